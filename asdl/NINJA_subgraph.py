@@ -24,8 +24,15 @@ def NinjaGraph(ru):
 
     ru.py_binary('asdl/asdl_main.py')
 
+    # Encoder and Decoder for --binary-methods
+    ru.cc_library('//asdl/cpp_binary',
+                  srcs=['asdl/cpp_binary.cc'],
+                  deps=['//mycpp/runtime'])
+
     # Base type for pretty printing
-    ru.asdl_library('asdl/hnode.asdl', pretty_print_methods=False)
+    ru.asdl_library('asdl/hnode.asdl',
+                    pretty_print_methods=False,
+                    binary_methods=False)
 
     # ASDL schemas
     ru.asdl_library('asdl/examples/typed_arith.asdl')
@@ -27,6 +27,12 @@ def Options():
                  default=True,
                  help='Whether to generate pretty printing methods')
 
+    p.add_option('--no-binary-methods',
+                 dest='binary_methods',
+                 action='store_false',
+                 default=True,
+                 help='Whether to generate binary Encode() and Decode() methods')
+
     # Control Python constructors
 
     # for hnode.asdl
@@ -135,6 +141,8 @@ def main(argv):
 using hnode_asdl::hnode_t;
 
 """)
+            if opts.binary_methods:
+                f.write('#include "asdl/cpp_binary.h"\n')
 
             if app_types:
                 f.write("""\
@@ -192,6 +200,13 @@ namespace %s {
 
 """ % ns)
 
+            if opts.binary_methods:
+                f.write("""\
+// Changes when the types or fields in the schema change
+const int FINGERPRINT = %d;
+
+""" % ast.Fingerprint(schema_ast))
+
             v = gen_cpp.ForwardDeclareVisitor(f)
             v.VisitModule(schema_ast)
 
@@ -199,7 +214,8 @@ namespace %s {
             v2 = gen_cpp.ClassDefVisitor(
                 f,
                 pretty_print_methods=opts.pretty_print_methods,
-                debug_info=debug_info)
+                debug_info=debug_info,
+                binary_methods=opts.binary_methods)
             v2.VisitModule(schema_ast)
 
             f.write("""
@@ -270,7 +286,8 @@ namespace %s {
                 v3 = gen_cpp.MethodDefVisitor(
                     f,
                     abbrev_ns=abbrev_ns,
-                    abbrev_mod_entries=abbrev_mod_entries)
+                    abbrev_mod_entries=abbrev_mod_entries,
+                    binary_methods=opts.binary_methods)
                 v3.VisitModule(schema_ast)
 
                 f.write("""
@@ -325,11 +342,22 @@ from _devbuild.gen.hnode_asdl import color_e, hnode, hnode_e, hnode_t, Field
             f.write('from %s import *\n' % opts.abbrev_module)
             f.write('\n')
 
+        if opts.binary_methods:
+            f.write("""
+from asdl import pybinary
+from mycpp.mylib import NewDict
+
+# Changes when the types or fields in the schema change
+FINGERPRINT = %d
+
+""" % ast.Fingerprint(schema_ast))
+
         v = gen_python.GenMyPyVisitor(
             f,
             abbrev_mod_entries,
             pretty_print_methods=opts.pretty_print_methods,
-            py_init_n=opts.py_init_n)
+            py_init_n=opts.py_init_n,
+            binary_methods=opts.binary_methods)
         v.VisitModule(schema_ast)
 
     else:
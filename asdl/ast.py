@@ -5,6 +5,7 @@
 from __future__ import print_function
 
 import cStringIO
+import zlib
 
 from typing import List
 
@@ -268,3 +269,42 @@ def TypeNameHeuristic(t):
     the name!  e.g. re_t or BraceGroup
     """
     return '%s_t' % t if t[0].islower() else t
+
+
+def _TypeString(typ):
+    # type: (AST) -> str
+    if isinstance(typ, ParameterizedType):
+        return '%s[%s]' % (typ.type_name, ', '.join(
+            _TypeString(c) for c in typ.children))
+    return typ.name
+
+
+def Fingerprint(module):
+    # type: (Module) -> int
+    """A hash of the types and fields in a schema.
+
+    The binary encoding refers to types by tag and to fields by position, so
+    data can only be decoded with the same schema.
+    """
+    parts = []  # type: List[str]
+    for d in module.dfns:
+        if isinstance(d, SubTypeDecl):
+            parts.append('%s < %s' % (d.name, _TypeString(d.base_class)))
+            continue
+
+        v = d.value
+        if isinstance(v, Product):
+            parts.append('%s = (%s)' % (d.name, ', '.join(
+                '%s %s' % (_TypeString(f.typ), f.name) for f in v.fields)))
+        else:
+            variants = []
+            for c in v.types:
+                if c.shared_type:
+                    variants.append('%s %%%s' % (c.name, c.shared_type))
+                else:
+                    variants.append('%s(%s)' % (c.name, ', '.join(
+                        '%s %s' % (_TypeString(f.typ), f.name)
+                        for f in c.fields)))
+            parts.append('%s = %s' % (d.name, ' | '.join(variants)))
+
+    return zlib.crc32('\n'.join(parts)) & 0x7fffffff
@@ -0,0 +1,199 @@
+// asdl/cpp_binary.cc
+
+#include "asdl/cpp_binary.h"
+
+#include <string.h>  // memcpy
+
+namespace pybinary {
+
+const int FORMAT_VERSION = 1;
+
+static const char kMagic[] = "ASDL";
+static const int kMagicLen = 4;
+
+static BigStr* EndOfData() {
+  return StrFromC("Unexpected end of ASDL data");
+}
+
+Encoder::Encoder(int fingerprint)
+    : buf_(Alloc<mylib::BufWriter>()),
+      objects_(Alloc<Dict<void*, int>>()),
+      strings_(Alloc<Dict<BigStr*, int>>()) {
+  buf_->WriteConst(kMagic);
+  Uint(FORMAT_VERSION);
+  Uint(fingerprint);
+}
+
+void Encoder::Uint(uint64_t n) {
+  buf_->EnsureMoreSpace(10);  // max length of a 64-bit varint
+  uint8_t* p = buf_->LengthPointer();
+  while (n >= 0x80) {
+    *p++ = static_cast<uint8_t>((n & 0x7f) | 0x80);
+    n >>= 7;
+  }
+  *p++ = static_cast<uint8_t>(n);
+  buf_->SetLengthFrom(p);
+}
+
+void Encoder::Int(int64_t i) {
+  // Zigzag encoding, so small negative numbers like -1 are short
+  uint64_t u = static_cast<uint64_t>(i);
+  Uint(i >= 0 ? (u << 1) : ((~u << 1) | 1));
+}
+
+void Encoder::Float(double f) {
+  // Assumes a little endian machine, like the rest of Oils
+  buf_->EnsureMoreSpace(sizeof(f));
+  uint8_t* p = buf_->LengthPointer();
+  memcpy(p, &f, sizeof(f));
+  buf_->SetLengthFrom(p + sizeof(f));
+}
+
+void Encoder::Str(BigStr* s) {
+  if (s == nullptr) {
+    Uint(0);
+    return;
+  }
+
+  int n = strings_->get(s, -1);
+  if (n != -1) {
+    Uint(n + 2);
+    return;
+  }
+
+  strings_->set(s, len(strings_));
+  Uint(1);
+  Uint(len(s));
+  buf_->write(s);
+}
+
+void Encoder::Register(void* obj) {
+  objects_->set(obj, len(objects_));
+}
+
+bool Encoder::Begin(void* obj, int tag) {
+  int n = objects_->get(obj, -1);
+  if (n != -1) {
+    Uint((static_cast<uint64_t>(n) << 1) | 1);
+    return false;
+  }
+
+  Register(obj);
+  Uint(static_cast<uint64_t>(tag) << 1);
+  return true;
+}
+
+void Encoder::Unsupported(BigStr* type_name) {
+  throw Alloc<ValueError>(
+      StrFormat("Can't encode ASDL type %r", type_name));
+}
+
+Decoder::Decoder(BigStr* data, int fingerprint)
+    : data_(data),
+      objects_(Alloc<List<void*>>()),
+      strings_(Alloc<List<BigStr*>>()),
+      ref(nullptr),
+      pos_(0) {
+  if (len(data_) < kMagicLen || memcmp(data_->data_, kMagic, kMagicLen) != 0) {
+    throw Alloc<ValueError>(StrFromC("Invalid ASDL header"));
+  }
+  pos_ = kMagicLen;
+  if (Uint() != static_cast<uint64_t>(FORMAT_VERSION)) {
+    throw Alloc<ValueError>(StrFromC("Unsupported ASDL format version"));
+  }
+  if (Uint() != static_cast<uint64_t>(fingerprint)) {
+    throw Alloc<ValueError>(StrFromC("ASDL schema fingerprint mismatch"));
+  }
+}
+
+uint64_t Decoder::Uint() {
+  const uint8_t* p = reinterpret_cast<const uint8_t*>(data_->data_);
+  int n_bytes = len(data_);
+
+  uint64_t n = 0;
+  int shift = 0;
+  while (true) {
+    if (pos_ >= n_bytes || shift > 63) {
+      throw Alloc<ValueError>(EndOfData());
+    }
+    uint8_t b = p[pos_++];
+    n |= static_cast<uint64_t>(b & 0x7f) << shift;
+    if (b < 0x80) {
+      break;
+    }
+    shift += 7;
+  }
+  return n;
+}
+
+int64_t Decoder::Int64() {
+  uint64_t n = Uint();
+  return static_cast<int64_t>((n >> 1) ^ (~(n & 1) + 1));
+}
+
+double Decoder::Float() {
+  double f;
+  if (pos_ + static_cast<int>(sizeof(f)) > len(data_)) {
+    throw Alloc<ValueError>(EndOfData());
+  }
+  memcpy(&f, data_->data_ + pos_, sizeof(f));
+  pos_ += sizeof(f);
+  return f;
+}
+
+BigStr* Decoder::Str() {
+  uint64_t n = Uint();
+  if (n == 0) {
+    return nullptr;
+  }
+  if (n == 1) {
+    uint64_t length = Uint();
+    if (length > static_cast<uint64_t>(len(data_) - pos_)) {
+      throw Alloc<ValueError>(EndOfData());
+    }
+    BigStr* s = StrFromC(data_->data_ + pos_, static_cast<int>(length));
+    pos_ += static_cast<int>(length);
+    strings_->append(s);
+    return s;
+  }
+  if (n - 2 >= static_cast<uint64_t>(len(strings_))) {
+    throw Alloc<ValueError>(StrFromC("Invalid ASDL string reference"));
+  }
+  return strings_->at(static_cast<int>(n - 2));
+}
+
+int Decoder::Len() {
+  uint64_t n = Uint();
+  // Each item takes at least one byte, so don't trust huge lengths
+  if (n > static_cast<uint64_t>(len(data_) - pos_) + 1) {
+    throw Alloc<ValueError>(EndOfData());
+  }
+  return static_cast<int>(n) - 1;
+}
+
+int Decoder::Begin() {
+  uint64_t n = Uint();
+  if (n == 0) {
+    return 0;
+  }
+  if (n & 1) {
+    uint64_t i = n >> 1;
+    if (i >= static_cast<uint64_t>(len(objects_))) {
+      throw Alloc<ValueError>(StrFromC("Invalid ASDL object reference"));
+    }
+    ref = objects_->at(static_cast<int>(i));
+    return -1;
+  }
+  return static_cast<int>(n >> 1);
+}
+
+void Decoder::BadTag(int tag) {
+  throw Alloc<ValueError>(StrFormat("Invalid ASDL tag %d", tag));
+}
+
+void* Decoder::Unsupported(BigStr* type_name) {
+  throw Alloc<ValueError>(
+      StrFormat("Can't decode ASDL type %r", type_name));
+}
+
+}  // namespace pybinary
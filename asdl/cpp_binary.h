@@ -0,0 +1,114 @@
+// asdl/cpp_binary.h: Encoder and Decoder for the ASDL binary format
+//
+// Hand-written port of asdl/pybinary.py, which documents the format.  The
+// Encode() and Decode() methods generated by asdl/gen_cpp.py call these
+// classes.
+
+#ifndef ASDL_CPP_BINARY_H
+#define ASDL_CPP_BINARY_H
+
+#include "mycpp/runtime.h"
+
+namespace pybinary {
+
+extern const int FORMAT_VERSION;
+
+class Encoder {
+ public:
+  explicit Encoder(int fingerprint);
+
+  void Uint(uint64_t n);
+  void Int(int64_t i);
+  void BigInt(mops::BigInt i) {
+    Int(i);
+  }
+  void Bool(bool b) {
+    Uint(b ? 1 : 0);
+  }
+  void Float(double f);
+  void Str(BigStr* s);
+  void Len(int n) {
+    Uint(n + 1);
+  }
+  void Null() {
+    Uint(0);
+  }
+
+  void Register(void* obj);
+  bool Begin(void* obj, int tag);
+  void Unsupported(BigStr* type_name);
+
+  BigStr* getvalue() {
+    return buf_->getvalue();
+  }
+
+  static constexpr ObjHeader obj_header() {
+    return ObjHeader::ClassFixed(field_mask(), sizeof(Encoder));
+  }
+
+  mylib::BufWriter* buf_;
+  Dict<void*, int>* objects_;
+  Dict<BigStr*, int>* strings_;
+
+  static constexpr uint32_t field_mask() {
+    return maskbit(offsetof(Encoder, buf_)) |
+           maskbit(offsetof(Encoder, objects_)) |
+           maskbit(offsetof(Encoder, strings_));
+  }
+
+  DISALLOW_COPY_AND_ASSIGN(Encoder)
+};
+
+class Decoder {
+ public:
+  // Throws ValueError if the header doesn't match
+  Decoder(BigStr* data, int fingerprint);
+
+  uint64_t Uint();
+  int Int() {
+    return static_cast<int>(Int64());
+  }
+  int64_t Int64();
+  mops::BigInt BigInt() {
+    return Int64();
+  }
+  bool Bool() {
+    return Uint() != 0;
+  }
+  double Float();
+  BigStr* Str();
+  int Len();
+
+  void Register(void* obj) {
+    objects_->append(obj);
+  }
+  int Begin();
+  void BadTag(int tag);
+  void* Unsupported(BigStr* type_name);
+  bool Done() {
+    return pos_ == len(data_);
+  }
+
+  static constexpr ObjHeader obj_header() {
+    return ObjHeader::ClassFixed(field_mask(), sizeof(Decoder));
+  }
+
+  BigStr* data_;
+  List<void*>* objects_;
+  List<BigStr*>* strings_;
+  void* ref;  // set by Begin() for references to objects already decoded
+  int pos_;
+
+  static constexpr uint32_t field_mask() {
+    return maskbit(offsetof(Decoder, data_)) |
+           maskbit(offsetof(Decoder, objects_)) |
+           maskbit(offsetof(Decoder, strings_)) |
+           maskbit(offsetof(Decoder, ref));
+  }
+
+  DISALLOW_COPY_AND_ASSIGN(Decoder)
+};
+
+}  // namespace pybinary
+
+#endif  // ASDL_CPP_BINARY_H
@@ -214,7 +214,11 @@ def _HNodeExpr(typ, var_name):
 class ClassDefVisitor(visitor.AsdlVisitor):
     """Generate C++ declarations and type-safe enums."""
 
-    def __init__(self, f, pretty_print_methods=True, debug_info=None):
+    def __init__(self,
+                 f,
+                 pretty_print_methods=True,
+                 debug_info=None,
+                 binary_methods=False):
         """
         Args:
           f: file to write to
@@ -222,6 +226,7 @@ class ClassDefVisitor(visitor.AsdlVisitor):
         """
         visitor.AsdlVisitor.__init__(self, f)
         self.pretty_print_methods = pretty_print_methods
+        self.binary_methods = binary_methods
         self.debug_info = debug_info if debug_info is not None else {}
 
         self._shared_type_tags = {}
@@ -362,6 +367,10 @@ class ClassDefVisitor(visitor.AsdlVisitor):
                 '  hnode_t* PrettyTree(bool do_abbrev, Dict<int, bool>* seen = nullptr);'
             )
 
+        if self.binary_methods:
+            Emit('  void Encode(pybinary::Encoder* enc);')
+            Emit('  static %(sum_name)s_t* Decode(pybinary::Decoder* dec);')
+
         Emit('  DISALLOW_COPY_AND_ASSIGN(%(sum_name)s_t)')
         Emit('};')
         Emit('')
@@ -419,13 +428,25 @@ class ClassDefVisitor(visitor.AsdlVisitor):
         self.Emit('};', depth)
         self.Emit('', depth)
 
-    def _EmitMethodDecl(self, obj_header_str, depth):
+    def _EmitMethodDecl(self, obj_header_str, depth, class_name,
+                        is_product):
         if self.pretty_print_methods:
             self.Emit(
                 '  hnode_t* PrettyTree(bool do_abbrev, Dict<int, bool>* seen = nullptr);',
                 depth)
             self.Emit('')
 
+        if self.binary_methods:
+            self.Emit('  void Encode(pybinary::Encoder* enc);', depth)
+            self.Emit(
+                '  static %s* DecodeNew(pybinary::Decoder* dec);' %
+                class_name, depth)
+            if is_product:
+                self.Emit(
+                    '  static %s* Decode(pybinary::Decoder* dec);' %
+                    class_name, depth)
+            self.Emit('')
+
         self.Emit('  static constexpr ObjHeader obj_header() {')
         self.Emit('    return %s;' % obj_header_str)
         self.Emit('  }')
@@ -466,7 +487,7 @@ class ClassDefVisitor(visitor.AsdlVisitor):
 
         # field_mask() should call List superclass, since say word_t won't have it
         obj_header_str = 'ObjHeader::TaggedSubtype(%d, field_mask())' % tag_num
-        self._EmitMethodDecl(obj_header_str, depth)
+        self._EmitMethodDecl(obj_header_str, depth, class_name, True)
 
         self._GenClassEnd(class_name, depth)
 
@@ -476,7 +497,8 @@ class ClassDefVisitor(visitor.AsdlVisitor):
                   base_classes,
                   depth,
                   tag_num,
-                  obj_header_str=''):
+                  obj_header_str='',
+                  is_product=False):
         """For Product and Constructor."""
         self._GenClassBegin(class_name, base_classes, depth)
 
@@ -536,7 +558,7 @@ class ClassDefVisitor(visitor.AsdlVisitor):
 
         obj_header_str = 'ObjHeader::AsdlClass(%s, %d)' % (tag_num,
                                                            len(managed_fields))
-        self._EmitMethodDecl(obj_header_str, depth)
+        self._EmitMethodDecl(obj_header_str, depth, class_name, is_product)
 
         #
         # Members
@@ -568,7 +590,12 @@ class ClassDefVisitor(visitor.AsdlVisitor):
             ast_node, name, depth, tag_num = args
             # Figure out base classes AFTERWARD.
             bases = self._base_classes[name]
-            self._GenClass(ast_node.fields, name, bases, depth, tag_num)
+            self._GenClass(ast_node.fields,
+                           name,
+                           bases,
+                           depth,
+                           tag_num,
+                           is_product=True)
 
         for args in self._subtypes:
             subtype, tag_num = args
@@ -591,6 +618,40 @@ class ClassDefVisitor(visitor.AsdlVisitor):
                 raise AssertionError()
 
 
+def _DecodeExpr(typ):
+    """Expression that decodes a value of a scalar or object type."""
+    if typ.IsOptional():
+        typ = typ.children[0]  # descend one level
+
+    assert isinstance(typ, ast.NamedType), typ
+    type_name = typ.name
+
+    if type_name == 'string':
+        return 'dec->Str()'
+    if type_name in ('int', 'uint16', 'id'):
+        return 'dec->Int()'
+    if type_name == 'BigInt':
+        return 'dec->BigInt()'
+    if type_name == 'float':
+        return 'dec->Float()'
+    if type_name == 'bool':
+        return 'dec->Bool()'
+    if type_name == 'any':
+        return 'dec->Unsupported(StrFromC("any"))'
+
+    r = typ.resolved
+    if isinstance(r, ast.SimpleSum):
+        if 'integers' in r.generate or 'uint16' in r.generate:
+            return 'dec->Int()'
+        return 'static_cast<%s_t>(dec->Int())' % type_name
+    if isinstance(r, ast.Extern):
+        return 'static_cast<%s>(dec->Unsupported(StrFromC("%s")))' % (
+            _GetCppType(typ), type_name)
+
+    # Sum, Product, or Use
+    return '%s::Decode(dec)' % _GetCppType(typ)[:-1]
+
+
 class MethodDefVisitor(visitor.AsdlVisitor):
     """Generate the body of pretty printing methods.
 
@@ -598,10 +659,193 @@ class MethodDefVisitor(visitor.AsdlVisitor):
     circular dependencies.
     """
 
-    def __init__(self, f, abbrev_ns=None, abbrev_mod_entries=None):
+    def __init__(self,
+                 f,
+                 abbrev_ns=None,
+                 abbrev_mod_entries=None,
+                 binary_methods=False):
         visitor.AsdlVisitor.__init__(self, f)
         self.abbrev_ns = abbrev_ns
         self.abbrev_mod_entries = abbrev_mod_entries or []
+        self.binary_methods = binary_methods
+
+        self._product_counter = 64  # matches ClassDefVisitor
+        self._var_counter = 0  # for names in generated methods
+
+    def _EmitEncodeValue(self, typ, var_name):
+        """Emit statements that encode var_name, which has type typ."""
+        if typ.IsOptional():
+            typ = typ.children[0]  # descend one level
+
+        if isinstance(typ, ast.ParameterizedType):
+            self._var_counter += 1
+            n = self._var_counter  # for unique names
+            self.Emit('if (%s == nullptr) {' % var_name)
+            self.Emit('  enc->Len(-1);')
+            self.Emit('} else {')
+            self.Indent()
+            self.Emit('enc->Len(len(%s));' % var_name)
+            if typ.type_name == 'List':
+                c_item_type = _GetCppType(typ.children[0])
+                self.Emit(
+                    'for (ListIter<%s> it%d(%s); !it%d.Done(); it%d.Next()) {'
+                    % (c_item_type, n, var_name, n, n))
+                self.Indent()
+                self.Emit('%s v%d = it%d.Value();' % (c_item_type, n, n))
+                self._EmitEncodeValue(typ.children[0], 'v%d' % n)
+            else:
+                k_typ, v_typ = typ.children
+                self.Emit(
+                    'for (DictIter<%s, %s> it%d(%s); !it%d.Done(); it%d.Next()) {'
+                    % (_GetCppType(k_typ), _GetCppType(v_typ), n, var_name, n,
+                       n))
+                self.Indent()
+                self.Emit('%s k%d = it%d.Key();' % (_GetCppType(k_typ), n, n))
+                self.Emit('%s v%d = it%d.Value();' %
+                          (_GetCppType(v_typ), n, n))
+                self._EmitEncodeValue(k_typ, 'k%d' % n)
+                self._EmitEncodeValue(v_typ, 'v%d' % n)
+            self.Dedent()
+            self.Emit('}')
+            self.Dedent()
+            self.Emit('}')
+            return
+
+        type_name = typ.name
+        r = typ.resolved
+
+        if type_name == 'string':
+            self.Emit('enc->Str(%s);' % var_name)
+        elif type_name in ('int', 'uint16', 'id'):
+            self.Emit('enc->Int(%s);' % var_name)
+        elif type_name == 'BigInt':
+            self.Emit('enc->BigInt(%s);' % var_name)
+        elif type_name == 'float':
+            self.Emit('enc->Float(%s);' % var_name)
+        elif type_name == 'bool':
+            self.Emit('enc->Bool(%s);' % var_name)
+        elif type_name == 'any':
+            self.Emit('enc->Unsupported(StrFromC("any"));')
+        elif isinstance(r, ast.SimpleSum):
+            self.Emit('enc->Int(static_cast<int>(%s));' % var_name)
+        elif isinstance(r, ast.Extern):
+            self.Emit('enc->Unsupported(StrFromC("%s"));' % type_name)
+        else:
+            self.Emit('if (%s == nullptr) {' % var_name)
+            self.Emit('  enc->Null();')
+            self.Emit('} else {')
+            self.Emit('  %s->Encode(enc);' % var_name)
+            self.Emit('}')
+
+    def _EmitDecodeValue(self, typ, assign):
+        """Emit statements that decode a value of type typ.
+
+        Args:
+          assign: format string for the statement that consumes the value,
+            e.g. 'obj->x = %s;'
+        """
+        if typ.IsOptional():
+            typ = typ.children[0]  # descend one level
+
+        if isinstance(typ, ast.ParameterizedType):
+            self._var_counter += 1
+            n = self._var_counter  # for unique names
+            c_type = _GetCppType(typ)[:-1]
+            self.Emit('int n%d = dec->Len();' % n)
+            self.Emit('if (n%d == -1) {' % n)
+            self.Emit('  ' + assign % 'nullptr')
+            self.Emit('} else {')
+            self.Indent()
+            self.Emit('auto* out%d = Alloc<%s>();' % (n, c_type))
+            if typ.type_name == 'List':
+                self.Emit('out%d->reserve(n%d);' % (n, n))
+                self.Emit('for (int i = 0; i < n%d; ++i) {' % n)
+                self.Indent()
+                self._EmitDecodeValue(typ.children[0],
+                                      'out%d->append(%%s);' % n)
+            else:
+                k_typ, v_typ = typ.children
+                self.Emit('for (int i = 0; i < n%d; ++i) {' % n)
+                self.Indent()
+                self.Emit('%s k%d = %s;' %
+                          (_GetCppType(k_typ), n, _DecodeExpr(k_typ)))
+                self._EmitDecodeValue(v_typ, 'out%d->set(k%d, %%s);' % (n, n))
+            self.Dedent()
+            self.Emit('}')
+            self.Emit(assign % ('out%d' % n))
+            self.Dedent()
+            self.Emit('}')
+            return
+
+        self.Emit(assign % _DecodeExpr(typ))
+
+    def _EmitBinaryMethods(self,
+                           class_name,
+                           all_fields,
+                           singleton=None,
+                           list_item_type=None,
+                           tag_num=None):
+        """Encode(), DecodeNew(), and for products, Decode()."""
+        self.Emit('')
+        self.Emit('void %s::Encode(pybinary::Encoder* enc) {' % class_name)
+        self.Emit(
+            '  if (!enc->Begin(this, ObjHeader::FromObject(this)->type_tag)) {'
+        )
+        self.Emit('    return;')
+        self.Emit('  }')
+        self.Indent()
+        if list_item_type:
+            self._EmitEncodeValue(
+                ast.ParameterizedType('List', [list_item_type]), 'this')
+        for field in all_fields:
+            self._EmitEncodeValue(field.typ, 'this->%s' % field.name)
+        self.Dedent()
+        self.Emit('}')
+
+        self.Emit('')
+        self.Emit('%s* %s::DecodeNew(pybinary::Decoder* dec) {' %
+                  (class_name, class_name))
+        if singleton:
+            self.Emit('  %s* obj = %s;' % (class_name, singleton))
+        elif list_item_type:
+            self.Emit('  %s* obj = %s::New();' % (class_name, class_name))
+        elif all_fields:
+            self.Emit('  %s* obj = %s::CreateNull();' %
+                      (class_name, class_name))
+        else:
+            self.Emit('  %s* obj = Alloc<%s>();' % (class_name, class_name))
+        self.Emit('  dec->Register(obj);')
+        self.Indent()
+        if list_item_type:
+            self.Emit('int n = dec->Len();')
+            self.Emit('for (int i = 0; i < n; ++i) {')
+            self.Indent()
+            self._EmitDecodeValue(list_item_type, 'obj->append(%s);')
+            self.Dedent()
+            self.Emit('}')
+        for field in all_fields:
+            self._EmitDecodeValue(field.typ, 'obj->%s = %%s;' % field.name)
+        self.Dedent()
+        self.Emit('  return obj;')
+        self.Emit('}')
+
+        if tag_num is not None:
+            self.Emit('')
+            self.Emit('%s* %s::Decode(pybinary::Decoder* dec) {' %
+                      (class_name, class_name))
+            self.Emit('  int tag = dec->Begin();')
+            self.Emit('  switch (tag) {')
+            self.Emit('  case 0:')
+            self.Emit('    return nullptr;')
+            self.Emit('  case -1:')
+            self.Emit('    return static_cast<%s*>(dec->ref);' % class_name)
+            self.Emit('  case %d:' % tag_num)
+            self.Emit('    return DecodeNew(dec);')
+            self.Emit('  default:')
+            self.Emit('    dec->BadTag(tag);')
+            self.Emit('    return nullptr;')
+            self.Emit('  }')
+            self.Emit('}')
 
     def _EmitList(self, list_str, item_type, out_val_name):
         # used in format strings
@@ -852,6 +1096,13 @@ class MethodDefVisitor(visitor.AsdlVisitor):
             self._EmitPrettyPrintMethods(class_name,
                                          all_fields,
                                          sum_name=sum_name)
+            if self.binary_methods:
+                singleton = None
+                if len(all_fields) == 0:
+                    singleton = '%s::%s' % (sum_name, variant.name)
+                self._EmitBinaryMethods(class_name,
+                                        all_fields,
+                                        singleton=singleton)
 
         # Emit dispatch WITHOUT using 'virtual'
         self.Emit('')
@@ -879,8 +1130,57 @@ class MethodDefVisitor(visitor.AsdlVisitor):
         self.Emit('  }')
         self.Emit('}')
 
+        if self.binary_methods:
+            self._EmitSumBinaryMethods(sum, sum_name)
+
+    def _EmitSumBinaryMethods(self, sum, sum_name):
+        """Encode() and Decode() dispatch WITHOUT using 'virtual'."""
+        self.Emit('')
+        self.Emit('void %s_t::Encode(pybinary::Encoder* enc) {' % sum_name)
+        self.Emit('  switch (this->tag()) {')
+        for variant in sum.types:
+            if variant.shared_type:
+                subtype_name = variant.shared_type
+            else:
+                subtype_name = '%s__%s' % (sum_name, variant.name)
+            self.Emit('  case %s_e::%s:' % (sum_name, variant.name))
+            self.Emit('    static_cast<%s*>(this)->Encode(enc);' %
+                      subtype_name)
+            self.Emit('    break;')
+        self.Emit('  default:')
+        self.Emit('    assert(0);')
+        self.Emit('  }')
+        self.Emit('}')
+
+        self.Emit('')
+        self.Emit('%s_t* %s_t::Decode(pybinary::Decoder* dec) {' %
+                  (sum_name, sum_name))
+        self.Emit('  int tag = dec->Begin();')
+        self.Emit('  switch (tag) {')
+        self.Emit('  case 0:')
+        self.Emit('    return nullptr;')
+        self.Emit('  case -1:')
+        self.Emit('    return static_cast<%s_t*>(dec->ref);' % sum_name)
+        for variant in sum.types:
+            if variant.shared_type:
+                subtype_name = variant.shared_type
+            else:
+                subtype_name = '%s__%s' % (sum_name, variant.name)
+            self.Emit('  case %s_e::%s:' % (sum_name, variant.name))
+            self.Emit('    return %s::DecodeNew(dec);' % subtype_name)
+        self.Emit('  default:')
+        self.Emit('    dec->BadTag(tag);')
+        self.Emit('    return nullptr;')
+        self.Emit('  }')
+        self.Emit('}')
+
     def VisitProduct(self, product, name, depth):
         self._EmitPrettyPrintMethods(name, product.fields)
+        if self.binary_methods:
+            self._EmitBinaryMethods(name,
+                                    product.fields,
+                                    tag_num=self._product_counter)
+        self._product_counter += 1
 
     def VisitSubType(self, subtype):
         list_item_type = None
@@ -890,3 +1190,8 @@ class MethodDefVisitor(visitor.AsdlVisitor):
                 list_item_type = b.children[0]
         self._EmitPrettyPrintMethods(subtype.name, [],
                                      list_item_type=list_item_type)
+        if self.binary_methods:
+            self._EmitBinaryMethods(subtype.name, [],
+                                    list_item_type=list_item_type,
+                                    tag_num=self._product_counter)
+        self._product_counter += 1
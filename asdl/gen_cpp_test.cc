@@ -279,6 +279,73 @@ TEST list_defaults_test() {
   PASS();
 }
 
+TEST binary_test() {
+  using typed_arith_asdl::arith_expr__Binary;
+
+  auto shared = Alloc<arith_expr__Var>(StrFromC("x"));
+  auto args = NewList<arith_expr_t*>(
+      std::initializer_list<arith_expr_t*>{shared, Alloc<arith_expr__Const>(-1)});
+  auto call = Alloc<arith_expr__FuncCall>(StrFromC("x"), args);
+  auto e = Alloc<arith_expr__Binary>(StrFromC("+"), call, shared);
+
+  auto enc = Alloc<pybinary::Encoder>(typed_arith_asdl::FINGERPRINT);
+  e->Encode(enc);
+  BigStr* data = enc->getvalue();
+
+  auto dec = Alloc<pybinary::Decoder>(data, typed_arith_asdl::FINGERPRINT);
+  arith_expr_t* e2 = arith_expr_t::Decode(dec);
+  ASSERT(dec->Done());
+  ASSERT_EQ(arith_expr_e::Binary, e2->tag());
+
+  // Shared subtrees are decoded once
+  auto b = static_cast<arith_expr__Binary*>(e2);
+  auto call2 = static_cast<arith_expr__FuncCall*>(b->left);
+  ASSERT_EQ(b->right, call2->args->at(0));
+  ASSERT(str_equals(StrFromC("x"), call2->name));
+
+  // Re-encoding gives the same bytes
+  auto enc2 = Alloc<pybinary::Encoder>(typed_arith_asdl::FINGERPRINT);
+  e2->Encode(enc2);
+  ASSERT(str_equals(data, enc2->getvalue()));
+
+  // Truncated data and the wrong schema are errors
+  bool caught = false;
+  try {
+    dec = Alloc<pybinary::Decoder>(data->slice(0, len(data) - 1),
+                                   typed_arith_asdl::FINGERPRINT);
+    arith_expr_t::Decode(dec);
+  } catch (ValueError* e) {
+    caught = true;
+  }
+  ASSERT(caught);
+
+  caught = false;
+  try {
+    dec = Alloc<pybinary::Decoder>(data, typed_demo_asdl::FINGERPRINT);
+  } catch (ValueError* e) {
+    caught = true;
+  }
+  ASSERT(caught);
+
+  // Dicts
+  auto m = typed_demo_asdl::Dicts::CreateNull();
+  m->ss = Alloc<Dict<BigStr*, BigStr*>>();
+  m->ib = Alloc<Dict<int, bool>>();
+  m->ss->set(StrFromC("foo"), StrFromC("bar"));
+  m->ib->set(42, true);
+
+  auto enc3 = Alloc<pybinary::Encoder>(typed_demo_asdl::FINGERPRINT);
+  m->Encode(enc3);
+  dec = Alloc<pybinary::Decoder>(enc3->getvalue(),
+                                 typed_demo_asdl::FINGERPRINT);
+  auto m2 = typed_demo_asdl::Dicts::Decode(dec);
+  ASSERT(dec->Done());
+  ASSERT(str_equals(StrFromC("bar"), m2->ss->at(StrFromC("foo"))));
+  ASSERT_EQ(true, m2->ib->at(42));
+
+  PASS();
+}
+
 GREATEST_MAIN_DEFS();
 
 int main(int argc, char** argv) {
@@ -293,6 +360,7 @@ int main(int argc, char** argv) {
   RUN_TEST(literal_test);
   RUN_TEST(string_defaults_test);
   RUN_TEST(list_defaults_test);
+  RUN_TEST(binary_test);
 
   gHeap.CleanProcessExit();
 
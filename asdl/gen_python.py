@@ -172,6 +172,49 @@ def _HNodeExpr(typ, var_name):
     return code_str, none_guard
 
 
+def _DecodeExpr(typ):
+    """Expression that decodes a value of a scalar or object type."""
+    if typ.IsOptional():
+        typ = typ.children[0]  # descend one level
+
+    assert isinstance(typ, ast.NamedType), typ
+    type_name = typ.name
+
+    if type_name == 'string':
+        return 'dec.Str()'
+    if type_name in ('int', 'uint16', 'id'):
+        return 'dec.Int()'
+    if type_name == 'BigInt':
+        return 'dec.BigInt()'
+    if type_name == 'float':
+        return 'dec.Float()'
+    if type_name == 'bool':
+        return 'dec.Bool()'
+    if type_name == 'any':
+        return "dec.Unsupported('any')"
+
+    r = typ.resolved
+    if isinstance(r, ast.SimpleSum):
+        if 'integers' in r.generate or 'uint16' in r.generate:
+            return 'dec.Int()'
+        return '%s_t(dec.Int())' % type_name
+    if isinstance(r, ast.Extern):
+        return 'dec.Unsupported(%r)' % type_name
+
+    # Sum, Product, or Use.  Use is imported in the function body.
+    return '%s.Decode(dec)' % _MyPyType(typ)
+
+
+def _UsedTypes(typ, out):
+    """Collect the 'use' types that decoding typ refers to."""
+    if isinstance(typ, ast.ParameterizedType):
+        for child in typ.children:
+            _UsedTypes(child, out)
+    elif isinstance(typ.resolved, ast.Use):
+        out.add((typ.resolved.module_parts[-1],
+                 ast.TypeNameHeuristic(typ.name)))
+
+
 class GenMyPyVisitor(visitor.AsdlVisitor):
     """Generate Python code with MyPy type annotations."""
 
@@ -180,11 +223,14 @@ class GenMyPyVisitor(visitor.AsdlVisitor):
                  abbrev_mod_entries=None,
                  pretty_print_methods=True,
                  py_init_n=False,
-                 simple_int_sums=None):
+                 simple_int_sums=None,
+                 binary_methods=False):
 
         visitor.AsdlVisitor.__init__(self, f)
         self.abbrev_mod_entries = abbrev_mod_entries or []
         self.pretty_print_methods = pretty_print_methods
+        self.binary_methods = binary_methods
+        self._var_counter = 0  # for names in generated methods
         self.py_init_n = py_init_n
 
         # For Id to use different code gen.  It's used like an integer, not just
@@ -337,11 +383,195 @@ class GenMyPyVisitor(visitor.AsdlVisitor):
             self.Emit('  L.append(Field(%r, %s))' % (field.name, out_val_name),
                       depth)
 
+    def _EmitEncodeValue(self, typ, var_name, ind):
+        """Emit statements that encode var_name, which has type typ."""
+        if typ.IsOptional():
+            typ = typ.children[0]  # descend one level
+
+        def Emit(line):
+            self.Emit(ind + line, reflow=False)
+
+        if isinstance(typ, ast.ParameterizedType):
+            self._var_counter += 1
+            n = self._var_counter  # for unique names
+            Emit('if %s is None:' % var_name)
+            Emit('  enc.Len(-1)')
+            Emit('else:')
+            Emit('  enc.Len(len(%s))' % var_name)
+            if typ.type_name == 'List':
+                item = 'i%d' % n
+                Emit('  for %s in %s:' % (item, var_name))
+                self._EmitEncodeValue(typ.children[0], item, ind + '    ')
+            else:
+                k = 'k%d' % n
+                v = 'v%d' % n
+                Emit('  for %s, %s in %s.iteritems():' % (k, v, var_name))
+                self._EmitEncodeValue(typ.children[0], k, ind + '    ')
+                self._EmitEncodeValue(typ.children[1], v, ind + '    ')
+            return
+
+        type_name = typ.name
+        r = typ.resolved
+
+        if type_name == 'string':
+            Emit('enc.Str(%s)' % var_name)
+        elif type_name in ('int', 'uint16', 'id'):
+            Emit('enc.Int(%s)' % var_name)
+        elif type_name == 'BigInt':
+            Emit('enc.BigInt(%s)' % var_name)
+        elif type_name == 'float':
+            Emit('enc.Float(%s)' % var_name)
+        elif type_name == 'bool':
+            Emit('enc.Bool(%s)' % var_name)
+        elif type_name == 'any':
+            Emit("enc.Unsupported('any')")
+        elif isinstance(r, ast.SimpleSum):
+            Emit('enc.Int(%s)' % var_name)
+        elif isinstance(r, ast.Extern):
+            Emit('enc.Unsupported(%r)' % type_name)
+        else:
+            Emit('if %s is None:' % var_name)
+            Emit('  enc.Null()')
+            Emit('else:')
+            Emit('  %s.Encode(enc)' % var_name)
+
+    def _EmitDecodeValue(self, typ, assign, ind):
+        """Emit statements that decode a value of type typ.
+
+        Args:
+          assign: format string for the statement that consumes the value,
+            e.g. 'obj.x = %s'
+        """
+        if typ.IsOptional():
+            typ = typ.children[0]  # descend one level
+
+        def Emit(line):
+            self.Emit(ind + line, reflow=False)
+
+        if isinstance(typ, ast.ParameterizedType):
+            self._var_counter += 1
+            n = self._var_counter  # for unique names
+            length = 'n%d' % n
+            out = 'out%d' % n
+            Emit('%s = dec.Len()' % length)
+            Emit('if %s == -1:' % length)
+            Emit('  ' + assign % 'None')
+            Emit('else:')
+            if typ.type_name == 'List':
+                Emit('  %s = []  # type: %s' % (out, _MyPyType(typ)))
+                Emit('  for _ in xrange(%s):' % length)
+                self._EmitDecodeValue(typ.children[0], out + '.append(%s)',
+                                      ind + '    ')
+            else:
+                k_typ, v_typ = typ.children
+                if k_typ.name == 'string':
+                    Emit('  %s = NewDict()  # type: %s' % (out, _MyPyType(typ)))
+                else:
+                    Emit('  %s = {}  # type: %s' % (out, _MyPyType(typ)))
+                k = 'k%d' % n
+                Emit('  for _ in xrange(%s):' % length)
+                Emit('    %s = %s' % (k, _DecodeExpr(k_typ)))
+                self._EmitDecodeValue(v_typ, '%s[%s] = %%s' % (out, k),
+                                      ind + '    ')
+            Emit('  ' + assign % out)
+            return
+
+        Emit(assign % _DecodeExpr(typ))
+
+    def _EmitBinaryMethods(self,
+                           class_name,
+                           class_ns,
+                           fields,
+                           list_item_type=None):
+        """Encode() and DecodeNew(), which reads the fields of a new object."""
+        if list_item_type:
+            type_str = class_name
+        elif fields:
+            type_str = '%s%s' % (class_ns, class_name)
+        else:
+            # command__NoOp; the instance is command.NoOp
+            type_str = class_name
+
+        self.Emit('  def Encode(self, enc):')
+        self.Emit('    # type: (pybinary.Encoder) -> None')
+        self.Emit('    if not enc.Begin(self, self._type_tag):')
+        self.Emit('      return')
+        if list_item_type:
+            self._EmitEncodeValue(ast.ParameterizedType('List', [list_item_type]),
+                                  'self', '    ')
+        for f in fields:
+            self._EmitEncodeValue(f.typ, 'self.%s' % f.name, '    ')
+        self.Emit('')
+
+        self.Emit('  @staticmethod')
+        self.Emit('  def DecodeNew(dec):')
+        self.Emit('    # type: (pybinary.Decoder) -> %s' % type_str)
+
+        # Import types from other modules here, to avoid circular imports
+        used = set()
+        if list_item_type:
+            _UsedTypes(list_item_type, used)
+        for f in fields:
+            _UsedTypes(f.typ, used)
+        for mod_name, type_name in sorted(used):
+            self.Emit('    from _devbuild.gen.%s_asdl import %s' %
+                      (mod_name, type_name))
+
+        if list_item_type:
+            self.Emit('    obj = %s.New()' % class_name)
+        elif not fields:
+            if class_ns or '__' not in class_name:
+                self.Emit('    obj = %s()' % class_name)
+            else:
+                self.Emit('    obj = %s' % class_name.replace('__', '.'))
+        elif self.py_init_n:
+            default_vals = [
+                _DefaultValue(f.typ, _MyPyType(f.typ)) for f in fields
+            ]
+            self.Emit('    obj = %s%s(%s)' %
+                      (class_ns, class_name, ', '.join(default_vals)),
+                      reflow=False)
+        else:
+            self.Emit('    obj = %s%s.CreateNull()' % (class_ns, class_name))
+        self.Emit('    dec.Register(obj)')
+
+        if list_item_type:
+            self.Emit('    n = dec.Len()')
+            self.Emit('    for _ in xrange(n):')
+            self._EmitDecodeValue(list_item_type, 'obj.append(%s)', '      ')
+        for f in fields:
+            self._EmitDecodeValue(f.typ, 'obj.%s = %%s' % f.name, '    ')
+        self.Emit('    return obj')
+        self.Emit('')
+
+    def _EmitDecodeBegin(self, type_str):
+        self.Emit('  @staticmethod')
+        self.Emit('  def Decode(dec):')
+        self.Emit('    # type: (pybinary.Decoder) -> %s' % type_str)
+        self.Emit('    tag = dec.Begin()')
+        self.Emit('    if tag == 0:')
+        self.Emit('      return None')
+        self.Emit('    if tag == -1:')
+        self.Emit('      return cast(%s, dec.ref)' % type_str)
+
+    def _EmitDecodeMethod(self, class_name, tag_num):
+        """Decode() for product types and subtypes, which have one tag."""
+        self._EmitDecodeBegin(class_name)
+        self.Emit('    if tag != %d:' % tag_num)
+        self.Emit('      dec.BadTag(tag)')
+        self.Emit('    return %s.DecodeNew(dec)' % class_name)
+        self.Emit('')
+
     def _GenClassBegin(self, class_name, base_classes, tag_num):
         self.Emit('class %s(%s):' % (class_name, ', '.join(base_classes)))
         self.Emit('  _type_tag = %d' % tag_num)
 
-    def _GenListSubclass(self, class_name, base_classes, tag_num, class_ns=''):
+    def _GenListSubclass(self,
+                         class_name,
+                         base_classes,
+                         tag_num,
+                         item_type,
+                         class_ns=''):
         self._GenClassBegin(class_name, base_classes, tag_num)
 
         # TODO: Do something nicer
@@ -376,18 +606,25 @@ class GenMyPyVisitor(visitor.AsdlVisitor):
         if self.pretty_print_methods:
             self._EmitPrettyPrintMethodsForList(class_name)
 
+        if self.binary_methods:
+            self._EmitBinaryMethods(class_name, '', [],
+                                    list_item_type=item_type)
+            self._EmitDecodeMethod(class_name, tag_num)
+
     def _GenClass(self,
                   fields,
                   class_name,
                   base_classes,
                   tag_num,
-                  class_ns=''):
+                  class_ns='',
+                  is_product=False):
         """Generate a typed Python class.
 
         Used for both Sum variants ("constructors") and Product types.
 
         Args:
           class_ns: for variants like value.Str
+          is_product: whether the class is a type on its own, not a variant
         """
         self._GenClassBegin(class_name, base_classes, tag_num)
 
@@ -438,6 +675,12 @@ class GenMyPyVisitor(visitor.AsdlVisitor):
         if self.pretty_print_methods:
             self._EmitPrettyPrintMethods(class_name, class_ns, fields)
 
+        # Encode() and Decode()
+        if self.binary_methods:
+            self._EmitBinaryMethods(class_name, class_ns, fields)
+            if is_product:
+                self._EmitDecodeMethod(class_name, tag_num)
+
     def _EmitPrettyBegin(self):
         self.Emit('  def PrettyTree(self, do_abbrev, trav=None):')
         self.Emit('    # type: (bool, Optional[TraversalState]) -> hnode_t')
@@ -566,6 +809,23 @@ class GenMyPyVisitor(visitor.AsdlVisitor):
         self.Emit('  # type: () -> int')
         self.Emit('  return self._type_tag')
 
+        if self.binary_methods:
+            self.Dedent()  # _EmitDecodeBegin() indents by itself
+            self.Emit('')
+            self._EmitDecodeBegin(sum_name + '_t')
+            for i, variant in enumerate(sum.types):
+                if variant.shared_type:
+                    decode_class = variant.shared_type
+                elif len(variant.fields) == 0:
+                    decode_class = '%s__%s' % (sum_name, variant.name)
+                else:
+                    decode_class = '%s.%s' % (sum_name, variant.name)
+                self.Emit('    if tag == %s_e.%s:' % (sum_name, variant.name))
+                self.Emit('      return %s.DecodeNew(dec)' % decode_class)
+            self.Emit('    dec.BadTag(tag)')
+            self.Emit('    return None')
+            self.Indent()
+
         self.Dedent()
         depth = self.current_depth
 
@@ -632,7 +892,11 @@ class GenMyPyVisitor(visitor.AsdlVisitor):
             bases = self._base_classes[name]
             if not bases:
                 bases = ['pybase.CompoundObj']
-            self._GenClass(ast_node.fields, name, bases, tag_num)
+            self._GenClass(ast_node.fields,
+                           name,
+                           bases,
+                           tag_num,
+                           is_product=True)
 
         for args in self._subtypes:
             subtype, tag_num = args
@@ -644,6 +908,11 @@ class GenMyPyVisitor(visitor.AsdlVisitor):
             bases.append(_MyPyType(subtype.base_class))
 
             if subtype.base_class.IsList():
-                self._GenListSubclass(subtype.name, bases, tag_num)
+                self._GenListSubclass(subtype.name, bases, tag_num,
+                                      subtype.base_class.children[0])
             else:
-                self._GenClass([], subtype.name, bases, tag_num)
+                self._GenClass([],
+                               subtype.name,
+                               bases,
+                               tag_num,
+                               is_product=True)
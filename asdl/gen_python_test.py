@@ -5,13 +5,22 @@ from __future__ import print_function
 import unittest
 
 from asdl import pybase
+from asdl import pybinary
+from mycpp import mops
 
+from _devbuild.gen import shared_variant_asdl
+from _devbuild.gen import typed_arith_asdl
 from _devbuild.gen import typed_demo_asdl
-from _devbuild.gen.typed_arith_asdl import arith_expr, arith_expr_e
+from _devbuild.gen.demo_lib_asdl import LibToken
+from _devbuild.gen.shared_variant_asdl import (DoubleQuoted, expr, expr_t,
+                                               word_part, word_part_t)
+from _devbuild.gen.typed_arith_asdl import arith_expr, arith_expr_e, arith_expr_t
 from _devbuild.gen.typed_demo_asdl import (source_location, flag_type,
                                            flag_type_str, op_id_e, op_id_str,
                                            cflow, cflow_t, Strings, Dicts,
-                                           Maybes, op_array)
+                                           Maybes, op_array, Token, a_word,
+                                           a_word_t, CompoundWord, ContainsLib,
+                                           foo)
 
 
 class ArithAstTest(unittest.TestCase):
@@ -176,5 +185,151 @@ class ArithAstTest(unittest.TestCase):
         self.assertEqual(arith_expr_e.Binary, n.tag())
 
 
+def _Encode(obj, fingerprint):
+    enc = pybinary.Encoder(fingerprint)
+    obj.Encode(enc)
+    return enc.getvalue()
+
+
+class BinaryTest(unittest.TestCase):
+
+    def _RoundTrip(self, obj, cls, fingerprint):
+        """Decode the encoded obj, and check that it encodes the same way."""
+        data = _Encode(obj, fingerprint)
+        dec = pybinary.Decoder(data, fingerprint)
+        obj2 = cls.Decode(dec)
+        self.assertTrue(dec.Done())
+        self.assertEqual(data, _Encode(obj2, fingerprint))
+        return obj2
+
+    def testSumAndProductTypes(self):
+        fp = typed_arith_asdl.FINGERPRINT
+        big = mops.BigInt(1 << 40)
+        node = arith_expr.Slice(
+            arith_expr.Binary('+', arith_expr.Const(-1), arith_expr.Big(big)),
+            None,
+            arith_expr.FuncCall('f', [arith_expr.Var('x'), arith_expr.NoOp]),
+            None,
+        )
+        node2 = self._RoundTrip(node, arith_expr_t, fp)
+
+        self.assertEqual(arith_expr_e.Slice, node2.tag())
+        self.assertEqual(-1, node2.a.left.i)
+        self.assertEqual(1 << 40, node2.a.right.b.i)
+        self.assertEqual(None, node2.begin)
+        self.assertEqual('x', node2.end.args[0].name)
+
+        # Variants without fields are singletons
+        self.assertIs(arith_expr.NoOp, node2.end.args[1])
+
+        s = source_location('foo.sh', 1, 2, 3)
+        s2 = self._RoundTrip(s, source_location, typed_demo_asdl.FINGERPRINT)
+        self.assertEqual('foo.sh', s2.path)
+        self.assertEqual(3, s2.length)
+
+    def testContainers(self):
+        fp = typed_demo_asdl.FINGERPRINT
+
+        d = Dicts({'k': 'v'}, {3: True, -4: False}, {'t': Token('s', True)})
+        d2 = self._RoundTrip(d, Dicts, fp)
+        self.assertEqual([('k', 'v')], d2.ss.items())
+        self.assertEqual({3: True, -4: False}, d2.ib)
+        self.assertEqual('s', d2.tokens['t'].s)
+        self.assertEqual(True, d2.tokens['t'].b)
+
+        d = Dicts(None, {}, None)
+        d2 = self._RoundTrip(d, Dicts, fp)
+        self.assertEqual(None, d2.ss)
+        self.assertEqual({}, d2.ib)
+
+        m = Maybes(None, None)
+        m2 = self._RoundTrip(m, Maybes, fp)
+        self.assertEqual(None, m2.op)
+
+        ops = op_array([op_id_e.Plus, op_id_e.Star])
+        ops2 = self._RoundTrip(ops, op_array, fp)
+        self.assertEqual([op_id_e.Plus, op_id_e.Star], ops2.ops)
+
+        # Imported from another module
+        c = ContainsLib(LibToken('lib', 42))
+        c2 = self._RoundTrip(c, ContainsLib, fp)
+        self.assertEqual(42, c2.t.i)
+
+    def testSubtypes(self):
+        fp = typed_demo_asdl.FINGERPRINT
+
+        w = CompoundWord([arith_expr.Const(1), arith_expr.NoOp])
+        w2 = self._RoundTrip(w, a_word_t, fp)
+        self.assertTrue(isinstance(w2, CompoundWord))
+        self.assertEqual(2, len(w2))
+        self.assertEqual(1, w2[0].i)
+
+        w = a_word.String('s')
+        w2 = self._RoundTrip(w, a_word_t, fp)
+        self.assertEqual('s', w2.s)
+
+        fp = shared_variant_asdl.FINGERPRINT
+        dq = DoubleQuoted(5, ['a', 'b'])
+        e2 = self._RoundTrip(expr.Binary(dq, dq), expr_t, fp)
+        self.assertEqual(['a', 'b'], e2.left.tokens)
+
+        p2 = self._RoundTrip(dq, word_part_t, fp)
+        self.assertEqual(5, p2.left)
+
+    def testSharing(self):
+        fp = typed_arith_asdl.FINGERPRINT
+
+        shared = arith_expr.Var('x')
+        node = arith_expr.Binary('+', shared, shared)
+        node2 = self._RoundTrip(node, arith_expr_t, fp)
+        self.assertIs(node2.left, node2.right)
+
+        # Strings are stored once
+        node = arith_expr.Binary('+', arith_expr.Var('+'),
+                                 arith_expr.Var('+'))
+        data = _Encode(node, fp)
+        self.assertEqual(1, data.count('+'))
+
+        # Cycles
+        node = arith_expr.FuncCall('f', [])
+        node.args.append(node)
+        data = _Encode(node, fp)
+        node2 = arith_expr_t.Decode(pybinary.Decoder(data, fp))
+        self.assertIs(node2, node2.args[0])
+
+    def testErrors(self):
+        fp = typed_arith_asdl.FINGERPRINT
+        data = _Encode(arith_expr.Var('x'), fp)
+
+        # Wrong schema
+        self.assertRaises(ValueError, pybinary.Decoder, data, fp + 1)
+        self.assertRaises(ValueError, pybinary.Decoder, 'JSON', fp)
+
+        # Truncated
+        for i in range(len(pybinary.MAGIC), len(data)):
+            try:
+                arith_expr_t.Decode(pybinary.Decoder(data[:i], fp))
+            except ValueError:
+                pass
+            else:
+                self.fail('Expected ValueError for %r' % data[:i])
+
+        # Wrong type
+        data = _Encode(source_location('foo.sh', 1, 2, 3),
+                       typed_demo_asdl.FINGERPRINT)
+        dec = pybinary.Decoder(data, typed_demo_asdl.FINGERPRINT)
+        self.assertRaises(ValueError, op_array.Decode, dec)
+
+        # extern types can't be encoded
+        f = foo(None, None)
+        self.assertRaises(ValueError, _Encode, f, typed_demo_asdl.FINGERPRINT)
+
+    def testFingerprint(self):
+        # Fingerprints differ, so data from one schema can't be decoded with
+        # another
+        self.assertNotEqual(typed_demo_asdl.FINGERPRINT,
+                            typed_arith_asdl.FINGERPRINT)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -7,6 +7,7 @@ from mycpp import mylib
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from _devbuild.gen.hnode_asdl import hnode_t
+    from asdl.pybinary import Encoder
     from asdl.runtime import TraversalState
 
 
@@ -26,6 +27,11 @@ class CompoundObj(object):
         # type: (bool, TraversalState) -> hnode_t
         raise NotImplementedError(self.__class__.__name__)
 
+    def Encode(self, enc):
+        # type: (Encoder) -> None
+        """Generated unless asdl_main.py is passed --no-binary-methods."""
+        raise NotImplementedError(self.__class__.__name__)
+
     def __repr__(self):
         # type: () -> str
         """Print this ASDL object nicely."""
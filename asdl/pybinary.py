@@ -0,0 +1,259 @@
+#!/usr/bin/env python2
+"""
+pybinary.py - Encoder and Decoder for the ASDL binary format.
+
+The Encode() and Decode() methods generated by asdl/gen_python.py call these
+classes.  Ported by hand to C++ in asdl/cpp_binary.h.
+
+Format, after a header of MAGIC, FORMAT_VERSION, and the module FINGERPRINT:
+
+  int      zigzag varint
+  bool     varint 0 or 1
+  float    8 bytes, little endian IEEE 754
+  string   0 for None, 1 for a new string followed by its length and bytes, or
+           n+2 for the n-th string seen
+  object   0 for None, tag << 1 for a new object followed by its fields, or
+           (n << 1) | 1 for the n-th object seen
+  list     0 for None, or length+1 followed by the items
+  dict     0 for None, or length+1 followed by key, value pairs
+
+Objects are numbered in the order they're encoded, so shared subtrees and
+cycles are preserved.  Objects passed to Register() before encoding are
+numbered first, so they can refer to objects outside the tree, e.g. the
+source_t of a file.  The decoder must Register() the corresponding objects in
+the same order.
+"""
+from __future__ import print_function
+
+import struct
+
+from mycpp import mops
+
+from typing import List, Dict, Any
+
+MAGIC = 'ASDL'
+FORMAT_VERSION = 1
+
+
+class Encoder(object):
+
+    def __init__(self, fingerprint):
+        # type: (int) -> None
+        self.parts = []  # type: List[str]
+        self.objects = {}  # type: Dict[int, int]
+        self.strings = {}  # type: Dict[str, int]
+
+        # Keep registered objects alive, so their id() isn't reused
+        self.keep_alive = []  # type: List[Any]
+
+        self.parts.append(MAGIC)
+        self.Uint(FORMAT_VERSION)
+        self.Uint(fingerprint)
+
+    def Uint(self, n):
+        # type: (int) -> None
+        """Write a non-negative integer as a varint."""
+        while n >= 0x80:
+            self.parts.append(chr((n & 0x7f) | 0x80))
+            n >>= 7
+        self.parts.append(chr(n))
+
+    def Int(self, i):
+        # type: (int) -> None
+        # Zigzag encoding, so small negative numbers like -1 are short
+        self.Uint((i << 1) if i >= 0 else ((-i << 1) - 1))
+
+    def BigInt(self, i):
+        # type: (mops.BigInt) -> None
+        self.Int(i.i)
+
+    def Bool(self, b):
+        # type: (bool) -> None
+        self.parts.append('\x01' if b else '\x00')
+
+    def Float(self, f):
+        # type: (float) -> None
+        self.parts.append(struct.pack('<d', f))
+
+    def Str(self, s):
+        # type: (str) -> None
+        if s is None:
+            self.Uint(0)
+            return
+
+        n = self.strings.get(s)
+        if n is not None:
+            self.Uint(n + 2)
+            return
+
+        self.strings[s] = len(self.strings)
+        self.Uint(1)
+        self.Uint(len(s))
+        self.parts.append(s)
+
+    def Len(self, n):
+        # type: (int) -> None
+        """Length of a list or dict, or -1 for None."""
+        self.Uint(n + 1)
+
+    def Null(self):
+        # type: () -> None
+        self.Uint(0)
+
+    def Register(self, obj):
+        # type: (Any) -> None
+        self.objects[id(obj)] = len(self.objects)
+        self.keep_alive.append(obj)
+
+    def Begin(self, obj, tag):
+        # type: (Any, int) -> bool
+        """Start encoding an object.
+
+        Returns False if it was already encoded, and only a reference was
+        written.
+        """
+        n = self.objects.get(id(obj))
+        if n is not None:
+            self.Uint((n << 1) | 1)
+            return False
+
+        self.Register(obj)
+        self.Uint(tag << 1)
+        return True
+
+    def Unsupported(self, type_name):
+        # type: (str) -> None
+        raise ValueError("Can't encode ASDL type %r" % type_name)
+
+    def getvalue(self):
+        # type: () -> str
+        return ''.join(self.parts)
+
+
+class Decoder(object):
+
+    def __init__(self, data, fingerprint):
+        # type: (str, int) -> None
+        """
+        Raises:
+          ValueError if the header doesn't match
+        """
+        self.data = data
+        self.pos = 0
+        self.objects = []  # type: List[Any]
+        self.strings = []  # type: List[str]
+
+        # Set by Begin() for references to objects already decoded
+        self.ref = None  # type: Any
+
+        if not data.startswith(MAGIC):
+            raise ValueError('Invalid ASDL header')
+        self.pos = len(MAGIC)
+        if self.Uint() != FORMAT_VERSION:
+            raise ValueError('Unsupported ASDL format version')
+        if self.Uint() != fingerprint:
+            raise ValueError('ASDL schema fingerprint mismatch')
+
+    def Uint(self):
+        # type: () -> int
+        data = self.data
+        pos = self.pos
+        n = 0
+        shift = 0
+        while True:
+            if pos >= len(data):
+                raise ValueError('Unexpected end of ASDL data')
+            b = ord(data[pos])
+            pos += 1
+            n |= (b & 0x7f) << shift
+            if b < 0x80:
+                break
+            shift += 7
+        self.pos = pos
+        return n
+
+    def Int(self):
+        # type: () -> int
+        n = self.Uint()
+        return (n >> 1) if (n & 1) == 0 else -((n + 1) >> 1)
+
+    def BigInt(self):
+        # type: () -> mops.BigInt
+        return mops.BigInt(self.Int())
+
+    def Bool(self):
+        # type: () -> bool
+        return self._Bytes(1) != '\x00'
+
+    def Float(self):
+        # type: () -> float
+        f = struct.unpack('<d', self._Bytes(8))[0]  # type: float
+        return f
+
+    def _Bytes(self, n):
+        # type: (int) -> str
+        end = self.pos + n
+        if end > len(self.data):
+            raise ValueError('Unexpected end of ASDL data')
+        s = self.data[self.pos:end]
+        self.pos = end
+        return s
+
+    def Str(self):
+        # type: () -> str
+        n = self.Uint()
+        if n == 0:
+            return None
+        if n == 1:
+            s = self._Bytes(self.Uint())
+            self.strings.append(s)
+            return s
+        if n - 2 >= len(self.strings):
+            raise ValueError('Invalid ASDL string reference')
+        return self.strings[n - 2]
+
+    def Len(self):
+        # type: () -> int
+        """Length of a list or dict, or -1 for None."""
+        n = self.Uint() - 1
+        # Each item takes at least one byte, so don't trust huge lengths
+        if n > len(self.data) - self.pos:
+            raise ValueError('Unexpected end of ASDL data')
+        return n
+
+    def Register(self, obj):
+        # type: (Any) -> None
+        self.objects.append(obj)
+
+    def Begin(self):
+        # type: () -> int
+        """Start decoding an object.
+
+        Returns:
+          0 for None, -1 for a reference to self.ref, or the tag of a new
+          object
+        """
+        n = self.Uint()
+        if n == 0:
+            return 0
+        if n & 1:
+            i = n >> 1
+            if i >= len(self.objects):
+                raise ValueError('Invalid ASDL object reference')
+            self.ref = self.objects[i]
+            return -1
+        return n >> 1
+
+    def BadTag(self, tag):
+        # type: (int) -> None
+        raise ValueError('Invalid ASDL tag %d' % tag)
+
+    def Unsupported(self, type_name):
+        # type: (str) -> Any
+        """Raise an error.  Returns Any, like void* in C++, so generated code
+        can use it as a field value."""
+        raise ValueError("Can't decode ASDL type %r" % type_name)
+
+    def Done(self):
+        # type: () -> bool
+        return self.pos == len(self.data)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python2
+"""pybinary_test.py: Tests for pybinary.py."""
+from __future__ import print_function
+
+import unittest
+
+from asdl import pybinary  # module under test
+
+FP = 42
+
+
+def _Decoder(enc):
+    return pybinary.Decoder(enc.getvalue(), FP)
+
+
+class EncoderTest(unittest.TestCase):
+
+    def testHeader(self):
+        enc = pybinary.Encoder(FP)
+        self.assertEqual('ASDL\x01\x2a', enc.getvalue())
+
+        self.assertRaises(ValueError, pybinary.Decoder, 'ASD', FP)
+        self.assertRaises(ValueError, pybinary.Decoder, 'ASDL\x02\x2a', FP)
+        self.assertRaises(ValueError, pybinary.Decoder, 'ASDL\x01\x2b', FP)
+
+    def testInts(self):
+        nums = [0, 1, -1, 63, -64, 64, 127, 128, 300, -300, 1 << 31, -(1 << 63)]
+
+        enc = pybinary.Encoder(FP)
+        for i in nums:
+            enc.Int(i)
+        enc.Uint(1 << 63)
+
+        dec = _Decoder(enc)
+        for i in nums:
+            self.assertEqual(i, dec.Int())
+        self.assertEqual(1 << 63, dec.Uint())
+        self.assertTrue(dec.Done())
+
+        # Small numbers take one byte
+        enc = pybinary.Encoder(FP)
+        n = len(enc.getvalue())
+        enc.Int(-1)
+        enc.Int(63)
+        self.assertEqual(n + 2, len(enc.getvalue()))
+
+    def testScalars(self):
+        enc = pybinary.Encoder(FP)
+        enc.Bool(True)
+        enc.Bool(False)
+        enc.Float(-1.5)
+        enc.Len(1)
+        enc.Len(-1)
+
+        dec = _Decoder(enc)
+        self.assertEqual(True, dec.Bool())
+        self.assertEqual(False, dec.Bool())
+        self.assertEqual(-1.5, dec.Float())
+        self.assertEqual(1, dec.Len())
+        self.assertEqual(-1, dec.Len())
+        self.assertTrue(dec.Done())
+
+    def testStrings(self):
+        enc = pybinary.Encoder(FP)
+        enc.Str('foo')
+        enc.Str(None)
+        enc.Str('')
+        enc.Str('foo')
+        data = enc.getvalue()
+        self.assertEqual(1, data.count('foo'))
+
+        dec = pybinary.Decoder(data, FP)
+        self.assertEqual('foo', dec.Str())
+        self.assertEqual(None, dec.Str())
+        self.assertEqual('', dec.Str())
+        self.assertEqual('foo', dec.Str())
+        self.assertTrue(dec.Done())
+
+    def testObjects(self):
+        a = object()
+        b = object()
+
+        enc = pybinary.Encoder(FP)
+        enc.Register(a)
+        self.assertEqual(True, enc.Begin(b, 5))
+        self.assertEqual(False, enc.Begin(b, 5))
+        self.assertEqual(False, enc.Begin(a, 7))
+        enc.Null()
+
+        dec = _Decoder(enc)
+        dec.Register(a)
+        self.assertEqual(5, dec.Begin())
+        dec.Register(b)
+        self.assertEqual(-1, dec.Begin())
+        self.assertIs(b, dec.ref)
+        self.assertEqual(-1, dec.Begin())
+        self.assertIs(a, dec.ref)
+        self.assertEqual(0, dec.Begin())
+        self.assertTrue(dec.Done())
+
+    def testInvalidData(self):
+        enc = pybinary.Encoder(FP)
+        enc.Str('foo')
+        data = enc.getvalue()
+
+        # Truncated
+        dec = pybinary.Decoder(data[:-1], FP)
+        self.assertRaises(ValueError, dec.Str)
+
+        # Bad references
+        enc = pybinary.Encoder(FP)
+        enc.Uint(5)  # string 3
+        enc.Uint(3)  # object 1
+        dec = _Decoder(enc)
+        self.assertRaises(ValueError, dec.Str)
+        self.assertRaises(ValueError, dec.Begin)
+
+        # Lengths longer than the data
+        enc = pybinary.Encoder(FP)
+        enc.Len(1000)
+        dec = _Decoder(enc)
+        self.assertRaises(ValueError, dec.Len)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -278,6 +278,22 @@ measure-cachegrind() {
   cat $ctasks | xargs -n $NUM_TASK_COLS -- $0 cachegrind-task $out_dir
 }
 
+parse-batch() {
+  ### Parse every file in the manifest in one osh process, with workers
+
+  # Unlike measure, this doesn't include the startup time of each process
+  local osh=${1:-bin/osh}
+  local num_jobs=${2:-4}
+  local out=${3:-$BASE_DIR/parse-batch.jsonl}
+
+  mkdir -p $BASE_DIR/tmp
+
+  write-sorted-manifest '' /dev/null
+
+  $osh --tool parse-batch --parse-jobs $num_jobs $SORTED > $out || true
+  tail -n 1 $out
+}
+
 #
 # Data Preparation and Analysis
 #
@@ -51,6 +51,11 @@ match-many() {
   echo
   echo "num_yes = $num_yes"
   echo "num_tried = $num_tried"
+
+  if test -n "${OILS_VERSION:-}"; then
+    # stderr, so the stdout of bash and OSH is still equal
+    pp regex-cache_ >&2
+  fi
 }
 
 compare() {
@@ -65,11 +70,16 @@ compare() {
   # with bash
   { time $0 match-many "$@"; } >$dir/bash-stdout.txt 2>$dir/bash-time.txt
 
+  # with OSH, without the cache of compiled regexes
+  { time OILS_REGEX_CACHE_SIZE=0 $bin $0 match-many "$@"; } \
+    >$dir/osh-nocache-stdout.txt 2>$dir/osh-nocache-time.txt
+
   # with OSH
   { time $bin $0 match-many "$@"; } >$dir/osh-stdout.txt 2>$dir/osh-time.txt
 
   # should have equal output except for version
-  diff $dir/*-stdout.txt || true
+  diff $dir/bash-stdout.txt $dir/osh-stdout.txt || true
+  diff $dir/osh-nocache-stdout.txt $dir/osh-stdout.txt || true
 
   # show timings
   head $dir/*-time.txt
@@ -79,6 +79,9 @@ setglobal_compile_flags() {
   flags="$flags -fdata-sections -ffunction-sections"
   # Note: -ftlo doesn't do anything for size?
 
+  # For parallel marking in mycpp/mark_sweep_heap.cc
+  flags="$flags -pthread"
+
   case $variant in
     *+bumpleak|*+bumproot)
       ;;
@@ -201,7 +204,7 @@ setglobal_link_flags() {
   local variant=$1
   local more_link_flags=${2:-}  # from NINJA_subgraph.py, e.g. Souffle datalog
 
-  link_flags="$more_link_flags"  # initialize
+  link_flags="$more_link_flags -pthread"  # initialize
 
   # Linker flags based on build variant
   local variant_flags=''
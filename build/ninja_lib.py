@@ -464,7 +464,8 @@ class Rules(object):
                      asdl_path,
                      deps=None,
                      pretty_print_methods=True,
-                     abbrev_module=None):
+                     abbrev_module=None,
+                     binary_methods=True):
 
         deps = deps or []
 
@@ -472,6 +473,10 @@ class Rules(object):
         deps.append('//asdl/hnode.asdl')
         deps.append('//display/pretty.asdl')
 
+        if binary_methods:
+            # #include "asdl/cpp_binary.h"
+            deps.append('//asdl/cpp_binary')
+
         # to create _gen/mycpp/examples/expr.asdl.h
         prefix = '_gen/%s' % asdl_path
 
@@ -489,6 +494,9 @@ class Rules(object):
         if abbrev_module:
             asdl_flags.append('--abbrev-module=%s' % abbrev_module)
 
+        if not binary_methods:
+            asdl_flags.append('--no-binary-methods')
+
         debug_mod = prefix + '_debug.py'
         outputs.append(debug_mod)
 
@@ -150,7 +150,9 @@ class NinjaTest(unittest.TestCase):
         n, ru = self._Rules()
 
         ru.asdl_library('asdl/hnode.asdl',
-                        pretty_print_methods=False)  # REQUIRED
+                        pretty_print_methods=False,
+                        binary_methods=False)  # REQUIRED
+        ru.cc_library('//asdl/cpp_binary', srcs=['asdl/cpp_binary.cc'])
         ru.asdl_library('display/pretty.asdl')
 
         ru.asdl_library('mycpp/examples/expr.asdl')
@@ -165,7 +167,7 @@ class NinjaTest(unittest.TestCase):
         print(actions)
         self.assertEqual([
             'asdl-cpp', 'asdl-cpp', 'asdl-cpp', 'compile_one', 'compile_one',
-            'compile_one', 'link'
+            'compile_one', 'compile_one', 'link'
         ], actions)
 
         compile_parse = CallFor(
@@ -182,6 +184,7 @@ class NinjaTest(unittest.TestCase):
 
         self.assertEqual([
             '_build/obj/cxx-dbg/_gen/mycpp/examples/parse.mycpp.o',
+            '_build/obj/cxx-dbg/asdl/cpp_binary.o',
             '_build/obj/cxx-dbg/_gen/display/pretty.asdl.o',
             '_build/obj/cxx-dbg/_gen/mycpp/examples/expr.asdl.o',
         ], last.inputs)
@@ -190,7 +193,9 @@ class NinjaTest(unittest.TestCase):
         n, ru = self._Rules()
 
         ru.asdl_library('asdl/hnode.asdl',
-                        pretty_print_methods=False)  # REQUIRED
+                        pretty_print_methods=False,
+                        binary_methods=False)  # REQUIRED
+        ru.cc_library('//asdl/cpp_binary', srcs=['asdl/cpp_binary.cc'])
         ru.asdl_library('display/pretty.asdl')
 
         ru.asdl_library('asdl/examples/demo_lib.asdl')
@@ -221,6 +226,7 @@ class NinjaTest(unittest.TestCase):
                 'compile_one',  # compile demo_lib
                 'compile_one',  # compile typed_demo
                 'compile_one',  # compile gen_cpp_test
+                'compile_one',  # compile cpp_binary
                 'link',
             ],
             actions)
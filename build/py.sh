@@ -98,6 +98,14 @@ const-mypy-gen() {
   log "  (frontend/consts_gen) -> $out"
 }
 
+lexer-dfa-gen() {
+  ### Tables for frontend/match.py, when fastlex isn't built
+
+  local out=_devbuild/gen/lexer_dfa.py
+  lexer-gen py-dfa > $out
+  log "  (lexer_gen py-dfa) -> $out"
+}
+
 option-mypy-gen() {
   local out=_devbuild/gen/option_asdl.py
   frontend/option_gen.py mypy > $out
@@ -133,7 +141,8 @@ gen-asdl-py() {
 py-codegen() {
   # note: filename must come first
   # hnode.asdl has REQUIRED fields so it's --py-init-N
-  gen-asdl-py 'asdl/hnode.asdl' --no-pretty-print-methods --py-init-N 
+  gen-asdl-py 'asdl/hnode.asdl' --no-pretty-print-methods --no-binary-methods \
+    --py-init-N
 
   gen-asdl-py 'frontend/types.asdl'
   # depends on syntax.asdl
@@ -155,6 +164,7 @@ py-codegen() {
 
   option-mypy-gen
   flag-gen-mypy
+  lexer-dfa-gen  # depends on Id and lex_mode_e
 
   # Experiment
   gen-asdl-py 'yaks/yaks.asdl'
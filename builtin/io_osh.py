@@ -127,18 +127,12 @@ class MapFile(vm._Builtin):
         if var_name is None:
             var_name = 'MAPFILE'
 
-        lines = []  # type: List[str]
-        while True:
-            # bash uses this slow algorithm; YSH could provide read --all-lines
-            try:
-                line = read_osh.ReadLineSlowly(self.cmd_ev, with_eol=not arg.t)
-            except pyos.ReadError as e:
-                self.errfmt.PrintMessage("mapfile: read() error: %s" %
-                                         posix.strerror(e.err_num))
-                return 1
-            if len(line) == 0:
-                break
-            lines.append(line)
+        try:
+            lines = read_osh.ReadLines(self.cmd_ev, with_eol=not arg.t)
+        except pyos.ReadError as e:
+            self.errfmt.PrintMessage("mapfile: read() error: %s" %
+                                     posix.strerror(e.err_num))
+            return 1
 
         state.BuiltinSetArray(self.mem, var_name, lines)
         return 0
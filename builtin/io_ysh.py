@@ -21,6 +21,8 @@ from frontend import typed_args
 from mycpp import mylib
 from mycpp.mylib import log, iteritems
 
+import libc
+
 from typing import TYPE_CHECKING, cast
 if TYPE_CHECKING:
     from core.alloc import Arena
@@ -185,6 +187,15 @@ class Pp(_Builtin):
             print('TODO')
             return 0
 
+        if action == 'regex-cache_':  # Format may change
+            stats = libc.regex_cache_stats()
+
+            # TSV8 header
+            print('num_entries\tcapacity\thits\tmisses\tevictions')
+            print('%d\t%d\t%d\t%d\t%d' %
+                  (stats[0], stats[1], stats[2], stats[3], stats[4]))
+            return 0
+
         if action == 'proc':
             names, locs = arg_r.Rest2()
             if len(names):
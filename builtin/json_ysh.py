@@ -3,8 +3,7 @@ from __future__ import print_function
 from _devbuild.gen import arg_types
 from _devbuild.gen.runtime_asdl import cmd_value
 from _devbuild.gen.syntax_asdl import loc, loc_t
-from _devbuild.gen.value_asdl import value, LeftName
-from builtin import read_osh
+from _devbuild.gen.value_asdl import value, value_e, value_t, LeftName
 from core import error
 from core.error import e_usage
 from core import pyos
@@ -20,7 +19,7 @@ from mycpp.mylib import log
 
 import posix_ as posix
 
-from typing import TYPE_CHECKING
+from typing import List, Optional, TYPE_CHECKING
 if TYPE_CHECKING:
     from display import ui
 
@@ -96,9 +95,12 @@ class Json(vm._Builtin):
             attrs = flag_util.Parse('json_read', arg_r)
             #arg_jr = arg_types.json_read(attrs.attrs)
 
+            path = None  # type: Optional[List[value_t]]
             if cmd_val.proc_args:  # json read (&x)
                 rd = typed_args.ReaderForProc(cmd_val)
                 place = rd.PosPlace()
+                # json read (&x, path=['items', 0])
+                path = rd.NamedList('path', None)
                 rd.Done()
 
                 blame_loc = cmd_val.proc_args.typed_args.left  # type: loc_t
@@ -114,17 +116,33 @@ class Json(vm._Builtin):
             if not arg_r.AtEnd():
                 e_usage('read got too many args', arg_r.Location())
 
+            # Decode stdin as it's read, so big documents don't need a copy
+            # of the input in memory
+            p = j8.StreamParser(0, self.is_j8)
             try:
-                contents = read_osh.ReadAll()
+                if path is None:
+                    val = p.ParseValue()
+                else:
+                    for part in path:
+                        if part.tag() not in (value_e.Str, value_e.Int):
+                            raise error.TypeErr(
+                                part, 'path should have Str and Int parts',
+                                blame_loc)
+
+                    # Only the selected value is built
+                    sel = j8.SelectValue(p, path)
+                    p.SkipToEnd()
+                    if sel is None:
+                        self.errfmt.Print_('%s read: No value at path' %
+                                           self.name,
+                                           blame_loc=action_loc)
+                        return 1
+                    val = sel
             except pyos.ReadError as e:  # different paths for read -d, etc.
                 # don't quote code since YSH errexit will likely quote
                 self.errfmt.PrintMessage("read error: %s" %
                                          posix.strerror(e.err_num))
                 return 1
-
-            p = j8.Parser(contents, self.is_j8)
-            try:
-                val = p.ParseValue()
             except error.Decode as err:
                 # TODO: Need to show position info
                 self.errfmt.Print_('%s read: %s' % (self.name, err.Message()),
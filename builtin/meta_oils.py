@@ -14,7 +14,8 @@ from __future__ import print_function
 
 from _devbuild.gen import arg_types
 from _devbuild.gen.runtime_asdl import cmd_value, CommandStatus
-from _devbuild.gen.syntax_asdl import source, loc, loc_t, CompoundWord
+from _devbuild.gen.syntax_asdl import (source, source_t, loc, loc_t,
+                                       CompoundWord)
 from _devbuild.gen.value_asdl import Obj, value, value_t
 from core import alloc
 from core import dev
@@ -44,6 +45,7 @@ _ = log
 from typing import Dict, List, Tuple, Optional, TYPE_CHECKING
 if TYPE_CHECKING:
     from frontend import args
+    from frontend import parse_cache
     from frontend.parse_lib import ParseContext
     from core import optview
     from display import ui
@@ -62,6 +64,7 @@ class Eval(vm._Builtin):
             tracer,  # type: dev.Tracer
             errfmt,  # type: ui.ErrorFormatter
             mem,  # type: state.Mem
+            eval_cache=None,  # type: Optional[parse_cache.EvalCache]
     ):
         # type: (...) -> None
         self.parse_ctx = parse_ctx
@@ -71,6 +74,7 @@ class Eval(vm._Builtin):
         self.tracer = tracer
         self.errfmt = errfmt
         self.mem = mem
+        self.eval_cache = eval_cache
 
     def Run(self, cmd_val):
         # type: (cmd_value.Argv) -> int
@@ -95,10 +99,30 @@ class Eval(vm._Builtin):
         with dev.ctx_Tracer(self.tracer, 'eval', None):
             with state.ctx_CompoundWordDebugFrame(self.mem, eval_loc):
                 with alloc.ctx_SourceCode(self.arena, src):
-                    return main_loop.Batch(self.cmd_ev,
-                                           c_parser,
-                                           self.errfmt,
-                                           cmd_flags=cmd_eval.RaiseControlFlow)
+                    return self._Batch(c_parser, code_str, src)
+
+    def _Batch(self, c_parser, code_str, src):
+        # type: (cmd_parse.CommandParser, str, source.Dynamic) -> int
+        """Run the code, using the eval cache if we have one."""
+        recorder = None  # type: Optional[parse_cache.Recorder]
+        if self.eval_cache:
+            cached = self.eval_cache.Get(code_str, src.location)
+            self.tracer.OnEvalCache(cached is not None)
+            if cached:
+                return main_loop.BatchCached(
+                    self.cmd_ev,
+                    c_parser,
+                    self.errfmt,
+                    self.eval_cache,
+                    cached,
+                    cmd_flags=cmd_eval.RaiseControlFlow)
+            recorder = self.eval_cache.NewRecorder(code_str, src)
+
+        return main_loop.Batch(self.cmd_ev,
+                               c_parser,
+                               self.errfmt,
+                               cmd_flags=cmd_eval.RaiseControlFlow,
+                               recorder=recorder)
 
 
 def _VarName(module_path):
@@ -145,12 +169,15 @@ class ShellFile(vm._Builtin):
             tracer,  # type: dev.Tracer
             errfmt,  # type: ui.ErrorFormatter
             loader,  # type: pyutil._ResourceLoader
+            p_cache=None,  # type: Optional[parse_cache.ParseCache]
             module_invoke=None,  # type: vm._Builtin
     ):
         # type: (...) -> None
         """
         If module_invoke is passed, this class behaves like 'use'.  Otherwise
         it behaves like 'source'.
+
+        If p_cache is passed, files on disk are loaded from the parse cache.
         """
         self.parse_ctx = parse_ctx
         self.arena = parse_ctx.arena
@@ -160,6 +187,7 @@ class ShellFile(vm._Builtin):
         self.tracer = tracer
         self.errfmt = errfmt
         self.loader = loader
+        self.p_cache = p_cache
         self.module_invoke = module_invoke
 
         self.builtin_name = 'use' if module_invoke else 'source'
@@ -210,8 +238,30 @@ class ShellFile(vm._Builtin):
         c_parser = self.parse_ctx.MakeOshParser(line_reader)
         return f, c_parser
 
-    def _SourceExec(self, cmd_val, arg_r, path, c_parser):
-        # type: (cmd_value.Argv, args.Reader, str, cmd_parse.CommandParser) -> int
+    def _Batch(self, c_parser, fs_path, src):
+        # type: (cmd_parse.CommandParser, Optional[str], source_t) -> int
+        """Run a file, using the parse cache if it's a file on disk."""
+        recorder = None  # type: Optional[parse_cache.Recorder]
+        if self.p_cache and fs_path is not None:
+            cached = self.p_cache.Load(fs_path, src)
+            if cached:
+                return main_loop.BatchCached(
+                    self.cmd_ev,
+                    c_parser,
+                    self.errfmt,
+                    self.p_cache,
+                    cached,
+                    cmd_flags=cmd_eval.RaiseControlFlow)
+            recorder = self.p_cache.NewRecorder(fs_path, src)
+
+        return main_loop.Batch(self.cmd_ev,
+                               c_parser,
+                               self.errfmt,
+                               cmd_flags=cmd_eval.RaiseControlFlow,
+                               recorder=recorder)
+
+    def _SourceExec(self, cmd_val, arg_r, path, fs_path, c_parser):
+        # type: (cmd_value.Argv, args.Reader, str, Optional[str], cmd_parse.CommandParser) -> int
         call_loc = cmd_val.arg_locs[0]
 
         # A sourced module CAN have a new arguments array, but it always shares
@@ -227,11 +277,7 @@ class ShellFile(vm._Builtin):
                     src = source.OtherFile(path, call_loc)
                     with alloc.ctx_SourceCode(self.arena, src):
                         try:
-                            status = main_loop.Batch(
-                                self.cmd_ev,
-                                c_parser,
-                                self.errfmt,
-                                cmd_flags=cmd_eval.RaiseControlFlow)
+                            status = self._Batch(c_parser, fs_path, src)
                         except vm.IntControlFlow as e:
                             if e.IsReturn():
                                 status = e.StatusCode()
@@ -253,6 +299,7 @@ class ShellFile(vm._Builtin):
             self,
             cmd_val,  # type: cmd_value.Argv
             path,  # type: str
+            fs_path,  # type: Optional[str]
             path_loc,  # type: loc_t
             c_parser,  # type: cmd_parse.CommandParser
             props,  # type: Dict[str, value_t]
@@ -271,11 +318,7 @@ class ShellFile(vm._Builtin):
                     src = source.OtherFile(path, path_loc)
                     with alloc.ctx_SourceCode(self.arena, src):
                         try:
-                            status = main_loop.Batch(
-                                self.cmd_ev,
-                                c_parser,
-                                self.errfmt,
-                                cmd_flags=cmd_eval.RaiseControlFlow)
+                            status = self._Batch(c_parser, fs_path, src)
                         except vm.IntControlFlow as e:
                             if e.IsReturn():
                                 status = e.StatusCode()
@@ -315,7 +358,8 @@ class ShellFile(vm._Builtin):
             if c_parser is None:
                 return 1  # error was already shown
 
-            return self._SourceExec(cmd_val, arg_r, load_path, c_parser)
+            return self._SourceExec(cmd_val, arg_r, load_path, None,
+                                    c_parser)
 
         else:
             # 'source' respects $PATH
@@ -329,7 +373,8 @@ class ShellFile(vm._Builtin):
                 return 1  # error was already shown
 
             with process.ctx_FileCloser(f):
-                return self._SourceExec(cmd_val, arg_r, path_arg, c_parser)
+                return self._SourceExec(cmd_val, arg_r, path_arg, resolved,
+                                        c_parser)
 
         raise AssertionError()
 
@@ -448,8 +493,8 @@ class ShellFile(vm._Builtin):
             # Cache BEFORE executing, to prevent circular import
             self._embed_cache[embed_path] = module_obj
 
-            status = self._UseExec(cmd_val, load_path, path_loc, c_parser,
-                                   module_obj.d)
+            status = self._UseExec(cmd_val, load_path, None, path_loc,
+                                   c_parser, module_obj.d)
             if status != 0:
                 return status
 
@@ -478,8 +523,8 @@ class ShellFile(vm._Builtin):
             self._disk_cache[normalized] = module_obj
 
             with process.ctx_FileCloser(f):
-                status = self._UseExec(cmd_val, path_arg, path_loc, c_parser,
-                                       module_obj.d)
+                status = self._UseExec(cmd_val, path_arg, normalized,
+                                       path_loc, c_parser, module_obj.d)
             if status != 0:
                 return status
 
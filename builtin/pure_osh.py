@@ -383,6 +383,16 @@ class Hash(vm._Builtin):
             self.search_path.ClearCache()
             return 0
 
+        if arg.stats:
+            if len(rest):
+                e_usage('got extra arguments after --stats', loc.Missing)
+            stats = self.search_path.Stats()
+
+            # TSV8 header
+            print('num_entries\thits\tlookups')
+            print('%d\t%d\t%d' % (stats[0], stats[1], stats[2]))
+            return 0
+
         status = 0
         if len(rest):
             for cmd in rest:  # enter in cache
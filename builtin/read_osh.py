@@ -156,93 +156,125 @@ def _ReadPortion(delim_byte, max_chars, cmd_ev):
     The delimiter is not included in the result.
     """
     eof = False
-    ch_array = []  # type: List[int]
+    chunks = []  # type: List[str]
     bytes_read = 0
     while True:
-        if max_chars >= 0 and bytes_read >= max_chars:
-            break
+        if max_chars >= 0:
+            if bytes_read >= max_chars:
+                break
+            max_bytes = max_chars - bytes_read
+        else:
+            max_bytes = -1
 
-        ch, err_num = pyos.ReadByte(0)
-        if ch < 0:
+        n, err_num = pyos.ReadUntil(STDIN_FILENO, delim_byte, max_bytes,
+                                    chunks)
+        if n < 0:
             if err_num == EINTR:
                 cmd_ev.RunPendingTraps()
-                # retry after running traps
+                # retry after running traps, keeping any partial data
+                bytes_read = _ChunksLength(chunks)
             else:
                 raise pyos.ReadError(err_num)
 
-        elif ch == pyos.EOF_SENTINEL:
+        elif n == 0:  # EOF
             eof = True
             break
 
-        elif ch == delim_byte:
-            break
-
         else:
-            ch_array.append(ch)
+            last = chunks[-1]
+            if mylib.ByteAt(last, len(last) - 1) == delim_byte:
+                chunks[-1] = last[:-1]
+                break
+            bytes_read += n
 
-        bytes_read += 1
+    return ''.join(chunks), eof
 
-    return pyutil.ChArrayToString(ch_array), eof
+
+def _ChunksLength(chunks):
+    # type: (List[str]) -> int
+    n = 0
+    for chunk in chunks:
+        n += len(chunk)
+    return n
 
 
 def ReadLineSlowly(cmd_ev, with_eol=True):
     # type: (CommandEvaluator, bool) -> str
-    """Read a line from stdin, unbuffered 
+    """Read a line from stdin, without buffering past the newline
 
     Used by mapfile and read --raw-line.
 
     sys.stdin.readline() in Python has its own buffering which is incompatible
     with shell semantics.  dash, mksh, and zsh all read a single byte at a time
-    with read(0, 1).
+    with read(0, 1).  Like bash, pyos.ReadUntil() reads regular files in
+    blocks, and seeks back to the end of the line.
     """
-    ch_array = []  # type: List[int]
+    chunks = []  # type: List[str]
     while True:
-        ch, err_num = pyos.ReadByte(0)
+        n, err_num = pyos.ReadUntil(STDIN_FILENO, pyos.NEWLINE_CH, -1, chunks)
 
-        if ch < 0:
+        if n < 0:
             if err_num == EINTR:
                 cmd_ev.RunPendingTraps()
                 # retry after running traps
             else:
                 raise pyos.ReadError(err_num)
 
-        elif ch == pyos.EOF_SENTINEL:
+        elif n == 0:  # EOF
             break
 
         else:
-            ch_array.append(ch)
-
-        if ch == pyos.NEWLINE_CH:
-            if not with_eol:
-                ch_array.pop()
-            break
+            last = chunks[-1]
+            if mylib.ByteAt(last, len(last) - 1) == pyos.NEWLINE_CH:
+                if not with_eol:
+                    chunks[-1] = last[:-1]
+                break
 
-    return pyutil.ChArrayToString(ch_array)
+    return ''.join(chunks)
 
 
-def ReadAll():
-    # type: () -> str
-    """Read all of stdin.
+def ReadLines(cmd_ev, with_eol=True):
+    # type: (CommandEvaluator, bool) -> List[str]
+    """Read all of stdin, and split it into lines.
 
-    Similar to command sub in core/executor.py.
+    Used by mapfile.  It always reads to EOF, so unlike ReadLineSlowly(), it
+    can read blocks from pipes too.
     """
     chunks = []  # type: List[str]
     while True:
-        n, err_num = pyos.Read(0, 4096, chunks)
+        n, err_num = pyos.Read(STDIN_FILENO, 4096, chunks)
 
         if n < 0:
             if err_num == EINTR:
-                # Retry only.  Like read --line (and command sub), read --all
-                # doesn't run traps.  It would be a bit weird to run every 4096
-                # bytes.
-                pass
+                cmd_ev.RunPendingTraps()
+                # retry after running traps
             else:
                 raise pyos.ReadError(err_num)
 
         elif n == 0:  # EOF
             break
 
-    return ''.join(chunks)
+    lines = ''.join(chunks).split('\n')
+    last = lines.pop()  # empty unless the input has no trailing newline
+    if with_eol:
+        lines = [line + '\n' for line in lines]
+    if len(last):
+        lines.append(last)
+    return lines
+
+
+def ReadAll():
+    # type: () -> str
+    """Read all of stdin.
+
+    Similar to command sub in core/executor.py.  Like read --line (and command
+    sub), read --all doesn't run traps on EINTR.
+    """
+    buf = mylib.BufWriter()
+    err_num = pyos.ReadAll(0, -1, buf)
+    if err_num != 0:
+        raise pyos.ReadError(err_num)
+    return buf.getvalue()
 
 
 class ctx_TermAttrs(object):
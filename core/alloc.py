@@ -103,9 +103,16 @@ class Arena(object):
         # All lines that haven't been discarded.  For LST formatting.
         self.lines_list = []  # type: List[SourceLine]
 
+        # Number of lines ever added, for stats
+        self.num_lines = 0
+
         # reuse these instances in many line_span instances
         self.source_instances = []  # type: List[source_t]
 
+        # The length of lines_list when each source was pushed.  Lines from a
+        # source are released when it's popped.
+        self.line_marks = []  # type: List[int]
+
     def SaveTokens(self):
         # type: () -> None
         """
@@ -116,10 +123,26 @@ class Arena(object):
     def PushSource(self, src):
         # type: (source_t) -> None
         self.source_instances.append(src)
+        self.line_marks.append(len(self.lines_list))
 
     def PopSource(self):
         # type: () -> None
+        """Release the lines read from the source, unless we save tokens.
+
+        Code parsed while a command runs, like trap handlers, ${!ref}, and
+        printf formats, has its own source.  Without this, a long-running
+        loop at the top level would accumulate their lines, because
+        main_loop only calls DiscardLines() between top level commands.
+
+        The tokens of functions and procs still point to their lines, so those
+        lines stay alive as long as the definitions do.
+        """
         self.source_instances.pop()
+        mark = self.line_marks.pop()
+        if self.save_tokens:  # tools like ysh-ify need every line
+            return
+        while len(self.lines_list) > mark:
+            self.lines_list.pop()
 
     def AddLine(self, line, line_num):
         # type: (str, int) -> SourceLine
@@ -129,8 +152,19 @@ class Arena(object):
         """
         src_line = SourceLine(line_num, line, self.source_instances[-1])
         self.lines_list.append(src_line)
+        self.num_lines += 1
         return src_line
 
+    def NumRetainedLines(self):
+        # type: () -> int
+        """The number of lines the arena holds onto."""
+        return len(self.lines_list)
+
+    def NumRetainedTokens(self):
+        # type: () -> int
+        """The number of tokens the arena holds onto, with save_tokens."""
+        return len(self.tokens)
+
     def DiscardLines(self):
         # type: () -> None
         """Remove references ot lines we've accumulated.
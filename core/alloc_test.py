@@ -4,7 +4,7 @@
 import unittest
 
 from _devbuild.gen.id_kind_asdl import Id
-from _devbuild.gen.syntax_asdl import source
+from _devbuild.gen.syntax_asdl import source, loc
 from core import alloc  # module under test
 
 
@@ -49,6 +49,44 @@ class AllocTest(unittest.TestCase):
         self.assertEqual('one.ysh', line3.src.path)
         self.assertEqual(3, line3.line_num)
 
+    def testPopSourceReleasesLines(self):
+        arena = self.arena
+
+        arena.PushSource(source.MainFile('one.ysh'))
+        arena.AddLine('echo 1a', 1)
+
+        # e.g. a trap handler parsed while a loop runs
+        arena.PushSource(source.Dynamic('trap arg', loc.Missing))
+        arena.AddLine('echo trap', 1)
+        self.assertEqual(2, arena.NumRetainedLines())
+        arena.PopSource()
+
+        self.assertEqual(1, arena.NumRetainedLines())
+        self.assertEqual(2, arena.num_lines)
+
+        # A nested DiscardLines() already released them
+        arena.PushSource(source.Dynamic('eval arg', loc.Missing))
+        arena.AddLine('echo eval', 1)
+        arena.DiscardLines()
+        arena.PopSource()
+        self.assertEqual(0, arena.NumRetainedLines())
+
+        arena.PopSource()
+
+    def testSaveTokensRetainsLines(self):
+        arena = self.arena
+        arena.SaveTokens()
+
+        arena.PushSource(source.MainFile('one.ysh'))
+        arena.PushSource(source.Dynamic('trap arg', loc.Missing))
+        line = arena.AddLine('echo trap', 1)
+        arena.NewToken(Id.Lit_Chars, 0, 4, line)
+        arena.PopSource()
+        arena.PopSource()
+
+        self.assertEqual(1, arena.NumRetainedLines())
+        self.assertEqual(1, arena.NumRetainedTokens())
+
 
 if __name__ == '__main__':
     unittest.main()
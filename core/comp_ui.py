@@ -95,6 +95,12 @@ class State(object):
         # completion candidate descriptions
         self.descriptions = {}  # type: Dict[str, str]
 
+        # The line that the completion parser's Trail was last filled from, so
+        # pressing TAB again on the same line doesn't parse it again.  Commands
+        # and completion functions can change aliases and parse options, so
+        # it's cleared in between commands, and after a function runs.
+        self.parsed_line = None  # type: Optional[str]
+
 
 class _IDisplay(object):
     """Interface for completion displays."""
@@ -137,7 +143,7 @@ class _IDisplay(object):
     def Reset(self):
         # type: () -> None
         """Call this in between commands."""
-        pass
+        self.comp_state.parsed_line = None
 
     def ShowPromptOnRight(self, rendered):
         # type: (str) -> None
@@ -363,6 +369,7 @@ class NiceDisplay(_IDisplay):
     def Reset(self):
         # type: () -> None
         """Call this in between commands."""
+        _IDisplay.Reset(self)
         self.num_lines_last_displayed = 0
         self.dupes.clear()
 
@@ -37,7 +37,7 @@ import time as time_
 
 from _devbuild.gen.id_kind_asdl import Id
 from _devbuild.gen.syntax_asdl import (CompoundWord, word_part_e, word_t,
-                                       redir_param_e, Token)
+                                       redir_param_e, Token, SourceLine)
 from _devbuild.gen.runtime_asdl import (scope_e, comp_action_e, comp_action_t)
 from _devbuild.gen.types_asdl import redir_arg_type_e
 from _devbuild.gen.value_asdl import (value, value_e)
@@ -884,6 +884,14 @@ class UserSpec(object):
         f.write('  prefix: %s\n' % self.prefix)
         f.write('  suffix: %s\n' % self.prefix)
 
+    def RunsShellFunc(self):
+        # type: () -> bool
+        """Whether completing may run a function registered with -F."""
+        for a in self.actions:
+            if a.ActionKind() == comp_action_e.BashFunc:
+                return True
+        return False
+
     def AllMatches(self, comp):
         # type: (Api) -> Iterator[Tuple[str, comp_action_t]]
         """yield completion candidates."""
@@ -929,6 +937,34 @@ class UserSpec(object):
         # It completes the word that
 
 
+class _ResumePoint(object):
+    """A place where the completion parser can start again."""
+
+    def __init__(self, line_index, col, stable_end, num_tokens):
+        # type: (int, int, int, int) -> None
+        self.line_index = line_index  # which line of the buffer
+        self.col = col  # where to start on that line
+        self.stable_end = stable_end  # the buffer must be the same up to here
+        self.num_tokens = num_tokens  # how many Trail tokens to keep
+
+
+def _SplitLines(s):
+    # type: (str) -> List[str]
+    """Split a buffer into lines that keep their newlines, like
+    StringLineReader."""
+    lines = []  # type: List[str]
+    start = 0
+    while True:
+        i = s.find('\n', start)
+        if i == -1:
+            break
+        lines.append(s[start:i + 1])
+        start = i + 1
+    if start < len(s):
+        lines.append(s[start:])
+    return lines
+
+
 # Helpers for Matches()
 def IsDollar(t):
     # type: (Token) -> bool
@@ -981,6 +1017,124 @@ class RootCompleter(object):
         self.parse_ctx = parse_ctx
         self.debug_f = debug_f
 
+        # Where the parse of comp_ui_state.parsed_line can be resumed, in
+        # order
+        self.resume_points = []  # type: List[_ResumePoint]
+
+    def _AddBoundaries(self, line_starts):
+        # type: (List[int]) -> None
+        """Turn the boundaries the parser left in the Trail into resume
+        points."""
+        trail = self.parse_ctx.trail
+        tokens = trail.tokens
+        n = len(tokens)
+
+        if len(self.resume_points):
+            i = self.resume_points[-1].num_tokens
+        else:
+            i = 0
+        for tok in trail.boundaries:
+            j = i
+            while j < n and tokens[j] is not tok:
+                j += 1
+            if j == n:  # e.g. it came from an alias
+                continue
+            i = j + 1
+
+            line_index = tok.line.line_num - 1
+            col = tok.col + tok.length
+            # One more char must be the same, so 'a |' isn't resumed when it
+            # becomes 'a ||'
+            stable_end = line_starts[line_index] + col + 1
+            self.resume_points.append(
+                _ResumePoint(line_index, col, stable_end, i))
+        del trail.boundaries[:]
+
+    def _Parse(self, line_until_tab):
+        # type: (str) -> int
+        """Fill in the Trail for line_until_tab.
+
+        If the last parsed line is the same up to a top level ; & && || | or
+        the start of a logical line, then we keep the Trail up to there, and
+        only parse the rest.
+
+        Returns:
+          Where the parse started in line_until_tab
+        """
+        trail = self.parse_ctx.trail
+        arena = self.parse_ctx.arena
+        points = self.resume_points
+
+        lines = _SplitLines(line_until_tab)
+        line_starts = []  # type: List[int]
+        pos = 0
+        for line in lines:
+            line_starts.append(pos)
+            pos += len(line)
+        line_starts.append(pos)  # a logical line can start at the end
+
+        # Find the valid points.  If one is valid, so are the ones before it.
+        old_line = self.comp_ui_state.parsed_line
+        num_valid = 0
+        if old_line is not None:
+            hi = len(points)
+            while num_valid < hi:
+                mid = (num_valid + hi) // 2
+                end = points[mid].stable_end
+                if old_line[:end] == line_until_tab[:end]:
+                    num_valid = mid + 1
+                else:
+                    hi = mid
+        while len(points) > num_valid:
+            points.pop()
+
+        if num_valid == 0:
+            trail.Clear()
+            start_index = 0
+            start_col = 0
+        else:
+            rp = points[-1]
+            trail.Truncate(rp.num_tokens)
+            start_index = rp.line_index
+            start_col = rp.col
+
+        src_lines = []  # type: List[Tuple[SourceLine, int]]
+        for j in xrange(start_index, len(lines)):
+            src_line = arena.AddLine(lines[j], j + 1)
+            if j == start_index:
+                src_lines.append((src_line, start_col))
+            else:
+                src_lines.append((src_line, 0))
+
+        line_reader = reader.VirtualLineReader(arena, src_lines, False)
+        c_parser = self.parse_ctx.MakeOshParser(line_reader,
+                                                emit_comp_dummy=True)
+
+        # We want the output from parse_ctx, so we don't use the return value.
+        while True:
+            try:
+                node = c_parser.ParseLogicalLine()
+            except error.Parse as e:
+                # e.g. 'ls | ' will not parse.  Now inspect the parser state!
+                break
+            if node is None:
+                break
+            self._AddBoundaries(line_starts)
+
+            if c_parser.c_id == Id.Op_Newline:
+                # The next logical line starts after the lines we read,
+                # including here doc bodies
+                line_index = start_index + line_reader.pos
+                points.append(
+                    _ResumePoint(line_index, 0, line_starts[line_index],
+                                 len(trail.tokens)))
+        self._AddBoundaries(line_starts)
+
+        # The tokens in the trail still point to their lines
+        arena.DiscardLines()
+
+        return line_starts[start_index] + start_col
+
     def Matches(self, comp):
         # type: (Api) -> Iterator[str]
         """
@@ -995,21 +1149,18 @@ class RootCompleter(object):
         line_until_tab = comp.line[:comp.end]
         self.comp_ui_state.line_until_tab = line_until_tab
 
-        self.parse_ctx.trail.Clear()
-        line_reader = reader.StringLineReader(line_until_tab,
-                                              self.parse_ctx.arena)
-        c_parser = self.parse_ctx.MakeOshParser(line_reader,
-                                                emit_comp_dummy=True)
-
-        # We want the output from parse_ctx, so we don't use the return value.
-        try:
-            c_parser.ParseLogicalLine()
-        except error.Parse as e:
-            # e.g. 'ls | ' will not parse.  Now inspect the parser state!
-            pass
-
         debug_f = self.debug_f
         trail = self.parse_ctx.trail
+
+        if line_until_tab == self.comp_ui_state.parsed_line:
+            # e.g. TAB TAB.  The trail is still filled in from the last parse.
+            debug_f.writeln('reparse span: none (reusing %d bytes)' %
+                            len(line_until_tab))
+        else:
+            start = self._Parse(line_until_tab)
+            self.comp_ui_state.parsed_line = line_until_tab
+            debug_f.writeln('reparse span: %d to %d' %
+                            (start, len(line_until_tab)))
         if mylib.PYTHON:
             trail.PrintDebugString(debug_f)
 
@@ -1299,6 +1450,11 @@ class RootCompleter(object):
             debug_f.writeln("Didn't find anything to complete")
             return
 
+        # A completion function can define aliases or change parse options, so
+        # the line must be parsed again on the next TAB
+        if user_spec.RunsShellFunc():
+            self.comp_ui_state.parsed_line = None
+
         # Reset it back to what was registered.  User-defined functions can mutate
         # it.
         dynamic_opts = {}  # type: Dict[str, bool]
@@ -26,6 +26,8 @@ from mycpp.mylib import log
 from frontend import flag_def  # side effect: flags are defined!
 
 _ = flag_def
+from frontend import lexer
+from frontend import location
 from frontend import parse_lib
 from testdata.completion import bash_oracle
 
@@ -49,6 +51,12 @@ def MockApi(line):
     return completion.Api(line=line, begin=0, end=len(line))
 
 
+def _WordStr(w):
+    left = location.LeftTokenForWord(w)
+    right = location.RightTokenForWord(w)
+    return left.line.content[left.col:right.col + right.length]
+
+
 def _MakeRootCompleter(parse_ctx=None, comp_lookup=None):
     compopt_state = completion.OptionState()
     comp_ui_state = comp_ui.State()
@@ -453,6 +461,9 @@ class RootCompleterTest(unittest.TestCase):
         m = list(r.Matches(MockApi('mywords t')))
         self.assertEqual(['mywords three ', 'mywords two '], sorted(m))
 
+        # The function could have changed how the line parses
+        self.assertEqual(None, r.comp_ui_state.parsed_line)
+
         # No space
         m = list(r.Matches(MockApi('mywords_nospace t')))
         self.assertEqual(['mywords_nospace three', 'mywords_nospace two'],
@@ -566,6 +577,113 @@ class RootCompleterTest(unittest.TestCase):
         m = list(r.Matches(MockApi('both2 ')))
         self.assertEqual(['both2 b1 ', 'both2 b2 '], sorted(m))
 
+    def testReusesParse(self):
+        r = _MakeRootCompleter()
+        trail = r.parse_ctx.trail
+
+        m1 = list(r.Matches(MockApi('echo $HO')))
+        self.assertEqual('echo $HO', r.comp_ui_state.parsed_line)
+        tokens = list(trail.tokens)
+
+        # TAB TAB doesn't parse again, and completes the same thing
+        m2 = list(r.Matches(MockApi('echo $HO')))
+        self.assertEqual(m1, m2)
+        self.assertEqual(len(tokens), len(trail.tokens))
+        for expected, actual in zip(tokens, trail.tokens):
+            self.assertIs(expected, actual)
+
+        # A different line is parsed
+        m = list(r.Matches(MockApi('echo $PS')))
+        self.assertEqual('echo $PS', r.comp_ui_state.parsed_line)
+        self.assertIsNot(tokens[0], trail.tokens[0])
+
+        # Running a command resets the state, and the line is parsed again
+        r.comp_ui_state.parsed_line = None
+        tokens = list(trail.tokens)
+        self.assertEqual(m, list(r.Matches(MockApi('echo $PS'))))
+        self.assertIsNot(tokens[0], trail.tokens[0])
+
+    def _AssertSameTrail(self, r, line):
+        # Compare against parsing the whole line with a new completer
+        full = _MakeRootCompleter()
+        m = list(full.Matches(MockApi(line)))
+        self.assertEqual(m, list(r.Matches(MockApi(line))))
+
+        expected = full.parse_ctx.trail
+        actual = r.parse_ctx.trail
+        self.assertEqual([(t.id, lexer.TokenVal(t)) for t in expected.tokens],
+                         [(t.id, lexer.TokenVal(t)) for t in actual.tokens])
+        self.assertEqual([_WordStr(w) for w in expected.words],
+                         [_WordStr(w) for w in actual.words])
+        self.assertEqual(len(expected.redirects), len(actual.redirects))
+
+    def testResumesParse(self):
+        r = _MakeRootCompleter()
+
+        def Parse(line):
+            start = r._Parse(line)
+            r.comp_ui_state.parsed_line = line
+            return start
+
+        self.assertEqual(0, Parse('echo hi; echo $HO'))
+        self.assertEqual(len('echo hi;'), Parse('echo hi; echo $PS'))
+        self.assertEqual(len('echo hi;'), Parse('echo hi; ls | grep f'))
+        self.assertEqual(len('echo hi; ls |'), Parse('echo hi; ls | gr'))
+        self.assertEqual(len('echo hi; ls |'), Parse('echo hi; ls | x &&'))
+
+        # 'a |' becomes 'a ||', so start over
+        Parse('a |')
+        self.assertEqual(0, Parse('a ||'))
+
+        # Editing the start of the line parses it all again
+        Parse('a; b; c')
+        self.assertEqual(0, Parse('x; b; c'))
+        self.assertEqual(len('x; b;'), Parse('x; b; cd'))
+
+        # Lines of a multi-line buffer
+        Parse('echo 1\necho 2\n')
+        self.assertEqual(len('echo 1\necho 2\n'),
+                         Parse('echo 1\necho 2\nec'))
+
+        # Not inside a here doc, or a pipeline that it's part of
+        line = 'cat <<EOF | wc; x\nbody\nEOF\n'
+        Parse(line)
+        self.assertEqual(len(line), Parse(line + 'ls'))
+        self.assertEqual(0, Parse('cat <<EOF | wc; y\nbody\nEOF\n'))
+
+        # Running a command means we start over
+        r.comp_ui_state.parsed_line = None
+        self.assertEqual(0, Parse('echo hi; echo $PS'))
+
+    def testResumedParseIsTheSame(self):
+        r = _MakeRootCompleter()
+
+        # As if the user typed each of these
+        lines = [
+            'echo hi; echo $HO',
+            'echo hi; echo $HOM',
+            'echo hi; ls | gr',
+            'echo hi; ls | grep -',
+            'echo hi; ls | grep x && ec',
+            'echo hi; ls | grep x && echo > f',
+            'echo hi; ls | grep x && echo >',
+            'echo hi; ls |',
+            'echo hi; ls ||',
+            'echo hi; ls || ~',
+            'echo hi & ech',
+            'echo hi &> ',
+            'for x in a b; do\necho $x\ndone\nech',
+            'for x in a b; do\necho $x\ndone\necho $H',
+            'for x in a b; do\necho $x; ec',
+            'cat <<EOF; ec\nbody $HO\nEOF\nec',
+            'cat <<EOF; ec\nbody $HO\nEOF\necho $P',
+            'echo )',
+            'echo ) ; ls',
+            'echo ok; ls',
+        ]
+        for line in lines:
+            self._AssertSameTrail(r, line)
+
     def testCompletesShAssignment(self):
         # OSH doesn't do this.  Here is noticed about bash --norc (which is
         # undoubtedly different from bash_completion):
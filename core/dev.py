@@ -286,8 +286,8 @@ class MultiTracer(object):
     PATH=$ORIG_PATH time-helper -x -e -- cc1 "$@"
     """
 
-    def __init__(self, shell_pid, out_dir, dumps, streams, fd_state):
-        # type: (int, str, str, str, process.FdState) -> None
+    def __init__(self, shell_pid, out_dir, dumps, streams, fd_state, arena):
+        # type: (int, str, str, str, process.FdState, alloc.Arena) -> None
         """
         out_dir could be auto-generated from root PID?
         """
@@ -296,6 +296,7 @@ class MultiTracer(object):
         self.dumps = dumps
         self.streams = streams
         self.fd_state = fd_state
+        self.arena = arena
 
         self.this_pid = shell_pid
 
@@ -305,6 +306,10 @@ class MultiTracer(object):
         # or something.
         self.hist_argv0 = {}  # type: Dict[str, int]
 
+        # Lookups in the cache of strings passed to eval
+        self.eval_cache_hits = 0
+        self.eval_cache_misses = 0
+
     def OnNewProcess(self, child_pid):
         # type: (int) -> None
         """
@@ -317,6 +322,8 @@ class MultiTracer(object):
         self.this_pid = child_pid
         # each process keep track of direct children
         self.hist_argv0.clear()
+        self.eval_cache_hits = 0
+        self.eval_cache_misses = 0
 
     def EmitArgv0(self, argv0):
         # type: (str) -> None
@@ -330,6 +337,13 @@ class MultiTracer(object):
             # TODO: mycpp doesn't allow +=
             self.hist_argv0[argv0] = self.hist_argv0[argv0] + 1
 
+    def EmitEvalCache(self, hit):
+        # type: (bool) -> None
+        if hit:
+            self.eval_cache_hits += 1
+        else:
+            self.eval_cache_misses += 1
+
     def WriteDumps(self):
         # type: () -> None
         if len(self.out_dir) == 0:
@@ -344,11 +358,28 @@ class MultiTracer(object):
             d = {'argv0': a, 'count': c}
             metric_argv0.append(value.Dict(d))
 
+        metric_eval_cache = {
+            'hits': value.Int(mops.IntWiden(self.eval_cache_hits)),
+            'misses': value.Int(mops.IntWiden(self.eval_cache_misses)),
+        }  # type: Dict[str, value_t]
+
+        # A long-running shell shouldn't retain more lines over time
+        metric_arena = {}  # type: Dict[str, value_t]
+        if self.arena:
+            metric_arena['lines'] = value.Int(
+                mops.IntWiden(self.arena.num_lines))
+            metric_arena['retained_lines'] = value.Int(
+                mops.IntWiden(self.arena.NumRetainedLines()))
+            metric_arena['retained_tokens'] = value.Int(
+                mops.IntWiden(self.arena.NumRetainedTokens()))
+
         # Other things we need: the reason for the crash!  _ErrorWithLocation is
         # required I think.
         j = {
             'pid': value.Int(mops.IntWiden(self.this_pid)),
             'metric_argv0': value.List(metric_argv0),
+            'metric_eval_cache': value.Dict(metric_eval_cache),
+            'metric_arena': value.Dict(metric_arena),
         }  # type: Dict[str, value_t]
 
         # dumps are named $PID.$channel.json
@@ -624,6 +655,11 @@ class Tracer(object):
         buf.write('\n')
         self.f.write(buf.getvalue())
 
+    def OnEvalCache(self, hit):
+        # type: (bool) -> None
+        """Called when eval looks up its string in the eval cache."""
+        self.multi_trace.EmitEvalCache(hit)
+
     def OnExec(self, argv):
         # type: (List[str]) -> None
         buf = self._RichTraceBegin('.')
@@ -1,10 +1,8 @@
 """executor.py."""
 from __future__ import print_function
 
-from errno import EINTR
-
 from _devbuild.gen.id_kind_asdl import Id
-from _devbuild.gen.option_asdl import builtin_i
+from _devbuild.gen.option_asdl import builtin_i, option_i
 from _devbuild.gen.runtime_asdl import RedirValue, trace
 from _devbuild.gen.syntax_asdl import (
     command,
@@ -29,11 +27,12 @@ from frontend import consts
 from frontend import lexer
 from mycpp import mylib
 from mycpp.mylib import log, print_stderr, tagswitch
+from osh import no_fork
 from pylib import os_path
 from pylib import path_stat
 
 import posix_ as posix
-from posix_ import X_OK  # translated directly to C macro
+from posix_ import X_OK, SEEK_CUR, SEEK_SET  # translated directly to C macros
 
 from typing import cast, Dict, List, Tuple, Optional, TYPE_CHECKING
 if TYPE_CHECKING:
@@ -82,16 +81,27 @@ class SearchPath(object):
         # TODO: remove exec_opts
         self.cache = {}  # type: Dict[str, str]
 
+        # $PATH split on :, reused until the string changes
+        self.path_str = None  # type: Optional[str]
+        self.path_dirs = []  # type: List[str]
+
+        # For 'hash --stats'
+        self.num_hits = 0
+        self.num_lookups = 0
+
     def _GetPath(self):
         # type: () -> List[str]
+        """Returns the parsed $PATH, which the caller must not mutate."""
 
         # In YSH, we read from ENV.PATH
         s = self.mem.env_config.Get('PATH')
         if s is None:
             return []  # treat as empty path
 
-        # TODO: Could cache this to avoid split() allocating all the time.
-        return s.split(':')
+        if s != self.path_str:
+            self.path_str = s
+            self.path_dirs = s.split(':')
+        return self.path_dirs
 
     def LookupOne(self, name, exec_required=True):
         # type: (str, bool) -> Optional[str]
@@ -106,6 +116,9 @@ class SearchPath(object):
         # type: (str, bool) -> List[str]
         """
         Like LookupOne(), with an option for 'type -a' to return all paths.
+
+        Without it, a command remembered by CachedLookup() is returned without
+        searching, like bash.
         """
         if len(name) == 0:  # special case for "$(true)"
             return []
@@ -116,6 +129,10 @@ class SearchPath(object):
             else:
                 return []
 
+        if not do_all and name in self.cache:
+            self.num_hits += 1
+            return [self.cache[name]]
+
         results = []  # type: List[str]
         for path_dir in self._GetPath():
             full_path = os_path.join(path_dir, name)
@@ -130,8 +147,12 @@ class SearchPath(object):
         # type: (str) -> Optional[str]
         #log('name %r', name)
         if name in self.cache:
+            self.num_hits += 1
             return self.cache[name]
 
+        # Like bash, we don't remember commands that weren't found.  Checking
+        # that one is still missing takes as many syscalls as searching again.
+        self.num_lookups += 1
         full_path = self.LookupOne(name)
         if full_path is not None:
             self.cache[name] = full_path
@@ -151,6 +172,11 @@ class SearchPath(object):
         # type: () -> List[str]
         return self.cache.values()
 
+    def Stats(self):
+        # type: () -> List[int]
+        """For hash --stats."""
+        return [len(self.cache), self.num_hits, self.num_lookups]
+
 
 class _ProcessSubFrame(object):
     """To keep track of diff <(cat 1) <(cat 2) > >(tac)"""
@@ -262,6 +288,8 @@ class ShellExecutor(vm._Executor):
         # group, we only need one pointer here, not some collection.
         self.fg_pipeline = None  # type: Optional[process.Pipeline]
 
+        self.no_fork_checker = no_fork.NoForkChecker(procs, exec_opts)
+
     def CheckCircularDeps(self):
         # type: () -> None
         assert self.cmd_ev is not None
@@ -479,6 +507,7 @@ class ShellExecutor(vm._Executor):
             p = process.Process(thunk, self.job_control, self.job_list,
                                 self.tracer)
 
+            pgid = process.INVALID_PGID
             if self.job_control.Enabled():
                 if self.fg_pipeline is not None:
                     pgid = self.fg_pipeline.ProcessGroupId()
@@ -488,9 +517,14 @@ class ShellExecutor(vm._Executor):
                     change = process.SetPgid(pgid, self.tracer)
                     self.fg_pipeline = None  # clear to avoid confusion in subshells
                 else:
-                    change = process.SetPgid(process.OWN_LEADER, self.tracer)
+                    pgid = process.OWN_LEADER
+                    change = process.SetPgid(pgid, self.tracer)
                 p.AddStateChange(change)
 
+            # Nothing runs in the child before exec(), so we can avoid copying
+            # the shell's page tables with fork().
+            p.AllowSpawn(pgid)
+
             status = p.RunProcess(self.waiter, trace.External(cmd_val.argv))
 
             # this is close to a "leaf" for errors
@@ -600,9 +634,64 @@ class ShellExecutor(vm._Executor):
 
         return p.RunProcess(self.waiter, trace.ForkWait)
 
+    def _CaptureStdoutNoFork(self, node):
+        # type: (command_t) -> Tuple[int, str]
+        """Run a command sub like $(echo hi) in this process.
+
+        Returns status -1 if it can't be run, and the caller should fork.
+        """
+        fd = self.fd_state.OpenCaptureFile()
+        if fd == process.NO_FD:
+            return -1, ''
+
+        # Like SubProgramThunk.Run()
+        opts = []  # type: List[int]
+        if not self.exec_opts.inherit_errexit():
+            opts.append(option_i.errexit)
+
+        # $_ and $? etc. don't leak out of the subshell
+        last_arg = self.mem.last_arg
+        io_errors = []  # type: List[error.IOError_OSError]
+        with process.ctx_CaptureStdout(self.fd_state, fd, io_errors):
+            with state.ctx_Registers(self.mem):
+                with state.ctx_Option(self.mutable_opts, opts, False):
+                    self.cmd_ev.ExecuteAndCatch(node, 0)
+                status = self.cmd_ev.LastStatus()
+
+            pyos.FlushStdout()
+            num_bytes = posix.lseek(fd, 0, SEEK_CUR)
+            posix.lseek(fd, 0, SEEK_SET)
+            stdout_str = self._ReadAll(fd, num_bytes)
+        self.mem.last_arg = last_arg
+
+        if len(io_errors):
+            e_die('Error restoring stdout after command sub: %s' %
+                  pyutil.strerror(io_errors[0]))
+
+        return status, stdout_str.rstrip('\n')
+
+    def _ReadAll(self, fd, max_bytes):
+        # type: (int, int) -> str
+        """Read from fd until EOF, or until max_bytes are read if it's not
+        -1."""
+        buf = mylib.BufWriter()
+        err_num = pyos.ReadAll(fd, max_bytes, buf)
+        if err_num != 0:
+            # Like the top level IOError handler
+            e_die_status(2,
+                         'Oils I/O error (read): %s' % posix.strerror(err_num))
+        return buf.getvalue()
+
     def CaptureStdout(self, node):
         # type: (command_t) -> Tuple[int, str]
 
+        if (self.exec_opts.no_fork_command_sub() and
+                not self.trap_state.ThisProcessHasTraps() and
+                self.no_fork_checker.Check(node)):
+            status, stdout_str = self._CaptureStdoutNoFork(node)
+            if status != -1:
+                return status, stdout_str
+
         p = self._MakeProcess(node, self.exec_opts.inherit_errexit(),
                               self.exec_opts.errtrace())
         # Shell quirk: Command subs remain part of the shell's process group, so we
@@ -614,26 +703,12 @@ class ShellExecutor(vm._Executor):
         p.StartProcess(trace.CommandSub)
         #log('Command sub started %d', pid)
 
-        chunks = []  # type: List[str]
         posix.close(w)  # not going to write
-        while True:
-            n, err_num = pyos.Read(r, 4096, chunks)
-
-            if n < 0:
-                if err_num == EINTR:
-                    pass  # retry
-                else:
-                    # Like the top level IOError handler
-                    e_die_status(
-                        2,
-                        'Oils I/O error (read): %s' % posix.strerror(err_num))
-
-            elif n == 0:  # EOF
-                break
+        stdout_str = self._ReadAll(r, -1)
         posix.close(r)
 
         status = p.Wait(self.waiter)
-        stdout_str = ''.join(chunks).rstrip('\n')
+        stdout_str = stdout_str.rstrip('\n')
 
         return status, stdout_str
 
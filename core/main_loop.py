@@ -28,6 +28,7 @@ import posix_ as posix
 from typing import cast, Any, List, TYPE_CHECKING
 if TYPE_CHECKING:
     from core.comp_ui import _IDisplay
+    from frontend import parse_cache
     from frontend import parse_lib
     from osh.cmd_parse import CommandParser
     from osh.cmd_eval import CommandEvaluator
@@ -320,10 +321,20 @@ def Interactive(
     return status
 
 
-def Batch(cmd_ev, c_parser, errfmt, cmd_flags=0):
-    # type: (CommandEvaluator, CommandParser, ui.ErrorFormatter, int) -> int
+def Batch(
+        cmd_ev,  # type: CommandEvaluator
+        c_parser,  # type: CommandParser
+        errfmt,  # type: ui.ErrorFormatter
+        cmd_flags=0,  # type: int
+        recorder=None,  # type: parse_cache.Recorder
+):
+    # type: (...) -> int
     """Loop for batch execution.
 
+    Args:
+      recorder: if passed, saves the commands in the parse cache or eval cache
+                after the whole file is parsed
+
     Returns:
       int status, e.g. 2 on parse error
 
@@ -346,16 +357,23 @@ def Batch(cmd_ev, c_parser, errfmt, cmd_flags=0):
     status = 0
     while True:
         probe('main_loop', 'Batch_parse_enter')
+        if recorder:
+            recorder.BeforeParse()
         try:
             node = c_parser.ParseLogicalLine()  # can raise ParseError
             if node is None:  # EOF
                 c_parser.CheckForPendingHereDocs()  # can raise ParseError
+                if recorder:
+                    recorder.Save()
                 break
         except error.Parse as e:
             errfmt.PrettyPrintError(e)
             status = 2
             break
 
+        if recorder:
+            recorder.AfterParse(node, c_parser.line_reader.line_num)
+
         # After every "logical line", no lines will be referenced by the Arena.
         # Tokens in the LST still point to many lines, but lines with only comment
         # or whitespace won't be reachable, so the GC will free them.
@@ -386,6 +404,38 @@ def Batch(cmd_ev, c_parser, errfmt, cmd_flags=0):
     return status
 
 
+def BatchCached(
+        cmd_ev,  # type: CommandEvaluator
+        c_parser,  # type: CommandParser
+        errfmt,  # type: ui.ErrorFormatter
+        p_cache,  # type: parse_cache.CommandCache
+        cached,  # type: parse_cache.CachedFile
+        cmd_flags=0,  # type: int
+):
+    # type: (...) -> int
+    """Like Batch(), but runs commands from the parse cache or eval cache.
+
+    If the parse options or aliases differ from when a command was parsed, we
+    parse the rest of the file with Batch().
+    """
+    status = 0
+    for i, node in enumerate(cached.nodes):
+        parse_key = p_cache.ParseKey()
+        if parse_key is None or parse_key != cached.parse_keys[i]:
+            if i > 0:
+                c_parser.line_reader.SkipLines(cached.next_lines[i - 1])
+            return Batch(cmd_ev, c_parser, errfmt, cmd_flags=cmd_flags)
+
+        is_return, is_fatal = cmd_ev.ExecuteAndCatch(node, cmd_flags)
+        status = cmd_ev.LastStatus()
+        if is_return or is_fatal:
+            break
+
+        mylib.MaybeCollect()  # manual GC point
+
+    return status
+
+
 def ParseWholeFile(c_parser):
     # type: (CommandParser) -> command_t
     """Parse an entire shell script.
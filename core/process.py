@@ -62,6 +62,7 @@ from posix_ import (
     O_RDWR,
     O_WRONLY,
     O_TRUNC,
+    SEEK_SET,
 )
 
 from typing import IO, List, Tuple, Dict, Optional, Any, cast, TYPE_CHECKING
@@ -202,6 +203,12 @@ class FdState(object):
         self.waiter = waiter
         self.exec_opts = exec_opts
 
+        # Unlinked temp files for $(echo hi) without forking, which are reused.
+        # They belong to capture_pid, not to forked children.
+        self.capture_files = []  # type: List[int]
+        self.capture_pid = -1
+        self.num_capture_files = 0
+
     def Open(self, path):
         # type: (str) -> mylib.LineReader
         """Opens a path for read, but moves it out of the reserved 3-9 fd
@@ -536,6 +543,66 @@ class FdState(object):
         self._PushDup(r, redir_loc.Fd(0))
         return True
 
+    def PushStdoutToFd(self, w):
+        # type: (int) -> None
+        """Save the current stdout and make it go to descriptor 'w'.
+
+        For command subs that run in the shell process.
+        """
+        new_frame = _FdFrame()
+        self.stack.append(new_frame)
+        self.cur_frame = new_frame
+
+        self._PushDup(w, redir_loc.Fd(1))
+
+    def OpenCaptureFile(self):
+        # type: () -> int
+        """Return a descriptor to capture the output of $(echo hi), or NO_FD.
+
+        It's an unlinked file in $TMPDIR, positioned at the start.  Call
+        ReleaseCaptureFile() when done with it.
+        """
+        pid = posix.getpid()
+        if pid != self.capture_pid:
+            # We forked, so the files are shared with the parent
+            for fd in self.capture_files:
+                posix.close(fd)
+            del self.capture_files[:]
+            self.capture_pid = pid
+
+        if len(self.capture_files):
+            fd = self.capture_files.pop()
+            posix.lseek(fd, 0, SEEK_SET)
+            return fd
+
+        tmp_dir = '/tmp'
+        val = self.mem.GetValue('TMPDIR')
+        if val.tag() == value_e.Str:
+            s = cast(value.Str, val).s
+            if len(s):
+                tmp_dir = s
+
+        path = '%s/oils-capture-%d-%d' % (tmp_dir, pid, self.num_capture_files)
+        self.num_capture_files += 1
+        try:
+            fd = posix.open(path, O_RDWR | O_CREAT | O_EXCL, 0o600)
+        except (IOError, OSError) as e:
+            return NO_FD
+
+        try:
+            posix.unlink(path)
+            new_fd = SaveFd(fd)
+        except (IOError, OSError) as e:
+            posix.close(fd)
+            return NO_FD
+        posix.close(fd)
+        fcntl_.fcntl(new_fd, F_SETFD, FD_CLOEXEC)
+        return new_fd
+
+    def ReleaseCaptureFile(self, fd):
+        # type: (int) -> None
+        self.capture_files.append(fd)
+
     def Pop(self, err_out):
         # type: (List[error.IOError_OSError]) -> None
         frame = self.stack.pop()
@@ -692,6 +759,27 @@ class ExternalProgram(object):
                    True)
         assert False, "This line should never execute"  # NO RETURN
 
+    def Spawn(self, argv0_path, cmd_val, environ, pgid, sigdef):
+        # type: (str, cmd_value.Argv, Dict[str, str], int, List[int]) -> int
+        """Start a program with posix_spawn(), without forking the shell.
+
+        Called by:   ls /
+
+        Returns the PID, or -1 if the caller should fall back to fork() and
+        Exec().  That path handles shebang hijacking, the /bin/sh retry on
+        ENOEXEC, and error messages like "Can't execute".
+        """
+        if len(self.hijack_shebang):
+            return -1
+
+        probe('process', 'ExternalProgram_Spawn', argv0_path)
+        try:
+            pid = posix.posix_spawn(argv0_path, cmd_val.argv, environ, pgid,
+                                    sigdef)
+        except (IOError, OSError) as e:
+            return -1
+        return pid
+
     def _Exec(self, argv0_path, argv, argv0_loc, environ, should_retry):
         # type: (str, List[str], loc_t, Dict[str, str], bool) -> None
         if len(self.hijack_shebang):
@@ -774,6 +862,14 @@ class Thunk(object):
         """Display for the 'jobs' list."""
         raise NotImplementedError()
 
+    def Spawn(self, pgid, sigdef):
+        # type: (int, List[int]) -> int
+        """Start the thunk in a new process without forking.
+
+        Returns the PID, or -1 if the thunk must be run after fork().
+        """
+        return -1
+
     def __repr__(self):
         # type: () -> str
         return self.UserString()
@@ -804,6 +900,11 @@ class ExternalThunk(Thunk):
         """An ExternalThunk is run in parent for the exec builtin."""
         self.ext_prog.Exec(self.argv0_path, self.cmd_val, self.environ)
 
+    def Spawn(self, pgid, sigdef):
+        # type: (int, List[int]) -> int
+        return self.ext_prog.Spawn(self.argv0_path, self.cmd_val, self.environ,
+                                   pgid, sigdef)
+
 
 class SubProgramThunk(Thunk):
     """A subprogram that can be executed in another process."""
@@ -999,11 +1100,35 @@ class Process(Job):
         self.pid = -1
         self.status = -1
 
+        # See AllowSpawn()
+        self.spawn_allowed = False
+        self.spawn_pgid = INVALID_PGID
+
     def Init_ParentPipeline(self, pi):
         # type: (Pipeline) -> None
         """For updating PIPESTATUS."""
         self.parent_pipeline = pi
 
+    def AllowSpawn(self, pgid):
+        # type: (int) -> None
+        """Let StartProcess() use posix_spawn() instead of fork().
+
+        Only valid for a standalone process whose thunk runs nothing in the
+        child before exec(), i.e. a simple external command.  pgid is the
+        process group given to SetPgid(), or INVALID_PGID without job control.
+        """
+        self.spawn_allowed = True
+        self.spawn_pgid = pgid
+
+    def _Spawn(self):
+        # type: () -> int
+        """Returns the PID, or -1 if the thunk can't be spawned."""
+        # Reset the same signals that the child resets after fork() below
+        sigdef = [SIGPIPE, SIGQUIT, SIGTTOU, SIGTTIN]
+        if self.spawn_pgid == OWN_LEADER:
+            sigdef.append(SIGTSTP)
+        return self.thunk.Spawn(self.spawn_pgid, sigdef)
+
     def __repr__(self):
         # type: () -> str
 
@@ -1055,13 +1180,30 @@ class Process(Job):
 
     def StartProcess(self, why):
         # type: (trace_t) -> int
-        """Start this process with fork(), handling redirects."""
+        """Start this process with fork(), handling redirects.
+
+        Simple external commands may use posix_spawn() instead; see
+        AllowSpawn().
+        """
+        if self.spawn_allowed:
+            pid = self._Spawn()
+            if pid != -1:
+                # The child already joined its process group before exec(), so
+                # we skip ApplyFromParent().  setpgid() would now fail with
+                # EACCES.
+                self.tracer.OnProcessStart(pid, why)
+                self.pid = pid
+                self.job_list.AddChildProcess(pid, self)
+                return pid
+
         pid = posix.fork()
         if pid < 0:
             # When does this happen?
             e_die('Fatal error in posix.fork()')
 
         elif pid == 0:  # child
+            mylib.FreezeHeap()
+
             # Note: this happens in BOTH interactive and non-interactive shells.
             # We technically don't need to do most of it in non-interactive, since we
             # did not change state in InitInteractiveShell().
@@ -1209,6 +1351,28 @@ class ctx_Pipe(object):
         self.fd_state.Pop(self.err_out)
 
 
+class ctx_CaptureStdout(object):
+    """For command subs that run in the shell process."""
+
+    def __init__(self, fd_state, fd, err_out):
+        # type: (FdState, int, List[error.IOError_OSError]) -> None
+        # Don't capture what was written before
+        pyos.FlushStdout()
+        fd_state.PushStdoutToFd(fd)
+        self.fd_state = fd_state
+        self.fd = fd
+        self.err_out = err_out
+
+    def __enter__(self):
+        # type: () -> None
+        pass
+
+    def __exit__(self, type, value, traceback):
+        # type: (Any, Any, Any) -> None
+        self.fd_state.Pop(self.err_out)
+        self.fd_state.ReleaseCaptureFile(self.fd)
+
+
 class Pipeline(Job):
     """A pipeline of processes to run.
 
@@ -68,7 +68,7 @@ class ProcessTest(unittest.TestCase):
 
         fd_state = None
         self.multi_trace = dev.MultiTracer(posix.getpid(), '', '', '',
-                                           fd_state)
+                                           fd_state, None)
         self.tracer = dev.Tracer(None, exec_opts, mutable_opts, mem,
                                  mylib.Stderr(), self.multi_trace)
         self.waiter = process.Waiter(self.job_list, exec_opts, self.trap_state,
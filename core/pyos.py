@@ -9,12 +9,14 @@ from errno import EINTR
 import pwd
 import resource
 import select
+import stat
 import sys
 import termios  # for read -n
 import time
 
 from mycpp import iolib
 from mycpp import mops
+from mycpp import mylib
 from mycpp.mylib import log
 
 import posix_ as posix
@@ -29,6 +31,10 @@ _ = log
 EOF_SENTINEL = 256  # bigger than any byte
 NEWLINE_CH = 10  # ord('\n')
 
+READ_BLOCK_SIZE = 4096  # for ReadUntil() on regular files
+READ_ALL_MAX_CHUNK = 1 << 20  # for ReadAll()
+SEEK_CUR = 1
+
 
 def FlushStdout():
     # type: () -> Optional[error.IOError_OSError]
@@ -105,12 +111,51 @@ def Read(fd, n, chunks):
         return length, 0
 
 
+def ReadAll(fd, max_bytes, buf):
+    # type: (int, int, mylib.BufWriter) -> int
+    """Read from fd until EOF, or until max_bytes are read if it's not -1, and
+    append the data to buf.
+
+    Used by command sub and read --all.  When the size is unknown, we start
+    with READ_BLOCK_SIZE and double the read() size up to READ_ALL_MAX_CHUNK,
+    so big outputs take few syscalls.  In C++, we read directly into the
+    BufWriter, so buf.getvalue() doesn't copy the data again.
+
+    Like Read(), EINTR raises KeyboardInterrupt if there's an untrapped
+    SIGINT.  Otherwise it's retried without running traps.
+
+    Returns:
+      0 on success, or errno on failure
+    """
+    n = READ_BLOCK_SIZE
+    while max_bytes != 0:
+        if max_bytes != -1:
+            n = max_bytes
+        try:
+            chunk = posix.read(fd, n)
+        except OSError as e:
+            if e.errno == EINTR:
+                if iolib.gSignalSafe.PollUntrappedSigInt():
+                    raise KeyboardInterrupt()
+                continue  # retry
+            return e.errno
+
+        length = len(chunk)
+        if length == 0:  # EOF
+            break
+        buf.write(chunk)
+
+        if max_bytes != -1:
+            max_bytes -= length
+        elif length == n and n < READ_ALL_MAX_CHUNK:
+            n *= 2
+    return 0
+
+
 def ReadByte(fd):
     # type: (int) -> Tuple[int, int]
     """Low-level interface that returns values rather than raising exceptions.
 
-    Used by _ReadUntilDelim() and _ReadLineSlowly().
-
     Returns:
       failure: (-1, errno) on failure
       success: (ch integer value or EOF_SENTINEL, 0)
@@ -128,6 +173,75 @@ def ReadByte(fd):
             return EOF_SENTINEL, 0
 
 
+def ReadUntil(fd, delim_byte, max_bytes, chunks):
+    # type: (int, int, int, List[str]) -> Tuple[int, int]
+    """Read up to and including delim_byte, and append the data to chunks.
+
+    Used by _ReadPortion() and ReadLineSlowly().  If max_bytes is
+    non-negative, at most that many bytes are consumed.
+
+    If fd is a regular file, we read a block and seek back to the byte after
+    the delimiter, like bash does.  The file offset ends up where reading a
+    byte at a time would leave it, so child processes see the same input.
+    Otherwise, e.g. for pipes and terminals, we read a byte at a time.
+
+    Returns:
+      (-1, errno) on failure, after appending any partial data
+      (number of bytes read, 0) on success.  Where 0 bytes read indicates EOF.
+    """
+    try:
+        is_reg = stat.S_ISREG(posix.fstat(fd).st_mode)
+    except OSError as e:
+        return -1, e.errno
+
+    if is_reg:
+        n = READ_BLOCK_SIZE
+        if 0 <= max_bytes < n:
+            n = max_bytes
+        try:
+            block = posix.read(fd, n)
+        except OSError as e:
+            if e.errno == EINTR and iolib.gSignalSafe.PollUntrappedSigInt():
+                raise KeyboardInterrupt()
+            return -1, e.errno
+
+        i = block.find(chr(delim_byte))
+        if i != -1 and i + 1 < len(block):
+            try:
+                posix.lseek(fd, i + 1 - len(block), SEEK_CUR)
+            except OSError as e:
+                return -1, e.errno
+            block = block[:i + 1]
+
+        length = len(block)
+        if length:
+            chunks.append(block)
+        return length, 0
+
+    buf = []  # type: List[str]
+    err_num = 0
+    while max_bytes < 0 or len(buf) < max_bytes:
+        try:
+            b = posix.read(fd, 1)
+        except OSError as e:
+            if e.errno == EINTR and iolib.gSignalSafe.PollUntrappedSigInt():
+                raise KeyboardInterrupt()
+            err_num = e.errno
+            break
+        if len(b) == 0:  # EOF
+            break
+        buf.append(b)
+        if ord(b) == delim_byte:
+            break
+
+    length = len(buf)
+    if length:
+        chunks.append(''.join(buf))
+    if err_num != 0:
+        return -1, err_num
+    return length, 0
+
+
 def Environ():
     # type: () -> Dict[str, str]
     return posix.environ
@@ -282,6 +396,17 @@ def InputAvailable(fd):
     return len(r) != 0
 
 
+def FileStamp(path):
+    # type: (str) -> Tuple[int, float]
+    """Returns the size and modification time of a file, which can be used to
+    cache data derived from it.
+
+    Raises OSError.
+    """
+    st = posix.stat(path)
+    return st.st_size, st.st_mtime
+
+
 def MakeDirCacheKey(path):
     # type: (str) -> Tuple[str, int]
     """Returns a pair (path with last modified time) that can be used to cache
@@ -33,6 +33,7 @@ from frontend import flag_def  # side effect: flags are defined!
 unused1 = flag_def
 from frontend import flag_util
 from frontend import reader
+from frontend import parse_cache
 from frontend import parse_lib
 
 from builtin import assign_osh
@@ -83,6 +84,7 @@ from mycpp.mylib import NewDict, print_stderr, log
 from pylib import os_path
 from tools import deps
 from tools import fmt
+from tools import parse_batch
 from tools import ysh_ify
 from ysh import expr_eval
 
@@ -419,7 +421,8 @@ def Main(
     trace_dir = environ.get('OILS_TRACE_DIR', '')
     dumps = environ.get('OILS_TRACE_DUMPS', '')
     streams = environ.get('OILS_TRACE_STREAMS', '')
-    multi_trace = dev.MultiTracer(my_pid, trace_dir, dumps, streams, fd_state)
+    multi_trace = dev.MultiTracer(my_pid, trace_dir, dumps, streams, fd_state,
+                                  arena)
 
     tracer = dev.Tracer(parse_ctx, exec_opts, mutable_opts, mem, trace_f,
                         multi_trace)
@@ -641,6 +644,13 @@ def Main(
     b[builtin_i.extern_] = meta_oils.Extern(shell_ex, procs, errfmt)
 
     # Meta builtins
+    # Opt-in cache of the syntax trees of files run with 'source' and 'use'
+    p_cache = None  # type: Optional[parse_cache.ParseCache]
+    parse_cache_dir = environ.get('OILS_PARSE_CACHE_DIR', '')
+    if len(parse_cache_dir):
+        p_cache = parse_cache.ParseCache(parse_cache_dir, version_str,
+                                         mutable_opts, aliases)
+
     module_invoke = module_ysh.ModuleInvoke(cmd_ev, tracer, errfmt)
     b[builtin_i.use] = meta_oils.ShellFile(parse_ctx,
                                            search_path,
@@ -649,13 +659,27 @@ def Main(
                                            tracer,
                                            errfmt,
                                            loader,
+                                           p_cache=p_cache,
                                            module_invoke=module_invoke)
-    source_builtin = meta_oils.ShellFile(parse_ctx, search_path, cmd_ev,
-                                         fd_state, tracer, errfmt, loader)
+    source_builtin = meta_oils.ShellFile(parse_ctx,
+                                         search_path,
+                                         cmd_ev,
+                                         fd_state,
+                                         tracer,
+                                         errfmt,
+                                         loader,
+                                         p_cache=p_cache)
     b[builtin_i.source] = source_builtin
     b[builtin_i.dot] = source_builtin
-    b[builtin_i.eval] = meta_oils.Eval(parse_ctx, exec_opts, cmd_ev, tracer,
-                                       errfmt, mem)
+    eval_cache = parse_cache.EvalCache(mutable_opts, aliases,
+                                       parse_cache.EVAL_CACHE_SIZE)
+    b[builtin_i.eval] = meta_oils.Eval(parse_ctx,
+                                       exec_opts,
+                                       cmd_ev,
+                                       tracer,
+                                       errfmt,
+                                       mem,
+                                       eval_cache=eval_cache)
 
     # Module builtins
     guards = NewDict()  # type: Dict[str, bool]
@@ -1167,6 +1191,12 @@ def Main(
     # osh --tool syntax-tree is equivalent to osh -n --one-pass-parse
     tool_name = 'syntax-tree' if exec_opts.noexec() else flag.tool
 
+    if tool_name == 'parse-batch':
+        # The script is a list of files to parse
+        paths = parse_batch.ReadPaths(line_reader)
+        return parse_batch.ParseBatch(parse_ctx, fd_state, paths,
+                                      mops.BigTruncate(flag.parse_jobs))
+
     if len(tool_name):
         # Don't save tokens becaues it's slow
         if tool_name != 'syntax-tree':
@@ -57,6 +57,10 @@ ClearExport = 1 << 3
 SetNameref = 1 << 4
 ClearNameref = 1 << 5
 
+# Dynamic scope lookups walk the stack until it's this deep, and then use
+# Mem.dynamic_index
+DYNAMIC_INDEX_MIN_DEPTH = 8
+
 
 class ctx_Source(object):
     """For source builtin."""
@@ -719,10 +723,10 @@ class ctx_FuncCall(object):
         self.saved_globals = mem.var_stack[0]
 
         assert func.module_frame is not None
-        mem.var_stack[0] = func.module_frame
+        mem.SetGlobalFrame(func.module_frame)
 
         frame = NewDict()  # type: Dict[str, Cell]
-        mem.var_stack.append(frame)
+        mem.PushFrame(frame)
 
         # blame the location of (
         mem.debug_stack.append(blame_tok)
@@ -736,9 +740,9 @@ class ctx_FuncCall(object):
     def __exit__(self, type, value, traceback):
         # type: (Any, Any, Any) -> None
         self.mem.debug_stack.pop()
-        self.mem.var_stack.pop()
+        self.mem.PopFrame()
 
-        self.mem.var_stack[0] = self.saved_globals
+        self.mem.SetGlobalFrame(self.saved_globals)
 
 
 class ctx_ProcCall(object):
@@ -755,7 +759,7 @@ class ctx_ProcCall(object):
         self.saved_globals = mem.var_stack[0]
 
         assert proc.module_frame is not None
-        mem.var_stack[0] = proc.module_frame
+        mem.SetGlobalFrame(proc.module_frame)
 
         frame = NewDict()  # type: Dict[str, Cell]
 
@@ -769,7 +773,7 @@ class ctx_ProcCall(object):
             # - closed: ARGV is empty list
             frame['ARGV'] = _MakeArgvCell(argv)
 
-        mem.var_stack.append(frame)
+        mem.PushFrame(frame)
 
         mem.debug_stack.append(
             debug_frame.ProcLike(invoke_loc, proc.name_tok, proc.name))
@@ -791,12 +795,12 @@ class ctx_ProcCall(object):
         # type: (Any, Any, Any) -> None
         self.mutable_opts.PopDynamicScope()
         self.mem.debug_stack.pop()
-        self.mem.var_stack.pop()
+        self.mem.PopFrame()
 
         if self.sh_compat:
             self.mem.argv_stack.pop()
 
-        self.mem.var_stack[0] = self.saved_globals
+        self.mem.SetGlobalFrame(self.saved_globals)
 
 
 class ctx_Temp(object):
@@ -915,7 +919,7 @@ class ctx_LoopFrame(object):
             self.new_frame = NewDict()  # type: Dict[str, Cell]
             self.new_frame['__E__'] = Cell(False, False, False,
                                            value.Frame(to_enclose))
-            mem.var_stack.append(self.new_frame)
+            mem.PushFrame(self.new_frame)
 
     def __enter__(self):
         # type: () -> None
@@ -924,7 +928,7 @@ class ctx_LoopFrame(object):
     def __exit__(self, type, value, traceback):
         # type: (Any, Any, Any) -> None
         if self.do_new_frame:
-            self.mem.var_stack.pop()
+            self.mem.PopFrame()
 
 
 class ctx_EnclosedFrame(object):
@@ -965,14 +969,14 @@ class ctx_EnclosedFrame(object):
 
         if module_frame is not None:
             self.saved_globals = self.mem.var_stack[0]
-            self.mem.var_stack[0] = module_frame
+            self.mem.SetGlobalFrame(module_frame)
 
         # __E__ gets a lookup rule
         self.new_frame = NewDict()  # type: Dict[str, Cell]
         self.new_frame['__E__'] = Cell(False, False, False,
                                        value.Frame(to_enclose))
 
-        mem.var_stack.append(self.new_frame)
+        mem.PushFrame(self.new_frame)
 
     def __enter__(self):
         # type: () -> None
@@ -994,10 +998,10 @@ class ctx_EnclosedFrame(object):
                 self.out_dict[name] = cell.val
 
         # Restore
-        self.mem.var_stack.pop()
+        self.mem.PopFrame()
 
         if self.module_frame is not None:
-            self.mem.var_stack[0] = self.saved_globals
+            self.mem.SetGlobalFrame(self.saved_globals)
 
 
 class ctx_CompoundWordDebugFrame(object):
@@ -1069,7 +1073,7 @@ class ctx_ModuleEval(object):
             self.new_frame['ENV'] = env
 
         assert len(mem.var_stack) == 1
-        mem.var_stack[0] = self.new_frame
+        mem.SetGlobalFrame(self.new_frame)
 
         # Whenever we're use-ing, the 'is-main' builtin will return 1 (false)
         self.to_restore = self.mem.is_main
@@ -1090,7 +1094,7 @@ class ctx_ModuleEval(object):
         self.mem.is_main = self.to_restore
 
         assert len(self.mem.var_stack) == 1
-        self.mem.var_stack[0] = self.saved_frame
+        self.mem.SetGlobalFrame(self.saved_frame)
 
         # Now look in __export__ for the list of names to expose
 
@@ -1253,6 +1257,13 @@ class Mem(object):
 
         self.var_stack = [frame]
 
+        # Optional index for dynamic scope: name -> the positions of frames on
+        # var_stack that bind it, in increasing order.  It's built by the first
+        # lookup in a deep stack, and then kept up to date, or set to None when
+        # that's hard.  Frames with an __E__ link aren't indexed.
+        self.dynamic_index = None  # type: Optional[Dict[str, List[int]]]
+        self.num_enclosed_frames = 0
+
         # The debug_stack isn't strictly necessary for execution.  We use it
         # for crash dumps and for 3 parallel arrays: BASH_SOURCE, FUNCNAME, and
         # BASH_LINENO.
@@ -1261,6 +1272,10 @@ class Mem(object):
         self.env_dict = env_dict
         self.env_object = Obj(None, env_dict)  # initial state
 
+        # Exported variables for GetEnv(), or None when an exported cell may
+        # have changed.  Callers don't mutate it.
+        self.exported_env = None  # type: Optional[Dict[str, str]]
+
         if defaults is None:  # for unit tests only
             self.defaults = NewDict()  # type: Dict[str, value_t]
         else:
@@ -1581,11 +1596,133 @@ class Mem(object):
         """
         # We don't want the 'read' builtin to write to this frame!
         frame = NewDict()  # type: Dict[str, Cell]
-        self.var_stack.append(frame)
+        self.PushFrame(frame)
 
     def PopTemp(self):
         # type: () -> None
-        self.var_stack.pop()
+        self.PopFrame()
+
+    def PushFrame(self, frame):
+        # type: (Dict[str, Cell]) -> None
+        self.var_stack.append(frame)
+
+        if '__E__' in frame:
+            self.num_enclosed_frames += 1
+            self.dynamic_index = None
+        elif self.dynamic_index is not None:
+            depth = len(self.var_stack) - 1
+            for name in frame:
+                self._IndexName(name, depth)
+
+    def PopFrame(self):
+        # type: () -> None
+        """Pop a frame, noticing if it had exported variables."""
+        depth = len(self.var_stack) - 1
+        frame = self.var_stack.pop()
+
+        if '__E__' in frame:
+            self.num_enclosed_frames -= 1
+        elif self.dynamic_index is not None:
+            for name in frame:
+                self._UnindexName(name, depth)
+
+        if self.exported_env is None:
+            return
+        for _, cell in iteritems(frame):
+            if cell.exported:
+                self.exported_env = None
+                break
+
+    def SetGlobalFrame(self, frame):
+        # type: (Dict[str, Cell]) -> None
+        """Swap in the globals of a module."""
+        if frame is not self.var_stack[0]:
+            self.var_stack[0] = frame
+            self.exported_env = None
+            self.dynamic_index = None
+
+    def _IndexName(self, name, depth):
+        # type: (str, int) -> None
+        depths = self.dynamic_index.get(name)
+        if depths is None:
+            self.dynamic_index[name] = [depth]
+        elif depths[-1] < depth:
+            depths.append(depth)
+        elif depths[-1] != depth and depths[0] != depth:
+            # e.g. a new global that's also bound in a function.  Rebuild the
+            # index on the next lookup.
+            self.dynamic_index = None
+
+    def _UnindexName(self, name, depth):
+        # type: (str, int) -> None
+        depths = self.dynamic_index.get(name)
+        if depths is None:
+            self.dynamic_index = None  # not expected
+            return
+
+        if depths[-1] == depth:
+            depths.pop()
+        elif depths[0] == depth:
+            depths.pop(0)  # unset a global that's also bound in a function
+        else:
+            self.dynamic_index = None
+            return
+
+        if len(depths) == 0:
+            mylib.dict_erase(self.dynamic_index, name)
+
+    def _FrameDepth(self, frame):
+        # type: (Dict[str, Cell]) -> int
+        """Returns the position of the top or bottom frame, or -1."""
+        if frame is self.var_stack[-1]:
+            return len(self.var_stack) - 1
+        if frame is self.var_stack[0]:
+            return 0
+        return -1
+
+    def _BindCell(self, frame, name, cell):
+        # type: (Dict[str, Cell], str, Cell) -> None
+        """Add a cell to a frame, keeping the dynamic scope index up to date."""
+        frame[name] = cell
+
+        if self.dynamic_index is not None:
+            depth = self._FrameDepth(frame)
+            if depth == -1:
+                self.dynamic_index = None  # e.g. a captured frame
+            else:
+                self._IndexName(name, depth)
+
+    def _UnbindCell(self, frame, name):
+        # type: (Dict[str, Cell], str) -> None
+        mylib.dict_erase(frame, name)
+
+        if self.dynamic_index is not None:
+            depth = self._FrameDepth(frame)
+            if depth == -1:
+                self.dynamic_index = None
+            else:
+                self._UnindexName(name, depth)
+
+    def DefineLocal(self, name, cell):
+        # type: (str, Cell) -> None
+        """Bind a name in the local frame, replacing any existing cell."""
+        self._BindCell(self.var_stack[-1], name, cell)
+
+    def _DynamicIndexLookup(self, name):
+        # type: (str) -> Tuple[Optional[Cell], Dict[str, Cell]]
+        """Like the dynamic scope loop in _ResolveNameOnly(), in O(1) time."""
+        if self.dynamic_index is None:
+            self.dynamic_index = NewDict()
+            for i, frame in enumerate(self.var_stack):
+                for frame_name in frame:
+                    self._IndexName(frame_name, i)
+
+        depths = self.dynamic_index.get(name)
+        if depths is None:
+            return None, self.var_stack[0]  # set in global var_frame
+
+        var_frame = self.var_stack[depths[-1]]
+        return var_frame[name], var_frame
 
     def _BindEnvObj(self):
         # type: () -> None
@@ -1711,6 +1848,10 @@ class Mem(object):
           var_frame: The frame it should be set to or deleted from.
         """
         if which_scopes == scope_e.Dynamic:
+            if (len(self.var_stack) >= DYNAMIC_INDEX_MIN_DEPTH and
+                    self.num_enclosed_frames == 0):
+                return self._DynamicIndexLookup(name)
+
             for i in xrange(len(self.var_stack) - 1, -1, -1):
                 var_frame = self.var_stack[i]
                 cell, result_frame = _FrameLookup(var_frame, name)
@@ -1854,9 +1995,11 @@ class Mem(object):
                 cell = frame.get(yval.name)
                 if cell is None:
                     cell = Cell(False, False, False, val)
-                    frame[yval.name] = cell
+                    self._BindCell(frame, yval.name, cell)
                 else:
                     cell.val = val
+                    if cell.exported:
+                        self.exported_env = None
 
             elif case(y_lvalue_e.Container):
                 e_die('Container place not implemented', blame_loc)
@@ -1880,9 +2023,11 @@ class Mem(object):
                 e_die("Can't assign to readonly value %r" % lval.name,
                       lval.blame_loc)
             cell.val = val  # Mutate value_t
+            if cell.exported:
+                self.exported_env = None
         else:
             cell = Cell(False, False, False, val)
-            var_frame[lval.name] = cell
+            self._BindCell(var_frame, lval.name, cell)
 
     def SetNamed(self, lval, val, which_scopes, flags=0):
         # type: (LeftName, value_t, scope_t, int) -> None
@@ -1936,7 +2081,10 @@ class Mem(object):
 
             cell = Cell(bool(flags & SetExport), bool(flags & SetReadOnly),
                         bool(flags & SetNameref), val)
-            var_frame[cell_name] = cell
+            self._BindCell(var_frame, cell_name, cell)
+
+        if cell.exported or flags & ClearExport:
+            self.exported_env = None
 
         # Maintain invariant that only strings and undefined cells can be
         # exported.
@@ -2087,7 +2235,8 @@ class Mem(object):
 
         # arrays can't be exported; can't have BashAssoc flag
         readonly = bool(flags & SetReadOnly)
-        var_frame[lval.name] = Cell(False, readonly, False, new_value)
+        self._BindCell(var_frame, lval.name,
+                       Cell(False, readonly, False, new_value))
 
     def InternalSetGlobal(self, name, new_val):
         # type: (str, value_t) -> None
@@ -2103,6 +2252,8 @@ class Mem(object):
         """
         cell = self.var_stack[0][name]
         cell.val = new_val
+        if cell.exported:
+            self.exported_env = None
 
     def GetValue(self, name, which_scopes=scope_e.Shopt):
         # type: (str, scope_t) -> value_t
@@ -2338,7 +2489,9 @@ class Mem(object):
             if case(sh_lvalue_e.Var):  # unset x
                 # Make variables in higher scopes visible.
                 # example: test/spec.sh builtin-vars -r 24 (ble.sh)
-                mylib.dict_erase(var_frame, cell_name)
+                self._UnbindCell(var_frame, cell_name)
+                if cell.exported:
+                    self.exported_env = None
 
                 # alternative that some shells use:
                 #   var_frame[cell_name].val = value.Undef
@@ -2416,6 +2569,7 @@ class Mem(object):
         if cell:
             if flag & ClearExport:
                 cell.exported = False
+                self.exported_env = None
             if flag & ClearNameref:
                 cell.nameref = False
             return True
@@ -2451,25 +2605,32 @@ class Mem(object):
         """
         Get the environment that should be used for launching processes.
 
-        Note: This is run on every SimpleCommand.  Should we have a dirty
-        flag?  We could notice these things:
+        This is run on every SimpleCommand, so the exported variables are
+        cached until one of them changes, an export flag changes, or a frame
+        with exported variables is popped.  The result must not be mutated.
 
-        - If an exported variable is changed
-        - If the set of exported variables changes.
+        The ENV dict is an ordinary mutable Obj, so it's consulted every time.
         """
-        new_env = {}  # type: Dict[str, str]
-
         # Note: ysh:upgrade has both of these behaviors
 
         # OSH: Consult exported vars
-        if not self.exec_opts.no_exported():
-            self._FillWithExported(new_env)
+        use_exported = not self.exec_opts.no_exported()
+        if use_exported and self.exported_env is None:
+            self.exported_env = {}
+            self._FillWithExported(self.exported_env)
 
         # YSH: Consult the ENV dict
         if self.exec_opts.env_obj():
+            new_env = {}  # type: Dict[str, str]
+            if use_exported:
+                for name, s in iteritems(self.exported_env):
+                    new_env[name] = s
             self._FillEnvObj(new_env, self.env_object)
+            return new_env
 
-        return new_env
+        if use_exported:
+            return self.exported_env
+        return NewDict()
 
     def VarNames(self):
         # type: () -> List[str]
@@ -2643,7 +2804,7 @@ class Procs(object):
         """
         procs are defined in the local scope.
         """
-        self.mem.var_stack[-1][name] = Cell(False, False, False, proc)
+        self.mem.DefineLocal(name, Cell(False, False, False, proc))
 
     def IsProc(self, name):
         # type: (str) -> bool
@@ -2,7 +2,9 @@
 """state_test.py: Tests for state.py."""
 
 import unittest
+import os
 import os.path
+import tempfile
 
 from _devbuild.gen.id_kind_asdl import Id
 from _devbuild.gen.runtime_asdl import scope_e
@@ -85,6 +87,39 @@ class MemTest(unittest.TestCase):
         else:
             self.assertEqual(search_path.LookupOne('env'), '/usr/bin/env')
 
+    def testSearchPathCache(self):
+        mem = _InitMem()
+        search_path = executor.SearchPath(mem, mem.exec_opts)
+
+        d = tempfile.mkdtemp()
+        mem.SetValue(location.LName('PATH'), value.Str(d), scope_e.GlobalOnly)
+
+        # A file that isn't executable
+        path = os.path.join(d, 'mycmd')
+        with open(path, 'w') as f:
+            f.write('#!/bin/sh\n')
+        self.assertEqual(None, search_path.CachedLookup('mycmd'))
+
+        # Misses aren't remembered, so chmod +x is noticed right away, even
+        # though it doesn't change the dir's mtime
+        os.chmod(path, 0o755)
+        self.assertEqual(path, search_path.CachedLookup('mycmd'))
+        self.assertEqual(path, search_path.CachedLookup('mycmd'))
+        # num_entries, hits, lookups
+        self.assertEqual([1, 1, 2], search_path.Stats())
+
+        # command -v and type use the remembered location
+        self.assertEqual([path], search_path.LookupReflect('mycmd', False))
+        self.assertEqual([1, 2, 2], search_path.Stats())
+        self.assertEqual([path], search_path.LookupReflect('mycmd', True))
+        self.assertEqual([1, 2, 2], search_path.Stats())
+
+        search_path.ClearCache()
+        self.assertEqual(0, search_path.Stats()[0])
+
+        os.remove(path)
+        os.rmdir(d)
+
     def testPushTemp(self):
         mem = _InitMem()
 
@@ -109,6 +144,60 @@ class MemTest(unittest.TestCase):
         self.assertEqual(1, len(mem.var_stack))
         self.assertEqual('1', mem.var_stack[-1]['x'].val.s)
 
+    def testDynamicIndex(self):
+        mem = _InitMem()
+
+        def Get(name):
+            cell, _ = mem._ResolveNameOnly(name, scope_e.Dynamic)
+            return None if cell is None else cell.val.s
+
+        def Set(name, s, which_scopes=scope_e.Dynamic):
+            mem.SetValue(location.LName(name), value.Str(s), which_scopes)
+
+        Set('g', 'global')
+        Set('x', 'x0')
+        for i in xrange(state.DYNAMIC_INDEX_MIN_DEPTH * 2):
+            mem.PushTemp()
+            Set('x', 'x%d' % (i + 1), scope_e.LocalOnly)
+        self.assertTrue(mem.dynamic_index is None)
+
+        self.assertEqual('global', Get('g'))
+        self.assertEqual('x16', Get('x'))
+        self.assertEqual(None, Get('undef'))
+        self.assertTrue(mem.dynamic_index is not None)
+
+        # New globals, locals, and mutations
+        Set('new_global', 'n')
+        Set('g', 'g2')
+        mem.PushTemp()
+        Set('t', 'temp', scope_e.LocalOnly)
+        Set('g', 'shadow', scope_e.LocalOnly)
+        self.assertEqual('n', Get('new_global'))
+        self.assertEqual('temp', Get('t'))
+        self.assertEqual('shadow', Get('g'))
+
+        mem.Unset(location.LName('g'), scope_e.Dynamic)
+        self.assertEqual('g2', Get('g'))
+        mem.PopTemp()
+        self.assertEqual(None, Get('t'))
+
+        # Unset a local, then a global
+        mem.Unset(location.LName('x'), scope_e.Dynamic)
+        self.assertEqual('x15', Get('x'))
+        mem.Unset(location.LName('g'), scope_e.Dynamic)
+        self.assertEqual(None, Get('g'))
+
+        for i in xrange(state.DYNAMIC_INDEX_MIN_DEPTH * 2):
+            mem.PopTemp()
+        self.assertEqual('x0', Get('x'))
+        self.assertTrue(mem.dynamic_index is not None)
+
+        # Frames with __E__ aren't indexed
+        mem.PushTemp()
+        with state.ctx_EnclosedFrame(mem, mem.var_stack[-1], None, None):
+            self.assertTrue(mem.dynamic_index is None)
+        mem.PopTemp()
+
     def testSetVarClearFlag(self):
         mem = _InitMem()
         print(mem)
@@ -300,6 +389,47 @@ class MemTest(unittest.TestCase):
         e = mem.GetEnv()
         self.assertEqual('u', e['U'])
 
+    def testGetEnvCache(self):
+        mem = _InitMem()
+
+        mem.SetValue(location.LName('E'),
+                     value.Str('1'),
+                     scope_e.Dynamic,
+                     flags=state.SetExport)
+        e1 = mem.GetEnv()
+        self.assertEqual('1', e1['E'])
+
+        # Unexported variables don't invalidate the cache
+        mem.SetValue(location.LName('x'), value.Str('x'), scope_e.Dynamic)
+        self.assertTrue(mem.GetEnv() is e1)
+
+        # E=2
+        mem.SetValue(location.LName('E'), value.Str('2'), scope_e.Dynamic)
+        self.assertEqual('2', mem.GetEnv()['E'])
+
+        # E=3 cmd
+        mem.PushTemp()
+        mem.SetValue(location.LName('E'),
+                     value.Str('3'),
+                     scope_e.LocalOnly,
+                     flags=state.SetExport)
+        self.assertEqual('3', mem.GetEnv()['E'])
+        mem.PopTemp()
+        self.assertEqual('2', mem.GetEnv()['E'])
+
+        # export -n E
+        mem.ClearFlag('E', state.ClearExport)
+        self.assertEqual(None, mem.GetEnv().get('E'))
+
+        # export E; unset E
+        mem.SetValue(location.LName('E'),
+                     None,
+                     scope_e.Dynamic,
+                     flags=state.SetExport)
+        self.assertEqual('2', mem.GetEnv()['E'])
+        mem.Unset(location.LName('E'), scope_e.Shopt)
+        self.assertEqual(None, mem.GetEnv().get('E'))
+
     def testUnset(self):
         mem = _InitMem()
         # unset a
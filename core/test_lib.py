@@ -280,7 +280,8 @@ def InitCommandEvaluator(parse_ctx=None,
                                        assign_builtins, arena, cmd_deps,
                                        trap_state, signal_safe)
 
-    multi_trace = dev.MultiTracer(posix.getpid(), '', '', '', fd_state)
+    multi_trace = dev.MultiTracer(posix.getpid(), '', '', '', fd_state,
+                                  arena)
     tracer = dev.Tracer(parse_ctx, exec_opts, mutable_opts, mem, debug_f,
                         multi_trace)
     waiter = process.Waiter(job_list, exec_opts, trap_state, tracer)
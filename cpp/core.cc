@@ -8,6 +8,7 @@
 #include <math.h>  // fmod()
 #include <pwd.h>   // passwd
 #include <signal.h>
+#include <string.h>        // memchr()
 #include <sys/resource.h>  // getrusage
 #include <sys/select.h>    // select(), FD_ISSET, FD_SET, FD_ZERO
 #include <sys/stat.h>      // stat
@@ -77,6 +78,126 @@ Tuple2<int, int> ReadByte(int fd) {
   }
 }
 
+// Block size for ReadUntil() on regular files
+const int kReadBlockSize = 4096;
+
+// Largest read() size for ReadAll() when we don't know how much is coming
+const int kReadAllMaxChunk = 1 << 20;
+
+int ReadAll(int fd, int max_bytes, mylib::BufWriter* buf) {
+  int n = kReadBlockSize;
+  while (max_bytes != 0) {
+    if (max_bytes != -1) {
+      n = max_bytes;
+    }
+    // Read directly into the buffer, so getvalue() doesn't copy
+    buf->EnsureMoreSpace(n);
+    uint8_t* pos = buf->LengthPointer();
+
+    int length = ::read(fd, pos, n);
+    if (length < 0) {
+      if (errno == EINTR) {
+        if (iolib::gSignalSafe->PollUntrappedSigInt()) {
+          throw Alloc<KeyboardInterrupt>();
+        }
+        continue;  // retry
+      }
+      return errno;
+    }
+    if (length == 0) {  // EOF
+      break;
+    }
+    buf->SetLengthFrom(pos + length);
+
+    if (max_bytes != -1) {
+      max_bytes -= length;
+    } else if (length == n && n < kReadAllMaxChunk) {
+      n *= 2;
+    }
+  }
+  return 0;
+}
+
+Tuple2<int, int> ReadUntil(int fd, int delim_byte, int max_bytes,
+                           List<BigStr*>* chunks) {
+  struct stat st;
+  if (::fstat(fd, &st) < 0) {
+    return Tuple2<int, int>(-1, errno);
+  }
+
+  if (S_ISREG(st.st_mode)) {
+    // Read a block, and seek back to the byte after the delimiter
+    int n = kReadBlockSize;
+    if (0 <= max_bytes && max_bytes < n) {
+      n = max_bytes;
+    }
+    BigStr* s = OverAllocatedStr(n);
+
+    int length = ::read(fd, s->data(), n);
+    if (length < 0) {
+      if (errno == EINTR && iolib::gSignalSafe->PollUntrappedSigInt()) {
+        throw Alloc<KeyboardInterrupt>();
+      }
+      return Tuple2<int, int>(-1, errno);
+    }
+    if (length == 0) {
+      return Tuple2<int, int>(length, 0);
+    }
+
+    char* p = static_cast<char*>(memchr(s->data(), delim_byte, length));
+    if (p) {
+      int used = p - s->data() + 1;
+      if (used < length) {
+        if (::lseek(fd, used - length, SEEK_CUR) < 0) {
+          return Tuple2<int, int>(-1, errno);
+        }
+        length = used;
+      }
+    }
+
+    s->MaybeShrink(length);
+    chunks->append(s);
+    return Tuple2<int, int>(length, 0);
+  }
+
+  // Pipes and terminals: read a byte at a time
+  char buf[kReadBlockSize];
+  int pos = 0;
+  int total = 0;
+  int err_num = 0;
+  while (max_bytes < 0 || total < max_bytes) {
+    ssize_t n = ::read(fd, buf + pos, 1);
+    if (n < 0) {
+      if (errno == EINTR && iolib::gSignalSafe->PollUntrappedSigInt()) {
+        throw Alloc<KeyboardInterrupt>();
+      }
+      err_num = errno;
+      break;
+    }
+    if (n == 0) {  // EOF
+      break;
+    }
+    bool found = static_cast<unsigned char>(buf[pos]) == delim_byte;
+    pos++;
+    total++;
+    if (pos == kReadBlockSize) {
+      chunks->append(StrFromC(buf, pos));
+      pos = 0;
+    }
+    if (found) {
+      break;
+    }
+  }
+  if (pos) {
+    chunks->append(StrFromC(buf, pos));
+  }
+
+  if (err_num != 0) {
+    return Tuple2<int, int>(-1, err_num);
+  }
+  return Tuple2<int, int>(total, 0);
+}
+
 Dict<BigStr*, BigStr*>* Environ() {
   auto d = Alloc<Dict<BigStr*, BigStr*>>();
 
@@ -262,6 +383,21 @@ IOError_OSError* FlushStdout() {
   return nullptr;
 }
 
+Tuple2<int, double> FileStamp(BigStr* path) {
+  struct stat st;
+  if (::stat(path->data(), &st) == -1) {
+    throw Alloc<OSError>(errno);
+  }
+
+  // Same value as CPython's st_mtime
+#if defined(__APPLE__)
+  double mtime = st.st_mtimespec.tv_sec + st.st_mtimespec.tv_nsec * 1e-9;
+#else
+  double mtime = st.st_mtim.tv_sec + st.st_mtim.tv_nsec * 1e-9;
+#endif
+  return Tuple2<int, double>(st.st_size, mtime);
+}
+
 Tuple2<BigStr*, int>* MakeDirCacheKey(BigStr* path) {
   struct stat st;
   if (::stat(path->data(), &st) == -1) {
@@ -25,6 +25,9 @@ const int NEWLINE_CH = 10;
 Tuple2<int, int> WaitPid(int waitpid_options);
 Tuple2<int, int> Read(int fd, int n, List<BigStr*>* chunks);
 Tuple2<int, int> ReadByte(int fd);
+int ReadAll(int fd, int max_bytes, mylib::BufWriter* buf);
+Tuple2<int, int> ReadUntil(int fd, int delim_byte, int max_bytes,
+                           List<BigStr*>* chunks);
 BigStr* ReadLineBuffered();
 Dict<BigStr*, BigStr*>* Environ();
 int Chdir(BigStr* dest_dir);
@@ -85,6 +88,8 @@ IOError_OSError* FlushStdout();
 Tuple2<int, void*> PushTermAttrs(int fd, int mask);
 void PopTermAttrs(int fd, int orig_local_modes, void* term_attrs);
 
+Tuple2<int, double> FileStamp(BigStr* path);
+
 Tuple2<BigStr*, int>* MakeDirCacheKey(BigStr* path);
 
 }  // namespace pyos
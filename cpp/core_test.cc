@@ -136,6 +136,109 @@ TEST pyos_readbyte_test() {
   PASS();
 }
 
+TEST pyos_read_until_test() {
+  const char* tmp_name = "pyos_ReadUntil";
+  int fd = ::open(tmp_name, O_CREAT | O_RDWR | O_TRUNC, 0644);
+  ASSERT(fd > 0);
+  write(fd, "ab\ncd\nef", 8);
+  close(fd);
+
+  fd = ::open(tmp_name, O_RDONLY);
+  ASSERT(fd > 0);
+
+  auto chunks = NewList<BigStr*>();
+  Tuple2<int, int> tup = pyos::ReadUntil(fd, '\n', -1, chunks);
+  ASSERT_EQ_FMT(3, tup.at0(), "%d");
+  ASSERT_EQ_FMT(0, tup.at1(), "%d");  // error code
+  ASSERT(str_equals(StrFromC("ab\n"), chunks->at(0)));
+
+  // The rest of the block was seeked back
+  ASSERT_EQ_FMT(3, static_cast<int>(lseek(fd, 0, SEEK_CUR)), "%d");
+
+  // max_bytes
+  tup = pyos::ReadUntil(fd, '\n', 1, chunks);
+  ASSERT_EQ_FMT(1, tup.at0(), "%d");
+  ASSERT(str_equals(StrFromC("c"), chunks->at(1)));
+
+  tup = pyos::ReadUntil(fd, '\n', -1, chunks);
+  ASSERT_EQ_FMT(2, tup.at0(), "%d");
+  ASSERT(str_equals(StrFromC("d\n"), chunks->at(2)));
+
+  // No delimiter before EOF
+  tup = pyos::ReadUntil(fd, '\n', -1, chunks);
+  ASSERT_EQ_FMT(2, tup.at0(), "%d");
+  ASSERT(str_equals(StrFromC("ef"), chunks->at(3)));
+
+  tup = pyos::ReadUntil(fd, '\n', -1, chunks);
+  ASSERT_EQ_FMT(0, tup.at0(), "%d");  // EOF
+  ASSERT_EQ_FMT(4, len(chunks), "%d");
+
+  close(fd);
+
+  // Pipes are read a byte at a time
+  int fds[2];
+  ASSERT_EQ(0, pipe(fds));
+  write(fds[1], "xy\nz", 4);
+  close(fds[1]);
+
+  chunks = NewList<BigStr*>();
+  tup = pyos::ReadUntil(fds[0], '\n', -1, chunks);
+  ASSERT_EQ_FMT(3, tup.at0(), "%d");
+  ASSERT(str_equals(StrFromC("xy\n"), chunks->at(0)));
+
+  tup = pyos::ReadUntil(fds[0], '\n', -1, chunks);
+  ASSERT_EQ_FMT(1, tup.at0(), "%d");
+  ASSERT(str_equals(StrFromC("z"), chunks->at(1)));
+
+  close(fds[0]);
+
+  PASS();
+}
+
+TEST pyos_read_all_test() {
+  // Bigger than the first few read() sizes
+  const int n = 100000;
+  static char big[n];
+  memset(big, 'x', n);
+
+  int fds[2];
+  ASSERT_EQ(0, pipe(fds));
+  pid_t pid = fork();
+  if (pid == 0) {
+    close(fds[0]);
+    write(fds[1], big, n);
+    _exit(0);
+  }
+  close(fds[1]);
+
+  auto buf = Alloc<mylib::BufWriter>();
+  ASSERT_EQ_FMT(0, pyos::ReadAll(fds[0], -1, buf), "%d");
+  close(fds[0]);
+  waitpid(pid, nullptr, 0);
+
+  BigStr* s = buf->getvalue();
+  ASSERT_EQ_FMT(n, len(s), "%d");
+  ASSERT_EQ(0, memcmp(big, s->data_, n));
+
+  // max_bytes
+  const char* tmp_name = "pyos_ReadAll";
+  int fd = ::open(tmp_name, O_CREAT | O_RDWR | O_TRUNC, 0644);
+  ASSERT(fd > 0);
+  write(fd, "abcdef", 6);
+  lseek(fd, 0, SEEK_SET);
+
+  buf = Alloc<mylib::BufWriter>();
+  ASSERT_EQ_FMT(0, pyos::ReadAll(fd, 4, buf), "%d");
+  ASSERT(str_equals(StrFromC("abcd"), buf->getvalue()));
+  close(fd);
+
+  // Error
+  buf = Alloc<mylib::BufWriter>();
+  ASSERT_EQ_FMT(EBADF, pyos::ReadAll(fd, -1, buf), "%d");
+
+  PASS();
+}
+
 TEST pyos_read_test() {
   const char* tmp_name = "pyos_Read";
   int fd = ::open(tmp_name, O_CREAT | O_RDWR, 0644);
@@ -278,6 +381,10 @@ TEST dir_cache_key_test() {
   }
   ASSERT(ec == ENOENT);
 
+  Tuple2<int, double> stamp = pyos::FileStamp(StrFromC("/"));
+  ASSERT_EQ(static_cast<int>(st.st_size), stamp.at0());
+  ASSERT(static_cast<time_t>(stamp.at1()) == st.st_mtime);
+
   PASS();
 }
 
@@ -344,6 +451,8 @@ int main(int argc, char** argv) {
   RUN_TEST(uname_test);
   RUN_TEST(pyos_readbyte_test);
   RUN_TEST(pyos_read_test);
+  RUN_TEST(pyos_read_until_test);
+  RUN_TEST(pyos_read_all_test);
   RUN_TEST(pyos_test);  // non-hermetic
   RUN_TEST(pyutil_test);
   RUN_TEST(strerror_test);
@@ -7,10 +7,15 @@
 #include <glob.h>
 #include <locale.h>
 #include <regex.h>
+#include <string.h>  // memcpy()
 #include <sys/ioctl.h>
 #include <unistd.h>  // gethostname()
 #include <wchar.h>
 
+#include <list>
+#include <string>
+#include <unordered_map>
+
 namespace libc {
 
 BigStr* gethostname() {
@@ -101,16 +106,131 @@ List<BigStr*>* glob(BigStr* pat, int flags) {
   return matches;
 }
 
+// A bounded LRU cache of compiled regexes, keyed by (pattern, cflags).  It's
+// shared by regex_search() and regex_first_group_match(), so that
+// [[ $x =~ $re ]] and ${x//pat/rep} in a loop don't call regcomp() on every
+// iteration.
+//
+// OILS_REGEX_CACHE_SIZE=0 disables caching, for benchmarking.
+class RegexCache {
+ public:
+  static const int kDefaultSize = 1000;
+
+  RegexCache() : capacity_(-1), hits_(0), misses_(0), evictions_(0) {
+  }
+
+  ~RegexCache() {
+    for (Entry& entry : lru_) {
+      regfree(&entry.compiled);
+    }
+  }
+
+  // Return a compiled regex owned by the cache, or nullptr if regcomp()
+  // failed.  In that case, *status is the regcomp() error, and 'error_pat' can
+  // be passed to regerror().
+  //
+  // The returned pointer is valid until the next call.
+  regex_t* Get(BigStr* pattern, int cflags, int* status, regex_t* error_pat) {
+    if (capacity_ == -1) {
+      InitCapacity();
+    }
+
+    // Patterns can't contain NUL, so this key is unambiguous
+    std::string key(pattern->data_, len(pattern));
+    key.push_back('\0');
+    key.append(reinterpret_cast<const char*>(&cflags), sizeof(cflags));
+
+    if (capacity_ != 0) {
+      auto it = index_.find(key);
+      if (it != index_.end()) {
+        hits_++;
+        lru_.splice(lru_.begin(), lru_, it->second);  // move to front
+        *status = 0;
+        return &it->second->compiled;
+      }
+    }
+
+    misses_++;
+
+    regex_t compiled;
+    *status = regcomp(&compiled, pattern->data_, cflags);
+    if (*status != 0) {
+      *error_pat = compiled;
+      return nullptr;
+    }
+
+    // With capacity 0, we still hold on to the last regex, but never look it
+    // up.
+    size_t max_len = capacity_ == 0 ? 1 : capacity_;
+    while (lru_.size() >= max_len) {
+      Entry& last = lru_.back();
+      regfree(&last.compiled);
+      index_.erase(last.key);
+      lru_.pop_back();
+      if (capacity_ != 0) {
+        evictions_++;
+      }
+    }
+
+    lru_.push_front(Entry{key, compiled});
+    index_[key] = lru_.begin();
+    return &lru_.front().compiled;
+  }
+
+  List<int>* Stats() {
+    if (capacity_ == -1) {
+      InitCapacity();
+    }
+    return NewList<int>(std::initializer_list<int>{
+        static_cast<int>(lru_.size()), capacity_, hits_, misses_, evictions_});
+  }
+
+ private:
+  struct Entry {
+    std::string key;
+    regex_t compiled;
+  };
+
+  void InitCapacity() {
+    capacity_ = kDefaultSize;
+    char* e = getenv("OILS_REGEX_CACHE_SIZE");
+    if (e && strlen(e)) {
+      int n;
+      if (StringToInt(e, strlen(e), 10, &n) && n >= 0) {
+        capacity_ = n;
+      }
+    }
+  }
+
+  int capacity_;  // -1 until the env var is read
+  int hits_;
+  int misses_;
+  int evictions_;
+
+  // Most recently used first
+  std::list<Entry> lru_;
+  std::unordered_map<std::string, std::list<Entry>::iterator> index_;
+
+  DISALLOW_COPY_AND_ASSIGN(RegexCache);
+};
+
+static RegexCache gRegexCache;
+
+List<int>* regex_cache_stats() {
+  return gRegexCache.Stats();
+}
+
 // Raises RuntimeError if the pattern is invalid.  TODO: Use a different
 // exception?
 List<int>* regex_search(BigStr* pattern, int cflags, BigStr* str, int eflags,
                         int pos) {
   cflags |= REG_EXTENDED;
-  regex_t pat;
-  int status = regcomp(&pat, pattern->data_, cflags);
-  if (status != 0) {
+  regex_t error_pat;
+  int status;
+  regex_t* pat = gRegexCache.Get(pattern, cflags, &status, &error_pat);
+  if (pat == nullptr) {
     char error_desc[50];
-    regerror(status, &pat, error_desc, 50);
+    regerror(status, &error_pat, error_desc, 50);
 
     char error_message[80];
     snprintf(error_message, 80, "Invalid regex %s (%s)", pattern->data_,
@@ -120,7 +240,7 @@ List<int>* regex_search(BigStr* pattern, int cflags, BigStr* str, int eflags,
   }
   // log("pat = %d, str = %d", len(pattern), len(str));
 
-  int num_groups = pat.re_nsub + 1;  // number of captures
+  int num_groups = pat->re_nsub + 1;  // number of captures
 
   List<int>* indices = NewList<int>();
   indices->reserve(num_groups * 2);
@@ -128,7 +248,7 @@ List<int>* regex_search(BigStr* pattern, int cflags, BigStr* str, int eflags,
   const char* s = str->data_;
   regmatch_t* pmatch =
       static_cast<regmatch_t*>(malloc(sizeof(regmatch_t) * num_groups));
-  bool match = regexec(&pat, s + pos, num_groups, pmatch, eflags) == 0;
+  bool match = regexec(pat, s + pos, num_groups, pmatch, eflags) == 0;
   if (match) {
     int i;
     for (i = 0; i < num_groups; i++) {
@@ -147,7 +267,6 @@ List<int>* regex_search(BigStr* pattern, int cflags, BigStr* str, int eflags,
   }
 
   free(pmatch);
-  regfree(&pat);
 
   if (!match) {
     return nullptr;
@@ -166,20 +285,21 @@ const int NMATCH = 2;
 // Odd: This a Tuple2* not Tuple2 because it's Optional[Tuple2]!
 Tuple2<int, int>* regex_first_group_match(BigStr* pattern, BigStr* str,
                                           int pos) {
-  regex_t pat;
+  regex_t error_pat;
   regmatch_t m[NMATCH];
 
   // Could have been checked by regex_parse for [[ =~ ]], but not for glob
   // patterns like ${foo/x*/y}.
 
-  if (regcomp(&pat, pattern->data_, REG_EXTENDED) != 0) {
+  int status;
+  regex_t* pat = gRegexCache.Get(pattern, REG_EXTENDED, &status, &error_pat);
+  if (pat == nullptr) {
     throw Alloc<RuntimeError>(
         StrFromC("Invalid regex syntax (func_regex_first_group_match)"));
   }
 
   // Match at offset 'pos'
-  int result = regexec(&pat, str->data_ + pos, NMATCH, m, 0 /*flags*/);
-  regfree(&pat);
+  int result = regexec(pat, str->data_ + pos, NMATCH, m, 0 /*flags*/);
 
   if (result != 0) {
     return nullptr;
@@ -193,6 +313,135 @@ Tuple2<int, int>* regex_first_group_match(BigStr* pattern, BigStr* str,
   return tup;
 }
 
+// For ${x//pat/replace}: return a flat list [start1, end1, start2, end2, ...]
+// of the first group of every non-overlapping match, starting at 'pos'.
+//
+// The regex is compiled once, and matches after the start of the string use
+// REG_NOTBOL, so ^ doesn't match there.  After an empty match, we advance by
+// one UTF-8 character, to avoid an infinite loop.
+List<int>* regex_find_all(BigStr* pattern, BigStr* str, int pos) {
+  regex_t error_pat;
+  int status;
+  regex_t* pat = gRegexCache.Get(pattern, REG_EXTENDED, &status, &error_pat);
+  if (pat == nullptr) {
+    throw Alloc<RuntimeError>(
+        StrFromC("Invalid regex syntax (func_regex_find_all)"));
+  }
+
+  List<int>* spans = NewList<int>();
+
+  const char* s = str->data_;
+  int n = len(str);
+  regmatch_t m[NMATCH];
+  while (pos < n) {
+    int eflags = pos == 0 ? 0 : REG_NOTBOL;
+    if (regexec(pat, s + pos, NMATCH, m, eflags) != 0) {
+      break;
+    }
+    int start = pos + m[1].rm_so;
+    int end = pos + m[1].rm_eo;
+    spans->append(start);
+    spans->append(end);
+
+    if (end == start) {
+      pos = end + 1;
+      while (pos < n && (s[pos] & 0xC0) == 0x80) {  // UTF-8 continuation
+        pos++;
+      }
+    } else {
+      pos = end;
+    }
+  }
+
+  return spans;
+}
+
+// For ${x#pat}: return the length of the shortest prefix of 'str' that the
+// regex matches, or -1.  Only lengths up to 'max_len' are tried, and only at
+// UTF-8 character boundaries.
+//
+// The regex should be anchored with ^, but NOT with $.  Then "some prefix of
+// str[:i] matches" is monotonic in i, so we binary search for the smallest i,
+// rather than testing every prefix.  We make one copy of the string and
+// temporarily NUL-terminate it, rather than slicing it.
+int regex_shortest_prefix(BigStr* pattern, BigStr* str, int max_len) {
+  regex_t error_pat;
+  int status;
+  regex_t* pat = gRegexCache.Get(pattern, REG_EXTENDED, &status, &error_pat);
+  if (pat == nullptr) {
+    throw Alloc<RuntimeError>(
+        StrFromC("Invalid regex syntax (func_regex_shortest_prefix)"));
+  }
+
+  const char* s = str->data_;
+  int n = len(str);
+  if (max_len > n) {
+    max_len = n;
+  }
+  char* buf = static_cast<char*>(malloc(max_len + 1));
+  memcpy(buf, s, max_len);
+  buf[max_len] = '\0';
+
+  // Invariant: no prefix shorter than 'lo' matches, and some prefix of
+  // length <= 'hi' does.  Both are character boundaries.
+  int lo = 0;
+  int hi = max_len;
+  if (regexec(pat, buf, 0, nullptr, 0) != 0) {
+    lo = hi = -1;  // nothing matches
+  }
+  while (lo < hi) {
+    int mid = lo + (hi - lo) / 2;
+    while (mid > lo && (s[mid] & 0xC0) == 0x80) {  // UTF-8 continuation
+      mid--;
+    }
+    char saved = buf[mid];
+    buf[mid] = '\0';
+    bool match = regexec(pat, buf, 0, nullptr, 0) == 0;
+    buf[mid] = saved;
+    if (match) {
+      hi = mid;
+    } else {
+      lo = mid + 1;
+      while (lo < hi && (s[lo] & 0xC0) == 0x80) {
+        lo++;
+      }
+    }
+  }
+  free(buf);
+
+  return lo;
+}
+
+// For ${x%pat}: return the start of the shortest suffix of 'str' that the
+// regex matches, or -1.  Only starts down to 'min_start' are tried, and only
+// at UTF-8 character boundaries.  The regex should be anchored with ^ and $.
+int regex_shortest_suffix(BigStr* pattern, BigStr* str, int min_start) {
+  regex_t error_pat;
+  int status;
+  regex_t* pat = gRegexCache.Get(pattern, REG_EXTENDED, &status, &error_pat);
+  if (pat == nullptr) {
+    throw Alloc<RuntimeError>(
+        StrFromC("Invalid regex syntax (func_regex_shortest_suffix)"));
+  }
+
+  const char* s = str->data_;
+  int n = len(str);
+  if (min_start < 0) {
+    min_start = 0;
+  }
+
+  for (int i = n; i >= min_start; --i) {
+    if (i < n && (s[i] & 0xC0) == 0x80) {  // UTF-8 continuation
+      continue;
+    }
+    // The suffix is already NUL-terminated
+    if (regexec(pat, s + i, 0, nullptr, 0) == 0) {
+      return i;
+    }
+  }
+  return -1;
+}
+
 int wcswidth(BigStr* s) {
   // Behavior of mbstowcs() depends on LC_CTYPE
 
@@ -27,9 +27,18 @@ List<BigStr*>* glob(BigStr* pat, int flags = 0);
 Tuple2<int, int>* regex_first_group_match(BigStr* pattern, BigStr* str,
                                           int pos);
 
+List<int>* regex_find_all(BigStr* pattern, BigStr* str, int pos = 0);
+
+int regex_shortest_prefix(BigStr* pattern, BigStr* str, int max_len);
+
+int regex_shortest_suffix(BigStr* pattern, BigStr* str, int min_start);
+
 List<int>* regex_search(BigStr* pattern, int cflags, BigStr* str, int eflags,
                         int pos = 0);
 
+// [num_entries, capacity, hits, misses, evictions]
+List<int>* regex_cache_stats();
+
 int wcswidth(BigStr* str);
 int get_terminal_width();
 
@@ -132,6 +132,118 @@ TEST regex_wrapper_test() {
   PASS();
 }
 
+TEST regex_find_all_test() {
+  BigStr* s = StrFromC("oXooXoooXoX");
+  List<int>* spans = libc::regex_find_all(StrFromC("(X.)"), s);
+  ASSERT_EQ_FMT(6, len(spans), "%d");
+  ASSERT_EQ_FMT(1, spans->at(0), "%d");
+  ASSERT_EQ_FMT(3, spans->at(1), "%d");
+  ASSERT_EQ_FMT(8, spans->at(4), "%d");
+  ASSERT_EQ_FMT(10, spans->at(5), "%d");
+
+  spans = libc::regex_find_all(StrFromC("(X.)"), s, 3);
+  ASSERT_EQ_FMT(4, len(spans), "%d");
+  ASSERT_EQ_FMT(4, spans->at(0), "%d");
+
+  spans = libc::regex_find_all(StrFromC("(z)"), s);
+  ASSERT_EQ_FMT(0, len(spans), "%d");
+
+  // ^ only matches at the start of the string
+  spans = libc::regex_find_all(StrFromC("(^o)"), StrFromC("ooo"));
+  ASSERT_EQ_FMT(2, len(spans), "%d");
+
+  // Empty matches advance by one character
+  spans = libc::regex_find_all(StrFromC("(z*)"), StrFromC("abc"));
+  ASSERT_EQ_FMT(6, len(spans), "%d");
+  spans = libc::regex_find_all(StrFromC("(z*)"), StrFromC("\xce\xbc" "c"));
+  ASSERT_EQ_FMT(4, len(spans), "%d");
+  ASSERT_EQ_FMT(2, spans->at(2), "%d");
+
+  bool caught = false;
+  try {
+    libc::regex_find_all(StrFromC("*"), s);
+  } catch (RuntimeError* e) {
+    caught = true;
+  }
+  ASSERT(caught);
+
+  PASS();
+}
+
+TEST regex_shortest_test() {
+  BigStr* s = StrFromC("aabbccdd");
+  ASSERT_EQ_FMT(3, libc::regex_shortest_prefix(StrFromC("^(.*b)"), s, 8),
+                "%d");
+  ASSERT_EQ_FMT(-1, libc::regex_shortest_prefix(StrFromC("^(.*b)"), s, 2),
+                "%d");
+  ASSERT_EQ_FMT(0, libc::regex_shortest_prefix(StrFromC("^(.*)"), s, 8),
+                "%d");
+  ASSERT_EQ_FMT(7, libc::regex_shortest_prefix(StrFromC("^(.*d)"), s, 8),
+                "%d");
+
+  ASSERT_EQ_FMT(5, libc::regex_shortest_suffix(StrFromC("^(c.*)$"), s, 0),
+                "%d");
+  ASSERT_EQ_FMT(-1, libc::regex_shortest_suffix(StrFromC("^(c.*)$"), s, 6),
+                "%d");
+  ASSERT_EQ_FMT(8, libc::regex_shortest_suffix(StrFromC("^(.*)$"), s, 0),
+                "%d");
+
+  bool caught = false;
+  try {
+    libc::regex_shortest_prefix(StrFromC("*"), s, 8);
+  } catch (RuntimeError* e) {
+    caught = true;
+  }
+  ASSERT(caught);
+
+  PASS();
+}
+
+TEST regex_cache_test() {
+  List<int>* before = libc::regex_cache_stats();
+  int hits = before->at(2);
+  int misses = before->at(3);
+
+  BigStr* pat = StrFromC("cache-(a+)");
+  BigStr* s = StrFromC("cache-aa");
+
+  // Same pattern and cflags: the second search is a cache hit
+  List<int>* indices = libc::regex_search(pat, 0, s, 0);
+  ASSERT(indices != nullptr);
+  indices = libc::regex_search(pat, 0, s, 0);
+  ASSERT(indices != nullptr);
+  ASSERT_EQ_FMT(8, indices->at(1), "%d");
+
+  // Different cflags is a different entry
+  indices = libc::regex_search(pat, REG_ICASE, StrFromC("CACHE-A"), 0);
+  ASSERT(indices != nullptr);
+
+  // regex_first_group_match() shares the cache
+  Tuple2<int, int>* result = libc::regex_first_group_match(pat, s, 0);
+  ASSERT_EQ_FMT(6, result->at0(), "%d");
+  ASSERT_EQ_FMT(8, result->at1(), "%d");
+
+  List<int>* after = libc::regex_cache_stats();
+  ASSERT_EQ_FMT(hits + 2, after->at(2), "%d");
+  ASSERT_EQ_FMT(misses + 2, after->at(3), "%d");
+
+  // Invalid regexes aren't cached
+  for (int i = 0; i < 2; ++i) {
+    bool caught = false;
+    try {
+      libc::regex_search(StrFromC("*"), 0, s, 0);
+    } catch (ValueError* e) {
+      caught = true;
+    }
+    ASSERT(caught);
+  }
+  after = libc::regex_cache_stats();
+  ASSERT_EQ_FMT(hits + 2, after->at(2), "%d");
+  ASSERT_EQ_FMT(misses + 4, after->at(3), "%d");
+
+  PASS();
+}
+
 TEST glob_test() {
   // This depends on the file system
   auto files = libc::glob(StrFromC("*.testdata"));
@@ -381,6 +493,9 @@ int main(int argc, char** argv) {
   RUN_TEST(realpath_test);
   RUN_TEST(libc_test);
   RUN_TEST(regex_wrapper_test);
+  RUN_TEST(regex_find_all_test);
+  RUN_TEST(regex_shortest_test);
+  RUN_TEST(regex_cache_test);
   RUN_TEST(glob_test);
   RUN_TEST(fnmatch_test);
   RUN_TEST(for_test_coverage);
@@ -8,6 +8,8 @@
 #include <fcntl.h>      // open
 #include <math.h>       // isinf, isnan
 #include <signal.h>     // kill
+#include <spawn.h>      // posix_spawn
+#include <string.h>     // memcpy
 #include <sys/stat.h>   // umask
 #include <sys/types.h>  // umask
 #include <sys/wait.h>   // WUNTRACED
@@ -98,8 +100,11 @@ mylib::File* fdopen(int fd, BigStr* c_mode) {
   return Alloc<mylib::CFile>(f);
 }
 
-void execve(BigStr* argv0, List<BigStr*>* argv,
-            Dict<BigStr*, BigStr*>* environ) {
+// Fill in argv and envp arrays for execve() and posix_spawn().  Returns a
+// single malloc()'d buffer that holds both.
+static char* MakeExecArrays(List<BigStr*>* argv,
+                            Dict<BigStr*, BigStr*>* environ, char*** out_argv,
+                            char*** out_envp) {
   int n_args = len(argv);
   int n_env = len(environ);
   int combined_size = 0;
@@ -115,8 +120,8 @@ void execve(BigStr* argv0, List<BigStr*>* argv,
   combined_size += argv_size;
   combined_size += env_size;
   char* combined_buf = static_cast<char*>(malloc(combined_size));
+  char* result = combined_buf;
 
-  // never deallocated
   char** _argv = reinterpret_cast<char**>(combined_buf);
   combined_buf += argv_size;
 
@@ -147,6 +152,17 @@ void execve(BigStr* argv0, List<BigStr*>* argv,
   }
   envp[n_env] = nullptr;
 
+  *out_argv = _argv;
+  *out_envp = envp;
+  return result;
+}
+
+void execve(BigStr* argv0, List<BigStr*>* argv,
+            Dict<BigStr*, BigStr*>* environ) {
+  char** _argv;
+  char** envp;
+  MakeExecArrays(argv, environ, &_argv, &envp);  // never deallocated
+
   int ret = ::execve(argv0->data_, _argv, envp);
   if (ret == -1) {
     throw Alloc<OSError>(errno);
@@ -156,6 +172,45 @@ void execve(BigStr* argv0, List<BigStr*>* argv,
   FAIL(kShouldNotGetHere);
 }
 
+int posix_spawn(BigStr* path, List<BigStr*>* argv,
+                Dict<BigStr*, BigStr*>* environ, int setpgroup,
+                List<int>* setsigdef) {
+  char** _argv;
+  char** envp;
+  char* buf = MakeExecArrays(argv, environ, &_argv, &envp);
+
+  posix_spawnattr_t attr;
+  posix_spawnattr_init(&attr);
+
+  short flags = POSIX_SPAWN_SETSIGDEF;
+#ifdef POSIX_SPAWN_USEVFORK
+  flags |= POSIX_SPAWN_USEVFORK;  // for older glibc
+#endif
+  if (setpgroup >= 0) {
+    flags |= POSIX_SPAWN_SETPGROUP;
+    posix_spawnattr_setpgroup(&attr, setpgroup);
+  }
+
+  sigset_t sigdef;
+  sigemptyset(&sigdef);
+  for (ListIter<int> it(setsigdef); !it.Done(); it.Next()) {
+    sigaddset(&sigdef, it.Value());
+  }
+  posix_spawnattr_setsigdefault(&attr, &sigdef);
+  posix_spawnattr_setflags(&attr, flags);
+
+  pid_t pid;
+  int err = ::posix_spawn(&pid, path->data_, nullptr, &attr, _argv, envp);
+
+  posix_spawnattr_destroy(&attr);
+  free(buf);
+
+  if (err != 0) {
+    throw Alloc<OSError>(err);
+  }
+  return pid;
+}
+
 void kill(int pid, int sig) {
   if (::kill(pid, sig) != 0) {
     throw Alloc<OSError>(errno);
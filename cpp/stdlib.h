@@ -4,6 +4,7 @@
 #define LEAKY_STDLIB_H
 
 #include <errno.h>
+#include <stdio.h>  // rename()
 #include <sys/types.h>  // mode_t
 #include <unistd.h>
 
@@ -90,6 +91,26 @@ inline void close(int fd) {
   }
 }
 
+inline int lseek(int fd, int pos, int how) {
+  off_t result = ::lseek(fd, pos, how);
+  if (result < 0) {
+    throw Alloc<OSError>(errno);
+  }
+  return result;
+}
+
+inline void unlink(BigStr* path) {
+  if (::unlink(path->data_) < 0) {
+    throw Alloc<OSError>(errno);
+  }
+}
+
+inline void rename(BigStr* old_path, BigStr* new_path) {
+  if (::rename(old_path->data_, new_path->data_) < 0) {
+    throw Alloc<OSError>(errno);
+  }
+}
+
 void putenv(BigStr* name, BigStr* value);
 
 inline int fork() {
@@ -155,6 +176,10 @@ mylib::File* fdopen(int fd, BigStr* c_mode);
 void execve(BigStr* argv0, List<BigStr*>* argv,
             Dict<BigStr*, BigStr*>* environ);
 
+int posix_spawn(BigStr* path, List<BigStr*>* argv,
+                Dict<BigStr*, BigStr*>* environ, int setpgroup,
+                List<int>* setsigdef);
+
 void kill(int pid, int sig);
 void killpg(int pgid, int sig);
 
@@ -1,7 +1,10 @@
 #include "cpp/stdlib.h"
 
 #include <errno.h>
+#include <fcntl.h>     // O_RDWR
+#include <signal.h>    // SIGPIPE
 #include <sys/stat.h>
+#include <sys/wait.h>  // waitpid
 
 #include "mycpp/gc_builtins.h"
 #include "vendor/greatest.h"
@@ -66,6 +69,39 @@ TEST open_test() {
   PASS();
 }
 
+TEST lseek_unlink_test() {
+  BigStr* path = StrFromC("_tmp_lseek_unlink_test");
+  int fd = posix::open(path, O_RDWR | O_CREAT | O_TRUNC, 0600);
+  ASSERT(fd > 0);
+  posix::unlink(path);
+
+  posix::write(fd, StrFromC("hello"));
+  ASSERT_EQ_FMT(5, posix::lseek(fd, 0, SEEK_CUR), "%d");
+  ASSERT_EQ_FMT(0, posix::lseek(fd, 0, SEEK_SET), "%d");
+  char buf[10];
+  ASSERT_EQ_FMT(5, static_cast<int>(::read(fd, buf, sizeof(buf))), "%d");
+  posix::close(fd);
+
+  bool caught = false;
+  try {
+    posix::unlink(path);
+  } catch (IOError_OSError* e) {
+    caught = true;
+    ASSERT_EQ_FMT(ENOENT, e->errno_, "%d");
+  }
+  ASSERT(caught);
+
+  caught = false;
+  try {
+    posix::lseek(-1, 0, SEEK_SET);
+  } catch (IOError_OSError* e) {
+    caught = true;
+  }
+  ASSERT(caught);
+
+  PASS();
+}
+
 TEST time_test() {
   int ts = time_::time();
   log("ts = %d", ts);
@@ -126,6 +162,35 @@ TEST listdir_test() {
   PASS();
 }
 
+TEST posix_spawn_test() {
+  auto argv = NewList<BigStr*>(
+      std::initializer_list<BigStr*>{StrFromC("sh"), StrFromC("-c"),
+                                     StrFromC("test \"$X\" = y && exit 42")});
+  auto environ = Alloc<Dict<BigStr*, BigStr*>>();
+  environ->set(StrFromC("X"), StrFromC("y"));
+  auto sigdef = NewList<int>(std::initializer_list<int>{SIGPIPE});
+
+  int pid = posix::posix_spawn(StrFromC("/bin/sh"), argv, environ, 0, sigdef);
+  ASSERT(pid > 0);
+
+  int status;
+  ASSERT_EQ(pid, waitpid(pid, &status, 0));
+  ASSERT(WIFEXITED(status));
+  ASSERT_EQ_FMT(42, WEXITSTATUS(status), "%d");
+
+  // Errors like ENOENT are reported to the caller
+  int ec = -1;
+  try {
+    posix::posix_spawn(StrFromC("/nonexistent_ZZ"), argv, environ, -1,
+                       sigdef);
+  } catch (IOError_OSError* e) {
+    ec = e->errno_;
+  }
+  ASSERT_EQ_FMT(ENOENT, ec, "%d");
+
+  PASS();
+}
+
 TEST for_test_coverage() {
   time_::sleep(0);
 
@@ -145,9 +210,11 @@ int main(int argc, char** argv) {
   RUN_TEST(posix_test);
   RUN_TEST(putenv_test);
   RUN_TEST(open_test);
+  RUN_TEST(lseek_unlink_test);
   RUN_TEST(time_test);
   RUN_TEST(mtime_demo);
   RUN_TEST(listdir_test);
+  RUN_TEST(posix_spawn_test);
 
   RUN_TEST(for_test_coverage);
 
@@ -32,6 +32,7 @@ from _devbuild.gen.value_asdl import (value, value_e, value_t, value_str, Obj)
 
 from core import bash_impl
 from core import error
+from core import pyos
 from data_lang import pyj8
 # dependency issue: consts.py pulls in frontend/option_def.py
 from frontend import consts
@@ -42,6 +43,8 @@ from mycpp.mylib import tagswitch, iteritems, NewDict, log
 
 import fastfunc
 
+from errno import EINTR
+
 _ = log
 
 from typing import cast, Dict, List, Tuple, Optional
@@ -621,6 +624,22 @@ class InstancePrinter(object):
                                        ValType(val))
 
 
+# Bytes of input after a token that StreamLexerDecoder must see before
+# accepting it.  Longer than any token that isn't a run, like \u{10ffff}, so a
+# token is never split between chunks.
+_LOOKAHEAD = 32
+
+STREAM_CHUNK_SIZE = 1 << 16
+
+
+def _Utf8Boundary(s, pos):
+    # type: (str, int) -> int
+    """Returns the position of the UTF-8 char that pos is in."""
+    while pos > 0 and (mylib.ByteAt(s, pos) & 0xC0) == 0x80:
+        pos -= 1
+    return pos
+
+
 class LexerDecoder(object):
     """J8 lexer and string decoder.
 
@@ -643,6 +662,17 @@ class LexerDecoder(object):
         # thousands of strings.
         self.decoded = mylib.BufWriter()
 
+        # False if _Fill() can append more input to self.s
+        self.at_eof = True
+
+    def _Fill(self, keep_pos):
+        # type: (int) -> int
+        """Append more input to self.s, dropping the bytes before keep_pos.
+
+        Returns the number of bytes dropped.
+        """
+        raise NotImplementedError()
+
     def _Error(self, msg, end_pos):
         # type: (str, int) -> error.Decode
 
@@ -655,6 +685,11 @@ class LexerDecoder(object):
 
         tok_id, end_pos = match.MatchJ8Token(self.s, self.pos)
 
+        # The token may continue in the next chunk of a stream
+        while not self.at_eof and len(self.s) - end_pos < _LOOKAHEAD:
+            self._Fill(self.pos)
+            tok_id, end_pos = match.MatchJ8Token(self.s, self.pos)
+
         if not self.is_j8:
             if tok_id in (Id.Left_BSingleQuote, Id.Left_USingleQuote):
                 raise self._Error(
@@ -720,6 +755,16 @@ class LexerDecoder(object):
             else:
                 tok_id, str_end = match.MatchJ8StrToken(self.s, str_pos)
 
+            if not self.at_eof and len(self.s) - str_end < _LOOKAHEAD:
+                if (tok_id == Id.Lit_Chars and
+                        str_end - str_pos > 2 * _LOOKAHEAD):
+                    # Decode most of a long run of chars now, rather than
+                    # matching it again after every _Fill()
+                    str_end = _Utf8Boundary(self.s, str_end - _LOOKAHEAD)
+                else:
+                    str_pos -= self._Fill(str_pos)
+                    continue
+
             #log('String tok %s %r', Id_str(tok_id), self.s[str_pos:str_end])
 
             if tok_id == Id.Eol_Tok:
@@ -817,6 +862,45 @@ class LexerDecoder(object):
             str_pos = str_end
 
 
+class StreamLexerDecoder(LexerDecoder):
+    """J8 lexer and string decoder that reads its input in chunks.
+
+    self.s only holds the current token and the input after it, so decoding
+    a huge document doesn't require reading it all into memory first.
+    Positions are relative to self.s, which starts at byte self.offset of the
+    stream.
+    """
+
+    def __init__(self, fd, is_j8, lang_str, chunk_size=STREAM_CHUNK_SIZE):
+        # type: (int, bool, str, int) -> None
+        LexerDecoder.__init__(self, '', is_j8, lang_str)
+        self.fd = fd
+        self.chunk_size = chunk_size
+        self.offset = 0
+        self.at_eof = False
+
+    def _Fill(self, keep_pos):
+        # type: (int) -> int
+        chunks = []  # type: List[str]
+        while True:
+            n, err_num = pyos.Read(self.fd, self.chunk_size, chunks)
+            if n < 0:
+                if err_num == EINTR:
+                    continue  # retry
+                raise pyos.ReadError(err_num)
+            break
+
+        if n == 0:
+            self.at_eof = True
+            return 0
+
+        self.s = self.s[keep_pos:] + chunks[0]
+        self.offset += keep_pos
+        # In a string, this is an error position, which we clamp
+        self.pos = max(0, self.pos - keep_pos)
+        return keep_pos
+
+
 class _Parser(object):
 
     def __init__(self, s, is_j8):
@@ -869,6 +953,10 @@ class _Parser(object):
                             self.lexer.cur_line_num)
 
 
+# Scalars that Parser.SkipRest() checks without building a value
+_SKIPPED_IDS = [Id.J8_String, Id.J8_Float, Id.J8_Bool, Id.J8_Null]
+
+
 class Parser(_Parser):
     """JSON and JSON8 Parser."""
 
@@ -876,6 +964,16 @@ class Parser(_Parser):
         # type: (str, bool) -> None
         _Parser.__init__(self, s, is_j8)
 
+        # For NextEvent(): the open Dicts and Lists, as Id.J8_LBrace or
+        # Id.J8_LBracket
+        self.ev_stack = []  # type: List[Id_t]
+        self.ev_started = False
+        self.ev_first = False  # at the first item of the innermost one
+
+        # The key of the last value in its Dict, and the last scalar value
+        self.key = None  # type: Optional[str]
+        self.scalar = None  # type: value_t
+
     def _ParsePair(self):
         # type: () -> Tuple[str, value_t]
 
@@ -994,20 +1092,238 @@ class Parser(_Parser):
             raise self._ParseError('Invalid token while parsing %s: %s' %
                                    (self.lang_str, Id_str(self.tok_id)))
 
-    def ParseValue(self):
-        # type: () -> value_t
-        """ Raises error.Decode. """
-        self._Next()
-        obj = self._ParseValue()
-
+    def _CheckEnd(self):
+        # type: () -> None
         n = len(self.s)
         if self.start_pos != n:
             extra = n - self.start_pos
             #log('n %d pos %d', n, self.start_pos)
             raise self._ParseError(
                 'Got %d bytes of unexpected trailing input' % extra)
+
+    def ParseValue(self):
+        # type: () -> value_t
+        """ Raises error.Decode. """
+        self._Next()
+        obj = self._ParseValue()
+        self._CheckEnd()
         return obj
 
+    def _StartItem(self):
+        # type: () -> Id_t
+        """Eat the comma and key before the next value.
+
+        Returns the event if there's no next value, and Id.Undefined_Tok
+        otherwise.
+        """
+        self.key = None
+        if not self.ev_started:
+            self.ev_started = True
+            self._Next()
+            return Id.Undefined_Tok
+
+        if len(self.ev_stack) == 0:
+            self._CheckEnd()
+            return Id.Eol_Tok
+
+        left_id = self.ev_stack[-1]
+        right_id = Id.J8_RBrace if left_id == Id.J8_LBrace else Id.J8_RBracket
+        if self.tok_id == right_id:
+            self.ev_stack.pop()
+            self.ev_first = False
+            self._Next()
+            return right_id
+
+        if not self.ev_first:
+            self._Eat(Id.J8_Comma)
+        self.ev_first = False
+
+        if left_id == Id.J8_LBrace:
+            key = self.decoded
+            self._Eat(Id.J8_String)
+            self._Eat(Id.J8_Colon)
+            self.key = key
+        return Id.Undefined_Tok
+
+    def NextEvent(self):
+        # type: () -> Id_t
+        """Returns the next event in the document, without building Dict and
+        List values.  This is an alternative to ParseValue().
+
+        Events:
+          Id.J8_LBrace, Id.J8_LBracket - the start of a Dict or List
+          Id.J8_RBrace, Id.J8_RBracket - the end of it
+          Id.J8_{Null,Bool,Int,Float,String} - a value in self.scalar
+          Id.Eol_Tok - the end of the document
+
+        For the start and scalar events, self.key is the key of the value if
+        it's in a Dict, and None otherwise.
+        """
+        ev = self._StartItem()
+        if ev != Id.Undefined_Tok:
+            return ev
+
+        tok_id = self.tok_id
+        if tok_id in (Id.J8_LBrace, Id.J8_LBracket):
+            self.ev_stack.append(tok_id)
+            self.ev_first = True
+            self._Next()
+            return tok_id
+
+        self.scalar = self._ParseValue()
+        return tok_id
+
+    def NextValue(self):
+        # type: () -> Id_t
+        """Like NextEvent(), but a Dict or List is parsed as a whole, and
+        returned in self.scalar.  There's no end event for it."""
+        ev = self._StartItem()
+        if ev != Id.Undefined_Tok:
+            return ev
+
+        tok_id = self.tok_id
+        self.scalar = self._ParseValue()
+        return tok_id
+
+    def FinishValue(self, ev):
+        # type: (Id_t) -> value_t
+        """After the start event ev, parse the rest of the Dict or List."""
+        if ev == Id.J8_LBrace:
+            d = NewDict()  # type: Dict[str, value_t]
+            while self.NextValue() != Id.J8_RBrace:
+                d[self.key] = self.scalar
+            return value.Dict(d)
+
+        assert ev == Id.J8_LBracket, Id_str(ev)
+        items = []  # type: List[value_t]
+        while self.NextValue() != Id.J8_RBracket:
+            items.append(self.scalar)
+        return value.List(items)
+
+    def SkipRest(self):
+        # type: () -> None
+        """Skip the rest of the innermost Dict or List, including its end.
+
+        The strings are still decoded and the grammar is checked, but no
+        values are built, except for integers.
+        """
+        assert len(self.ev_stack), 'Not in a Dict or List'
+        n = len(self.ev_stack) - 1
+        while len(self.ev_stack) > n:
+            # Checks the commas, keys, and closing brackets
+            if self._StartItem() != Id.Undefined_Tok:
+                continue
+
+            tok_id = self.tok_id
+            if tok_id in (Id.J8_LBrace, Id.J8_LBracket):
+                self.ev_stack.append(tok_id)
+                self.ev_first = True
+                self._Next()
+            elif tok_id in _SKIPPED_IDS:
+                self._Next()
+            else:
+                self._ParseValue()  # checks the size of an int, or raises
+
+    def SkipToEnd(self):
+        # type: () -> None
+        """Skip the rest of the document, and check that nothing follows
+        it."""
+        while len(self.ev_stack):
+            self.SkipRest()
+        self._CheckEnd()
+
+
+class StreamParser(Parser):
+    """JSON and JSON8 parser that reads a file descriptor in chunks."""
+
+    def __init__(self, fd, is_j8, chunk_size=STREAM_CHUNK_SIZE):
+        # type: (int, bool, int) -> None
+        Parser.__init__(self, '', is_j8)
+        self.stream_lexer = StreamLexerDecoder(fd, is_j8, self.lang_str,
+                                               chunk_size)
+        self.lexer = self.stream_lexer
+
+    def _Next(self):
+        # type: () -> None
+        lex = self.stream_lexer
+        while True:
+            # The lexer may drop the input before the token, so remember its
+            # position in the stream
+            start_offset = lex.offset + lex.pos
+            self.tok_id, self.end_pos, self.decoded = lex.Next()
+            self.start_pos = max(0, start_offset - lex.offset)
+            if self.tok_id not in (Id.Ignored_Space, Id.Ignored_Newline,
+                                   Id.Ignored_Comment):
+                break
+        self.s = lex.s
+
+    def _CheckEnd(self):
+        # type: () -> None
+
+        # A NUL byte is also Id.Eol_Tok
+        if self.tok_id != Id.Eol_Tok or self.start_pos != len(self.s):
+            raise self._ParseError('Got unexpected trailing input')
+
+
+def _SelectRest(p, ev, path, i):
+    # type: (Parser, Id_t, List[value_t], int) -> Optional[value_t]
+    """Returns the value at path[i:] in the value that starts with event ev.
+
+    The whole value is consumed.
+    """
+    if i == len(path):
+        if ev in (Id.J8_LBrace, Id.J8_LBracket):
+            return p.FinishValue(ev)
+        return p.scalar
+
+    key = None  # type: Optional[str]
+    index = -1
+    ok = False
+    part = path[i]
+    UP_part = part
+    with tagswitch(part) as case:
+        if case(value_e.Str):
+            part = cast(value.Str, UP_part)
+            key = part.s
+            ok = ev == Id.J8_LBrace
+        elif case(value_e.Int):
+            part = cast(value.Int, UP_part)
+            index = mops.BigTruncate(part.i)
+            ok = ev == Id.J8_LBracket
+
+    if not ok:  # a scalar, or the wrong type of part
+        if ev in (Id.J8_LBrace, Id.J8_LBracket):
+            p.SkipRest()
+        return None
+
+    # Like ParseValue(), the last of duplicate keys wins, so keep going after
+    # a match
+    result = None  # type: Optional[value_t]
+    j = 0
+    while True:
+        ev2 = p.NextEvent()
+        if ev2 in (Id.J8_RBrace, Id.J8_RBracket):
+            break
+        if (key is not None and p.key == key) or j == index:
+            result = _SelectRest(p, ev2, path, i + 1)
+        elif ev2 in (Id.J8_LBrace, Id.J8_LBracket):
+            p.SkipRest()
+        j += 1
+    return result
+
+
+def SelectValue(p, path):
+    # type: (Parser, List[value_t]) -> Optional[value_t]
+    """Returns the value at the path in the document, or None if it's not
+    there.
+
+    Each part of the path is a Dict key (Str) or a List index (Int).  Only the
+    selected value is built; the Dicts and Lists around it are skipped, but
+    still checked.  Call p.SkipToEnd() afterward to check for trailing input.
+    """
+    ev = p.NextEvent()
+    return _SelectRest(p, ev, path, 0)
+
 
 class Nil8Parser(_Parser):
     """
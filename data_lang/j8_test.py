@@ -1,11 +1,15 @@
 #!/usr/bin/env python2
 from __future__ import print_function
 
+import os
+import tempfile
 import unittest
 
 from _devbuild.gen.id_kind_asdl import Id, Id_str
+from _devbuild.gen.value_asdl import value
 from core import error
 from data_lang import j8
+from mycpp import mops
 from mycpp.mylib import log
 
 
@@ -212,6 +216,200 @@ class J8Test(unittest.TestCase):
             self.fail('Expected failure')
 
 
+def _StreamParse(s, is_j8, chunk_size):
+    with tempfile.TemporaryFile() as f:
+        f.write(s)
+        f.flush()
+        os.lseek(f.fileno(), 0, 0)
+        p = j8.StreamParser(f.fileno(), is_j8, chunk_size)
+        return p.ParseValue()
+
+
+def _Encode(val):
+    buf = j8.mylib.BufWriter()
+    j8.PrintMessage(val, buf, -1)
+    return buf.getvalue()
+
+
+class StreamParserTest(unittest.TestCase):
+
+    def testSameAsParser(self):
+        long_str = 'x' * 300 + '\xce\xbc' * 100
+        docs = [
+            '{}',
+            '  [1, 2.5e-3, -42, true, false, null]  ',
+            r'{"mu \u03bc": "surrogate \ud83d\ude00", "esc": "\n\t\""}',
+            r"""[b'bytes \yff \u{1f600}', u'\u{03bc}', 'raw'] # comment""",
+            '"%s"' % long_str,
+            '{"a": [{"b": "%s"}, 1234567890123]}' % long_str,
+            '[\n1,\n2\n]\n',
+        ]
+        for doc in docs:
+            expected = _Encode(j8.Parser(doc, True).ParseValue())
+            # Small chunks split tokens, escapes, and UTF-8 chars
+            for chunk_size in (1, 2, 3, 7, 64, 4096):
+                val = _StreamParse(doc, True, chunk_size)
+                self.assertEqual(expected, _Encode(val),
+                                 '%r chunk_size %d' % (doc, chunk_size))
+
+    def testErrors(self):
+        cases = [
+            ('[1, 2', 'got Id.Eol_Tok'),
+            ('"abc', 'Unexpected EOF'),
+            ('[1] 2', 'trailing input'),
+            ('123\x00abc', 'trailing input'),
+            ('"\xff"', 'Invalid UTF-8'),
+            ("u'hi'", 'Single quotes'),
+        ]
+        for doc, msg in cases:
+            for chunk_size in (1, 3, 4096):
+                try:
+                    _StreamParse(doc, False, chunk_size)
+                except error.Decode as e:
+                    self.assertIn(msg, e.Message())
+                else:
+                    self.fail('Expected failure for %r' % doc)
+
+        # Line numbers are counted across chunks
+        try:
+            _StreamParse('[1,\n2,\n3,\n}', False, 2)
+        except error.Decode as e:
+            self.assertEqual(4, e.line_num)
+        else:
+            self.fail('Expected failure')
+
+    def testBufferIsBounded(self):
+        items = ', '.join('"item %d"' % i for i in xrange(10000))
+        with tempfile.TemporaryFile() as f:
+            f.write('[%s]' % items)
+            f.flush()
+            os.lseek(f.fileno(), 0, 0)
+            p = j8.StreamParser(f.fileno(), False, 100)
+
+            max_len = [0]
+            lexer_next = p.stream_lexer.Next
+
+            def Next():
+                result = lexer_next()
+                max_len[0] = max(max_len[0], len(p.stream_lexer.s))
+                return result
+
+            p.stream_lexer.Next = Next
+            val = p.ParseValue()
+
+        self.assertEqual(10000, len(val.items))
+        self.assertEqual('item 9999', val.items[-1].s)
+        self.assert_(max_len[0] < 200, max_len[0])
+
+
+def _Events(p):
+    events = []
+    while True:
+        ev = p.NextEvent()
+        if ev == Id.Eol_Tok:
+            break
+        if ev in (Id.J8_LBrace, Id.J8_LBracket, Id.J8_RBrace, Id.J8_RBracket):
+            events.append((Id_str(ev), p.key))
+        else:
+            events.append((Id_str(ev), p.key, _Encode(p.scalar)))
+    return events
+
+
+class EventTest(unittest.TestCase):
+
+    def testNextEvent(self):
+        p = j8.Parser('{"a": [1, {}], "b": null, "c": "s"}', False)
+        self.assertEqual([
+            ('Id.J8_LBrace', None),
+            ('Id.J8_LBracket', 'a'),
+            ('Id.J8_Int', None, '1'),
+            ('Id.J8_LBrace', None),
+            ('Id.J8_RBrace', None),
+            ('Id.J8_RBracket', None),
+            ('Id.J8_Null', 'b', 'null'),
+            ('Id.J8_String', 'c', '"s"'),
+            ('Id.J8_RBrace', None),
+        ], _Events(p))
+
+        p = j8.Parser(' 42 ', False)
+        self.assertEqual([('Id.J8_Int', None, '42')], _Events(p))
+
+        for bad in ['[1 2]', '[1,]', '{"a" 1}', '{1: 2}', '[1] 2', '[1']:
+            p = j8.Parser(bad, False)
+            self.assertRaises(error.Decode, _Events, p)
+
+    def testSkipRest(self):
+        p = j8.Parser('[{"a": [1, [2]], "b": {}}, 3]', False)
+        self.assertEqual(Id.J8_LBracket, p.NextEvent())
+        self.assertEqual(Id.J8_LBrace, p.NextEvent())
+        p.SkipRest()
+        self.assertEqual(Id.J8_Int, p.NextEvent())
+        self.assertEqual('3', _Encode(p.scalar))
+        self.assertEqual(Id.J8_RBracket, p.NextEvent())
+        self.assertEqual(Id.Eol_Tok, p.NextEvent())
+
+        # The grammar is checked, not just the brackets
+        for bad in [
+                '[[1}]', '[[1, 2', '[[@]]', '[[1 2]]', '[[1,]]', '[[1:2]]',
+                '[{"a" 1}]', '[{1: 2}]', '[{"a": 1 "b": 2}]'
+        ]:
+            p = j8.Parser(bad, True)
+            p.NextEvent()
+            p.NextEvent()
+            self.assertRaises(error.Decode, p.SkipRest)
+
+    def testSelectValue(self):
+        doc = '{"items": [{"name": "a"}, {"name": "b", "tags": [1, 2]}]}'
+        cases = [
+            ([], doc.replace(' ', '')),
+            (['items', 1, 'name'], '"b"'),
+            (['items', 1, 'tags'], '[1,2]'),
+            (['items', 0], '{"name":"a"}'),
+            (['items', 2], None),
+            (['nope'], None),
+            ([0], None),
+            (['items', 'name'], None),
+        ]
+        for path, expected in cases:
+            p = j8.Parser(doc, False)
+            path = [
+                value.Str(part) if isinstance(part, str) else
+                value.Int(mops.IntWiden(part)) for part in path
+            ]
+            val = j8.SelectValue(p, path)
+            p.SkipToEnd()
+            if expected is None:
+                self.assertEqual(None, val)
+            else:
+                self.assertEqual(expected, _Encode(val).replace(' ', ''))
+
+        # The rest of the document is still checked
+        for bad in ['[1, [2, 3} ]', '[1, [2 3]]', '{"a": 1, "b": [1 2 3]}']:
+            p = j8.Parser(bad, False)
+            self.assertRaises(error.Decode, j8.SelectValue, p,
+                              [value.Int(mops.IntWiden(0))])
+            p = j8.Parser(bad, False)
+            self.assertRaises(error.Decode, j8.SelectValue, p,
+                              [value.Str('a')])
+
+        p = j8.Parser('[1, 2] 3', False)
+        val = j8.SelectValue(p, [value.Int(mops.IntWiden(0))])
+        self.assertEqual('1', _Encode(val))
+        self.assertRaises(error.Decode, p.SkipToEnd)
+
+        # Like ParseValue(), the last of duplicate keys wins
+        doc = '{"a": 1, "b": {"c": 2}, "a": 3, "b": {"d": 4}}'
+        for path, expected in [(['a'], '3'), (['b', 'd'], '4'),
+                               (['b', 'c'], None)]:
+            p = j8.Parser(doc, False)
+            val = j8.SelectValue(p, [value.Str(part) for part in path])
+            p.SkipToEnd()
+            if expected is None:
+                self.assertEqual(None, val)
+            else:
+                self.assertEqual(expected, _Encode(val))
+
+
 class YajlTest(unittest.TestCase):
     """
     Note on old tests for YAJL.  Differences
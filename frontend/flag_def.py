@@ -89,6 +89,7 @@ SHOPT_SPEC.ShortFlag('-q')  # query option settings
 
 HASH_SPEC = FlagSpec('hash')
 HASH_SPEC.ShortFlag('-r')
+HASH_SPEC.LongFlag('--stats')
 
 ECHO_SPEC = FlagSpec('echo')
 ECHO_SPEC.ShortFlag('-e')  # no backslash escapes
@@ -257,9 +258,12 @@ MAIN_SPEC.LongFlag('--version')
 #   parse-printf
 MAIN_SPEC.LongFlag('--tool', [
     'tokens', 'lossless-cat', 'syntax-tree', 'fmt', 'test', 'ysh-ify', 'deps',
-    'cat-em'
+    'cat-em', 'parse-batch'
 ])
 
+# Number of worker processes for --tool parse-batch
+MAIN_SPEC.LongFlag('--parse-jobs', args.Int, default=4)
+
 MAIN_SPEC.ShortFlag('-i')  # interactive
 MAIN_SPEC.ShortFlag('-l')  # login - currently no-op
 MAIN_SPEC.LongFlag('--login')  # login - currently no-op
@@ -106,8 +106,9 @@ def LazyStr(tok):
 
     if tok.tval is None:
         if tok.id in (Id.VSub_DollarName, Id.VSub_Number):  # $x or $2
-            # Special case for SimpleVarSub - completion also relies on this
-            tok.tval = TokenSliceLeft(tok, 1)
+            # Special case for SimpleVarSub - completion also relies on this.
+            # Names are interned, so variable lookups compare pointers in C++.
+            tok.tval = intern(TokenSliceLeft(tok, 1))
         else:
             tok.tval = TokenVal(tok)
 
@@ -420,6 +420,275 @@ static inline int %s(const unsigned char* s, int len) {
 """ % (func_name, re2c_pat))
 
 
+#
+# DFA tables for frontend/match.py, when the fastlex extension isn't built
+#
+# We build an NFA from the same sre_parse trees that TranslateTree() turns
+# into re2c input, and convert it to a DFA with the subset construction.  Like
+# re2c, the DFA finds the longest match, and the first rule wins ties.
+#
+
+_ALL_BYTES = frozenset(range(256))
+
+
+class _Nfa(object):
+
+    def __init__(self):
+        self.eps = []  # state -> List[state]
+        self.edges = []  # state -> List[Tuple[frozenset of bytes, state]]
+        self.rules = {}  # accepting state -> rule index
+
+    def NewState(self):
+        self.eps.append([])
+        self.edges.append([])
+        return len(self.eps) - 1
+
+
+def _CharClass(re_tree):
+    """Returns the set of bytes in [a-z] or [^a-z]."""
+    chars = set()
+    negate = False
+    for name, arg in re_tree:
+        if name == 'negate':
+            negate = True
+        elif name == 'literal':
+            chars.add(arg)
+        elif name == 'range':
+            begin, end = arg
+            chars.update(range(begin, end + 1))
+        else:
+            raise RuntimeError("I don't understand regex construct: %r" %
+                               name)
+    if negate:
+        return _ALL_BYTES - chars
+    return frozenset(chars)
+
+
+def _BuildSeq(nfa, re_tree, s):
+    """Add edges for the sequence re_tree, starting at state s.
+
+    Returns the end state.
+    """
+    for child in re_tree:
+        s = _BuildNode(nfa, child, s)
+    return s
+
+
+def _BuildChars(nfa, chars, s):
+    t = nfa.NewState()
+    nfa.edges[s].append((chars, t))
+    return t
+
+
+def _BuildNode(nfa, child, s):
+    name, arg = child
+    if name == 'literal':
+        return _BuildChars(nfa, frozenset([arg]), s)
+
+    elif name == 'not_literal':
+        return _BuildChars(nfa, _ALL_BYTES - frozenset([arg]), s)
+
+    elif name == 'any':  # . doesn't match newline
+        return _BuildChars(nfa, _ALL_BYTES - frozenset([ord('\n')]), s)
+
+    elif name == 'in':
+        return _BuildChars(nfa, _CharClass(arg), s)
+
+    elif name == 'subpattern':
+        _, children = arg
+        return _BuildSeq(nfa, children, s)
+
+    elif name == 'branch':
+        _, branches = arg
+        t = nfa.NewState()
+        for branch in branches:
+            b = nfa.NewState()
+            nfa.eps[s].append(b)
+            e = _BuildSeq(nfa, branch, b)
+            nfa.eps[e].append(t)
+        return t
+
+    elif name == 'max_repeat':
+        min_, max_, children = arg
+        for i in xrange(min_):
+            s = _BuildSeq(nfa, children, s)
+
+        if max_ == sre_constants.MAXREPEAT:
+            loop = nfa.NewState()
+            nfa.eps[s].append(loop)
+            e = _BuildSeq(nfa, children, loop)
+            nfa.eps[e].append(loop)
+            return loop
+
+        t = nfa.NewState()
+        nfa.eps[s].append(t)
+        for i in xrange(max_ - min_):
+            s = _BuildSeq(nfa, children, s)
+            nfa.eps[s].append(t)
+        return t
+
+    else:
+        raise RuntimeError("I don't understand regex construct: %r" % name)
+
+
+def _Closure(nfa, states):
+    result = set(states)
+    stack = list(states)
+    while stack:
+        s = stack.pop()
+        for t in nfa.eps[s]:
+            if t not in result:
+                result.add(t)
+                stack.append(t)
+    return frozenset(result)
+
+
+def _ByteClasses(nfa):
+    """Partition the bytes so that the bytes in a class have the same
+    transitions.
+
+    Returns a list that maps each byte to its class, and one byte from each
+    class.
+    """
+    char_sets = set()
+    for edges in nfa.edges:
+        for chars, _ in edges:
+            char_sets.add(chars)
+    char_sets = sorted(char_sets)
+
+    class_of = []
+    examples = []
+    sig_to_class = {}
+    for b in xrange(256):
+        sig = tuple(i for i, chars in enumerate(char_sets) if b in chars)
+        if sig not in sig_to_class:
+            sig_to_class[sig] = len(examples)
+            examples.append(b)
+        class_of.append(sig_to_class[sig])
+    return class_of, examples
+
+
+def MakeDfa(pat_list):
+    """Compile a list of lexer rules to a DFA.
+
+    Returns a table for _MatchTokenDfa in frontend/match.py:
+      class_str: the class of each byte, as a string of 256 chars
+      trans: trans[state][class] is the next state.  State 0 is the dead state,
+        and state 1 is the start state.
+      accept: accept[state] is the Id of the rule that matches when we reach
+        the state, or None
+    """
+    nfa = _Nfa()
+    start = nfa.NewState()
+    for i, (is_regex, pat, _) in enumerate(pat_list):
+        if is_regex:
+            re_tree = sre_parse.parse(pat)
+        else:
+            re_tree = [('literal', ord(c)) for c in pat]
+        b = nfa.NewState()
+        nfa.eps[start].append(b)
+        try:
+            e = _BuildSeq(nfa, re_tree, b)
+        except RuntimeError:
+            print('Error translating %r' % pat, file=sys.stderr)
+            raise
+        if e not in nfa.rules:
+            nfa.rules[e] = i
+
+    class_of, examples = _ByteClasses(nfa)
+
+    dfa_states = [None, _Closure(nfa, [start])]
+    index = {dfa_states[1]: 1}
+    trans = [[0] * len(examples)]
+    accept = [None]
+
+    i = 1
+    while i < len(dfa_states):
+        nfa_states = dfa_states[i]
+
+        rules = [nfa.rules[s] for s in nfa_states if s in nfa.rules]
+        accept.append(pat_list[min(rules)][2] if rules else None)
+
+        row = []
+        for b in examples:
+            targets = [
+                t for s in nfa_states for chars, t in nfa.edges[s]
+                if b in chars
+            ]
+            if not targets:
+                row.append(0)
+                continue
+            next_states = _Closure(nfa, targets)
+            if next_states not in index:
+                index[next_states] = len(dfa_states)
+                dfa_states.append(next_states)
+            row.append(index[next_states])
+        trans.append(row)
+        i += 1
+
+    class_str = ''.join(chr(c) for c in class_of)
+    return class_str, trans, accept
+
+
+def _PrintDfa(var_name, pat_list):
+    class_str, trans, accept = MakeDfa(pat_list)
+
+    print('%s = (' % var_name)
+    print('    %r,' % class_str)
+    print('    [')
+    for row in trans:
+        print('        (%s),' % ', '.join(str(t) for t in row))
+    print('    ],')
+    print('    [')
+    for id_ in accept:
+        print('        %s,' % ('None' if id_ is None else Id_str(id_)))
+    print('    ],')
+    print(')  # type: DfaTable')
+    print()
+
+
+def TranslatePyDfa():
+    print("""\
+# Generated by frontend/lexer_gen.py.  Don't edit.
+#
+# Each lexer is a tuple (class_str, trans, accept).  See MakeDfa() in
+# frontend/lexer_gen.py, and _MatchTokenDfa in frontend/match.py.
+
+from _devbuild.gen.id_kind_asdl import Id
+from _devbuild.gen.types_asdl import lex_mode_e
+
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+if TYPE_CHECKING:
+    from _devbuild.gen.id_kind_asdl import Id_t
+    from _devbuild.gen.types_asdl import lex_mode_t
+    DfaTable = Tuple[str, List[Tuple[int, ...]], List[Optional[Id_t]]]
+""")
+
+    names = []
+    for lex_mode, pat_list in lexer_def.LEXER_DEF.iteritems():
+        mode_name = lex_mode_str(lex_mode).split('.')[-1]
+        var_name = 'OSH_%s' % mode_name.upper()
+        _PrintDfa(var_name, pat_list)
+        names.append((mode_name, var_name))
+
+    print('OSH_LEXER = {')
+    for mode_name, var_name in names:
+        print('    lex_mode_e.%s: %s,' % (mode_name, var_name))
+    print('}  # type: Dict[lex_mode_t, DfaTable]')
+    print()
+
+    _PrintDfa('ECHO_E', lexer_def.ECHO_E_DEF)
+    _PrintDfa('GLOB', lexer_def.GLOB_DEF)
+    _PrintDfa('PS1', lexer_def.PS1_DEF)
+    _PrintDfa('HISTORY', lexer_def.HISTORY_DEF)
+    _PrintDfa('BRACE_RANGE', lexer_def.BRACE_RANGE_DEF)
+    _PrintDfa('J8', lexer_def.J8_DEF)
+    _PrintDfa('J8_LINES', lexer_def.J8_LINES_DEF)
+    _PrintDfa('J8_STR', lexer_def.J8_STR_DEF)
+    _PrintDfa('JSON_STR', lexer_def.JSON_STR_DEF)
+    _PrintDfa('SH_NUMBER', lexer_def.SH_NUMBER_DEF)
+
+
     # note: use YYCURSOR and YYLIMIT
     # limit should be the end of string
     # line + line_len
@@ -454,6 +723,10 @@ def main(argv):
         TranslateBracket('BracketBinary', TEST_BINARY_LOOKUP)
         TranslateBracket('BracketOther', TEST_OTHER_LOOKUP)
 
+    elif action == 'py-dfa':
+        # Python tables are printed to stdout
+        TranslatePyDfa()
+
     elif action == 'print-all':
         # Top level is a switch statement.
         for state, pat_list in lexer_def.LEXER_DEF.iteritems():
@@ -6,7 +6,9 @@ from __future__ import print_function
 
 import unittest
 
+from _devbuild.gen.id_kind_asdl import Id
 from frontend import lexer_gen  # module under test
+from frontend import match
 from core import test_lib
 
 
@@ -48,6 +50,24 @@ class LexerGenTest(unittest.TestCase):
             print()
             print()
 
+    def testMakeDfa(self):
+        rules = [
+            (False, 'ab', Id.Lit_Chars),
+            (True, r'a[a-z]*', Id.Lit_VarLike),
+            (True, r'[0-7]{1,3}', Id.Lit_Digits),
+            (True, r'[^a-z0-9]', Id.Lit_Other),
+        ]
+        m = match._MatchTokenDfa(lexer_gen.MakeDfa(rules))
+
+        # The first rule wins ties
+        self.assertEqual((Id.Lit_Chars, 2), m('ab!', 0))
+        # The longest match wins
+        self.assertEqual((Id.Lit_VarLike, 3), m('abc!', 0))
+        self.assertEqual((Id.Lit_Digits, 3), m('7777', 0))
+        self.assertEqual((Id.Lit_Other, 4), m('abc!', 3))
+        self.assertEqual((Id.Eol_Tok, 4), m('abc!', 4))
+        self.assertRaises(AssertionError, m, '89', 0)
+
 
 if __name__ == '__main__':
     unittest.main()
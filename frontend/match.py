@@ -1,12 +1,16 @@
 """
 match.py - lexer primitives, implemented with re2c or Python regexes.
+
+Without the fastlex extension, we run DFA tables that frontend/lexer_gen.py
+generates from the same lexer definitions.  If they haven't been generated, we
+fall back to trying each regex.
 """
 
 from _devbuild.gen.id_kind_asdl import Id, Id_t
 from _devbuild.gen.types_asdl import lex_mode_t
 from frontend import lexer_def
 
-from typing import Tuple, Callable, Dict, List, Any, TYPE_CHECKING
+from typing import Tuple, Callable, Dict, List, Optional, Any, TYPE_CHECKING
 
 # bin/osh should work without compiling fastlex?  But we want all the unit
 # tests to run with a known version of it.
@@ -15,15 +19,23 @@ try:
 except ImportError:
     fastlex = None
 
+# lexer_dfa is only imported if fastlex isn't built, and it was generated
 if fastlex:
     re = None  # re module isn't in CPython slice
+    HAVE_LEXER_DFA = False
 else:
     import re  # type: ignore
+    try:
+        from _devbuild.gen import lexer_dfa
+        HAVE_LEXER_DFA = True
+    except ImportError:
+        HAVE_LEXER_DFA = False
 
 if TYPE_CHECKING:
     SRE_Pattern = Any  # Do we need a .pyi file for re or _sre?
     SimpleMatchFunc = Callable[[str, int], Tuple[Id_t, int]]
     LexerPairs = List[Tuple[SRE_Pattern, Id_t]]
+    DfaTable = Tuple[str, List[Tuple[int, ...]], List[Optional[Id_t]]]
 
 
 def _LongestMatch(re_list, line, start_pos):
@@ -75,6 +87,66 @@ class _MatchOshToken_Slow(object):
         return _LongestMatch(re_list, line, start_pos)
 
 
+class _MatchTokenDfa(object):
+    """Runs a DFA generated by frontend/lexer_gen.py, with a table lookup for
+    each byte."""
+
+    def __init__(self, table):
+        # type: (DfaTable) -> None
+        class_str, self.trans, self.accept = table
+
+        # Index by character rather than calling ord()
+        self.class_of = {}  # type: Dict[str, int]
+        for i, c in enumerate(class_str):
+            self.class_of[chr(i)] = ord(c)
+
+    def __call__(self, line, start_pos):
+        # type: (str, int) -> Tuple[Id_t, int]
+        n = len(line)
+
+        # Like _LongestMatch()
+        if start_pos >= n or line[start_pos] == '\0':
+            return Id.Eol_Tok, start_pos
+
+        class_of = self.class_of
+        trans = self.trans
+        accept = self.accept
+
+        # State 1 is the start state, which accepts if a rule matches the empty
+        # string.  State 0 is the dead state.
+        tok_id = accept[1]
+        end_pos = start_pos
+        state = 1
+        pos = start_pos
+        while pos < n:
+            state = trans[state][class_of[line[pos]]]
+            if state == 0:
+                break
+            pos += 1
+            if accept[state] is not None:
+                tok_id = accept[state]
+                end_pos = pos
+
+        if tok_id is None:
+            raise AssertionError('no match at position %d: %r' %
+                                 (start_pos, line))
+        return tok_id, end_pos
+
+
+class _MatchOshToken_Dfa(object):
+
+    def __init__(self, tables):
+        # type: (Dict[lex_mode_t, DfaTable]) -> None
+        self.lexers = {}  # type: Dict[lex_mode_t, _MatchTokenDfa]
+        for lex_mode, table in tables.items():
+            self.lexers[lex_mode] = _MatchTokenDfa(table)
+
+    def __call__(self, lex_mode, line, start_pos):
+        # type: (lex_mode_t, str, int) -> Tuple[Id_t, int]
+        """Returns (id, end_pos)."""
+        return self.lexers[lex_mode](line, start_pos)
+
+
 def _MatchOshToken_Fast(lex_mode, line, start_pos):
     # type: (lex_mode_t, str, int) -> Tuple[Id_t, int]
     """Returns (Id, end_pos)."""
@@ -174,6 +246,19 @@ if fastlex:
     LooksLikeInteger = fastlex.LooksLikeInteger
     LooksLikeYshInt = fastlex.LooksLikeYshInt
     LooksLikeYshFloat = fastlex.LooksLikeYshFloat
+elif HAVE_LEXER_DFA:
+    OneToken = _MatchOshToken_Dfa(lexer_dfa.OSH_LEXER)
+    ECHO_MATCHER = _MatchTokenDfa(lexer_dfa.ECHO_E)
+    GLOB_MATCHER = _MatchTokenDfa(lexer_dfa.GLOB)
+    PS1_MATCHER = _MatchTokenDfa(lexer_dfa.PS1)
+    HISTORY_MATCHER = _MatchTokenDfa(lexer_dfa.HISTORY)
+    BRACE_RANGE_MATCHER = _MatchTokenDfa(lexer_dfa.BRACE_RANGE)
+
+    MatchJ8Token = _MatchTokenDfa(lexer_dfa.J8)
+    MatchJ8LinesToken = _MatchTokenDfa(lexer_dfa.J8_LINES)
+    MatchJ8StrToken = _MatchTokenDfa(lexer_dfa.J8_STR)
+    MatchJsonStrToken = _MatchTokenDfa(lexer_dfa.JSON_STR)
+    MatchShNumberToken = _MatchTokenDfa(lexer_dfa.SH_NUMBER)
 else:
     OneToken = _MatchOshToken_Slow(lexer_def.LEXER_DEF)
     ECHO_MATCHER = _MatchTokenSlow(lexer_def.ECHO_E_DEF)
@@ -188,6 +273,7 @@ else:
     MatchJsonStrToken = _MatchTokenSlow(lexer_def.JSON_STR_DEF)
     MatchShNumberToken = _MatchTokenSlow(lexer_def.SH_NUMBER_DEF)
 
+if not fastlex:
     # Used by osh/cmd_parse.py to validate for loop name.  Note it must be
     # anchored on the right.
     _VAR_NAME_RE = re.compile(lexer_def.VAR_NAME_RE + '$')  # type: ignore
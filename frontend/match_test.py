@@ -8,6 +8,7 @@ import unittest
 
 from _devbuild.gen.id_kind_asdl import Id, Id_str
 from mycpp.mylib import log
+from frontend import lexer_def
 from frontend import match  # module under test
 
 
@@ -127,5 +128,52 @@ class MatchTest(unittest.TestCase):
             self.assertEqual(expected, match.LooksLikeYshFloat(s), s)
 
 
+class DfaTest(unittest.TestCase):
+
+    def testSameAsRegexes(self):
+        if not match.HAVE_LEXER_DFA:
+            log('lexer_dfa not generated; skipping')
+            return
+
+        slow = match._MatchOshToken_Slow(lexer_def.LEXER_DEF)
+        dfa = match._MatchOshToken_Dfa(match.lexer_dfa.OSH_LEXER)
+
+        lines = [
+            'echo hi > out.txt 2>&1\n',
+            'FOO=bar ls -l "$x" \'single\' $\'c\\n\' # comment\n',
+            'if [[ $x =~ ^a(b|c)*$ ]]; then echo ${a[@]:1:2}; fi\n',
+            'echo $(( x += 0x1f ** 2 )) ${x%%.*} ${#x} $((a<<1))\n',
+            'var x = {a: [1, 2.5e3], b: u\'\\u{3bc}\'}; echo $[x]\n',
+            'proc p (x; y) { return ("a" ++ "b") }\n',
+            '  \t\n',
+            '',
+            'unterminated " and \xff\x01 bytes\n',
+        ]
+        for lex_mode in lexer_def.LEXER_DEF:
+            for line in lines:
+                for pos in range(len(line) + 1):
+                    self.assertEqual(slow(lex_mode, line, pos),
+                                     dfa(lex_mode, line, pos),
+                                     (lex_mode, line, pos))
+
+    def testSimpleLexers(self):
+        if not match.HAVE_LEXER_DFA:
+            return
+
+        pairs = [
+            (lexer_def.ECHO_E_DEF, match.lexer_dfa.ECHO_E,
+             r'a\tb\x41\0123\u{3bc}\c'),
+            (lexer_def.GLOB_DEF, match.lexer_dfa.GLOB, r'*.[ch]?[!a-z]\*'),
+            (lexer_def.J8_DEF, match.lexer_dfa.J8,
+             '[3.14, -4, true, null, "x", b\'\\yff\']'),
+            (lexer_def.SH_NUMBER_DEF, match.lexer_dfa.SH_NUMBER, '0x1f'),
+        ]
+        for pat_list, table, s in pairs:
+            slow = match._MatchTokenSlow(pat_list)
+            dfa = match._MatchTokenDfa(table)
+            for pos in range(len(s) + 1):
+                self.assertEqual(slow(s, pos), dfa(s, pos), (s, pos))
+
+
 if __name__ == '__main__':
     unittest.main()
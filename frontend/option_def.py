@@ -296,6 +296,10 @@ def _Init(opt_def):
     opt_def.Add('ignore_flags_not_impl')
     opt_def.Add('ignore_shopt_not_impl')
 
+    # Run $(echo hi) and $(myfunc) in the shell process when it's safe.  See
+    # osh/no_fork.py.
+    opt_def.Add('no_fork_command_sub')
+
     # For implementing strict_errexit
     # TODO: could be _no_command_sub / _no_process_sub, if we had to discourage
     # "default True" options
@@ -0,0 +1,338 @@
+"""
+parse_cache.py - Cache the syntax trees of files and eval strings.
+
+If $OILS_PARSE_CACHE_DIR is set, the commands of each file are saved there in
+the ASDL binary format (asdl/pybinary.py), along with the SourceLine objects
+their tokens point to.  The next time the file is run, we decode the commands
+instead of lexing and parsing it again.
+
+The cache entry is keyed by:
+
+- the real path, size, and mtime of the file
+- the Oils version, and the fingerprints of the ASDL schemas
+- for each command, the parse options in effect when it was parsed
+
+A file is parsed one command at a time, interleaved with execution, so running
+it can change how the rest of it is parsed.  So we record the parse options
+before each command, and don't cache files that are parsed while aliases are
+defined.  When the cached file is run and the options differ, we parse the
+rest of the file normally.
+
+EvalCache keeps the commands of strings passed to 'eval' in memory, with the
+same rules.
+"""
+from __future__ import print_function
+
+from _devbuild.gen import syntax_asdl
+from _devbuild.gen import value_asdl
+from _devbuild.gen.id_kind_asdl import Id
+from _devbuild.gen.syntax_asdl import command_t, loc_t, source, source_t
+from asdl import pybinary
+from core import pyos
+from frontend import consts
+from mycpp import mylib
+from mycpp.mylib import log
+from pylib import os_path
+
+import libc
+import posix_ as posix
+from posix_ import O_CREAT, O_RDONLY, O_TRUNC, O_WRONLY
+
+from typing import Dict, List, Tuple, Optional, cast, TYPE_CHECKING
+if TYPE_CHECKING:
+    from core import state
+
+_ = log
+
+
+class CachedFile(object):
+    """The commands of a file or eval string, from the cache."""
+
+    def __init__(self, src):
+        # type: (source_t) -> None
+        # The source that the SourceLine objects in the commands point to
+        self.src = src
+        self.nodes = []  # type: List[command_t]
+
+        # Parse options when each command was parsed
+        self.parse_keys = []  # type: List[str]
+
+        # The line after each command, where we resume parsing if we can't
+        # use the rest of the cache
+        self.next_lines = []  # type: List[int]
+
+
+class Recorder(object):
+    """Records the commands of a file as main_loop.Batch() parses them."""
+
+    def __init__(self, cache, key, enc, src):
+        # type: (CommandCache, str, Optional[pybinary.Encoder], source_t) -> None
+        """
+        Args:
+          key: the path of the cache file, or the eval string
+          enc: if passed, commands are encoded rather than kept in memory
+        """
+        self.cache = cache
+        self.key = key
+
+        self.enc = enc
+        if self.enc:
+            self.enc.Register(src)
+        self.cached = CachedFile(src)
+        self.parse_key = None  # type: Optional[str]
+        self.ok = True
+
+    def BeforeParse(self):
+        # type: () -> None
+        self.parse_key = self.cache.ParseKey()
+        if self.parse_key is None:
+            self.ok = False
+
+    def AfterParse(self, node, next_line):
+        # type: (command_t, int) -> None
+        if not self.ok:
+            return
+
+        if self.enc is None:
+            self.cached.parse_keys.append(self.parse_key)
+            self.cached.next_lines.append(next_line)
+            self.cached.nodes.append(node)
+            return
+
+        try:
+            self.enc.Str(self.parse_key)
+            self.enc.Int(next_line)
+            node.Encode(self.enc)
+        except ValueError:
+            self.ok = False
+
+    def Save(self):
+        # type: () -> None
+        """Called when the whole file was parsed without errors."""
+        if self.ok:
+            self.cache.Save(self)
+
+
+def _ReadFile(path):
+    # type: (str) -> Optional[str]
+    try:
+        fd = posix.open(path, O_RDONLY, 0)
+    except (IOError, OSError) as e:
+        return None
+
+    buf = mylib.BufWriter()
+    err_num = pyos.ReadAll(fd, -1, buf)
+    posix.close(fd)
+    if err_num != 0:
+        return None
+    return buf.getvalue()
+
+
+def _WriteFileAtomically(path, contents):
+    # type: (str, str) -> None
+    """Write to a temp file, then rename it, so readers never see a partial
+    file."""
+    tmp_path = '%s.%d.tmp' % (path, posix.getpid())
+    try:
+        fd = posix.open(tmp_path, O_WRONLY | O_CREAT | O_TRUNC, 0o644)
+    except (IOError, OSError) as e:
+        return
+
+    try:
+        posix.write(fd, contents)
+        posix.close(fd)
+        posix.rename(tmp_path, path)
+    except (IOError, OSError) as e:
+        try:
+            posix.unlink(tmp_path)
+        except (IOError, OSError) as e:
+            pass
+
+
+class CommandCache(object):
+    """Base class for caches of parsed commands."""
+
+    def __init__(self, mutable_opts, aliases):
+        # type: (state.MutableOpts, Dict[str, str]) -> None
+        self.mutable_opts = mutable_opts
+        self.aliases = aliases
+
+    def ParseKey(self):
+        # type: () -> Optional[str]
+        """Returns the state of options that change how code is parsed.
+
+        Returns None if parsing may depend on aliases.
+        """
+        if len(self.aliases):
+            return None
+
+        bits = []  # type: List[str]
+        for opt_num in consts.PARSE_OPTION_NUMS:
+            bits.append('1' if self.mutable_opts.Get(opt_num) else '0')
+        return ''.join(bits)
+
+    def Save(self, recorder):
+        # type: (Recorder) -> None
+        raise NotImplementedError()
+
+
+class ParseCache(CommandCache):
+    """Load and save the commands of files in a directory."""
+
+    def __init__(
+            self,
+            cache_dir,  # type: str
+            version_str,  # type: str
+            mutable_opts,  # type: state.MutableOpts
+            aliases,  # type: Dict[str, str]
+    ):
+        # type: (...) -> None
+        CommandCache.__init__(self, mutable_opts, aliases)
+        self.cache_dir = cache_dir
+        self.version_str = version_str
+
+    def _CachePath(self, fs_path):
+        # type: (str) -> Tuple[str, str, int, float]
+        """Returns the path of the cache file, and the real path, size, and
+        mtime of the file.
+
+        Returns a None cache path if the file can't be cached.
+        """
+        real_path = libc.realpath(fs_path)
+        if real_path is None:
+            return None, None, -1, -1.0
+
+        try:
+            size, mtime = pyos.FileStamp(real_path)
+        except (IOError, OSError) as e:
+            return None, None, -1, -1.0
+
+        name = real_path.replace('%', '%25').replace('/', '%2F')
+        cache_path = os_path.join(self.cache_dir, name)
+        return cache_path, real_path, size, mtime
+
+    def _NewEncoder(self, real_path, size, mtime):
+        # type: (str, int, float) -> pybinary.Encoder
+        enc = pybinary.Encoder(syntax_asdl.FINGERPRINT)
+        enc.Str(self.version_str)
+        enc.Int(value_asdl.FINGERPRINT)
+        enc.Int(Id.ARRAY_SIZE)
+        enc.Str(real_path)
+        enc.Int(size)
+        enc.Float(mtime)
+        return enc
+
+    def _HeaderMatches(self, dec, real_path, size, mtime):
+        # type: (pybinary.Decoder, str, int, float) -> bool
+        version_str = dec.Str()
+        if version_str is None or version_str != self.version_str:
+            return False
+        if dec.Int() != value_asdl.FINGERPRINT:
+            return False
+        if dec.Int() != Id.ARRAY_SIZE:
+            return False
+        path = dec.Str()
+        if path is None or path != real_path:
+            return False
+        return dec.Int() == size and dec.Float() == mtime
+
+    def Load(self, fs_path, src):
+        # type: (str, source_t) -> Optional[CachedFile]
+        """Returns the cached commands, or None if they're missing or stale.
+
+        The SourceLine objects in the commands will point to src.
+        """
+        cache_path, real_path, size, mtime = self._CachePath(fs_path)
+        if cache_path is None:
+            return None
+
+        data = _ReadFile(cache_path)
+        if data is None:
+            return None
+
+        cached = CachedFile(src)
+        try:
+            dec = pybinary.Decoder(data, syntax_asdl.FINGERPRINT)
+            if not self._HeaderMatches(dec, real_path, size, mtime):
+                return None
+
+            dec.Register(src)
+            while True:
+                parse_key = dec.Str()
+                if parse_key is None:
+                    break
+                cached.parse_keys.append(parse_key)
+                cached.next_lines.append(dec.Int())
+                cached.nodes.append(command_t.Decode(dec))
+
+            if not dec.Done():
+                return None
+        except ValueError:
+            return None
+
+        return cached
+
+    def NewRecorder(self, fs_path, src):
+        # type: (str, source_t) -> Optional[Recorder]
+        """Returns an object to pass to main_loop.Batch(), or None."""
+        cache_path, real_path, size, mtime = self._CachePath(fs_path)
+        if cache_path is None:
+            return None
+        enc = self._NewEncoder(real_path, size, mtime)
+        return Recorder(self, cache_path, enc, src)
+
+    def Save(self, recorder):
+        # type: (Recorder) -> None
+        recorder.enc.Str(None)  # no more commands
+
+        # Errors aren't fatal; the file will be parsed next time
+        _WriteFileAtomically(recorder.key, recorder.enc.getvalue())
+
+
+# Programs usually eval a few strings many times, not many strings.  Note that
+# the cache holds the commands and the lines they were parsed from.
+EVAL_CACHE_SIZE = 100
+
+
+class EvalCache(CommandCache):
+    """Remember the commands of strings passed to eval.
+
+    Programs often eval the same few strings in a loop, so this skips parsing
+    them again.  The commands are shared, so the cache is keyed by the string
+    AND the location of the eval, which their SourceLine objects point to.
+    """
+
+    def __init__(self, mutable_opts, aliases, max_entries):
+        # type: (state.MutableOpts, Dict[str, str], int) -> None
+        CommandCache.__init__(self, mutable_opts, aliases)
+        self.max_entries = max_entries
+        self.entries = {}  # type: Dict[str, CachedFile]
+
+    def Get(self, code_str, eval_loc):
+        # type: (str, loc_t) -> Optional[CachedFile]
+        cached = self.entries.get(code_str)
+        if cached is None:
+            return None
+
+        src = cast(source.Dynamic, cached.src)
+        if src.location is not eval_loc:
+            return None
+
+        # If the options changed, parse it again, so the next eval is a hit
+        if len(cached.nodes) and cached.parse_keys[0] != self.ParseKey():
+            return None
+        return cached
+
+    def NewRecorder(self, code_str, src):
+        # type: (str, source.Dynamic) -> Recorder
+        return Recorder(self, code_str, None, src)
+
+    def Save(self, recorder):
+        # type: (Recorder) -> None
+
+        # Start over when we're full, rather than tracking which entries are
+        # used
+        if (recorder.key not in self.entries and
+                len(self.entries) >= self.max_entries):
+            self.entries.clear()
+        self.entries[recorder.key] = recorder.cached
@@ -0,0 +1,166 @@
+#!/usr/bin/env python2
+"""
+parse_cache_test.py: Tests for parse_cache.py
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from _devbuild.gen import syntax_asdl
+from _devbuild.gen.option_asdl import option_i
+from _devbuild.gen.syntax_asdl import source, loc
+from asdl import pybinary
+from core import state
+from core import test_lib
+from frontend import parse_cache  # module under test
+
+
+def _Encode(node):
+    enc = pybinary.Encoder(syntax_asdl.FINGERPRINT)
+    node.Encode(enc)
+    return enc.getvalue()
+
+
+class ParseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'lib.sh')
+        with open(self.path, 'w') as f:
+            f.write('echo one\n\nf() {\n  echo two\n}\n')
+
+        mem = state.Mem('', [], None, [], {})
+        _, _, self.mutable_opts = state.MakeOpts(mem, {}, None)
+        self.aliases = {}
+        self.cache = parse_cache.ParseCache(self.tmp_dir, '0.0.test',
+                                            self.mutable_opts, self.aliases)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _Record(self):
+        arena = test_lib.MakeArena('<parse_cache_test>')
+        src = source.OtherFile(self.path, loc.Missing)
+        arena.PushSource(src)
+
+        with open(self.path) as f:
+            c_parser = test_lib.InitCommandParser(f.read(), arena=arena)
+
+        recorder = self.cache.NewRecorder(self.path, src)
+        nodes = []
+        while True:
+            recorder.BeforeParse()
+            node = c_parser.ParseLogicalLine()
+            if node is None:
+                recorder.Save()
+                break
+            recorder.AfterParse(node, c_parser.line_reader.line_num)
+            nodes.append(node)
+        return nodes
+
+    def testRoundTrip(self):
+        src = source.OtherFile(self.path, loc.Missing)
+        self.assertEqual(None, self.cache.Load(self.path, src))
+
+        nodes = self._Record()
+
+        cached = self.cache.Load(self.path, src)
+        self.assertEqual(2, len(cached.nodes))
+        self.assertEqual([2, 6], cached.next_lines)
+        for expected, actual in zip(nodes, cached.nodes):
+            self.assertEqual(_Encode(expected), _Encode(actual))
+
+        # Tokens point to lines, which point to the new source
+        tok = cached.nodes[1].name_tok
+        self.assertEqual(3, tok.line.line_num)
+        self.assertEqual('f() {\n', tok.line.content)
+        self.assertIs(src, tok.line.src)
+
+        key = self.cache.ParseKey()
+        self.assertEqual([key, key], cached.parse_keys)
+
+    def testStale(self):
+        self._Record()
+
+        with open(self.path, 'a') as f:
+            f.write('echo three\n')
+        src = source.OtherFile(self.path, loc.Missing)
+        self.assertEqual(None, self.cache.Load(self.path, src))
+
+    def testParseKey(self):
+        key1 = self.cache.ParseKey()
+        self.mutable_opts.opt0_array[option_i.parse_at] = True
+        key2 = self.cache.ParseKey()
+        self.assertNotEqual(key1, key2)
+
+        # Not cached when aliases are defined
+        self.aliases['ll'] = 'ls -l'
+        self.assertEqual(None, self.cache.ParseKey())
+
+        src = source.OtherFile(self.path, loc.Missing)
+        self._Record()
+        self.assertEqual(None, self.cache.Load(self.path, src))
+
+
+class EvalCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        mem = state.Mem('', [], None, [], {})
+        _, _, self.mutable_opts = state.MakeOpts(mem, {}, None)
+        self.aliases = {}
+        self.cache = parse_cache.EvalCache(self.mutable_opts, self.aliases, 2)
+
+    def _Record(self, code_str, eval_loc):
+        arena = test_lib.MakeArena('<parse_cache_test>')
+        src = source.Dynamic('eval arg', eval_loc)
+        arena.PushSource(src)
+        c_parser = test_lib.InitCommandParser(code_str, arena=arena)
+
+        recorder = self.cache.NewRecorder(code_str, src)
+        while True:
+            recorder.BeforeParse()
+            node = c_parser.ParseLogicalLine()
+            if node is None:
+                recorder.Save()
+                break
+            recorder.AfterParse(node, c_parser.line_reader.line_num)
+
+    def testGet(self):
+        eval_loc = loc.Word(None)
+        self.assertEqual(None, self.cache.Get('echo hi', eval_loc))
+
+        self._Record('echo hi\necho bye', eval_loc)
+        cached = self.cache.Get('echo hi\necho bye', eval_loc)
+        self.assertEqual(2, len(cached.nodes))
+        self.assertEqual([2, 3], cached.next_lines)
+
+        # The commands point to the location of another eval
+        self.assertEqual(None,
+                         self.cache.Get('echo hi\necho bye', loc.Word(None)))
+
+        # Parse options changed
+        self.mutable_opts.opt0_array[option_i.parse_at] = True
+        self.assertEqual(None, self.cache.Get('echo hi\necho bye', eval_loc))
+
+    def testLimit(self):
+        eval_loc = loc.Missing
+        self._Record('echo 1', eval_loc)
+        self._Record('echo 2', eval_loc)
+        self._Record('echo 2', eval_loc)
+        self.assertEqual(2, len(self.cache.entries))
+
+        self._Record('echo 3', eval_loc)
+        self.assertEqual(1, len(self.cache.entries))
+        self.assertEqual(None, self.cache.Get('echo 1', eval_loc))
+        self.assertNotEqual(None, self.cache.Get('echo 3', eval_loc))
+
+    def testAliases(self):
+        self.aliases['ll'] = 'ls -l'
+        self._Record('echo hi', loc.Missing)
+        self.assertEqual(None, self.cache.Get('echo hi', loc.Missing))
+
+
+if __name__ == '__main__':
+    unittest.main()
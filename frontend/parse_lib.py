@@ -64,6 +64,11 @@ class _BaseTrail(object):
         ]  # type: List[CompoundWord]  # words INSIDE an alias expansion
         self._expanding_alias = False
 
+        # Top level operators like ; && | that end a complete command, so
+        # completion can resume parsing after them.  Filled in by
+        # _ParseCommandLine() in osh/cmd_parse.py.
+        self.boundaries = []  # type: List[Token]
+
     def Clear(self):
         # type: () -> None
         pass
@@ -76,6 +81,14 @@ class _BaseTrail(object):
         # type: (Token) -> None
         pass
 
+    def AppendBoundary(self, token):
+        # type: (Token) -> None
+        pass
+
+    def Truncate(self, num_tokens):
+        # type: (int) -> None
+        pass
+
     def BeginAliasExpansion(self):
         # type: () -> None
         pass
@@ -164,6 +177,7 @@ class Trail(_BaseTrail):
         # The other ones don't need to be reset?
         del self.tokens[:]
         del self.alias_words[:]
+        del self.boundaries[:]
 
     def SetLatestWords(self, words, redirects):
         # type: (List[CompoundWord], List[Redir]) -> None
@@ -179,6 +193,23 @@ class Trail(_BaseTrail):
             return
         self.tokens.append(token)
 
+    def AppendBoundary(self, token):
+        # type: (Token) -> None
+        if self._expanding_alias:
+            return
+        self.boundaries.append(token)
+
+    def Truncate(self, num_tokens):
+        # type: (int) -> None
+        """Forget everything after the first num_tokens tokens, so the parse
+        can resume at a boundary."""
+        del self.words[:]
+        del self.redirects[:]
+        del self.alias_words[:]
+        del self.boundaries[:]
+        while len(self.tokens) > num_tokens:
+            self.tokens.pop()
+
 
 if TYPE_CHECKING:
     AliasesInFlight = List[Tuple[str, int]]
@@ -56,6 +56,17 @@ class _Reader(object):
         self.line_num += 1
         return src_line, 0
 
+    def SkipLines(self, line_num):
+        # type: (int) -> None
+        """Read up to the given line without adding lines to the arena.
+
+        Used to resume parsing after commands from the parse cache.
+        """
+        while self.line_num < line_num:
+            if self._GetLine() is None:
+                break
+            self.line_num += 1
+
     def Reset(self):
         # type: () -> None
         """Called after command execution in main_loop.py."""
@@ -42,6 +42,10 @@ class BumpLeakHeap {
 
   void* Allocate(size_t num_bytes);
   void* Reallocate(void* p, size_t num_bytes);
+  void WriteBarrier(void* obj) {
+  }
+  void Freeze() {
+  }
   int MaybeCollect() {
 #ifdef BUMP_ROOT
     // Do some computation with the roots
@@ -1377,6 +1377,28 @@ class Impl(_Shared):
         self.write(' : ')
         self.accept(o.else_expr)
 
+    def _WriteBarrier(self, lval: Expression) -> None:
+        """After self.x = y, tell the generational GC that self may now point
+        to a young object.  See WriteBarrier() in mycpp/mark_sweep_heap.h.
+        """
+        if not isinstance(lval, MemberExpr):
+            return
+        if not isinstance(self.dot_exprs.get(lval),
+                          pass_state.HeapObjectMember):
+            return
+        if not CTypeIsManaged(GetCType(self.types[lval])):
+            return
+
+        # The object expression is evaluated twice, so it can't have effects
+        if not isinstance(lval.expr, (NameExpr, MemberExpr)):
+            self.report_error(lval,
+                              "Can't assign to a member of this expression")
+            return
+
+        self.write_ind('WriteBarrier(')
+        self.accept(lval.expr)
+        self.write(');\n')
+
     def _WriteTupleUnpacking(self,
                              temp_name: str,
                              lval_items: List[Expression],
@@ -1403,6 +1425,7 @@ class Impl(_Shared):
             # Tuples that are return values aren't pointers
             op = '.' if is_return else '->'
             self.write(' = %s%sat%d();\n', temp_name, op, i)  # RHS
+            self._WriteBarrier(lval_item)
 
     def _WriteTupleUnpackingInLoop(self, temp_name: str,
                                    lval_items: List[Expression],
@@ -1423,6 +1446,7 @@ class Impl(_Shared):
 
             op = '->'
             self.write(' = %s%sat%d();\n', temp_name, op, i)  # RHS
+            self._WriteBarrier(lval_item)
 
             # Note: it would be nice to eliminate these roots, just like
             # StackRoots _for() below
@@ -1711,6 +1735,7 @@ class Impl(_Shared):
                 self.write(' = ')
                 self._AssignNewDictImpl(lval)  # uses lval, not rval
                 self.write(';\n')
+                self._WriteBarrier(lval)
                 return
 
             if callee_name == 'cast':
@@ -1745,6 +1770,7 @@ class Impl(_Shared):
             self.write(' = ')
             self.accept(rval)
             self.write(';\n')
+            self._WriteBarrier(lval)
             return
 
         if isinstance(lval, IndexExpr):  # a[x] = 1
@@ -2650,6 +2676,7 @@ class Impl(_Shared):
         self.write(' %s= ', o.op)  # + to +=
         self.accept(o.rvalue)
         self.write(';\n')
+        self._WriteBarrier(o.lvalue)
 
     def visit_while_stmt(self, o: 'mypy.nodes.WhileStmt') -> None:
         self.write_ind('while (')
@@ -96,6 +96,13 @@ class StackRoots {
   int n_;
 };
 
+// Called after a pointer is stored in an object that may have survived a
+// collection, e.g. obj->field = other.  In generational mode, the object is
+// added to the remembered set.
+inline void WriteBarrier(void* obj) {
+  gHeap.WriteBarrier(obj);
+}
+
 // Note:
 // - This function causes code bloat due to template expansion on hundreds of
 //   types.  Could switch to a GC_NEW() macro
@@ -172,6 +179,7 @@ inline BigStr* NewStr(int len) {
   s->len_ = len;
   s->hash_ = 0;
   s->is_hashed_ = 0;
+  s->is_interned_ = 0;
 
 #if MARK_SWEEP
   header->obj_id = obj_id;
@@ -199,6 +207,7 @@ inline BigStr* OverAllocatedStr(int len) {
   auto s = new (header->ObjectAddress()) BigStr();
   s->hash_ = 0;
   s->is_hashed_ = 0;
+  s->is_interned_ = 0;
 
 #if MARK_SWEEP
   header->obj_id = obj_id;
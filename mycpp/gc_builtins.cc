@@ -63,16 +63,22 @@ BigStr* str(double d) {
 // %a is a hexfloat form, probably don't need that
 // int length = snprintf(buf, n, "%a", d);
 
-// Do we need this API?  Or is mylib.InternedStr(BigStr* s, int start, int end)
-// better for getting values out of Token.line without allocating?
+// Like Python 2's intern(): return the one string object that's equal to s.
+// See InternTable in mark_sweep_heap.h.
 //
-// e.g. mylib.InternedStr(tok.line, tok.start, tok.start+1)
+// TODO: mylib.InternedStr(BigStr* s, int start, int end) could get values out
+// of Token.line without allocating, e.g.
+//
+// mylib.InternedStr(tok.line, tok.start, tok.start+1)
 //
 // Also for SmallStr, we don't care about interning.  Only for HeapStr.
 
 BigStr* intern(BigStr* s) {
-  // TODO: put in table gHeap.interned_
+#if MARK_SWEEP
+  return gHeap.interned_.Intern(s);
+#else
   return s;
+#endif
 }
 
 // Print quoted string.  Called by StrFormat('%r').
@@ -370,6 +376,11 @@ bool str_equals(BigStr* left, BigStr* right) {
     return false;
   }
 
+  // Equal interned strings are the same object
+  if (left->is_interned_ && right->is_interned_) {
+    return false;
+  }
+
   if (left->len_ != right->len_) {
     return false;
   }
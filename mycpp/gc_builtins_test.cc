@@ -396,6 +396,14 @@ TEST intern_test() {
 
   ASSERT(str_equals(s, t));
 
+  // Comparing interned and other strings
+  BigStr* u = intern(StrFromC("foo"));
+  BigStr* v = intern(StrFromC("bar"));
+  ASSERT(str_equals(u, s));
+  ASSERT(str_equals(StrFromC("foo"), u));
+  ASSERT(!str_equals(u, v));
+  ASSERT_EQ(hash(u), hash(StrFromC("foo")));
+
   PASS();
 }
 
@@ -231,6 +231,7 @@ void Dict<K, V>::reserve(int num_desired) {
   // These are DENSE, while index_ is sparse.
   keys_ = NewSlab<K>(capacity_);
   values_ = NewSlab<V>(capacity_);
+  WriteBarrier(this);
 
   if (old_k != nullptr) {  // rehash if there were any entries
     // log("REHASH num_desired %d", num_desired);
@@ -408,9 +409,15 @@ void Dict<K, V>::set(K key, V val) {
     index_->items_[pos] = len_;
     len_++;
     DCHECK(len_ <= capacity_);
+    if (std::is_pointer<K>::value) {
+      WriteBarrier(keys_);
+    }
   } else {
     values_->items_[kv_index] = val;
   }
+  if (std::is_pointer<V>::value) {
+    WriteBarrier(values_);
+  }
 }
 
 template <typename K, typename V>
@@ -3,7 +3,8 @@
 
 #include <string.h>  // memcpy
 
-#include <algorithm>  // sort() is templated
+#include <algorithm>    // sort() is templated
+#include <type_traits>  // is_pointer
 
 #include "mycpp/common.h"  // DCHECK
 #include "mycpp/comparators.h"
@@ -209,6 +210,9 @@ template <typename T>
 void List<T>::append(T item) {
   reserve(len_ + 1);
   slab_->items_[len_] = item;
+  if (std::is_pointer<T>::value) {
+    WriteBarrier(slab_);
+  }
   ++len_;
 }
 
@@ -285,6 +289,7 @@ void List<T>::reserve(int num_desired) {
     memcpy(new_slab->items_, slab_->items_, len_ * sizeof(T));
   }
   slab_ = new_slab;
+  WriteBarrier(this);
 }
 
 // Implements L[i] = item
@@ -299,6 +304,9 @@ void List<T>::set(int i, T item) {
   }
 
   slab_->items_[i] = item;
+  if (std::is_pointer<T>::value) {
+    WriteBarrier(slab_);
+  }
 }
 
 // Implements L[i]
@@ -406,6 +414,9 @@ void List<T>::extend(List<T>* other) {
   for (int i = 0; i < n; ++i) {
     slab_->items_[len_ + i] = other->slab_->items_[i];
   }
+  if (std::is_pointer<T>::value && n > 0) {
+    WriteBarrier(slab_);
+  }
   len_ = new_len;
 }
 
@@ -213,6 +213,7 @@ void BufWriter::EnsureMoreSpace(int n) {
     // TODO: we could make the default capacity big enough for a line, e.g. 128
     // capacity: 128 -> 256 -> 512
     str_ = NewMutableStr(n);
+    WriteBarrier(this);
     return;
   }
 
@@ -226,6 +227,7 @@ void BufWriter::EnsureMoreSpace(int n) {
     memcpy(s->data_, str_->data_, len_);
     s->data_[len_] = '\0';
     str_ = s;
+    WriteBarrier(this);
   }
 }
 
@@ -31,6 +31,10 @@ inline void MaybeCollect() {
   gHeap.MaybeCollect();
 }
 
+inline void FreezeHeap() {
+  gHeap.Freeze();
+}
+
 inline void PrintGcStats() {
   gHeap.PrintShortStats();  // print to stderr
 }
@@ -510,7 +510,7 @@ List<BigStr*>* BigStr::split(BigStr* sep) {
 
 unsigned BigStr::hash(HashFunc h) {
   if (!is_hashed_) {
-    hash_ = h(data_, len(this)) >> 1;
+    hash_ = h(data_, len(this)) >> 2;
     is_hashed_ = 1;
   }
   return hash_;
@@ -61,6 +61,8 @@ class BigStr {
   BigStr* upper();
   BigStr* lower();
 
+  // intern() puts strings in a weak table, gHeap.interned_.
+  //
   // Other options for fast comparison / hashing / string interning:
   // - unique_id_: an index into intern table.  I don't think this works unless
   //   you want to deal with rehashing all strings when the set grows.
@@ -81,9 +83,10 @@ class BigStr {
   unsigned hash(HashFunc h);
 
   int len_;
-  unsigned hash_ : 31;
+  unsigned hash_ : 30;
   unsigned is_hashed_ : 1;
-  char data_[1];  // flexible array
+  unsigned is_interned_ : 1;  // see intern()
+  char data_[1];              // flexible array
 
  private:
   int _strip_left_pos();
@@ -146,8 +149,9 @@ class GlobalStr {
   // a buffer of size N).  For initializing global constant instances.
  public:
   int len_;
-  unsigned hash_ : 31;
+  unsigned hash_ : 30;
   unsigned is_hashed_ : 1;
+  unsigned is_interned_ : 1;
   const char data_[N];
 
   DISALLOW_COPY_AND_ASSIGN(GlobalStr)
@@ -198,14 +202,22 @@ inline int len(const Str s) {
 #define GLOBAL_STR(name, val)                                                \
   GcGlobal<GlobalStr<sizeof(val)>> _##name = {                               \
       ObjHeader::Global(TypeTag::BigStr),                                    \
-      {.len_ = sizeof(val) - 1, .hash_ = 0, .is_hashed_ = 0, .data_ = val}}; \
+      {.len_ = sizeof(val) - 1,                                              \
+       .hash_ = 0,                                                           \
+       .is_hashed_ = 0,                                                      \
+       .is_interned_ = 0,                                                    \
+       .data_ = val}};                                                       \
   BigStr* name = reinterpret_cast<BigStr*>(&_##name.obj);
 
 // New style for SmallStr compatibility
 #define GLOBAL_STR2(name, val)                                               \
   GcGlobal<GlobalStr<sizeof(val)>> _##name = {                               \
       ObjHeader::Global(TypeTag::BigStr),                                    \
-      {.len_ = sizeof(val) - 1, .hash_ = 0, .is_hashed_ = 0, .data_ = val}}; \
+      {.len_ = sizeof(val) - 1,                                              \
+       .hash_ = 0,                                                           \
+       .is_hashed_ = 0,                                                      \
+       .is_interned_ = 0,                                                    \
+       .data_ = val}};                                                       \
   Str name(reinterpret_cast<BigStr*>(&_##name.obj));
 
 // Helper function that's consistent with JSON definition of ASCII whitespace,
@@ -1,5 +1,6 @@
 #include "mycpp/hash.h"
 
+#include "mycpp/gc_builtins.h"  // intern()
 #include "mycpp/gc_str.h"
 #include "mycpp/gc_tuple.h"
 
@@ -17,6 +18,12 @@ unsigned fnv1(const char* data, int len) {
 }
 
 unsigned hash_key(BigStr* s) {
+  // GLOBAL_STR constants used as dict keys join the intern table, so names
+  // from the lexer can share them
+  if (!s->is_hashed_ &&
+      ObjHeader::FromObject(s)->heap_tag == HeapTag::Global) {
+    intern(s);
+  }
   return s->hash(fnv1);
 }
 
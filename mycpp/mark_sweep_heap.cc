@@ -1,6 +1,9 @@
 #include "mycpp/mark_sweep_heap.h"
 
 #include <inttypes.h>  // PRId64
+#include <pthread.h>
+#include <sched.h>     // sched_yield()
+#include <signal.h>    // pthread_sigmask()
 #include <stdlib.h>    // getenv()
 #include <string.h>    // strlen()
 #include <sys/time.h>  // gettimeofday()
@@ -31,6 +34,24 @@ void MarkSweepHeap::Init(int gc_threshold) {
     }
   }
 
+  // Generational mode, e.g. OILS_GC_NURSERY=10000
+  e = getenv("OILS_GC_NURSERY");
+  if (e) {
+    int result;
+    if (StringToInt(e, strlen(e), 10, &result) && result > 0) {
+      SetNurserySize(result);
+    }
+  }
+
+  // Parallel marking, e.g. OILS_GC_THREADS=4
+  e = getenv("OILS_GC_THREADS");
+  if (e) {
+    int result;
+    if (StringToInt(e, strlen(e), 10, &result) && result >= 1) {
+      num_mark_threads_ = std::min(result, kMaxMarkThreads);
+    }
+  }
+
   // only for developers
   e = getenv("_OILS_GC_VERBOSE");
   if (e && strcmp(e, "1") == 0) {
@@ -41,13 +62,55 @@ void MarkSweepHeap::Init(int gc_threshold) {
   roots_.reserve(KiB(1));  // prevent resizing in common case
 }
 
+void MarkSweepHeap::SetNurserySize(int nursery_size) {
+  generational_ = true;
+  remember_writes_ = true;
+  nursery_size_ = nursery_size;
+  #ifndef NO_POOL_ALLOC
+  for (int i = 0; i < kNumPools; ++i) {
+    pools_[i].track_young_ = true;
+  }
+  #endif
+}
+
+// Like gc.freeze() in CPython.  After fork(), a collection in the child would
+// otherwise trace every object inherited from the parent, and rebuild the free
+// lists in their pages, which copies them.
+//
+// The mark bits are already stored outside the objects.  WriteBarrier()
+// records the frozen objects that point to objects allocated later.
+void MarkSweepHeap::Freeze() {
+  frozen_ = true;
+  remember_writes_ = true;
+
+  #ifndef NO_POOL_ALLOC
+  for (int i = 0; i < kNumPools; ++i) {
+    pools_[i].Freeze();
+  }
+  #endif
+  num_frozen_objs_ = live_objs_.size();
+  thawed_.bits_.clear();
+  num_frozen_ = num_live();
+
+  // Every object is now frozen, so none of them point to a thawed object
+  remembered_.clear();
+  frozen_remembered_.clear();
+  EndCollection();
+}
+
 int MarkSweepHeap::MaybeCollect() {
   // Maybe collect BEFORE allocation, because the new object won't be rooted
   #if GC_ALWAYS
   int result = Collect();
   #else
   int result = -1;
-  if (num_live() > gc_threshold_) {
+  if (generational_) {
+    if (num_live() - num_young_ > gc_threshold_) {
+      result = Collect();
+    } else if (num_young_ > nursery_size_) {
+      result = MinorCollect();
+    }
+  } else if (num_live() > gc_threshold_) {
     result = Collect();
   }
   #endif
@@ -66,20 +129,19 @@ BumpLeakHeap gBumpLeak;
 // TODO: Make this interface nicer.
 void* MarkSweepHeap::Allocate(size_t num_bytes, int* obj_id, int* pool_id) {
   // log("Allocate %d", num_bytes);
+  num_young_++;
+
   #ifndef NO_POOL_ALLOC
-  if (num_bytes <= pool1_.kMaxObjSize) {
-    *pool_id = 1;
-    return pool1_.Allocate(obj_id);
-  }
-  if (num_bytes <= pool2_.kMaxObjSize) {
-    *pool_id = 2;
-    return pool2_.Allocate(obj_id);
+  if (num_bytes <= kMaxPoolObjSize) {
+    int i = pool_index_[(num_bytes + 7) / 8];
+    *pool_id = i + 1;
+    return pools_[i].Allocate(obj_id);
   }
   *pool_id = 0;  // malloc(), not a pool
   #endif
 
-  // Does the pool allocator approximate a bump allocator?  Use pool2_
-  // threshold of 48 bytes.
+  // Does the pool allocator approximate a bump allocator?  Use the threshold
+  // of the 48 byte pool.
   // These only work with GC off -- OILS_GC_THRESHOLD=[big]
   #ifdef BUMP_SMALL
   if (num_bytes <= 48) {
@@ -107,6 +169,9 @@ void* MarkSweepHeap::Allocate(size_t num_bytes, int* obj_id, int* pool_id) {
   DCHECK(result != nullptr);
 
   live_objs_.push_back(static_cast<ObjHeader*>(result));
+  if (frozen_) {
+    thawed_.Insert(*obj_id);
+  }
 
   num_live_++;
   num_allocated_++;
@@ -130,43 +195,125 @@ void* MarkSweepHeap::Reallocate(void* p, size_t num_bytes) {
 // - Tag::{Opaque,FixedSized,Scanned} have their mark bits set
 // - Tag::{FixedSize,Scanned} are also pushed on the gray stack
 
-void MarkSweepHeap::MaybeMarkAndPush(RawObject* obj) {
+bool MarkSweepHeap::IsYoung(ObjHeader* header) {
+  #ifndef NO_POOL_ALLOC
+  if (header->pool_id) {
+    return pools_[header->pool_id - 1].IsYoung(header->obj_id);
+  }
+  #endif
+  return young_set_.IsMarked(header->obj_id);
+}
+
+// Set the mark bit of obj, and return its header if its children should be
+// traced, or nullptr.  kAtomic is for ParallelMarker.
+template <bool kAtomic>
+ObjHeader* MarkSweepHeap::MarkObject(RawObject* obj) {
   ObjHeader* header = ObjHeader::FromObject(obj);
   if (header->heap_tag == HeapTag::Global) {  // don't mark or push
-    return;
+    return nullptr;
+  }
+
+  // In a minor collection, old objects are assumed to be live.  Their
+  // pointers to young objects are found through the remembered set.
+  if (minor_gc_ && !IsYoung(header)) {
+    return nullptr;
+  }
+
+  // After Freeze(), the objects inherited from the parent are also assumed to
+  // be live, and aren't traced
+  if (frozen_ && !verifying_ && IsFrozen(header)) {
+    return nullptr;
   }
 
   int obj_id = header->obj_id;
   #ifndef NO_POOL_ALLOC
-  if (header->pool_id == 1) {
-    if (pool1_.IsMarked(obj_id)) {
-      return;
-    }
-    pool1_.Mark(obj_id);
-  } else if (header->pool_id == 2) {
-    if (pool2_.IsMarked(obj_id)) {
-      return;
+  if (header->pool_id) {
+    Pool& pool = pools_[header->pool_id - 1];
+    if (kAtomic) {
+      if (!pool.TestAndMark(obj_id)) {
+        return nullptr;
+      }
+    } else {
+      if (pool.IsMarked(obj_id)) {
+        return nullptr;
+      }
+      pool.Mark(obj_id);
     }
-    pool2_.Mark(obj_id);
   } else
   #endif
   {
-    if (mark_set_.IsMarked(obj_id)) {
-      return;
+    if (kAtomic) {
+      if (!mark_set_.TestAndMark(obj_id)) {
+        return nullptr;
+      }
+    } else {
+      if (mark_set_.IsMarked(obj_id)) {
+        return nullptr;
+      }
+      mark_set_.Mark(obj_id);
     }
-    mark_set_.Mark(obj_id);
   }
 
   switch (header->heap_tag) {
   case HeapTag::Opaque:  // e.g. strings have no children
-    break;
+    return nullptr;
 
   case HeapTag::Scanned:  // these 2 types have children
   case HeapTag::FixedSize:
-    gray_stack_.push_back(header);  // Push the header, not the object!
+    return header;  // Push the header, not the object!
+
+  default:
+    FAIL(kShouldNotGetHere);
+  }
+}
+
+void MarkSweepHeap::MaybeMarkAndPush(RawObject* obj) {
+  ObjHeader* header = MarkObject<false>(obj);
+  if (header) {
+    gray_stack_.push_back(header);
+  }
+}
+
+// Mark the children of an object, and push the ones to trace on stack
+template <bool kAtomic>
+void MarkSweepHeap::TraceObject(ObjHeader* header,
+                                std::vector<ObjHeader*>* stack) {
+  switch (header->heap_tag) {
+  case HeapTag::FixedSize: {
+    auto fixed = reinterpret_cast<LayoutFixed*>(header->ObjectAddress());
+    int mask = FIELD_MASK(*header);
+
+    for (int i = 0; i < kFieldMaskBits; ++i) {
+      if (mask & (1 << i)) {
+        RawObject* child = fixed->children_[i];
+        if (child) {
+          ObjHeader* h = MarkObject<kAtomic>(child);
+          if (h) {
+            stack->push_back(h);
+          }
+        }
+      }
+    }
     break;
+  }
 
+  case HeapTag::Scanned: {
+    auto slab = reinterpret_cast<Slab<RawObject*>*>(header->ObjectAddress());
+
+    int n = NUM_POINTERS(*header);
+    for (int i = 0; i < n; ++i) {
+      RawObject* child = slab->items_[i];
+      if (child) {
+        ObjHeader* h = MarkObject<kAtomic>(child);
+        if (h) {
+          stack->push_back(h);
+        }
+      }
+    }
+    break;
+  }
   default:
+    // Only FixedSize and Scanned are pushed
     FAIL(kShouldNotGetHere);
   }
 }
@@ -175,51 +322,184 @@ void MarkSweepHeap::TraceChildren() {
   while (!gray_stack_.empty()) {
     ObjHeader* header = gray_stack_.back();
     gray_stack_.pop_back();
+    TraceObject<false>(header, &gray_stack_);
+  }
+}
+
+// Traces the gray stack with heap->num_mark_threads_ threads.  Each thread
+// has a private stack, and shares half of it when it grows.  Idle threads
+// steal from the shared stacks.
+//
+// The threads are started for each collection, rather than kept in a pool,
+// because the shell forks, and only the forking thread survives fork().
+class ParallelMarker {
+ public:
+  ParallelMarker(MarkSweepHeap* heap, int num_threads)
+      : heap_(heap), num_threads_(num_threads), workers_(num_threads) {
+    for (Worker& w : workers_) {
+      pthread_mutex_init(&w.mu, nullptr);
+    }
+  }
 
-    switch (header->heap_tag) {
-    case HeapTag::FixedSize: {
-      auto fixed = reinterpret_cast<LayoutFixed*>(header->ObjectAddress());
-      int mask = FIELD_MASK(*header);
+  ~ParallelMarker() {
+    for (Worker& w : workers_) {
+      pthread_mutex_destroy(&w.mu);
+    }
+  }
 
-      for (int i = 0; i < kFieldMaskBits; ++i) {
-        if (mask & (1 << i)) {
-          RawObject* child = fixed->children_[i];
-          if (child) {
-            MaybeMarkAndPush(child);
-          }
-        }
+  void Run(std::vector<ObjHeader*>* gray_stack) {
+    // Deal out the roots
+    int i = 0;
+    for (ObjHeader* header : *gray_stack) {
+      workers_[i].local.push_back(header);
+      i = (i + 1) % num_threads_;
+    }
+    gray_stack->clear();
+
+    // The shell handles signals on the main thread
+    sigset_t all, old;
+    sigfillset(&all);
+    pthread_sigmask(SIG_SETMASK, &all, &old);
+
+    std::vector<pthread_t> threads(num_threads_ - 1);
+    std::vector<Arg> args(num_threads_ - 1);
+    for (int j = 1; j < num_threads_; ++j) {
+      args[j - 1] = {this, j};
+      CHECK(pthread_create(&threads[j - 1], nullptr, ThreadMain,
+                           &args[j - 1]) == 0);
+    }
+    pthread_sigmask(SIG_SETMASK, &old, nullptr);
+
+    Work(0);  // this thread is worker 0
+    for (pthread_t t : threads) {
+      pthread_join(t, nullptr);
+    }
+  }
+
+ private:
+  // A private stack doesn't share until it has this many objects
+  static const int kShareMin = 64;
+
+  struct Worker {
+    std::vector<ObjHeader*> local;
+    std::vector<ObjHeader*> shared;  // guarded by mu
+    int num_shared = 0;              // read without mu, for Steal()
+    pthread_mutex_t mu;
+  };
+
+  struct Arg {
+    ParallelMarker* marker;
+    int worker_id;
+  };
+
+  static void* ThreadMain(void* p) {
+    Arg* arg = static_cast<Arg*>(p);
+    arg->marker->Work(arg->worker_id);
+    return nullptr;
+  }
+
+  void Work(int i) {
+    Worker& w = workers_[i];
+    while (true) {
+      if (w.local.empty() && !Steal(i) && !WaitForWork(i)) {
+        return;
+      }
+      ObjHeader* header = w.local.back();
+      w.local.pop_back();
+      heap_->TraceObject<true>(header, &w.local);
+
+      if (static_cast<int>(w.local.size()) >= kShareMin &&
+          __atomic_load_n(&w.num_shared, __ATOMIC_RELAXED) == 0) {
+        Share(&w);
+      }
+    }
+  }
+
+  // Move the bottom half of the private stack to the shared stack
+  void Share(Worker* w) {
+    int half = w->local.size() / 2;
+    pthread_mutex_lock(&w->mu);
+    w->shared.insert(w->shared.end(), w->local.begin(),
+                     w->local.begin() + half);
+    __atomic_store_n(&w->num_shared, w->shared.size(), __ATOMIC_RELAXED);
+    pthread_mutex_unlock(&w->mu);
+    w->local.erase(w->local.begin(), w->local.begin() + half);
+  }
+
+  // Take half of a shared stack, starting with our own
+  bool Steal(int i) {
+    for (int j = 0; j < num_threads_; ++j) {
+      Worker& victim = workers_[(i + j) % num_threads_];
+      if (__atomic_load_n(&victim.num_shared, __ATOMIC_RELAXED) == 0) {
+        continue;
+      }
+      pthread_mutex_lock(&victim.mu);
+      int n = victim.shared.size();
+      int take = (n + 1) / 2;
+      auto begin = victim.shared.end() - take;
+      workers_[i].local.insert(workers_[i].local.end(), begin,
+                               victim.shared.end());
+      victim.shared.resize(n - take);
+      __atomic_store_n(&victim.num_shared, n - take, __ATOMIC_RELAXED);
+      pthread_mutex_unlock(&victim.mu);
+      if (take) {
+        return true;
       }
-      break;
     }
+    return false;
+  }
 
-    case HeapTag::Scanned: {
-      auto slab = reinterpret_cast<Slab<RawObject*>*>(header->ObjectAddress());
+  bool AnyShared() {
+    for (Worker& w : workers_) {
+      if (__atomic_load_n(&w.num_shared, __ATOMIC_RELAXED)) {
+        return true;
+      }
+    }
+    return false;
+  }
 
-      int n = NUM_POINTERS(*header);
-      for (int i = 0; i < n; ++i) {
-        RawObject* child = slab->items_[i];
-        if (child) {
-          MaybeMarkAndPush(child);
+  // Returns false when every thread is out of work.  A thread only pushes to
+  // its stacks while it's busy, so when all are idle, all stacks are empty.
+  bool WaitForWork(int i) {
+    __atomic_fetch_add(&num_idle_, 1, __ATOMIC_SEQ_CST);
+    while (true) {
+      if (__atomic_load_n(&num_idle_, __ATOMIC_SEQ_CST) == num_threads_) {
+        return false;
+      }
+      if (AnyShared()) {
+        __atomic_fetch_sub(&num_idle_, 1, __ATOMIC_SEQ_CST);
+        if (Steal(i)) {
+          return true;
         }
+        __atomic_fetch_add(&num_idle_, 1, __ATOMIC_SEQ_CST);
       }
-      break;
-    }
-    default:
-      // Only FixedSize and Scanned are pushed
-      FAIL(kShouldNotGetHere);
+      sched_yield();
     }
   }
+
+  MarkSweepHeap* heap_;
+  int num_threads_;
+  std::vector<Worker> workers_;
+  int num_idle_ = 0;
+};
+
+void MarkSweepHeap::ParallelTraceChildren() {
+  ParallelMarker marker(this, num_mark_threads_);
+  marker.Run(&gray_stack_);
+  num_parallel_marks_++;
 }
 
 void MarkSweepHeap::Sweep() {
   #ifndef NO_POOL_ALLOC
-  pool1_.Sweep();
-  pool2_.Sweep();
+  for (int i = 0; i < kNumPools; ++i) {
+    pools_[i].Sweep();
+  }
   #endif
 
-  int last_live_index = 0;
+  // Frozen objects are never swept, and always come first
+  int last_live_index = num_frozen_objs_;
   int num_objs = live_objs_.size();
-  for (int i = 0; i < num_objs; ++i) {
+  for (int i = num_frozen_objs_; i < num_objs; ++i) {
     ObjHeader* obj = live_objs_[i];
     DCHECK(obj);  // malloc() shouldn't have returned nullptr
 
@@ -233,6 +513,9 @@ void MarkSweepHeap::Sweep() {
       to_free_.push_back(obj);
       // free(obj);
       num_live_--;
+      if (frozen_) {
+        thawed_.Remove(obj->obj_id);
+      }
     }
   }
   live_objs_.resize(last_live_index);  // remove dangling objects
@@ -241,13 +524,267 @@ void MarkSweepHeap::Sweep() {
   max_survived_ = std::max(max_survived_, num_live());
 }
 
-int MarkSweepHeap::Collect() {
+// Like Sweep(), but only for objects allocated since the last collection
+void MarkSweepHeap::SweepYoung() {
+  #ifndef NO_POOL_ALLOC
+  for (int i = 0; i < kNumPools; ++i) {
+    pools_[i].SweepYoung();
+  }
+  #endif
+
+  int last_live_index = num_old_objs_;
+  int num_objs = live_objs_.size();
+  for (int i = num_old_objs_; i < num_objs; ++i) {
+    ObjHeader* obj = live_objs_[i];
+    if (mark_set_.IsMarked(obj->obj_id)) {
+      live_objs_[last_live_index++] = obj;
+    } else {
+      to_free_.push_back(obj);
+      num_live_--;
+      if (frozen_) {
+        thawed_.Remove(obj->obj_id);
+      }
+    }
+  }
+  live_objs_.resize(last_live_index);
+
+  num_minor_collections_++;
+}
+
+// Current CPU time of the process, or 0.0 if it's not measured
+static double ProcessMillis() {
+  #ifdef GC_TIMING
+  struct timespec now;
+  if (clock_gettime(CLOCK_PROCESS_CPUTIME_ID, &now) < 0) {
+    FAIL("clock_gettime failed");
+  }
+  return now.tv_sec * 1000.0 + now.tv_nsec / 1e6;
+  #else
+  return 0.0;
+  #endif
+}
+
+// Current wall time, or 0.0 if it's not measured.  The process CPU time would
+// include every thread of a parallel mark.
+static double WallMillis() {
   #ifdef GC_TIMING
-  struct timespec start, end;
-  if (clock_gettime(CLOCK_PROCESS_CPUTIME_ID, &start) < 0) {
+  struct timespec now;
+  if (clock_gettime(CLOCK_MONOTONIC, &now) < 0) {
     FAIL("clock_gettime failed");
   }
+  return now.tv_sec * 1000.0 + now.tv_nsec / 1e6;
+  #else
+  return 0.0;
+  #endif
+}
+
+void MarkSweepHeap::MarkRoots() {
+  // Note: It might be nice to get rid of double pointers
+  int num_roots = roots_.size();
+  for (int i = 0; i < num_roots; ++i) {
+    RawObject* root = *(roots_[i]);
+    if (root) {
+      MaybeMarkAndPush(root);
+    }
+  }
+
+  int num_globals = global_roots_.size();
+  for (int i = 0; i < num_globals; ++i) {
+    RawObject* root = global_roots_[i];
+    if (!root) {
+      continue;
+    }
+    MaybeMarkAndPush(root);
+
+    // Hand-written code mutates some global objects without WriteBarrier(),
+    // so scan their fields even if they're old or frozen
+    ObjHeader* header = ObjHeader::FromObject(root);
+    if (header->heap_tag == HeapTag::Global ||
+        header->heap_tag == HeapTag::Opaque) {
+      continue;
+    }
+    if ((minor_gc_ && !IsYoung(header)) ||
+        (frozen_ && !verifying_ && IsFrozen(header))) {
+      gray_stack_.push_back(header);
+    }
+  }
+}
+
+// Trace the objects that WriteBarrier() was called on, if they won't be traced
+// otherwise: old objects in a minor collection, and frozen objects.
+void MarkSweepHeap::MarkRemembered() {
+  for (ObjHeader* header : frozen_remembered_) {
+    gray_stack_.push_back(header);
+  }
+
+  for (ObjHeader* header : remembered_) {
+    if (header->heap_tag == HeapTag::Opaque) {
+      continue;
+    }
+    bool is_frozen = frozen_ && IsFrozen(header);
+    if (is_frozen) {
+      // Remember it until the next Freeze().  Note that EndCollection() can't
+      // tell, since other objects in remembered_ may have been swept.
+      frozen_remembered_.push_back(header);
+    }
+    if (is_frozen || (minor_gc_ && !IsYoung(header))) {
+      gray_stack_.push_back(header);
+    }
+  }
+}
+
+// Remove the interned strings that are about to be swept.  In a minor
+// collection, only young objects are swept.
+void MarkSweepHeap::SweepInterned(bool minor) {
+  if (interned_.size() == 0) {
+    return;
+  }
+  interned_.Sweep([this, minor](BigStr* s) {
+    ObjHeader* header = ObjHeader::FromObject(s);
+    if (header->heap_tag == HeapTag::Global) {
+      return false;
+    }
+    if (minor) {
+      return IsYoung(header) && !IsMarked(header);
+    }
+    return !IsMarked(header) && !(frozen_ && IsFrozen(header));
+  });
+}
+
+// After a major or minor collection, every object is old
+void MarkSweepHeap::EndCollection() {
+  num_old_objs_ = live_objs_.size();
+  num_young_ = 0;
+
+  remembered_.clear();
+  for (int i = 0; i < kNumPools + 1; ++i) {
+    remembered_sets_[i].Clear();
+  }
+  // So WriteBarrier() doesn't add them again
+  for (ObjHeader* header : frozen_remembered_) {
+    remembered_sets_[header->pool_id].Insert(header->obj_id);
+  }
+}
+
+int MarkSweepHeap::MinorCollect() {
+  double start_millis = ProcessMillis();
+
+  if (gc_verbose_) {
+    log("");
+    log("%2d. Minor GC with %d young objects, %d remembered",
+        num_minor_collections_, num_young_,
+        static_cast<int>(remembered_.size()));
+  }
+
+  mark_set_.ReInit(greatest_obj_id_);
+  young_set_.ReInit(greatest_obj_id_);
+  int num_objs = live_objs_.size();
+  for (int i = num_old_objs_; i < num_objs; ++i) {
+    young_set_.Mark(live_objs_[i]->obj_id);
+  }
+  #ifndef NO_POOL_ALLOC
+  for (int i = 0; i < kNumPools; ++i) {
+    pools_[i].PrepareForMinorGc();
+  }
+  #endif
+
+  minor_gc_ = true;
+  MarkRoots();
+  num_remembered_ += remembered_.size();
+  MarkRemembered();
+
+  TraceChildren();
+  minor_gc_ = false;
+
+  #ifndef OPTIMIZED
+  std::vector<ObjHeader*> young;
+  for (int i = num_old_objs_; i < num_objs; ++i) {
+    young.push_back(live_objs_[i]);
+  }
+    #ifndef NO_POOL_ALLOC
+  for (int i = 0; i < kNumPools; ++i) {
+    for (int cell_id : pools_[i].young_ids_) {
+      young.push_back(pools_[i].CellAddress(cell_id));
+    }
+  }
+    #endif
+  VerifyMarks(young);
+  #endif
+
+  SweepInterned(true);
+  SweepYoung();
+  EndCollection();
+
+  if (gc_verbose_) {
+    log("    %d live after minor sweep", num_live());
+  }
+
+  double gc_millis = ProcessMillis() - start_millis;
+  total_minor_gc_millis_ += gc_millis;
+  if (gc_millis > max_minor_gc_millis_) {
+    max_minor_gc_millis_ = gc_millis;
+  }
+
+  return num_live();  // for unit tests only
+}
+
+// Check that a full mark, through old and frozen objects, finds no object in
+// to_sweep that the partial mark missed.  A missing WriteBarrier() would make
+// the collection free a live object.
+void MarkSweepHeap::VerifyMarks(const std::vector<ObjHeader*>& to_sweep) {
+  std::vector<bool> marked;
+  for (ObjHeader* header : to_sweep) {
+    marked.push_back(IsMarked(header));
+  }
+
+  mark_set_.Clear();
+  #ifndef NO_POOL_ALLOC
+  for (int i = 0; i < kNumPools; ++i) {
+    pools_[i].ClearMarks();
+  }
+  #endif
+  verifying_ = true;
+  MarkRoots();
+  // Frozen objects may point to objects that are otherwise unreachable.  They
+  // must survive, since the frozen objects are never swept.
+  for (ObjHeader* header : frozen_remembered_) {
+    gray_stack_.push_back(header);
+  }
+  TraceChildren();
+  verifying_ = false;
+
+  // Sweeping with these marks is also correct
+  int n = to_sweep.size();
+  for (int i = 0; i < n; ++i) {
+    if (IsMarked(to_sweep[i]) && !marked[i]) {
+      log("GC missed a live object with type tag %d; is a WriteBarrier() "
+          "missing?",
+          to_sweep[i]->type_tag);
+      FAIL(kShouldNotGetHere);
+    }
+  }
+}
+
+bool MarkSweepHeap::IsFrozen(ObjHeader* header) {
+  #ifndef NO_POOL_ALLOC
+  if (header->pool_id) {
+    return pools_[header->pool_id - 1].IsFrozen(header->obj_id);
+  }
   #endif
+  return frozen_ && !thawed_.Contains(header->obj_id);
+}
+
+bool MarkSweepHeap::IsMarked(ObjHeader* header) {
+  #ifndef NO_POOL_ALLOC
+  if (header->pool_id) {
+    return pools_[header->pool_id - 1].IsMarked(header->obj_id);
+  }
+  #endif
+  return mark_set_.IsMarked(header->obj_id);
+}
+
+int MarkSweepHeap::Collect() {
+  double start_millis = ProcessMillis();
 
   int num_roots = roots_.size();
   int num_globals = global_roots_.size();
@@ -261,33 +798,57 @@ int MarkSweepHeap::Collect() {
   // Resize it
   mark_set_.ReInit(greatest_obj_id_);
   #ifndef NO_POOL_ALLOC
-  pool1_.PrepareForGc();
-  pool2_.PrepareForGc();
+  for (int i = 0; i < kNumPools; ++i) {
+    pools_[i].PrepareForGc();
+  }
   #endif
 
+  double mark_start_millis = WallMillis();
+
   // Mark roots.
-  // Note: It might be nice to get rid of double pointers
-  for (int i = 0; i < num_roots; ++i) {
-    RawObject* root = *(roots_[i]);
-    if (root) {
-      MaybeMarkAndPush(root);
-    }
+  MarkRoots();
+  MarkRemembered();
+
+  // Traverse object graph.  Starting threads isn't worth it for small heaps.
+  if (num_mark_threads_ > 1 && num_live() >= parallel_mark_min_) {
+    ParallelTraceChildren();
+  } else {
+    TraceChildren();
   }
 
-  for (int i = 0; i < num_globals; ++i) {
-    RawObject* root = global_roots_[i];
-    if (root) {
-      MaybeMarkAndPush(root);
+  double mark_millis = WallMillis() - mark_start_millis;
+
+  #ifndef OPTIMIZED
+  if (frozen_) {
+    std::vector<ObjHeader*> thawed;
+    int num_objs = live_objs_.size();
+    for (int i = num_frozen_objs_; i < num_objs; ++i) {
+      thawed.push_back(live_objs_[i]);
     }
+    #ifndef NO_POOL_ALLOC
+    for (int i = 0; i < kNumPools; ++i) {
+      pools_[i].GetThawed(&thawed);
+    }
+    #endif
+    VerifyMarks(thawed);
   }
+  #endif
 
-  // Traverse object graph.
-  TraceChildren();
-
+  double sweep_start_millis = WallMillis();
+  SweepInterned(false);
   Sweep();
+  EndCollection();
+  double sweep_millis = WallMillis() - sweep_start_millis;
+
+  total_mark_millis_ += mark_millis;
+  if (mark_millis > max_mark_millis_) {
+    max_mark_millis_ = mark_millis;
+  }
+  total_sweep_millis_ += sweep_millis;
 
   if (gc_verbose_) {
     log("    %d live after sweep", num_live());
+    log("    %.1f ms mark, %.1f ms sweep", mark_millis, sweep_millis);
   }
 
   // We know how many are live.  If the number of objects is close to the
@@ -305,14 +866,7 @@ int MarkSweepHeap::Collect() {
     }
   }
 
-  #ifdef GC_TIMING
-  if (clock_gettime(CLOCK_PROCESS_CPUTIME_ID, &end) < 0) {
-    FAIL("clock_gettime failed");
-  }
-
-  double start_secs = start.tv_sec + start.tv_nsec / 1e9;
-  double end_secs = end.tv_sec + end.tv_nsec / 1e9;
-  double gc_millis = (end_secs - start_secs) * 1000.0;
+  double gc_millis = ProcessMillis() - start_millis;
 
   if (gc_verbose_) {
     log("    %.1f ms GC", gc_millis);
@@ -322,19 +876,36 @@ int MarkSweepHeap::Collect() {
   if (gc_millis > max_gc_millis_) {
     max_gc_millis_ = gc_millis;
   }
-  #endif
 
   return num_live();  // for unit tests only
 }
 
+// Including the pools
+int MarkSweepHeap::TotalAllocated() {
+  int n = num_allocated_;
+  #ifndef NO_POOL_ALLOC
+  for (int i = 0; i < kNumPools; ++i) {
+    n += pools_[i].num_allocated();
+  }
+  #endif
+  return n;
+}
+
+int64_t MarkSweepHeap::TotalBytesAllocated() {
+  int64_t n = bytes_allocated_;
+  #ifndef NO_POOL_ALLOC
+  for (int i = 0; i < kNumPools; ++i) {
+    n += pools_[i].bytes_allocated();
+  }
+  #endif
+  return n;
+}
+
 void MarkSweepHeap::PrintShortStats() {
   #ifndef NO_POOL_ALLOC
   int fd = 2;
-  dprintf(fd, "  num allocated    = %10d\n",
-          num_allocated_ + pool1_.num_allocated() + pool2_.num_allocated());
-  dprintf(
-      fd, "bytes allocated    = %10" PRId64 "\n",
-      bytes_allocated_ + pool1_.bytes_allocated() + pool2_.bytes_allocated());
+  dprintf(fd, "  num allocated    = %10d\n", TotalAllocated());
+  dprintf(fd, "bytes allocated    = %10" PRId64 "\n", TotalBytesAllocated());
   #endif
 }
 
@@ -344,22 +915,21 @@ void MarkSweepHeap::PrintStats(int fd) {
   dprintf(fd, "  max survived     = %10d\n", max_survived_);
   dprintf(fd, "\n");
 
+  dprintf(fd, "  num allocated    = %10d\n", TotalAllocated());
   #ifndef NO_POOL_ALLOC
-  dprintf(fd, "  num allocated    = %10d\n",
-          num_allocated_ + pool1_.num_allocated() + pool2_.num_allocated());
   dprintf(fd, "  num in heap      = %10d\n", num_allocated_);
-  #else
-  dprintf(fd, "  num allocated    = %10d\n", num_allocated_);
   #endif
+  dprintf(fd, "bytes allocated    = %10" PRId64 "\n", TotalBytesAllocated());
 
   #ifndef NO_POOL_ALLOC
-  dprintf(fd, "  num in pool 1    = %10d\n", pool1_.num_allocated());
-  dprintf(fd, "  num in pool 2    = %10d\n", pool2_.num_allocated());
-  dprintf(
-      fd, "bytes allocated    = %10" PRId64 "\n",
-      bytes_allocated_ + pool1_.bytes_allocated() + pool2_.bytes_allocated());
-  #else
-  dprintf(fd, "bytes allocated    = %10" PRId64 "\n", bytes_allocated_);
+  // The free cells in each pool show fragmentation
+  dprintf(fd, "\n");
+  dprintf(fd, "  pool  cell size   allocated        live        free\n");
+  for (int i = 0; i < kNumPools; ++i) {
+    Pool& pool = pools_[i];
+    dprintf(fd, "  %4d  %9d  %10d  %10d  %10d\n", i + 1, pool.cell_size(),
+            pool.num_allocated(), pool.num_live(), pool.num_free());
+  }
   #endif
 
   dprintf(fd, "\n");
@@ -372,6 +942,34 @@ void MarkSweepHeap::PrintStats(int fd) {
   dprintf(fd, "  max gc millis    = %10.1f\n", max_gc_millis_);
   dprintf(fd, "total gc millis    = %10.1f\n", total_gc_millis_);
   dprintf(fd, "\n");
+  dprintf(fd, "  mark threads     = %10d\n", num_mark_threads_);
+  dprintf(fd, "  num parallel     = %10d\n", num_parallel_marks_);
+  dprintf(fd, "  max mark millis  = %10.1f\n", max_mark_millis_);
+  dprintf(fd, "total mark millis  = %10.1f\n", total_mark_millis_);
+  dprintf(fd, "total sweep millis = %10.1f\n", total_sweep_millis_);
+  dprintf(fd, "\n");
+  if (generational_) {
+    dprintf(fd, "  nursery size     = %10d\n", nursery_size_);
+    dprintf(fd, "  num minor gcs    = %10d\n", num_minor_collections_);
+    dprintf(fd, "  num remembered   = %10d\n", num_remembered_);
+    dprintf(fd, "  max minor millis = %10.1f\n", max_minor_gc_millis_);
+    dprintf(fd, "total minor millis = %10.1f\n", total_minor_gc_millis_);
+    dprintf(fd, "\n");
+  }
+  dprintf(fd, "  num interned     = %10d\n", interned_.size());
+  dprintf(fd, "  intern lookups   = %10d\n", interned_.num_lookups_);
+  dprintf(fd, "  intern hits      = %10d\n", interned_.num_hits_);
+  if (interned_.num_lookups_) {
+    dprintf(fd, "  intern hit rate  = %10.3f\n",
+            static_cast<double>(interned_.num_hits_) / interned_.num_lookups_);
+  }
+  dprintf(fd, "\n");
+  if (frozen_) {
+    dprintf(fd, "  num frozen       = %10d\n", num_frozen_);
+    dprintf(fd, "  num frozen rem   = %10d\n",
+            static_cast<int>(frozen_remembered_.size()));
+    dprintf(fd, "\n");
+  }
   dprintf(fd, "roots capacity     = %10d\n",
           static_cast<int>(roots_.capacity()));
   dprintf(fd, " objs capacity     = %10d\n",
@@ -412,10 +1010,16 @@ void MarkSweepHeap::FreeEverything() {
   for (auto obj : to_free_) {
     free(obj);
   }
+  // Frozen objects, and the objects they point to, are never swept
+  for (auto obj : live_objs_) {
+    free(obj);
+  }
   #ifndef NO_POOL_ALLOC
-  pool1_.Free();
-  pool2_.Free();
+  for (int i = 0; i < kNumPools; ++i) {
+    pools_[i].Free();
+  }
   #endif
+  interned_.Clear();
 }
 
 void MarkSweepHeap::CleanProcessExit() {
@@ -445,6 +1049,57 @@ void MarkSweepHeap::ProcessExit() {
   #endif
 }
 
+// Enough for the names in a small script
+const int kMinInternSlots = 256;
+
+BigStr* InternTable::Intern(BigStr* s) {
+  num_lookups_++;
+  if (s->is_interned_) {
+    num_hits_++;
+    return s;
+  }
+
+  unsigned h = s->hash(fnv1);
+  int n = len(s);
+  if (num_strs_) {
+    unsigned mask = slots_.size() - 1;
+    for (unsigned i = h & mask; slots_[i]; i = (i + 1) & mask) {
+      BigStr* t = slots_[i];
+      if (t->hash_ == h && len(t) == n && memcmp(t->data_, s->data_, n) == 0) {
+        num_hits_++;
+        return t;
+      }
+    }
+  }
+
+  Insert(s);
+  return s;
+}
+
+void InternTable::Insert(BigStr* s) {
+  if ((num_strs_ + 1) * 2 > static_cast<int>(slots_.size())) {
+    std::vector<BigStr*> old;
+    old.swap(slots_);
+    int new_size = old.empty() ? kMinInternSlots : old.size() * 2;
+    slots_.resize(new_size, nullptr);
+    num_strs_ = 0;
+    for (BigStr* t : old) {
+      if (t) {
+        Insert(t);
+      }
+    }
+  }
+
+  unsigned mask = slots_.size() - 1;
+  unsigned i = s->hash(fnv1) & mask;
+  while (slots_[i]) {
+    i = (i + 1) & mask;
+  }
+  slots_[i] = s;
+  s->is_interned_ = 1;
+  num_strs_++;
+}
+
 MarkSweepHeap gHeap;
 
 #endif  // MARK_SWEEP
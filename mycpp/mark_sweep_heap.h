@@ -34,6 +34,16 @@ class MarkSet {
     bits_[byte_index] |= (1 << bit_index);
   }
 
+  // Like IsMarked() then Mark(), but safe to call from many threads.  Returns
+  // whether the object was newly marked.
+  bool TestAndMark(int obj_id) {
+    DCHECK(obj_id >= 0);
+    uint8_t bit = 1 << (obj_id & 0b111);
+    uint8_t old =
+        __atomic_fetch_or(&bits_[obj_id >> 3], bit, __ATOMIC_RELAXED);
+    return !(old & bit);
+  }
+
   // Called by Sweep()
   bool IsMarked(int obj_id) {
     DCHECK(obj_id >= 0);
@@ -42,6 +52,57 @@ class MarkSet {
     return bits_[byte_index] & (1 << bit_index);
   }
 
+  // For sets that aren't sized by ReInit(), like the remembered set.  Returns
+  // whether obj_id was added.
+  bool Insert(int obj_id) {
+    DCHECK(obj_id >= 0);
+    int byte_index = obj_id >> 3;
+    if (byte_index >= static_cast<int>(bits_.size())) {
+      bits_.resize(byte_index + 1);
+    }
+    uint8_t bit = 1 << (obj_id & 0b111);
+    if (bits_[byte_index] & bit) {
+      return false;
+    }
+    bits_[byte_index] |= bit;
+    return true;
+  }
+
+  // Like IsMarked(), for sets that aren't sized by ReInit()
+  bool Contains(int obj_id) {
+    DCHECK(obj_id >= 0);
+    int byte_index = obj_id >> 3;
+    if (byte_index >= static_cast<int>(bits_.size())) {
+      return false;
+    }
+    return bits_[byte_index] & (1 << (obj_id & 0b111));
+  }
+
+  void Remove(int obj_id) {
+    DCHECK(Contains(obj_id));
+    bits_[obj_id >> 3] &= ~(1 << (obj_id & 0b111));
+  }
+
+  // Append the IDs in the set to out, in increasing order
+  void GetIds(std::vector<int>* out) {
+    int n = bits_.size();
+    for (int i = 0; i < n; ++i) {
+      uint8_t byte = bits_[i];
+      if (byte == 0) {
+        continue;
+      }
+      for (int j = 0; j < 8; ++j) {
+        if (byte & (1 << j)) {
+          out->push_back((i << 3) | j);
+        }
+      }
+    }
+  }
+
+  void Clear() {
+    std::fill(bits_.begin(), bits_.end(), 0);
+  }
+
   void Debug() {
     int n = bits_.size();
     dprintf(2, "[ ");
@@ -70,28 +131,39 @@ class MarkSet {
 // Note: within the context of the Pool allocator we refer to object IDs as cell
 // IDs because in addition to identifying an object they're also used to index
 // into the Cell storage.
-template <int CellsPerBlock, size_t CellSize>
 class Pool {
  public:
-  static constexpr size_t kMaxObjSize = CellSize;
-  static constexpr int kBlockSize = CellSize * CellsPerBlock;
-
   Pool() = default;
 
+  // Must be called before Allocate()
+  void Init(int cell_size, int cells_per_block) {
+    DCHECK(cell_size >= static_cast<int>(sizeof(FreeCell)));
+    cell_size_ = cell_size;
+    cells_per_block_ = cells_per_block;
+  }
+
+  int cell_size() {
+    return cell_size_;
+  }
+
+  int block_size() {
+    return cell_size_ * cells_per_block_;
+  }
+
   void* Allocate(int* obj_id) {
     num_allocated_++;
 
     if (!free_list_) {
       // Allocate a new Block and add every new Cell to the free list.
-      Block* block = static_cast<Block*>(malloc(sizeof(Block)));
+      char* block = static_cast<char*>(malloc(block_size()));
       blocks_.push_back(block);
-      bytes_allocated_ += kBlockSize;
-      num_free_ += CellsPerBlock;
+      bytes_allocated_ += block_size();
+      num_free_ += cells_per_block_;
 
       // The starting cell_id for Cells in this block.
-      int cell_id = (blocks_.size() - 1) * CellsPerBlock;
-      for (Cell& cell : block->cells) {
-        FreeCell* free_cell = reinterpret_cast<FreeCell*>(cell);
+      int cell_id = (blocks_.size() - 1) * cells_per_block_;
+      for (int i = 0; i < cells_per_block_; ++i) {
+        FreeCell* free_cell = reinterpret_cast<FreeCell*>(block + i * cell_size_);
         free_cell->id = cell_id++;
         free_cell->next = free_list_;
         free_list_ = free_cell;
@@ -102,13 +174,54 @@ class Pool {
     free_list_ = free_list_->next;
     num_free_--;
     *obj_id = cell->id;
+    if (track_young_) {
+      young_ids_.push_back(cell->id);
+    }
+    if (frozen_) {
+      thawed_.Insert(cell->id);
+    }
     return cell;
   }
 
+  // Cells allocated before this are never swept.  See MarkSweepHeap::Freeze().
+  void Freeze() {
+    frozen_ = true;
+    thawed_.bits_.clear();
+    young_ids_.clear();
+  }
+
+  // Whether the cell was allocated before Freeze() was called
+  bool IsFrozen(int cell_id) {
+    return frozen_ && !thawed_.Contains(cell_id);
+  }
+
   void PrepareForGc() {
     DCHECK(!gc_underway_);
     gc_underway_ = true;
-    mark_set_.ReInit(blocks_.size() * CellsPerBlock);
+    mark_set_.ReInit(blocks_.size() * cells_per_block_);
+  }
+
+  // Like PrepareForGc(), but only the cells allocated since the last
+  // collection will be swept
+  void PrepareForMinorGc() {
+    PrepareForGc();
+    young_set_.ReInit(blocks_.size() * cells_per_block_);
+    for (int cell_id : young_ids_) {
+      young_set_.Mark(cell_id);
+    }
+  }
+
+  // Whether the cell was allocated since the last collection.  Only valid
+  // after PrepareForMinorGc().
+  bool IsYoung(int cell_id) {
+    DCHECK(gc_underway_);
+    return young_set_.IsMarked(cell_id);
+  }
+
+  // Forget the marks of MaybeMarkAndPush(), e.g. to verify a minor GC
+  void ClearMarks() {
+    DCHECK(gc_underway_);
+    mark_set_.Clear();
   }
 
   bool IsMarked(int cell_id) {
@@ -121,17 +234,27 @@ class Pool {
     mark_set_.Mark(cell_id);
   }
 
+  bool TestAndMark(int cell_id) {
+    DCHECK(gc_underway_);
+    return mark_set_.TestAndMark(cell_id);
+  }
+
   void Sweep() {
     DCHECK(gc_underway_);
+    if (frozen_) {
+      SweepThawed();
+      return;
+    }
     // Iterate over every Cell linking the free ones into a new free list.
     num_free_ = 0;
     free_list_ = nullptr;
     int cell_id = 0;
-    for (Block* block : blocks_) {
-      for (Cell& cell : block->cells) {
+    for (char* block : blocks_) {
+      for (int i = 0; i < cells_per_block_; ++i) {
         if (!mark_set_.IsMarked(cell_id)) {
           num_free_++;
-          FreeCell* free_cell = reinterpret_cast<FreeCell*>(cell);
+          FreeCell* free_cell =
+              reinterpret_cast<FreeCell*>(block + i * cell_size_);
           free_cell->id = cell_id;
           free_cell->next = free_list_;
           free_list_ = free_cell;
@@ -139,11 +262,58 @@ class Pool {
         cell_id++;
       }
     }
+    young_ids_.clear();  // survivors are old
+    gc_underway_ = false;
+  }
+
+  // Free the unmarked cells that were allocated since the last collection
+  void SweepYoung() {
+    DCHECK(gc_underway_);
+    for (int cell_id : young_ids_) {
+      if (!mark_set_.IsMarked(cell_id)) {
+        PushFreeCell(cell_id);
+      }
+    }
+    young_ids_.clear();
+    gc_underway_ = false;
+  }
+
+  // After Freeze(), free the unmarked cells allocated since.  Unlike Sweep(),
+  // the free list isn't rebuilt, so the frozen cells are never written to.
+  void SweepThawed() {
+    DCHECK(gc_underway_);
+    std::vector<int> cell_ids;
+    thawed_.GetIds(&cell_ids);
+    for (int cell_id : cell_ids) {
+      if (!mark_set_.IsMarked(cell_id)) {
+        PushFreeCell(cell_id);
+      }
+    }
+    young_ids_.clear();
     gc_underway_ = false;
   }
 
+  // Append the cells allocated since Freeze() to out
+  void GetThawed(std::vector<ObjHeader*>* out) {
+    std::vector<int> cell_ids;
+    thawed_.GetIds(&cell_ids);
+    for (int cell_id : cell_ids) {
+      out->push_back(CellAddress(cell_id));
+    }
+  }
+
+  ObjHeader* CellAddress(int cell_id) {
+    char* block = blocks_[cell_id / cells_per_block_];
+    return reinterpret_cast<ObjHeader*>(
+        block + (cell_id % cells_per_block_) * cell_size_);
+  }
+
+  // Cells allocated since the last collection, if track_young_ is set
+  std::vector<int> young_ids_;
+  bool track_young_ = false;
+
   void Free() {
-    for (Block* block : blocks_) {
+    for (char* block : blocks_) {
       free(block);
     }
     blocks_.clear();
@@ -158,30 +328,41 @@ class Pool {
     return bytes_allocated_;
   }
 
+  int num_free() {
+    return num_free_;
+  }
+
   int num_live() {
 #ifndef OPTIMIZED
-    int capacity = blocks_.size() * CellsPerBlock;
+    int capacity = blocks_.size() * cells_per_block_;
     // log("Pool capacity = %d", capacity);
     // log("Pool num_free_ = %d", num_free_);
     DCHECK(num_free_ <= capacity);
 #endif
-    return blocks_.size() * CellsPerBlock - num_free_;
+    return blocks_.size() * cells_per_block_ - num_free_;
   }
 
  private:
-  using Cell = uint8_t[CellSize];
-
-  struct Block {
-    Cell cells[CellsPerBlock];
-  };
-
   // Unused/free cells are tracked via a linked list of FreeCells. The FreeCells
   // are stored in the unused Cells, so it takes no extra memory to track them.
   struct FreeCell {
     int id;
     FreeCell* next;
   };
-  static_assert(CellSize >= sizeof(FreeCell), "CellSize is too small");
+
+  void PushFreeCell(int cell_id) {
+    num_free_++;
+    FreeCell* free_cell = reinterpret_cast<FreeCell*>(CellAddress(cell_id));
+    free_cell->id = cell_id;
+    free_cell->next = free_list_;
+    free_list_ = free_cell;
+    if (frozen_) {
+      thawed_.Remove(cell_id);
+    }
+  }
+
+  int cell_size_ = 0;
+  int cells_per_block_ = 0;
 
   // Whether a GC is underway, for asserting that calls are in order.
   bool gc_underway_ = false;
@@ -190,20 +371,123 @@ class Pool {
   int num_free_ = 0;
   int num_allocated_ = 0;
   int64_t bytes_allocated_ = 0;
-  std::vector<Block*> blocks_;
+  std::vector<char*> blocks_;
   MarkSet mark_set_;
+  MarkSet young_set_;  // during a minor GC
+
+  // After Freeze(), the live cells that were allocated since
+  bool frozen_ = false;
+  MarkSet thawed_;
 
   DISALLOW_COPY_AND_ASSIGN(Pool);
 };
 
+// The cell sizes of the pools, which are the size classes of small objects.
+// Objects bigger than the last one are allocated with malloc().
+//
+// - 24 bytes: List and Token headers.  It's too small for slabs; see gc_list.h
+// - 48 bytes: small slabs and objects
+// - Bigger slabs are powers of 2, except the index of a Dict, which is 8 bytes
+//   more.  So there are 2 classes for every power of 2.
+//
+// pool_id in ObjHeader is 3 bits, and 0 means malloc(), so there can be at
+// most 7 pools.
+const int kPoolCellSizes[] = {24, 48, 64, 96, 128, 192, 256};
+const int kNumPools = sizeof(kPoolCellSizes) / sizeof(kPoolCellSizes[0]);
+const int kMaxPoolObjSize = kPoolCellSizes[kNumPools - 1];
+static_assert(kNumPools <= 7, "pool_id has 3 bits");
+
+// 16,384 / 24 bytes = 682 cells (rounded), 16,368 bytes
+// 16,384 / 48 bytes = 341 cells (rounded), 16,368 bytes
+// Conveniently, the glibc malloc header is 16 bytes, giving exactly 16 Ki
+// differences
+const int kPoolBlockSize = KiB(16) - 16;
+
+class ParallelMarker;
+
+const int kMaxMarkThreads = 16;
+
+class BigStr;
+
+// The strings returned by intern(), so that equal identifiers share one object.
+// Interned strings are equal only if they're the same object, and their hash
+// is computed once.
+//
+// The table holds its strings weakly: the heap removes them when they're
+// swept.  GLOBAL_STR constants are never swept.
+class InternTable {
+ public:
+  InternTable() : slots_(), num_strs_(0) {
+  }
+
+  // Returns the string in the table that's equal to s, or adds s
+  BigStr* Intern(BigStr* s);
+
+  // Remove the strings that is_dead(s) returns true for
+  template <typename F>
+  void Sweep(F is_dead) {
+    std::vector<BigStr*> live;
+    for (BigStr* s : slots_) {
+      if (s && !is_dead(s)) {
+        live.push_back(s);
+      }
+    }
+    std::fill(slots_.begin(), slots_.end(), nullptr);
+    num_strs_ = 0;
+    for (BigStr* s : live) {
+      Insert(s);
+    }
+  }
+
+  void Clear() {
+    slots_.clear();
+    num_strs_ = 0;
+  }
+
+  int size() {
+    return num_strs_;
+  }
+
+  // Cumulative stats
+  int num_lookups_ = 0;
+  int num_hits_ = 0;
+
+ private:
+  void Insert(BigStr* s);  // s must not be in the table
+
+  // Open addressing with linear probing.  The size is a power of 2, and at
+  // most half of the slots are used.
+  std::vector<BigStr*> slots_;
+  int num_strs_;
+
+  DISALLOW_COPY_AND_ASSIGN(InternTable);
+};
+
 class MarkSweepHeap {
  public:
   // reserve 32 frames to start
   MarkSweepHeap() {
+#ifndef NO_POOL_ALLOC
+    int pool_index = 0;
+    for (int i = 0; i < kNumPools; ++i) {
+      int cell_size = kPoolCellSizes[i];
+      pools_[i].Init(cell_size, kPoolBlockSize / cell_size);
+
+      // Objects of up to cell_size bytes go in this pool
+      for (; pool_index <= cell_size / 8; ++pool_index) {
+        pool_index_[pool_index] = i;
+      }
+    }
+#endif
   }
 
   void Init();  // use default threshold
   void Init(int gc_threshold);
+  void SetNurserySize(int nursery_size);  // turn on generational mode
+
+  // Called in a forked child.  The objects that exist now are never traced or
+  // swept, so the pages shared with the parent aren't written to.
+  void Freeze();
 
   void PushRoot(RawObject** p) {
     roots_.push_back(p);
@@ -219,16 +503,33 @@ class MarkSweepHeap {
 
   void* Allocate(size_t num_bytes, int* obj_id, int* pool_id);
 
+  // Must be called after a pointer to a GC object is stored in obj, in case
+  // obj is old and the pointee is young
+  void WriteBarrier(void* obj) {
+    if (!remember_writes_) {
+      return;
+    }
+    ObjHeader* header = ObjHeader::FromObject(obj);
+    if (header->heap_tag == HeapTag::Global) {
+      return;
+    }
+    if (remembered_sets_[header->pool_id].Insert(header->obj_id)) {
+      remembered_.push_back(header);
+    }
+  }
+
 #if 0
   void* Reallocate(void* p, size_t num_bytes);
 #endif
   int MaybeCollect();
   int Collect();
+  int MinorCollect();
 
   void MaybeMarkAndPush(RawObject* obj);
   void TraceChildren();
 
   void Sweep();
+  void SweepYoung();
 
   void PrintStats(int fd);  // public for testing
   void PrintShortStats();
@@ -237,11 +538,13 @@ class MarkSweepHeap {
   void ProcessExit();       // main() lets OS clean up, except ASAN variant
 
   int num_live() {
-    return num_live_
+    int n = num_live_;
 #ifndef NO_POOL_ALLOC
-           + pool1_.num_live() + pool2_.num_live()
+    for (int i = 0; i < kNumPools; ++i) {
+      n += pools_[i].num_live();
+    }
 #endif
-        ;
+    return n;
   }
 
   bool is_initialized_ = true;  // mark/sweep doesn't need to be initialized
@@ -252,6 +555,24 @@ class MarkSweepHeap {
   // total bytes
   int gc_threshold_;
 
+  // In generational mode, a minor collection is done when this many objects
+  // were allocated since the last collection.  A major collection is done
+  // when the objects that survived a collection exceed gc_threshold_.
+  bool generational_ = false;
+  int nursery_size_ = 0;
+
+  // Whether Freeze() was called
+  bool frozen_ = false;
+
+  // Whether WriteBarrier() records objects, in generational mode or after
+  // Freeze()
+  bool remember_writes_ = false;
+
+  // Threads that mark in a major collection, if there are at least
+  // parallel_mark_min_ live objects
+  int num_mark_threads_ = 1;
+  int parallel_mark_min_ = 100000;
+
   // Show debug logging
   bool gc_verbose_ = false;
 
@@ -270,20 +591,63 @@ class MarkSweepHeap {
   double max_gc_millis_ = 0.0;
   double total_gc_millis_ = 0.0;
 
+  // Pauses of the phases of major collections
+  int num_parallel_marks_ = 0;
+  double max_mark_millis_ = 0.0;
+  double total_mark_millis_ = 0.0;
+  double total_sweep_millis_ = 0.0;
+
+  int num_minor_collections_ = 0;
+  int num_remembered_ = 0;  // objects in the remembered set of each collection
+  double max_minor_gc_millis_ = 0.0;
+  double total_minor_gc_millis_ = 0.0;
+
+  int num_frozen_ = 0;  // objects that were live at the last Freeze()
+
 #ifndef NO_POOL_ALLOC
-  // 16,384 / 24 bytes = 682 cells (rounded), 16,368 bytes
-  // 16,384 / 48 bytes = 341 cells (rounded), 16,368 bytes
-  // Conveniently, the glibc malloc header is 16 bytes, giving exactly 16 Ki
-  // differences
-  Pool<682, 24> pool1_;
-  Pool<341, 48> pool2_;
+  // The object with pool_id N is in pools_[N - 1]
+  Pool pools_[kNumPools];
+
+  // Index of the pool for an object of N bytes, by (N + 7) / 8
+  uint8_t pool_index_[kMaxPoolObjSize / 8 + 1];
 #endif
 
   std::vector<RawObject**> roots_;
   std::vector<RawObject*> global_roots_;
 
-  // Allocate() appends live objects, and Sweep() compacts it
+  // Allocate() appends live objects, and Sweep() compacts it.  The objects
+  // before num_old_objs_ have survived a collection, and the ones before
+  // num_frozen_objs_ were live at Freeze().
   std::vector<ObjHeader*> live_objs_;
+  int num_old_objs_ = 0;
+  int num_frozen_objs_ = 0;
+
+  // After Freeze(), the IDs of the live objects from malloc() that were
+  // allocated since
+  MarkSet thawed_;
+
+  // Objects allocated since the last collection
+  int num_young_ = 0;
+
+  // Objects that WriteBarrier() was called on since the last collection, and
+  // a set of their IDs for each pool_id
+  std::vector<ObjHeader*> remembered_;
+  MarkSet remembered_sets_[kNumPools + 1];
+
+  // Frozen objects that WriteBarrier() was called on.  They're never traced,
+  // so they stay remembered across collections.
+  std::vector<ObjHeader*> frozen_remembered_;
+
+  // During a minor collection, the young objects from malloc()
+  MarkSet young_set_;
+  bool minor_gc_ = false;
+
+  // In debug builds, trace through old and frozen objects too
+  bool verifying_ = false;
+
+  // See intern() in gc_builtins.cc
+  InternTable interned_;
+
   // Allocate lazily frees these, and Sweep() replenishes it
   std::vector<ObjHeader*> to_free_;
 
@@ -293,8 +657,27 @@ class MarkSweepHeap {
   int greatest_obj_id_ = 0;
 
  private:
+  friend class ParallelMarker;
+
   void FreeEverything();
   void MaybePrintStats();
+  int TotalAllocated();
+  int64_t TotalBytesAllocated();
+
+  template <bool kAtomic>
+  ObjHeader* MarkObject(RawObject* obj);
+  template <bool kAtomic>
+  void TraceObject(ObjHeader* header, std::vector<ObjHeader*>* stack);
+  void ParallelTraceChildren();
+
+  bool IsYoung(ObjHeader* header);
+  bool IsFrozen(ObjHeader* header);
+  bool IsMarked(ObjHeader* header);
+  void MarkRoots();
+  void MarkRemembered();
+  void SweepInterned(bool minor);
+  void EndCollection();
+  void VerifyMarks(const std::vector<ObjHeader*>& to_sweep);
 
   DISALLOW_COPY_AND_ASSIGN(MarkSweepHeap);
 };
@@ -1,6 +1,8 @@
 #include "mycpp/mark_sweep_heap.h"
 
-#include "mycpp/gc_alloc.h"  // gHeap
+#include "mycpp/gc_alloc.h"     // gHeap
+#include "mycpp/gc_builtins.h"  // intern()
+#include "mycpp/gc_dict.h"
 #include "mycpp/gc_list.h"
 #include "vendor/greatest.h"
 
@@ -172,12 +174,13 @@ TEST cycle_collection_test() {
 }
 
 TEST pool_sanity_check() {
-  Pool<2, 32> p;
+  Pool p;
+  p.Init(32, 2);
 
   ASSERT_EQ(p.bytes_allocated(), 0);
   ASSERT_EQ(p.num_allocated(), 0);
   ASSERT_EQ(p.num_live(), 0);
-  ASSERT_EQ(p.kMaxObjSize, 32);
+  ASSERT_EQ(p.cell_size(), 32);
 
   int obj_id1 = -1;
   int obj_id2 = -1;
@@ -198,7 +201,8 @@ TEST pool_sanity_check() {
 }
 
 TEST pool_sweep() {
-  Pool<2, 32> p;
+  Pool p;
+  p.Init(32, 2);
 
   p.PrepareForGc();
   p.Sweep();
@@ -222,7 +226,8 @@ TEST pool_sweep() {
 }
 
 TEST pool_marked_objs_are_kept_alive() {
-  Pool<1, 32> p;
+  Pool p;
+  p.Init(32, 1);
 
   int obj_id1;
   int obj_id2;
@@ -239,28 +244,46 @@ TEST pool_marked_objs_are_kept_alive() {
 
 TEST pool_size() {
   MarkSweepHeap heap;
-  log("pool1 kMaxObjSize %d", heap.pool1_.kMaxObjSize);
-  log("pool1 kBlockSize %d", heap.pool1_.kBlockSize);
+  for (int i = 0; i < kNumPools; ++i) {
+    Pool &pool = heap.pools_[i];
+    log("pool %d cell_size %d block_size %d", i + 1, pool.cell_size(),
+        pool.block_size());
+    ASSERT(pool.block_size() <= kPoolBlockSize);
+
+    // It may do malloc() of a block each time, e.g. 16368 bytes
+    for (int j = 0; j < 200; ++j) {
+      int obj_id = 0;
+      pool.Allocate(&obj_id);
+      // log("pool obj_id = %d", obj_id);
+    }
+    ASSERT_EQ(200, pool.num_live());
+    pool.Free();
+  }
+
+  PASS();
+}
 
-  log("pool2 kMaxObjSize %d", heap.pool2_.kMaxObjSize);
-  log("pool2 kBlockSize %d", heap.pool2_.kBlockSize);
+TEST pool_size_classes() {
+  MarkSweepHeap heap;
 
-  // It may do malloc(sizeof(Block)) each time, e.g. 4080 bytes
-  for (int i = 0; i < 200; ++i) {
-    int obj_id = 0;
-    heap.pool1_.Allocate(&obj_id);
-    // log("pool1 obj_id = %d", obj_id);
+  // Each object goes in the smallest cell that fits
+  for (int num_bytes = 1; num_bytes <= kMaxPoolObjSize; ++num_bytes) {
+    int obj_id = -1;
+    int pool_id = -1;
+    heap.Allocate(num_bytes, &obj_id, &pool_id);
+    ASSERT(1 <= pool_id && pool_id <= kNumPools);
+
+    int cell_size = heap.pools_[pool_id - 1].cell_size();
+    ASSERT(num_bytes <= cell_size);
+    if (pool_id > 1) {
+      ASSERT(num_bytes > heap.pools_[pool_id - 2].cell_size());
+    }
   }
 
-  for (int i = 0; i < 200; ++i) {
-    int obj_id = 0;
-    heap.pool2_.Allocate(&obj_id);
-    // log("pool2 obj_id = %d", obj_id);
+  for (int i = 0; i < kNumPools; ++i) {
+    heap.pools_[i].Free();
   }
 
-  heap.pool1_.Free();
-  heap.pool2_.Free();
-
   PASS();
 }
 
@@ -269,6 +292,7 @@ SUITE(pool_alloc) {
   RUN_TEST(pool_sweep);
   RUN_TEST(pool_marked_objs_are_kept_alive);
   RUN_TEST(pool_size);
+  RUN_TEST(pool_size_classes);
 }
 
 int f(BigStr *s, List<int> *mylist) {
@@ -344,6 +368,218 @@ TEST timing_test() {
   PASS();
 }
 
+TEST parallel_mark_test() {
+  List<List<BigStr *> *> *outer = nullptr;
+  List<BigStr *> *inner = nullptr;
+  StackRoots _roots({&outer, &inner});
+
+  int num_live = gHeap.Collect();
+
+  // A wide graph, so every thread gets work, with some garbage
+  outer = NewList<List<BigStr *> *>();
+  for (int i = 0; i < 500; ++i) {
+    inner = NewList<BigStr *>();
+    for (int j = 0; j < 20; ++j) {
+      inner->append(StrFromC("x"));
+      StrFromC("garbage");
+    }
+    outer->append(inner);
+  }
+  // Shared children are marked once
+  outer->append(outer->at(0));
+  inner = nullptr;
+
+  int serial_live = gHeap.Collect();
+  ASSERT(serial_live > num_live + 500 * 21);
+
+  gHeap.num_mark_threads_ = 4;
+  gHeap.parallel_mark_min_ = 0;
+
+  int num_parallel = gHeap.num_parallel_marks_;
+  ASSERT_EQ_FMT(serial_live, gHeap.Collect(), "%d");
+  ASSERT_EQ_FMT(num_parallel + 1, gHeap.num_parallel_marks_, "%d");
+
+  // Objects that are no longer reachable are swept.  The first pop() is the
+  // shared list.
+  for (int i = 0; i < 100; ++i) {
+    outer->pop();
+  }
+  int expected = serial_live - 99 * (1 + 1 + 20);  // list, slab, items
+  ASSERT_EQ_FMT(expected, gHeap.Collect(), "%d");
+
+  for (int i = 0; i < 401; ++i) {
+    ASSERT_EQ(20, len(outer->at(i)));
+    ASSERT(str_equals(StrFromC("x"), outer->at(i)->at(19)));
+  }
+
+  gHeap.num_mark_threads_ = 1;
+  PASS();
+}
+
+GLOBAL_STR(kGlobalName, "global_name");
+
+TEST interned_test() {
+  BigStr *s = nullptr;
+  BigStr *t = nullptr;
+  Dict<BigStr *, int> *d = nullptr;
+  StackRoots _roots({&s, &t, &d});
+
+  int num_interned = gHeap.interned_.size();
+  int num_hits = gHeap.interned_.num_hits_;
+
+  s = intern(StrFromC("interned_name"));
+  t = intern(StrFromC("interned_name"));
+  ASSERT_EQ(s, t);
+  ASSERT_EQ(num_interned + 1, gHeap.interned_.size());
+  ASSERT_EQ(num_hits + 1, gHeap.interned_.num_hits_);
+
+  // Unequal interned strings are unequal objects, but equal to copies
+  t = intern(StrFromC("interned_other"));
+  ASSERT(!str_equals(s, t));
+  ASSERT(str_equals(StrFromC("interned_name"), s));
+
+  // The table doesn't keep strings alive
+  t = nullptr;
+  gHeap.Collect();
+  ASSERT_EQ(num_interned + 1, gHeap.interned_.size());
+  ASSERT_EQ(s, intern(StrFromC("interned_name")));
+
+  // Grow the table, then remove what was added
+  for (int i = 0; i < 1000; ++i) {
+    t = intern(str(i));
+    ASSERT_EQ(t, intern(str(i)));
+  }
+  ASSERT_EQ(num_interned + 1001, gHeap.interned_.size());
+  gHeap.Collect();
+  ASSERT_EQ(num_interned + 2, gHeap.interned_.size());  // s and the last t
+
+  s = nullptr;
+  t = nullptr;
+  gHeap.Collect();
+  ASSERT_EQ(num_interned, gHeap.interned_.size());
+
+  // A GLOBAL_STR that's used as a dict key is in the table, so names share it
+  d = Alloc<Dict<BigStr *, int>>();
+  d->set(kGlobalName, 42);
+  s = intern(StrFromC("global_name"));
+  ASSERT_EQ(kGlobalName, s);
+  ASSERT_EQ(42, d->at(s));
+
+  d = nullptr;
+  s = nullptr;
+  gHeap.Collect();
+  ASSERT_EQ(kGlobalName, intern(StrFromC("global_name")));
+
+  PASS();
+}
+
+// Longer than the biggest pool cells, so it's allocated with malloc()
+const char* kLongStr =
+    "0123456789012345678901234567890123456789012345678901234567890123456789"
+    "0123456789012345678901234567890123456789012345678901234567890123456789"
+    "0123456789012345678901234567890123456789012345678901234567890123456789"
+    "0123456789012345678901234567890123456789012345678901234567890123456789";
+
+TEST freeze_test() {
+  List<BigStr *> *frozen_list = nullptr;
+  StackRoots _roots({&frozen_list});
+
+  int num_live = gHeap.Collect();
+
+  frozen_list = NewList<BigStr *>();
+  frozen_list->reserve(8);
+  frozen_list->append(StrFromC("frozen"));
+  // Garbage that's never swept
+  StrFromC("garbage");
+  StrFromC(kLongStr);
+
+  gHeap.Freeze();
+  num_live += 5;
+  ASSERT_EQ_FMT(num_live, gHeap.Collect(), "%d");
+
+  // A frozen object that points to new objects keeps them alive
+  frozen_list->append(StrFromC("thawed"));
+  frozen_list->append(StrFromC(kLongStr));
+  for (int i = 0; i < 10; ++i) {
+    StrFromC("garbage");
+    StrFromC(kLongStr);
+  }
+  num_live += 2;
+  ASSERT_EQ_FMT(num_live, gHeap.Collect(), "%d");
+  ASSERT(gHeap.frozen_remembered_.size() > 0);
+
+  // It stays remembered
+  ASSERT_EQ_FMT(num_live, gHeap.Collect(), "%d");
+  ASSERT_EQ(3, len(frozen_list));
+  ASSERT(str_equals(StrFromC("frozen"), frozen_list->at(0)));
+  ASSERT(str_equals(StrFromC("thawed"), frozen_list->at(1)));
+  ASSERT(str_equals(StrFromC(kLongStr), frozen_list->at(2)));
+
+  // Frozen objects are never freed
+  frozen_list = nullptr;
+  ASSERT_EQ_FMT(num_live, gHeap.Collect(), "%d");
+
+  PASS();
+}
+
+TEST minor_collection_test() {
+  // Turn on generational mode.  Leave it on; this test runs last.
+  gHeap.SetNurserySize(1000);
+  gHeap.Collect();
+
+  List<BigStr *> *old_list = nullptr;
+  BigStr *young_str = nullptr;
+  StackRoots _roots({&old_list, &young_str});
+
+  old_list = NewList<BigStr *>();
+  old_list->append(StrFromC("old"));
+  gHeap.Collect();  // old_list and its items are now old
+  int num_old = gHeap.num_live();
+
+  // Young objects that are only reachable through an old one
+  old_list->append(StrFromC("young_0"));
+  for (int i = 0; i < 100; ++i) {
+    old_list->append(StrFromC("young_1"));
+  }
+  // Garbage
+  for (int i = 0; i < 50; ++i) {
+    StrFromC("garbage");
+  }
+  // A young root
+  young_str = StrFromC("young_root");
+
+  // 101 young strings in the list, a new slab, and the root survive
+  ASSERT_EQ_FMT(num_old + 103, gHeap.MinorCollect(), "%d");
+  ASSERT(gHeap.num_remembered_ > 0);
+
+  ASSERT_EQ(102, len(old_list));
+  ASSERT(str_equals(StrFromC("old"), old_list->at(0)));
+  ASSERT(str_equals(StrFromC("young_0"), old_list->at(1)));
+  ASSERT(str_equals(StrFromC("young_1"), old_list->at(101)));
+  ASSERT(str_equals(StrFromC("young_root"), young_str));
+
+  // Survivors are old now, so nothing is freed
+  int num_live = gHeap.MinorCollect();
+  ASSERT_EQ_FMT(num_old + 103, num_live, "%d");
+
+  // Only a major collection frees old objects
+  old_list = nullptr;
+  ASSERT_EQ_FMT(num_live, gHeap.MinorCollect(), "%d");
+  // The list, 2 slabs, and 102 strings
+  ASSERT_EQ_FMT(num_live - 105, gHeap.Collect(), "%d");
+
+  // Interned strings are removed by a minor collection too
+  int num_interned = gHeap.interned_.size();
+  young_str = intern(StrFromC("young_name"));
+  intern(StrFromC("young_garbage"));
+  ASSERT_EQ(num_interned + 2, gHeap.interned_.size());
+  gHeap.MinorCollect();
+  ASSERT_EQ(num_interned + 1, gHeap.interned_.size());
+  ASSERT_EQ(young_str, intern(StrFromC("young_name")));
+
+  PASS();
+}
+
 GREATEST_MAIN_DEFS();
 
 int main(int argc, char **argv) {
@@ -362,6 +598,10 @@ int main(int argc, char **argv) {
 
   RUN_TEST(hybrid_root_test);
   RUN_TEST(timing_test);
+  RUN_TEST(parallel_mark_test);
+  RUN_TEST(interned_test);
+  RUN_TEST(freeze_test);
+  RUN_TEST(minor_collection_test);
 
   gHeap.CleanProcessExit();
 
@@ -40,6 +40,13 @@ def MaybeCollect():
     pass
 
 
+def FreezeHeap():
+    # type: () -> None
+    """Called in a forked child, so it doesn't collect the objects it
+    inherited.  Their pages stay shared with the parent."""
+    pass
+
+
 def PrintGcStats():
     # type: () -> None
     pass
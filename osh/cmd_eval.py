@@ -86,7 +86,9 @@ from frontend import lexer
 from frontend import location
 from frontend import typed_args
 from osh import braces
+from osh import glob_
 from osh import sh_expr_eval
+from osh import word_
 from osh import word_eval
 from mycpp import iolib
 from mycpp import mops
@@ -284,6 +286,38 @@ class ctx_LoopLevel(object):
         self.cmd_ev.loop_level -= 1
 
 
+class _CaseTable(object):
+    """Dispatch table for a shell-style case statement.
+
+    It's built once per command.Case node.  Patterns that are static words
+    don't need to be evaluated again:
+
+    - Literal patterns like --verbose or 'foo' go in a dict.
+    - Glob patterns like -* are turned into fnmatch() patterns once.
+
+    Arms with dynamic patterns like $x are still evaluated every time, in
+    order, so side effects and first-match semantics are preserved.
+    """
+
+    def __init__(self, num_arms):
+        # type: (int) -> None
+        self.num_arms = num_arms
+
+        # literal string -> indices of the arms it appears in, ascending
+        self.literals = {}  # type: Dict[str, List[int]]
+
+        # Indices of arms that need fnmatch() or evaluation, ascending
+        self.slow_arms = []  # type: List[int]
+
+        # For each arm, its static glob patterns, or None if the words must be
+        # evaluated at runtime
+        self.globs = []  # type: List[Optional[List[str]]]
+
+
+# When scripts eval many case statements, don't hold onto every node
+_MAX_CASE_TABLES = 1000
+
+
 class CommandEvaluator(object):
     """Executes the program by tree-walking.
 
@@ -338,6 +372,7 @@ class CommandEvaluator(object):
         self.check_command_sub_status = False  # a hack.  Modified by ShellExecutor
 
         self.status_array_pool = []  # type: List[StatusArray]
+        self.case_tables = {}  # type: Dict[command.Case, _CaseTable]
 
     def CheckCircularDeps(self):
         # type: () -> None
@@ -1426,10 +1461,119 @@ class CommandEvaluator(object):
         assert status != -1, 'Should have been initialized'
         return status
 
+    def _GetCaseTable(self, node):
+        # type: (command.Case) -> _CaseTable
+        table = self.case_tables.get(node)
+        if table is not None:
+            return table
+
+        table = _CaseTable(len(node.arms))
+        for i, case_arm in enumerate(node.arms):
+            # Shell-style case only has pat.Words
+            pat_words = cast(pat.Words, case_arm.pattern)
+
+            globs = []  # type: Optional[List[str]]
+            for pat_word in pat_words.words:
+                ok, _, _ = word_.StaticEval(pat_word)
+                if not ok:
+                    globs = None  # evaluate the whole arm at runtime
+                    break
+            if globs is not None:
+                for pat_word in pat_words.words:
+                    # Static words have no side effects
+                    word_val = self.word_ev.EvalWordToString(
+                        pat_word, word_eval.QUOTE_FNMATCH)
+                    if glob_.LooksLikeGlob(word_val.s):
+                        globs.append(word_val.s)
+                    else:
+                        literal = glob_.GlobUnescape(word_val.s)
+                        arms = table.literals.get(literal)
+                        if arms is None:
+                            table.literals[literal] = [i]
+                        elif arms[-1] != i:
+                            arms.append(i)
+
+            table.globs.append(globs)
+            if globs is None or len(globs):
+                table.slow_arms.append(i)
+
+        if len(self.case_tables) >= _MAX_CASE_TABLES:
+            self.case_tables.clear()
+        self.case_tables[node] = table
+        return table
+
+    def _CaseMatch(self, node, table, to_match, start):
+        # type: (command.Case, _CaseTable, str, int) -> int
+        """Return the index of the first arm at or after start that matches,
+        or -1."""
+        end = table.num_arms
+        lit_arms = table.literals.get(to_match)
+        if lit_arms is not None:
+            for i in lit_arms:
+                if i >= start:
+                    end = i
+                    break
+
+        # Test the arms that come before the literal match
+        for i in table.slow_arms:
+            if i < start:
+                continue
+            if i >= end:
+                break
+
+            globs = table.globs[i]
+            if globs is None:
+                pat_words = cast(pat.Words, node.arms[i].pattern)
+                for pat_word in pat_words.words:
+                    word_val = self.word_ev.EvalWordToString(
+                        pat_word, word_eval.QUOTE_FNMATCH)
+                    if libc.fnmatch(word_val.s, to_match, 0):
+                        return i
+            else:
+                for glob_pat in globs:
+                    if libc.fnmatch(glob_pat, to_match, 0):
+                        return i
+
+        return -1 if end == table.num_arms else end
+
+    def _DoShellCase(self, node, to_match):
+        # type: (command.Case, str) -> int
+        """Like _DoCase(), but uses a _CaseTable."""
+        table = self._GetCaseTable(node)
+
+        status = 0
+        i = self._CaseMatch(node, table, to_match, 0)
+        while i != -1:
+            case_arm = node.arms[i]
+            status = self._ExecuteList(case_arm.action)
+
+            if case_arm.right is None:
+                break
+            id_ = case_arm.right.id
+            if id_ == Id.Op_SemiAmp:
+                # ;& runs the next arm without testing it
+                i += 1
+                if i == table.num_arms:
+                    break
+            elif id_ == Id.Op_DSemiAmp:
+                # ;;& tests the arms after this one
+                i = self._CaseMatch(node, table, to_match, i + 1)
+            else:
+                break
+
+        return status
+
     def _DoCase(self, node):
         # type: (command.Case) -> int
 
         to_match = self._EvalCaseArg(node.to_match, node.case_kw)
+
+        if (node.to_match.tag() == case_arg_e.Word and
+                to_match.tag() == value_e.Str and
+                not self.exec_opts.nocasematch()):
+            to_match_str = cast(value.Str, to_match)
+            return self._DoShellCase(node, to_match_str.s)
+
         fnmatch_flags = FNM_CASEFOLD if self.exec_opts.nocasematch() else 0
 
         status = 0  # If there are no arms, it should be zero?
@@ -19,6 +19,7 @@ from _devbuild.gen.syntax_asdl import (
     parse_result,
     parse_result_t,
     command,
+    command_e,
     command_t,
     condition,
     condition_t,
@@ -220,10 +221,10 @@ def _MakeAssignPair(parse_ctx, preparsed, arena):
 
     if left_token.id == Id.Lit_VarLike:  # s=1
         if lexer.IsPlusEquals(left_token):
-            var_name = lexer.TokenSliceRight(left_token, -2)
+            var_name = intern(lexer.TokenSliceRight(left_token, -2))
             op = assign_op_e.PlusEqual
         else:
-            var_name = lexer.TokenSliceRight(left_token, -1)
+            var_name = intern(lexer.TokenSliceRight(left_token, -1))
             op = assign_op_e.Equal
 
         lhs = sh_lhs.Name(left_token, var_name)
@@ -303,7 +304,7 @@ def _AppendMoreEnv(preparsed_list, more_env):
         if lexer.IsPlusEquals(left_token):
             p_die('Expected = in environment binding, got +=', left_token)
 
-        var_name = lexer.TokenSliceRight(left_token, -1)
+        var_name = intern(lexer.TokenSliceRight(left_token, -1))
 
         parts = preparsed.w.parts
         n = len(parts)
@@ -2631,6 +2632,24 @@ class CommandParser(object):
 
         return command.AndOr(children, ops)
 
+    def _AppendBoundaries(self, node):
+        # type: (command_t) -> None
+        """For completion, record the && || | operators of a top level
+        command.  A parse can resume after them."""
+        UP_node = node
+        with tagswitch(node) as case:
+            if case(command_e.AndOr):
+                node = cast(command.AndOr, UP_node)
+                for i, child in enumerate(node.children):
+                    self._AppendBoundaries(child)
+                    if i < len(node.ops):
+                        self.parse_ctx.trail.AppendBoundary(node.ops[i])
+
+            elif case(command_e.Pipeline):
+                node = cast(command.Pipeline, UP_node)
+                for op in node.ops:
+                    self.parse_ctx.trail.AppendBoundary(op)
+
     # NOTE: _ParseCommandLine and _ParseCommandTerm are similar, but different.
 
     # At the top level, we execute after every line, e.g. to
@@ -2671,12 +2690,20 @@ class CommandParser(object):
         children = []  # type: List[command_t]
         done = False
         while not done:
+            self._GetWord()
+            multiline = self.c_id == Id.Lit_TDot
             child = self.ParseAndOr()
+            # Pending here docs and ... span lines, so completion can't resume
+            # in the middle of them
+            if not multiline and len(self.pending_here_docs) == 0:
+                self._AppendBoundaries(child)
 
             self._GetWord()
             if self.c_id in (Id.Op_Semi, Id.Op_Amp):
                 tok = cast(Token, self.cur_word)  # for MyPy
                 child = command.Sentence(child, tok)
+                if len(self.pending_here_docs) == 0:
+                    self.parse_ctx.trail.AppendBoundary(tok)
                 self._SetNext()
 
                 self._GetWord()
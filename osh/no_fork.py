@@ -0,0 +1,616 @@
+#!/usr/bin/env python2
+"""
+no_fork.py - Decide whether $(...) can run without forking.
+
+With shopt -s no_fork_command_sub, the body of a command sub runs in the shell
+process when it only uses builtins that write to stdout and shell functions,
+and can't change shell state.  For example:
+
+    x=$(echo hi)
+    y=$(myfunc "$x")     # if myfunc is "pure" too
+
+Everything else forks as usual, e.g. external commands, 'exit', 'cd', and
+assignments that would leak out of the subshell:
+
+    z=$(a=1; echo $a)
+
+Inside shell functions, assignments are allowed to names declared with 'local'
+or 'declare' at the top level of the function body, before they're used.  A
+'local' that may not run, like one in an 'if' branch, makes the command sub
+fork.  The check is static and conservative: it doesn't need to accept every
+safe command sub.
+"""
+from __future__ import print_function
+
+from _devbuild.gen.id_kind_asdl import Id
+from _devbuild.gen.option_asdl import builtin_i
+from _devbuild.gen.syntax_asdl import (
+    arith_expr,
+    arith_expr_e,
+    arith_expr_t,
+    bool_expr,
+    bool_expr_e,
+    bool_expr_t,
+    bracket_op_e,
+    case_arg,
+    case_arg_e,
+    command,
+    command_e,
+    command_t,
+    condition_e,
+    condition_t,
+    for_iter,
+    for_iter_e,
+    pat,
+    pat_e,
+    redir_loc_e,
+    redir_param,
+    redir_param_e,
+    rhs_word_e,
+    rhs_word_t,
+    sh_lhs,
+    sh_lhs_e,
+    suffix_op,
+    suffix_op_e,
+    word,
+    word_e,
+    word_t,
+    word_part,
+    word_part_e,
+    word_part_t,
+    BraceGroup,
+    BracedVarSub,
+    CommandSub,
+    CompoundWord,
+    DoubleQuoted,
+    List_of_command,
+    ShArrayLiteral,
+    SimpleVarSub,
+    Token,
+)
+from _devbuild.gen.value_asdl import value, value_e
+from frontend import consts
+from frontend import lexer
+from frontend import match
+from mycpp.mylib import tagswitch
+from osh import word_
+
+from typing import cast, Dict, List, Optional, Tuple, TYPE_CHECKING
+if TYPE_CHECKING:
+    from core import optview
+    from core import state
+
+# Builtins that only write to stdout or return a status.  'printf -v' is
+# checked separately.
+_NO_FORK_BUILTINS = [
+    builtin_i.echo,
+    builtin_i.printf,
+    builtin_i.write,
+    builtin_i.pwd,
+    builtin_i.true_,
+    builtin_i.false_,
+    builtin_i.colon,
+    builtin_i.test,
+    builtin_i.bracket,
+    builtin_i.cat,  # for $(<file)
+]
+
+# Assignment builtins that make a local variable in a function
+_LOCAL_BUILTINS = ['local', 'declare']
+
+
+def _IsSafeVarName(name):
+    # type: (str) -> bool
+    """$BASHPID is different in a subshell."""
+    return name != 'BASHPID'
+
+
+def _CommandName(UP_w):
+    # type: (word_t) -> Tuple[bool, str]
+    """Like word_.StaticEval(), but also handles the __cat word that
+    RunCommandSub() creates for $(<file)."""
+    if UP_w.tag() == word_e.Compound:
+        w = cast(CompoundWord, UP_w)
+        if len(w.parts) == 1 and w.parts[0].tag() == word_part_e.Literal:
+            tok = cast(Token, w.parts[0])
+            if tok.line is None:  # lexer.DummyToken()
+                return True, tok.tval
+
+    ok, s, _ = word_.StaticEval(UP_w)
+    return ok, s
+
+
+class NoForkChecker(object):
+    """Checks the body of a command sub, and the shell functions it calls."""
+
+    def __init__(self, procs, exec_opts):
+        # type: (state.Procs, optview.Exec) -> None
+        self.procs = procs
+        self.exec_opts = exec_opts
+
+        # Functions that were checked or are being checked, for recursion
+        self.funcs_seen = {}  # type: Dict[str, bool]
+
+    def Check(self, node):
+        # type: (command_t) -> bool
+        """Returns whether the command sub body can run without forking."""
+        if self.exec_opts.eval_unsafe_arith():
+            # Strings could contain assignments like a[x=1]
+            return False
+
+        self.funcs_seen.clear()
+        return self._Command(node, None)
+
+    def _Func(self, name, body):
+        # type: (str, command_t) -> bool
+        if name in self.funcs_seen:
+            return True
+        self.funcs_seen[name] = True
+
+        local_names = {}  # type: Dict[str, bool]
+        if body.tag() != command_e.BraceGroup:
+            return self._Command(body, local_names)
+
+        # Only 'local' at the top level of the body always runs before the
+        # commands after it
+        brace_group = cast(BraceGroup, body)
+        for child in brace_group.children:
+            UP_child = child
+            if child.tag() == command_e.Sentence:
+                sentence = cast(command.Sentence, UP_child)
+                UP_child = sentence.child
+
+            if UP_child.tag() == command_e.Simple:
+                simple = cast(command.Simple, UP_child)
+                ok, arg0 = _CommandName(simple.words[0])
+                if ok and arg0 in _LOCAL_BUILTINS:
+                    if not self._Local(simple, local_names):
+                        return False
+                    continue
+
+            if not self._Command(child, local_names):
+                return False
+        return True
+
+    def _Local(self, node, local_names):
+        # type: (command.Simple, Dict[str, bool]) -> bool
+        """Record the names in 'local x y=1'."""
+        if len(node.more_env) or node.typed_args or node.block:
+            return False
+
+        for UP_w in node.words[1:]:
+            if not self._Word(UP_w):
+                return False
+            if UP_w.tag() != word_e.Compound:
+                return False
+            w = cast(CompoundWord, UP_w)
+
+            if word_.IsVarLike(w):
+                tok = cast(Token, w.parts[0])
+                if lexer.IsPlusEquals(tok):
+                    name = lexer.TokenSliceRight(tok, -2)
+                else:
+                    name = lexer.TokenSliceRight(tok, -1)
+            else:
+                # Flags like 'local -n' aren't allowed
+                ok, name, _ = word_.StaticEval(w)
+                if not ok or not match.IsValidVarName(name):
+                    return False
+            local_names[name] = True
+        return True
+
+    def _Simple(self, node, local_names):
+        # type: (command.Simple, Optional[Dict[str, bool]]) -> bool
+        if len(node.more_env) or node.typed_args or node.block:
+            return False
+
+        for w in node.words:
+            if not self._Word(w):
+                return False
+
+        ok, arg0 = _CommandName(node.words[0])
+        if not ok:
+            return False
+
+        # Same lookup order as ShellExecutor.RunSimpleCommand().  _Func()
+        # checks 'local' at the top level of a function body.
+        if consts.LookupAssignBuiltin(arg0) != consts.NO_INDEX:
+            return False
+
+        builtin_id = consts.LookupSpecialBuiltin(arg0)
+        if builtin_id != consts.NO_INDEX:
+            return builtin_id in _NO_FORK_BUILTINS
+
+        proc_val, _ = self.procs.GetInvokable(arg0)
+        if proc_val is not None:
+            if proc_val.tag() != value_e.Proc:
+                return False
+            proc = cast(value.Proc, proc_val)
+            if not proc.sh_compat:  # YSH procs aren't checked
+                return False
+            return self._Func(arg0, proc.body)
+
+        builtin_id = consts.LookupNormalBuiltin(arg0)
+        if builtin_id == builtin_i.printf and len(node.words) > 1:
+            ok, arg1, _ = word_.StaticEval(node.words[1])
+            if not ok or arg1 == '-v':
+                return False
+
+        return builtin_id in _NO_FORK_BUILTINS
+
+    def _Commands(self, nodes, local_names):
+        # type: (List[command_t], Optional[Dict[str, bool]]) -> bool
+        for child in nodes:
+            if not self._Command(child, local_names):
+                return False
+        return True
+
+    def _Condition(self, cond, local_names):
+        # type: (condition_t, Optional[Dict[str, bool]]) -> bool
+        if cond.tag() != condition_e.Shell:
+            return False
+        commands = cast(List_of_command, cond)
+        return self._Commands(commands, local_names)
+
+    def _Command(self, node, local_names):
+        # type: (command_t, Optional[Dict[str, bool]]) -> bool
+        """
+        Args:
+          local_names: names declared with 'local' in the enclosing function,
+            or None at the top level of the command sub
+        """
+        UP_node = node
+        with tagswitch(node) as case:
+            if case(command_e.NoOp):
+                return True
+
+            elif case(command_e.Simple):
+                node = cast(command.Simple, UP_node)
+                return self._Simple(node, local_names)
+
+            elif case(command_e.Sentence):
+                node = cast(command.Sentence, UP_node)
+                return self._Command(node.child, local_names)
+
+            elif case(command_e.Redirect):
+                node = cast(command.Redirect, UP_node)
+                for r in node.redirects:
+                    if r.loc.tag() == redir_loc_e.VarName:  # {fd}>out assigns
+                        return False
+
+                    UP_arg = r.arg
+                    with tagswitch(r.arg) as arg_case:
+                        if arg_case(redir_param_e.Word):
+                            arg_word = cast(CompoundWord, UP_arg)
+                            if not self._Word(arg_word):
+                                return False
+                        elif arg_case(redir_param_e.HereWord):
+                            here_word = cast(redir_param.HereWord, UP_arg)
+                            if not self._Word(here_word.w):
+                                return False
+                        elif arg_case(redir_param_e.HereDoc):
+                            here_doc = cast(redir_param.HereDoc, UP_arg)
+                            if not self._Parts(here_doc.stdin_parts):
+                                return False
+                return self._Command(node.child, local_names)
+
+            elif case(command_e.CommandList):
+                node = cast(command.CommandList, UP_node)
+                return self._Commands(node.children, local_names)
+
+            elif case(command_e.BraceGroup):
+                node = cast(BraceGroup, UP_node)
+                return self._Commands(node.children, local_names)
+
+            elif case(command_e.DoGroup):
+                node = cast(command.DoGroup, UP_node)
+                return self._Commands(node.children, local_names)
+
+            elif case(command_e.AndOr):
+                node = cast(command.AndOr, UP_node)
+                return self._Commands(node.children, local_names)
+
+            elif case(command_e.ShAssignment):
+                node = cast(command.ShAssignment, UP_node)
+                if local_names is None:
+                    return False
+                for pair in node.pairs:
+                    if pair.lhs.tag() != sh_lhs_e.Name:
+                        return False
+                    lhs = cast(sh_lhs.Name, pair.lhs)
+                    if lhs.name not in local_names:
+                        return False
+                    if not self._RhsWord(pair.rhs):
+                        return False
+                return True
+
+            elif case(command_e.ControlFlow):
+                node = cast(command.ControlFlow, UP_node)
+                # 'break' at the top level is an error that we leave to the
+                # subshell
+                if local_names is None:
+                    return False
+                if node.keyword.id == Id.ControlFlow_Exit:
+                    return False
+                if node.arg_word and not self._Word(node.arg_word):
+                    return False
+                return True
+
+            elif case(command_e.If):
+                node = cast(command.If, UP_node)
+                for if_arm in node.arms:
+                    if not self._Condition(if_arm.cond, local_names):
+                        return False
+                    if not self._Commands(if_arm.action, local_names):
+                        return False
+                return self._Commands(node.else_action, local_names)
+
+            elif case(command_e.Case):
+                node = cast(command.Case, UP_node)
+                if node.to_match.tag() != case_arg_e.Word:
+                    return False
+                to_match = cast(case_arg.Word, node.to_match)
+                if not self._Word(to_match.w):
+                    return False
+
+                for case_arm in node.arms:
+                    UP_pattern = case_arm.pattern
+                    with tagswitch(case_arm.pattern) as pat_case:
+                        if pat_case(pat_e.Words):
+                            pattern = cast(pat.Words, UP_pattern)
+                            for w in pattern.words:
+                                if not self._Word(w):
+                                    return False
+                        elif pat_case(pat_e.Else):
+                            pass
+                        else:
+                            return False
+                    if not self._Commands(case_arm.action, local_names):
+                        return False
+                return True
+
+            elif case(command_e.WhileUntil):
+                node = cast(command.WhileUntil, UP_node)
+                if not self._Condition(node.cond, local_names):
+                    return False
+                return self._Command(node.body, local_names)
+
+            elif case(command_e.ForEach):
+                node = cast(command.ForEach, UP_node)
+                # The loop variable is assigned
+                if local_names is None:
+                    return False
+                for name in node.iter_names:
+                    if name not in local_names:
+                        return False
+
+                UP_iterable = node.iterable
+                with tagswitch(node.iterable) as iter_case:
+                    if iter_case(for_iter_e.Args):
+                        pass
+                    elif iter_case(for_iter_e.Words):
+                        iterable = cast(for_iter.Words, UP_iterable)
+                        for w in iterable.words:
+                            if not self._Word(w):
+                                return False
+                    else:
+                        return False
+                return self._Command(node.body, local_names)
+
+            elif case(command_e.DParen):
+                node = cast(command.DParen, UP_node)
+                return self._Arith(node.child)
+
+            elif case(command_e.DBracket):
+                node = cast(command.DBracket, UP_node)
+                # BASH_REMATCH is restored by ctx_Registers
+                return self._Bool(node.expr)
+
+            else:
+                # Pipelines and subshells fork anyway.  Function definitions,
+                # YSH assignments, etc. change state.
+                return False
+
+    def _Bool(self, node):
+        # type: (bool_expr_t) -> bool
+        UP_node = node
+        with tagswitch(node) as case:
+            if case(bool_expr_e.WordTest):
+                node = cast(bool_expr.WordTest, UP_node)
+                return self._Word(node.w)
+
+            elif case(bool_expr_e.Binary):
+                node = cast(bool_expr.Binary, UP_node)
+                return self._Word(node.left) and self._Word(node.right)
+
+            elif case(bool_expr_e.Unary):
+                node = cast(bool_expr.Unary, UP_node)
+                return self._Word(node.child)
+
+            elif case(bool_expr_e.LogicalNot):
+                node = cast(bool_expr.LogicalNot, UP_node)
+                return self._Bool(node.child)
+
+            elif case(bool_expr_e.LogicalAnd):
+                node = cast(bool_expr.LogicalAnd, UP_node)
+                return self._Bool(node.left) and self._Bool(node.right)
+
+            elif case(bool_expr_e.LogicalOr):
+                node = cast(bool_expr.LogicalOr, UP_node)
+                return self._Bool(node.left) and self._Bool(node.right)
+
+            else:
+                return False
+
+    def _Arith(self, node):
+        # type: (arith_expr_t) -> bool
+        UP_node = node
+        with tagswitch(node) as case:
+            if case(arith_expr_e.EmptyZero, arith_expr_e.EmptyOne):
+                return True
+
+            elif case(arith_expr_e.VarSub):
+                tok = cast(Token, UP_node)
+                return _IsSafeVarName(lexer.TokenVal(tok))
+
+            elif case(arith_expr_e.Word):
+                w = cast(CompoundWord, UP_node)
+                return self._Word(w)
+
+            elif case(arith_expr_e.Unary):
+                node = cast(arith_expr.Unary, UP_node)
+                return self._Arith(node.child)
+
+            elif case(arith_expr_e.Binary):
+                node = cast(arith_expr.Binary, UP_node)
+                return self._Arith(node.left) and self._Arith(node.right)
+
+            elif case(arith_expr_e.TernaryOp):
+                node = cast(arith_expr.TernaryOp, UP_node)
+                return (self._Arith(node.cond) and
+                        self._Arith(node.true_expr) and
+                        self._Arith(node.false_expr))
+
+            else:
+                # UnaryAssign like i++, BinaryAssign like i=1
+                return False
+
+    def _RhsWord(self, w):
+        # type: (rhs_word_t) -> bool
+        if w.tag() == rhs_word_e.Empty:
+            return True
+        return self._Word(cast(CompoundWord, w))
+
+    def _Word(self, UP_w):
+        # type: (word_t) -> bool
+        with tagswitch(UP_w) as case:
+            if case(word_e.Compound):
+                w = cast(CompoundWord, UP_w)
+                return self._Parts(w.parts)
+
+            elif case(word_e.BracedTree):
+                w2 = cast(word.BracedTree, UP_w)
+                return self._Parts(w2.parts)
+
+            else:
+                return False
+
+    def _Parts(self, parts):
+        # type: (List[word_part_t]) -> bool
+        for part in parts:
+            if not self._WordPart(part):
+                return False
+        return True
+
+    def _VarSub(self, part):
+        # type: (BracedVarSub) -> bool
+        if not _IsSafeVarName(part.var_name):
+            return False
+
+        # ${!ref} can evaluate an index like a[i=1]
+        if part.prefix_op and part.prefix_op.id == Id.VSub_Bang:
+            return False
+
+        if part.bracket_op:
+            if part.bracket_op.tag() != bracket_op_e.WholeArray:
+                return False  # ${a[i]} is dynamically parsed for assoc arrays
+
+        if part.suffix_op:
+            UP_op = part.suffix_op
+            with tagswitch(part.suffix_op) as case:
+                if case(suffix_op_e.Nullary):
+                    nullary_op = cast(Token, UP_op)
+                    # ${x@P} evaluates prompt code like $((y=5))
+                    if nullary_op.id == Id.VOp0_P:
+                        return False
+
+                elif case(suffix_op_e.Static):
+                    pass
+
+                elif case(suffix_op_e.Unary):
+                    unary_op = cast(suffix_op.Unary, UP_op)
+                    # ${x:=default} assigns
+                    if unary_op.op.id in (Id.VTest_ColonEquals,
+                                          Id.VTest_Equals):
+                        return False
+                    if not self._RhsWord(unary_op.arg_word):
+                        return False
+
+                elif case(suffix_op_e.PatSub):
+                    patsub_op = cast(suffix_op.PatSub, UP_op)
+                    if not self._Word(patsub_op.pat):
+                        return False
+                    if not self._RhsWord(patsub_op.replace):
+                        return False
+
+                elif case(suffix_op_e.Slice):
+                    slice_op = cast(suffix_op.Slice, UP_op)
+                    if not self._Arith(slice_op.begin):
+                        return False
+                    if slice_op.length and not self._Arith(slice_op.length):
+                        return False
+
+                else:
+                    return False
+
+        return True
+
+    def _WordPart(self, part):
+        # type: (word_part_t) -> bool
+        UP_part = part
+        with tagswitch(part) as case:
+            if case(word_part_e.Literal, word_part_e.EscapedLiteral,
+                    word_part_e.SingleQuoted, word_part_e.TildeSub,
+                    word_part_e.BracedRange, word_part_e.Splice):
+                return True
+
+            elif case(word_part_e.SimpleVarSub):
+                part = cast(SimpleVarSub, UP_part)
+                return _IsSafeVarName(lexer.LazyStr(part.tok))
+
+            elif case(word_part_e.DoubleQuoted):
+                part = cast(DoubleQuoted, UP_part)
+                return self._Parts(part.parts)
+
+            elif case(word_part_e.BracedVarSub):
+                part = cast(BracedVarSub, UP_part)
+                return self._VarSub(part)
+
+            elif case(word_part_e.ArithSub):
+                part = cast(word_part.ArithSub, UP_part)
+                return self._Arith(part.anode)
+
+            elif case(word_part_e.CommandSub):
+                part = cast(CommandSub, UP_part)
+                # A nested $(...) is checked when it runs.  Process subs fork.
+                return part.left_token.id in (Id.Left_DollarParen,
+                                              Id.Left_Backtick)
+
+            elif case(word_part_e.ShArrayLiteral):
+                part = cast(ShArrayLiteral, UP_part)
+                for w in part.words:
+                    if not self._Word(w):
+                        return False
+                return True
+
+            elif case(word_part_e.BracedTuple):
+                part = cast(word_part.BracedTuple, UP_part)
+                for w in part.words:
+                    if not self._Word(w):
+                        return False
+                return True
+
+            elif case(word_part_e.ExtGlob):
+                part = cast(word_part.ExtGlob, UP_part)
+                for w in part.arms:
+                    if not self._Word(w):
+                        return False
+                return True
+
+            elif case(word_part_e.BashRegexGroup):
+                part = cast(word_part.BashRegexGroup, UP_part)
+                return part.child is None or self._Word(part.child)
+
+            else:
+                # e.g. YSH $[expr sub]
+                return False
@@ -0,0 +1,89 @@
+#!/usr/bin/env python2
+"""
+no_fork_test.py: Tests for no_fork.py
+"""
+
+import unittest
+
+from core import test_lib
+from osh import no_fork
+
+
+def _Parse(code_str, arena):
+    c_parser = test_lib.InitCommandParser(code_str, arena=arena)
+    return c_parser.ParseLogicalLine()
+
+
+class NoForkCheckerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.arena = test_lib.MakeArena('<no_fork_test.py>')
+        cmd_ev = test_lib.InitCommandEvaluator(arena=self.arena)
+
+        for code_str in [
+                'f() { local x=$1 i; for i in a b; do echo $x$i; done; }',
+                'g() { y=leak; echo $y; }',
+                'h() { echo $(f z); }',
+                'r() { echo r; r; }',
+                'w() { declare i=0; while test $i = 0; do i=1; done; }',
+                'c() { case a in b) local y;; esac; y=leak; }',
+                'a() { true && local y; y=leak; }',
+                'u() { y=leak; local y; }',
+        ]:
+            cmd_ev.ExecuteAndCatch(_Parse(code_str, self.arena), 0)
+
+        self.checker = no_fork.NoForkChecker(cmd_ev.procs, cmd_ev.exec_opts)
+
+    def assertSafe(self, code_str):
+        node = _Parse(code_str, self.arena)
+        self.assertEqual(True, self.checker.Check(node), code_str)
+
+    def assertUnsafe(self, code_str):
+        node = _Parse(code_str, self.arena)
+        self.assertEqual(False, self.checker.Check(node), code_str)
+
+    def testBuiltins(self):
+        self.assertSafe('echo hi')
+        self.assertSafe('printf "%s\\n" a b')
+        self.assertSafe('test -n "$x" && echo yes || echo no')
+        self.assertSafe('echo ${x:-default} $((1 + 2))')
+        self.assertSafe('echo hi >&2')
+
+        self.assertUnsafe('printf -v x hi')
+        self.assertUnsafe('cd /tmp')
+        self.assertUnsafe('x=1')
+        self.assertUnsafe('echo ${x:=default}')
+        self.assertUnsafe('echo $((x += 1))')
+        self.assertUnsafe('FOO=bar echo hi')
+        self.assertUnsafe('echo hi {fd}> out.txt')
+        self.assertUnsafe('$cmd')
+        self.assertUnsafe('ls')
+
+        self.assertSafe('if test -n "$x"; then echo a; elif true; then :; fi')
+        self.assertSafe('while false; do echo a; done')
+
+        # An indirect index can assign, and $BASHPID is different in a subshell
+        self.assertUnsafe('echo ${!ref}')
+        self.assertUnsafe('echo $BASHPID')
+        self.assertUnsafe('echo ${BASHPID}')
+        self.assertUnsafe('echo $((BASHPID + 1))')
+
+        # ${x@P} runs prompt code, which can assign
+        self.assertUnsafe('echo ${x@P}')
+        self.assertSafe('echo ${x@Q}')
+
+    def testFunctions(self):
+        self.assertSafe('f z')
+        self.assertSafe('h')
+        self.assertSafe('r')  # recursion is OK
+        self.assertSafe('w')
+
+        self.assertUnsafe('g')
+        # 'local' that may not run, or runs after the assignment
+        self.assertUnsafe('c')
+        self.assertUnsafe('a')
+        self.assertUnsafe('u')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -448,11 +448,13 @@ class ArithEvaluator(object):
         # For compatibility: Try to parse it as an expression and evaluate it.
         a_parser = self.parse_ctx.MakeArithParser(s)
 
-        try:
-            node2 = a_parser.Parse()  # may raise error.Parse
-        except error.Parse as e:
-            self.errfmt.PrettyPrintError(e)
-            e_die('Parse error in recursive arithmetic', e.location)
+        src = source.Dynamic('recursive arith', blame_loc)
+        with alloc.ctx_SourceCode(self.parse_ctx.arena, src):
+            try:
+                node2 = a_parser.Parse()  # may raise error.Parse
+            except error.Parse as e:
+                self.errfmt.PrettyPrintError(e)
+                e_die('Parse error in recursive arithmetic', e.location)
 
         # Prevent infinite recursion of $(( 1x )) -- it's a word that evaluates
         # to itself, and you don't want to reparse it as a word.
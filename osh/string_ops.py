@@ -12,7 +12,7 @@ YSH:
     Pass x => sub('a*', 'b', :ALL) => var y
 """
 
-from _devbuild.gen.id_kind_asdl import Id
+from _devbuild.gen.id_kind_asdl import Id, Id_t
 from _devbuild.gen.syntax_asdl import loc, Token, suffix_op
 from core import pyutil
 from display import ui
@@ -371,18 +371,69 @@ def DoUnarySuffixOp(s, op_tok, arg, is_extglob):
         else:  # e.g. ^ ^^ , ,,
             raise AssertionError(id_)
 
-    # For patterns, do fnmatch() in a loop.
+    # For patterns, translate the glob to an ERE.  POSIX regexes are
+    # leftmost-longest, so ## and %% are a single regexec().  The shortest
+    # match for # and % needs a loop, but it's in C, doesn't slice the string,
+    # and is bounded by the longest match.
     #
-    # TODO:
-    # - Another potential fast path:
+    # That gives us the early-reject fast path:
     #   v=aabbccdd
     #   echo ${v#*b}  # strip shortest prefix
     #
-    # If the whole thing doesn't match '*b*', then no test can succeed.  So we
-    # can fail early.  Conversely echo ${v%%c*} and '*c*'.
+    # If no prefix matches '*b', then no shorter test can succeed.
     #
     # (Although honestly this whole construct is nuts and should be deprecated.)
 
+    if not is_extglob:
+        regex, warnings = glob_.GlobToERE(arg)
+        # Malformed globs may not translate faithfully, so use fnmatch()
+        if len(warnings) == 0:
+            try:
+                return _StripRegex(s, id_, regex)
+            except ValueError:
+                # e.g. [] is a valid glob, but not a valid ERE
+                pass
+
+    return _StripFnmatch(s, id_, arg)
+
+
+def _StripRegex(s, id_, regex):
+    # type: (str, Id_t, str) -> str
+    """${x#pat} and family, where pat has been translated to an ERE."""
+
+    if id_ in (Id.VOp1_Pound, Id.VOp1_DPound):
+        prefix_regex = '^(%s)' % regex
+        indices = libc.regex_search(prefix_regex, 0, s, 0)
+        if indices is None:  # no prefix matches
+            return s
+        end = indices[1]  # longest prefix
+
+        if id_ == Id.VOp1_Pound:  # shortest prefix
+            end = libc.regex_shortest_prefix(prefix_regex, s, end)
+            assert end != -1  # the longest prefix matches
+        return s[end:]
+
+    elif id_ in (Id.VOp1_Percent, Id.VOp1_DPercent):
+        indices = libc.regex_search('(%s)$' % regex, 0, s, 0)
+        if indices is None:  # no suffix matches
+            return s
+        start = indices[0]  # longest suffix starts at the leftmost match
+
+        if id_ == Id.VOp1_Percent:  # shortest suffix
+            start = libc.regex_shortest_suffix('^(%s)$' % regex, s, start)
+            assert start != -1  # the longest suffix matches
+        return s[:start]
+
+    else:
+        raise NotImplementedError(ui.PrettyId(id_))
+
+
+def _StripFnmatch(s, id_, arg):
+    # type: (str, Id_t, str) -> str
+    """${x#pat} and family, with fnmatch() in a loop.
+
+    Used for extended globs, which we can't translate to ERE.
+    """
     n = len(s)
 
     if id_ == Id.VOp1_Pound:  # shortest prefix
@@ -449,26 +500,26 @@ def _AllMatchPositions(s, regex):
     (If there are no matches, it returns the empty list.)
     """
     matches = []  # type: List[Tuple[int, int]]
-    pos = 0
-    n = len(s)
-    while pos < n:  # needed to prevent infinite loop in (.*) case
-        m = libc.regex_first_group_match(regex, s, pos)
-        if m is None:
-            break
-        matches.append(m)
-        start, end = m
-        pos = end  # advance position
+    spans = libc.regex_find_all(regex, s)
+    for i in xrange(0, len(spans), 2):
+        matches.append((spans[i], spans[i + 1]))
     return matches
 
 
 def _PatSubAll(s, regex, replace_str):
     # type: (str, str, str) -> str
+
+    # One pass in C over the string, returning [start1, end1, start2, ...]
+    spans = libc.regex_find_all(regex, s)
+    if len(spans) == 0:
+        return s
+
     parts = []  # type: List[str]
     prev_end = 0
-    for start, end in _AllMatchPositions(s, regex):
-        parts.append(s[prev_end:start])
+    for i in xrange(0, len(spans), 2):
+        parts.append(s[prev_end:spans[i]])
         parts.append(replace_str)
-        prev_end = end
+        prev_end = spans[i + 1]
     parts.append(s[prev_end:])
     return ''.join(parts)
 
@@ -478,9 +529,7 @@ class GlobReplacer(object):
     def __init__(self, regex, replace_str, slash_tok):
         # type: (str, str, Token) -> None
 
-        # TODO: It would be nice to cache the compilation of the regex here,
-        # instead of just the string.  That would require more sophisticated use of
-        # the Python/C API in libc.c, which we might want to avoid.
+        # Note: libc caches the compiled regex, keyed by this string
         self.regex = regex
         self.replace_str = replace_str
         self.slash_tok = slash_tok
@@ -504,7 +553,7 @@ class GlobReplacer(object):
                 return _PatSubAll(s, regex, self.replace_str)
             except RuntimeError as e:
                 # Not sure if this is possible since we convert from glob:
-                # libc.regex_first_group_match raises RuntimeError on regex syntax
+                # libc.regex_find_all raises RuntimeError on regex syntax
                 # error.
                 msg = e.message  # type: str
                 e_die('Error matching regex %r: %s' % (regex, msg),
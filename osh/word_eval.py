@@ -2333,10 +2333,12 @@ class AbstractWordEvaluator(StringWordEvaluator):
                         e_die('LHS array not allowed in assignment builtin', w)
 
                     if lexer.IsPlusEquals(left_token):
-                        var_name = lexer.TokenSliceRight(left_token, -2)
+                        var_name = intern(
+                            lexer.TokenSliceRight(left_token, -2))
                         append = True
                     else:
-                        var_name = lexer.TokenSliceRight(left_token, -1)
+                        var_name = intern(
+                            lexer.TokenSliceRight(left_token, -1))
                         append = False
 
                     if part_offset == len(w.parts):
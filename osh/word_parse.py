@@ -406,7 +406,7 @@ class WordParser(WordEmitter):
 
         part = BracedVarSub.CreateNull()
         part.name_tok = name_token
-        part.var_name = lexer.TokenVal(name_token)
+        part.var_name = intern(lexer.TokenVal(name_token))
         part.bracket_op = bracket_op
         return part
 
@@ -13,6 +13,7 @@
 #include <limits.h>
 #include <wchar.h>
 #include <stdlib.h>
+#include <string.h>  // strcmp(), memmove()
 #include <sys/ioctl.h>
 #include <locale.h>
 #include <fnmatch.h>
@@ -155,6 +156,109 @@ func_glob(PyObject *self, PyObject *args) {
   return matches;
 }
 
+// A bounded LRU cache of compiled regexes, keyed by (pattern, cflags).  It's
+// shared by regex_search() and regex_first_group_match(), so that [[ $x =~ $re ]]
+// and ${x//pat/rep} in a loop don't call regcomp() on every iteration.
+//
+// The entries are kept in most-recently-used order.  A lookup is a linear scan
+// comparing hashes first, which is cheap compared with regcomp().
+//
+// OILS_REGEX_CACHE_SIZE=0 disables caching, for benchmarking.
+
+#define REGEX_CACHE_DEFAULT_SIZE 1000
+
+typedef struct {
+  char* pattern;
+  int cflags;
+  unsigned int hash;
+  regex_t compiled;
+} RegexEntry;
+
+static RegexEntry** regex_cache = NULL;
+static int regex_cache_capacity = REGEX_CACHE_DEFAULT_SIZE;
+static int regex_cache_len = 0;
+
+static long regex_cache_hits = 0;
+static long regex_cache_misses = 0;
+static long regex_cache_evictions = 0;
+
+static unsigned int regex_hash(const char* pattern, int cflags) {
+  // FNV-1a
+  unsigned int h = 2166136261u;
+  const unsigned char* p;
+  for (p = (const unsigned char*)pattern; *p; ++p) {
+    h = (h ^ *p) * 16777619u;
+  }
+  return (h ^ (unsigned int)cflags) * 16777619u;
+}
+
+static void regex_entry_free(RegexEntry* entry) {
+  regfree(&entry->compiled);
+  free(entry->pattern);
+  free(entry);
+}
+
+// Return a compiled regex owned by the cache, or NULL if regcomp() failed.  In
+// that case, *status is the regcomp() error, and 'error_pat' can be passed to
+// regerror().
+//
+// The returned pointer is valid until the next call.
+static regex_t* regex_cache_get(const char* pattern, int cflags, int* status,
+                                regex_t* error_pat) {
+  unsigned int h = regex_hash(pattern, cflags);
+
+  int limit = regex_cache_capacity == 0 ? 0 : regex_cache_len;
+  int i;
+  for (i = 0; i < limit; ++i) {
+    RegexEntry* entry = regex_cache[i];
+    if (entry->hash == h && entry->cflags == cflags &&
+        strcmp(entry->pattern, pattern) == 0) {
+      regex_cache_hits++;
+      // Move to the front
+      memmove(regex_cache + 1, regex_cache, i * sizeof(RegexEntry*));
+      regex_cache[0] = entry;
+      *status = 0;
+      return &entry->compiled;
+    }
+  }
+
+  regex_cache_misses++;
+
+  RegexEntry* entry = (RegexEntry*) malloc(sizeof(RegexEntry));
+  *status = regcomp(&entry->compiled, pattern, cflags);
+  if (*status != 0) {
+    *error_pat = entry->compiled;
+    free(entry);
+    return NULL;
+  }
+  entry->pattern = strdup(pattern);
+  entry->cflags = cflags;
+  entry->hash = h;
+
+  // With capacity 0, we still hold on to the last regex, but never look it up.
+  int max_len = regex_cache_capacity == 0 ? 1 : regex_cache_capacity;
+  while (regex_cache_len >= max_len) {
+    regex_cache_len--;
+    regex_entry_free(regex_cache[regex_cache_len]);
+    if (regex_cache_capacity != 0) {
+      regex_cache_evictions++;
+    }
+  }
+
+  memmove(regex_cache + 1, regex_cache, regex_cache_len * sizeof(RegexEntry*));
+  regex_cache[0] = entry;
+  regex_cache_len++;
+
+  return &entry->compiled;
+}
+
+static PyObject *
+func_regex_cache_stats(PyObject *self, PyObject *unused) {
+  return Py_BuildValue("[i,i,l,l,l]", regex_cache_len, regex_cache_capacity,
+                       regex_cache_hits, regex_cache_misses,
+                       regex_cache_evictions);
+}
+
 static PyObject *
 func_regex_search(PyObject *self, PyObject *args) {
   const char* pattern;
@@ -168,11 +272,12 @@ func_regex_search(PyObject *self, PyObject *args) {
   }
 
   cflags |= REG_EXTENDED;
-  regex_t pat;
-  int status = regcomp(&pat, pattern, cflags);
-  if (status != 0) {
+  regex_t error_pat;
+  int status;
+  regex_t* pat = regex_cache_get(pattern, cflags, &status, &error_pat);
+  if (pat == NULL) {
     char error_desc[50];
-    regerror(status, &pat, error_desc, 50);
+    regerror(status, &error_pat, error_desc, 50);
 
     char error_message[80];
     snprintf(error_message, 80, "Invalid regex %s (%s)", pattern, error_desc);
@@ -181,16 +286,15 @@ func_regex_search(PyObject *self, PyObject *args) {
     return NULL;
   }
 
-  int num_groups = pat.re_nsub + 1;
+  int num_groups = pat->re_nsub + 1;
   PyObject *ret = PyList_New(num_groups * 2);
 
   if (ret == NULL) {
-    regfree(&pat);
     return NULL;
   }
 
   regmatch_t *pmatch = (regmatch_t*) malloc(sizeof(regmatch_t) * num_groups);
-  int match = regexec(&pat, str + pos, num_groups, pmatch, eflags);
+  int match = regexec(pat, str + pos, num_groups, pmatch, eflags);
   if (match == 0) {
     int i;
     for (i = 0; i < num_groups; i++) {
@@ -209,9 +313,9 @@ func_regex_search(PyObject *self, PyObject *args) {
   }
 
   free(pmatch);
-  regfree(&pat);
 
   if (match != 0) {
+    Py_DECREF(ret);
     Py_RETURN_NONE;
   }
 
@@ -234,16 +338,17 @@ func_regex_first_group_match(PyObject *self, PyObject *args) {
     return NULL;
   }
 
-  regex_t pat;
+  regex_t error_pat;
   regmatch_t m[NMATCH];
 
   // Could have been checked by regex_parse for [[ =~ ]], but not for glob
   // patterns like ${foo/x*/y}.
 
-  int status = regcomp(&pat, pattern, REG_EXTENDED);
-  if (status != 0) {
+  int status;
+  regex_t* pat = regex_cache_get(pattern, REG_EXTENDED, &status, &error_pat);
+  if (pat == NULL) {
     char error_string[80];
-    regerror(status, &pat, error_string, 80);
+    regerror(status, &error_pat, error_string, 80);
     PyErr_SetString(PyExc_RuntimeError, error_string);
     return NULL;
   }
@@ -251,8 +356,7 @@ func_regex_first_group_match(PyObject *self, PyObject *args) {
   debug("first_group_match pat %s str %s pos %d", pattern, str, pos);
 
   // Match at offset 'pos'
-  int result = regexec(&pat, str + pos, NMATCH, m, 0 /*flags*/);
-  regfree(&pat);
+  int result = regexec(pat, str + pos, NMATCH, m, 0 /*flags*/);
 
   if (result != 0) {
     Py_RETURN_NONE;  // no match
@@ -264,6 +368,174 @@ func_regex_first_group_match(PyObject *self, PyObject *args) {
   return Py_BuildValue("(i,i)", pos + start, pos + end);
 }
 
+// For ${x//pat/replace}: return a flat list [start1, end1, start2, end2, ...]
+// of the first group of every non-overlapping match, starting at 'pos'.
+//
+// The regex is compiled once, and matches after the start of the string use
+// REG_NOTBOL, so ^ doesn't match there.  After an empty match, we advance by
+// one UTF-8 character, to avoid an infinite loop.
+
+static PyObject *
+func_regex_find_all(PyObject *self, PyObject *args) {
+  const char* pattern;
+  const char* str;
+  int n;
+  int pos = 0;
+  if (!PyArg_ParseTuple(args, "ss#|i", &pattern, &str, &n, &pos)) {
+    return NULL;
+  }
+
+  regex_t error_pat;
+  int status;
+  regex_t* pat = regex_cache_get(pattern, REG_EXTENDED, &status, &error_pat);
+  if (pat == NULL) {
+    char error_string[80];
+    regerror(status, &error_pat, error_string, 80);
+    PyErr_SetString(PyExc_RuntimeError, error_string);
+    return NULL;
+  }
+
+  PyObject* ret = PyList_New(0);
+  if (ret == NULL) {
+    return NULL;
+  }
+
+  regmatch_t m[NMATCH];
+  while (pos < n) {
+    int eflags = pos == 0 ? 0 : REG_NOTBOL;
+    if (regexec(pat, str + pos, NMATCH, m, eflags) != 0) {
+      break;
+    }
+    int start = pos + m[1].rm_so;
+    int end = pos + m[1].rm_eo;
+
+    PyObject* py_start = PyInt_FromLong(start);
+    PyObject* py_end = PyInt_FromLong(end);
+    PyList_Append(ret, py_start);
+    PyList_Append(ret, py_end);
+    Py_DECREF(py_start);
+    Py_DECREF(py_end);
+
+    if (end == start) {
+      pos = end + 1;
+      while (pos < n && (str[pos] & 0xC0) == 0x80) {  // UTF-8 continuation
+        pos++;
+      }
+    } else {
+      pos = end;
+    }
+  }
+
+  return ret;
+}
+
+// For ${x#pat}: return the length of the shortest prefix of 'str' that the
+// regex matches, or -1.  Only lengths up to 'max_len' are tried, and only at
+// UTF-8 character boundaries.
+//
+// The regex should be anchored with ^, but NOT with $.  Then "some prefix of
+// str[:i] matches" is monotonic in i, so we binary search for the smallest i,
+// rather than testing every prefix.  We make one copy of the string and
+// temporarily NUL-terminate it, rather than slicing it.
+
+static PyObject *
+func_regex_shortest_prefix(PyObject *self, PyObject *args) {
+  const char* pattern;
+  const char* str;
+  int n;
+  int max_len;
+  if (!PyArg_ParseTuple(args, "ss#i", &pattern, &str, &n, &max_len)) {
+    return NULL;
+  }
+
+  regex_t error_pat;
+  int status;
+  regex_t* pat = regex_cache_get(pattern, REG_EXTENDED, &status, &error_pat);
+  if (pat == NULL) {
+    char error_string[80];
+    regerror(status, &error_pat, error_string, 80);
+    PyErr_SetString(PyExc_RuntimeError, error_string);
+    return NULL;
+  }
+
+  if (max_len > n) {
+    max_len = n;
+  }
+  char* buf = (char*) malloc(max_len + 1);
+  memcpy(buf, str, max_len);
+  buf[max_len] = '\0';
+
+  // Invariant: no prefix shorter than 'lo' matches, and some prefix of
+  // length <= 'hi' does.  Both are character boundaries.
+  int lo = 0;
+  int hi = max_len;
+  if (regexec(pat, buf, 0, NULL, 0) != 0) {
+    lo = hi = -1;  // nothing matches
+  }
+  while (lo < hi) {
+    int mid = lo + (hi - lo) / 2;
+    while (mid > lo && (str[mid] & 0xC0) == 0x80) {  // UTF-8 continuation
+      mid--;
+    }
+    char saved = buf[mid];
+    buf[mid] = '\0';
+    int match = regexec(pat, buf, 0, NULL, 0) == 0;
+    buf[mid] = saved;
+    if (match) {
+      hi = mid;
+    } else {
+      lo = mid + 1;
+      while (lo < hi && (str[lo] & 0xC0) == 0x80) {
+        lo++;
+      }
+    }
+  }
+  free(buf);
+
+  return PyInt_FromLong(lo);
+}
+
+// For ${x%pat}: return the start of the shortest suffix of 'str' that the
+// regex matches, or -1.  Only starts down to 'min_start' are tried, and only
+// at UTF-8 character boundaries.  The regex should be anchored with ^ and $.
+
+static PyObject *
+func_regex_shortest_suffix(PyObject *self, PyObject *args) {
+  const char* pattern;
+  const char* str;
+  int n;
+  int min_start;
+  if (!PyArg_ParseTuple(args, "ss#i", &pattern, &str, &n, &min_start)) {
+    return NULL;
+  }
+
+  regex_t error_pat;
+  int status;
+  regex_t* pat = regex_cache_get(pattern, REG_EXTENDED, &status, &error_pat);
+  if (pat == NULL) {
+    char error_string[80];
+    regerror(status, &error_pat, error_string, 80);
+    PyErr_SetString(PyExc_RuntimeError, error_string);
+    return NULL;
+  }
+
+  if (min_start < 0) {
+    min_start = 0;
+  }
+
+  int i;
+  for (i = n; i >= min_start; --i) {
+    if (i < n && (str[i] & 0xC0) == 0x80) {  // UTF-8 continuation
+      continue;
+    }
+    // The suffix is already NUL-terminated
+    if (regexec(pat, str + i, 0, NULL, 0) == 0) {
+      return PyInt_FromLong(i);
+    }
+  }
+  return PyInt_FromLong(-1);
+}
+
 // We do this in C so we can remove '%f' % 0.1 from the CPython build.  That
 // involves dtoa.c and pystrod.c, which are thousands of lines of code.
 static PyObject *
@@ -379,6 +651,20 @@ static PyMethodDef methods[] = {
   // the regex is invalid.
   {"regex_first_group_match", func_regex_first_group_match, METH_VARARGS, ""},
 
+  // Like regex_first_group_match(), but returns a flat list of the start and
+  // end positions of every match.  Raises RuntimeError if the regex is
+  // invalid.
+  {"regex_find_all", func_regex_find_all, METH_VARARGS, ""},
+
+  // For ${x#pat} and ${x%pat}, return the position of the shortest prefix or
+  // suffix that an anchored regex matches, or -1.
+  {"regex_shortest_prefix", func_regex_shortest_prefix, METH_VARARGS, ""},
+  {"regex_shortest_suffix", func_regex_shortest_suffix, METH_VARARGS, ""},
+
+  // Return [num_entries, capacity, hits, misses, evictions] for the cache of
+  // compiled regexes.
+  {"regex_cache_stats", func_regex_cache_stats, METH_NOARGS, ""},
+
   // "Print three floating point values for the 'time' builtin.
   {"print_time", func_print_time, METH_VARARGS, ""},
 
@@ -415,4 +701,15 @@ void initlibc(void) {
 
   errno_error = PyErr_NewException("libc.error",
                                     PyExc_IOError, NULL);
+
+  char* e = getenv("OILS_REGEX_CACHE_SIZE");
+  if (e && strlen(e)) {
+    regex_cache_capacity = atoi(e);
+    if (regex_cache_capacity < 0) {
+      regex_cache_capacity = 0;
+    }
+  }
+  // Room for the single entry that's held with capacity 0
+  int n = regex_cache_capacity == 0 ? 1 : regex_cache_capacity;
+  regex_cache = (RegexEntry**) malloc(n * sizeof(RegexEntry*));
 }
@@ -15,7 +15,11 @@ def gethostname() -> str: ...
 def glob(pat: str, flags: int = 0) -> List[str]: ...
 def fnmatch(pat: str, s: str, flags: int = 0) -> bool: ...
 def regex_first_group_match(regex: str, s: str, pos: int) -> Optional[Tuple[int, int]]: ...
+def regex_find_all(regex: str, s: str, pos: int = 0) -> List[int]: ...
+def regex_shortest_prefix(regex: str, s: str, max_len: int) -> int: ...
+def regex_shortest_suffix(regex: str, s: str, min_start: int) -> int: ...
 def regex_search(regex: str, cflags: int, s: str, eflags: int, pos: int = 0) -> Optional[List[int]]: ...
+def regex_cache_stats() -> List[int]: ...
 def wcswidth(s: str) -> int: ...
 def get_terminal_width() -> int: ...
 def print_time(real: float, user: float, sys: float) -> None: ...
@@ -213,6 +213,68 @@ class LibcTest(unittest.TestCase):
     self.assertRaises(
         RuntimeError, libc.regex_first_group_match, r'*', 'abcd', 0)
 
+  def testRegexCache(self):
+    num_entries, capacity, hits, misses, evictions = libc.regex_cache_stats()
+
+    # Same pattern and cflags: the second search is a cache hit
+    libc.regex_search(r'cache-(a+)', 0, 'cache-aa', 0)
+    libc.regex_search(r'cache-(a+)', 0, 'cache-aaa', 0)
+
+    # Different cflags is a different entry
+    libc.regex_search(r'cache-(a+)', libc.REG_ICASE, 'CACHE-A', 0)
+
+    # regex_first_group_match() shares the cache
+    self.assertEqual(
+        (6, 8),
+        libc.regex_first_group_match(r'cache-(a+)', 'cache-aa', 0))
+
+    stats = libc.regex_cache_stats()
+    self.assertEqual(hits + 2, stats[2])
+    self.assertEqual(misses + 2, stats[3])
+
+    # Invalid regexes aren't cached
+    self.assertRaises(ValueError, libc.regex_search, r'*', 0, 'abcd', 0)
+    self.assertRaises(ValueError, libc.regex_search, r'*', 0, 'abcd', 0)
+    stats = libc.regex_cache_stats()
+    self.assertEqual(hits + 2, stats[2])
+    self.assertEqual(misses + 4, stats[3])
+
+  def testRegexFindAll(self):
+    s = 'oXooXoooXoX'
+    self.assertEqual([1, 3, 4, 6, 8, 10], libc.regex_find_all('(X.)', s))
+    self.assertEqual([4, 6, 8, 10], libc.regex_find_all('(X.)', s, 3))
+    self.assertEqual([], libc.regex_find_all('(z)', s))
+
+    # ^ only matches at the start of the string
+    self.assertEqual([0, 1], libc.regex_find_all('(^o)', 'ooo'))
+
+    # Empty matches advance by one character
+    self.assertEqual([0, 0, 1, 1, 2, 2], libc.regex_find_all('(z*)', 'abc'))
+    self.assertEqual([0, 0, 2, 2], libc.regex_find_all('(z*)', '\xce\xbcc'))
+
+    self.assertRaises(RuntimeError, libc.regex_find_all, r'*', 'abcd')
+
+  def testRegexShortestPrefixSuffix(self):
+    s = 'aabbccdd'
+    self.assertEqual(3, libc.regex_shortest_prefix('^(.*b)', s, len(s)))
+    self.assertEqual(-1, libc.regex_shortest_prefix('^(.*b)', s, 2))
+    self.assertEqual(0, libc.regex_shortest_prefix('^(.*)', s, len(s)))
+    self.assertEqual(7, libc.regex_shortest_prefix('^(.*d)', s, len(s)))
+
+    self.assertEqual(5, libc.regex_shortest_suffix('^(c.*)$', s, 0))
+    self.assertEqual(-1, libc.regex_shortest_suffix('^(c.*)$', s, 6))
+    self.assertEqual(8, libc.regex_shortest_suffix('^(.*)$', s, 0))
+
+    # Only UTF-8 character boundaries are tried
+    mu = '\xce\xbc'
+    self.assertEqual(2, libc.regex_shortest_prefix('^(.)', mu + 'x', 3))
+    self.assertEqual(1, libc.regex_shortest_suffix('^(.)$', 'x' + mu, 0))
+
+    self.assertRaises(
+        RuntimeError, libc.regex_shortest_prefix, r'*', 'abcd', 4)
+    self.assertRaises(
+        RuntimeError, libc.regex_shortest_suffix, r'*', 'abcd', 0)
+
   def testRegexFirstGroupMatchError(self):
     # Helping to debug issue #291
     s = ''
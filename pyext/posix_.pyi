@@ -49,6 +49,8 @@ O_SYNC = ...  # type: int
 O_TRUNC = ...  # type: int
 O_WRONLY = ...  # type: int
 R_OK = ...  # type: int
+SEEK_CUR = ...  # type: int
+SEEK_SET = ...  # type: int
 TMP_MAX = ...  # type: int
 WCONTINUED = ...  # type: int
 WNOHANG = ...  # type: int
@@ -110,6 +112,7 @@ def dup(fd: int) -> int: ...
 def dup2(fd: int, fd2: int) -> None: ...
 def execv(path: str, args: Sequence[str], env: Mapping[str, str]) -> None: ...
 def execve(path: str, args: Sequence[str], env: Mapping[str, str]) -> None: ...
+def posix_spawn(path: str, args: List[str], env: Dict[str, str], setpgroup: int, setsigdef: List[int]) -> int: ...
 def fchdir(fd: int) -> None: ...
 def fchmod(fd: int, mode: int) -> None: ...
 def fchown(fd: int, uid: int, gid: int) -> None: ...
@@ -150,7 +153,7 @@ def lchown(path: unicode, uid: int, gid: int) -> None: ...
 def link(source: unicode, link_name: str) -> None: ...
 _T = TypeVar("_T")
 def listdir(path: _T) -> List[_T]: ...
-def lseek(fd: int, pos: int, how: int) -> None: ...
+def lseek(fd: int, pos: int, how: int) -> int: ...
 def lstat(path: unicode) -> stat_result: ...
 def major(device: int) -> int: ...
 def makedev(major: int, minor: int) -> int: ...
@@ -28,6 +28,7 @@ Other notes:
 """
 from __future__ import print_function
 
+import errno
 import signal
 import subprocess
 import unittest
@@ -46,11 +47,13 @@ FUNCS = [
     "lstat",
     "readlink",
     "stat",
+    "fstat",
     "umask",
     "uname",
     "_exit",
     "execv",
     "execve",
+    "posix_spawn",
     "fork",
     "geteuid",
     "getpid",
@@ -61,6 +64,9 @@ FUNCS = [
     "dup2",
     "read",
     "write",
+    "lseek",
+    "unlink",
+    "rename",
     "fdopen",
     "isatty",
     "pipe",
@@ -101,6 +107,19 @@ class PosixTest(unittest.TestCase):
     posix_.read(0, 0)
     posix_.write(1, '')
 
+  def testPosixSpawn(self):
+    argv = ['/bin/sh', '-c', 'test "$X" = y && exit 42']
+    pid = posix_.posix_spawn('/bin/sh', argv, {'X': 'y'}, -1, [signal.SIGPIPE])
+    _, status = posix_.waitpid(pid, 0)
+    self.assertEqual(42, posix_.WEXITSTATUS(status))
+
+    try:
+      posix_.posix_spawn('/nonexistent_ZZ', ['x'], {}, -1, [])
+    except OSError as e:
+      self.assertEqual(errno.ENOENT, e.errno)
+    else:
+      self.fail('Expected OSError')
+
   def testRead(self):
     if posix_.environ.get('EINTR_TEST'):
       # Now we can do kill -TERM PID can get EINTR.
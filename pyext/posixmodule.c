@@ -48,6 +48,8 @@ corresponding Unix manual entries for more information on calls.");
 #include <signal.h>
 #endif
 
+#include <spawn.h>              /* posix_spawn() */
+
 #ifdef HAVE_FCNTL_H
 #include <fcntl.h>
 #endif /* HAVE_FCNTL_H */
@@ -1262,6 +1264,116 @@ posix_execve(PyObject *self, PyObject *args)
     PyMem_Free(path);
     return NULL;
 }
+
+PyDoc_STRVAR_remove(posix_posix_spawn__doc__,
+"posix_spawn(path, args, env, setpgroup, setsigdef) -> pid\n\n\
+Start a child process running path, without forking the shell.\n\
+\n\
+    path: path of executable file\n\
+    args: list of arguments\n\
+    env: dictionary of strings mapping to strings\n\
+    setpgroup: process group for the child, or -1 to inherit ours\n\
+    setsigdef: list of signals to reset to SIG_DFL in the child");
+
+static PyObject *
+posix_posix_spawn(PyObject *self, PyObject *args)
+{
+    char *path;
+    PyObject *argv, *env, *sigdef_list;
+    PyObject *key, *val;
+    char **argvlist = NULL;
+    char **envlist = NULL;
+    Py_ssize_t i, pos, argc, envc = 0;
+    int setpgroup;
+    short flags = POSIX_SPAWN_SETSIGDEF;
+    posix_spawnattr_t attr;
+    sigset_t sigdef;
+    pid_t pid;
+    int err;
+    PyObject *result = NULL;
+
+    if (!PyArg_ParseTuple(args, "sO!O!iO!:posix_spawn", &path,
+                          &PyList_Type, &argv, &PyDict_Type, &env,
+                          &setpgroup, &PyList_Type, &sigdef_list))
+        return NULL;
+
+    sigemptyset(&sigdef);
+    for (i = 0; i < PyList_Size(sigdef_list); i++) {
+        long sig = PyInt_AsLong(PyList_GetItem(sigdef_list, i));
+        if (sig == -1 && PyErr_Occurred())
+            return NULL;
+        sigaddset(&sigdef, (int)sig);
+    }
+
+    /* The strings are borrowed from argv, which outlives the call */
+    argc = PyList_Size(argv);
+    argvlist = PyMem_NEW(char *, argc+1);
+    if (argvlist == NULL)
+        return PyErr_NoMemory();
+    for (i = 0; i < argc; i++) {
+        argvlist[i] = PyString_AsString(PyList_GetItem(argv, i));
+        if (argvlist[i] == NULL)
+            goto done;
+    }
+    argvlist[argc] = NULL;
+
+    envlist = PyMem_NEW(char *, PyDict_Size(env) + 1);
+    if (envlist == NULL) {
+        PyErr_NoMemory();
+        goto done;
+    }
+    pos = 0;
+    while (PyDict_Next(env, &pos, &key, &val)) {
+        char *p, *k, *v;
+        size_t len;
+
+        k = PyString_AsString(key);
+        v = PyString_AsString(val);
+        if (k == NULL || v == NULL)
+            goto done;
+
+        len = PyString_Size(key) + PyString_Size(val) + 2;
+        p = PyMem_NEW(char, len);
+        if (p == NULL) {
+            PyErr_NoMemory();
+            goto done;
+        }
+        PyOS_snprintf(p, len, "%s=%s", k, v);
+        envlist[envc++] = p;
+    }
+    envlist[envc] = NULL;
+
+    posix_spawnattr_init(&attr);
+#ifdef POSIX_SPAWN_USEVFORK
+    flags |= POSIX_SPAWN_USEVFORK;  /* for older glibc */
+#endif
+    if (setpgroup >= 0) {
+        flags |= POSIX_SPAWN_SETPGROUP;
+        posix_spawnattr_setpgroup(&attr, setpgroup);
+    }
+    posix_spawnattr_setsigdefault(&attr, &sigdef);
+    posix_spawnattr_setflags(&attr, flags);
+
+    err = posix_spawn(&pid, path, NULL, &attr, argvlist, envlist);
+    posix_spawnattr_destroy(&attr);
+
+    if (err != 0) {
+        errno = err;
+        posix_error();
+    }
+    else {
+        result = PyInt_FromLong((long)pid);
+    }
+
+  done:
+    if (envlist != NULL) {
+        while (--envc >= 0)
+            PyMem_DEL(envlist[envc]);
+        PyMem_DEL(envlist);
+    }
+    PyMem_DEL(argvlist);
+    return result;
+}
 #endif /* HAVE_EXECV */
 
 #ifdef HAVE_FORK
@@ -2112,6 +2224,45 @@ posix_write(PyObject *self, PyObject *args)
 }
 
 
+PyDoc_STRVAR_remove(posix_lseek__doc__,
+"lseek(fd, pos, how) -> newpos\n\n\
+Set the current position of a file descriptor.\n\
+Return the new cursor position in bytes, starting from the beginning.");
+
+static PyObject *
+posix_lseek(PyObject *self, PyObject *args)
+{
+    int fd, how;
+    off_t pos, res;
+    PyObject *posobj;
+    if (!PyArg_ParseTuple(args, "iOi:lseek", &fd, &posobj, &how))
+        return NULL;
+
+#if !defined(HAVE_LARGEFILE_SUPPORT)
+    pos = PyInt_AsLong(posobj);
+#else
+    pos = PyLong_Check(posobj) ?
+        PyLong_AsLongLong(posobj) : PyInt_AsLong(posobj);
+#endif
+    if (PyErr_Occurred())
+        return NULL;
+
+    if (!_PyVerify_fd(fd))
+        return posix_error();
+    Py_BEGIN_ALLOW_THREADS
+    res = lseek(fd, pos, how);
+    Py_END_ALLOW_THREADS
+    if (res < 0)
+        return posix_error();
+
+#if !defined(HAVE_LARGEFILE_SUPPORT)
+    return PyInt_FromLong(res);
+#else
+    return PyLong_FromLongLong(res);
+#endif
+}
+
+
 PyDoc_STRVAR_remove(posix_fstat__doc__,
 "fstat(fd) -> stat result\n\n\
 Like stat(), but for an open file descriptor.");
@@ -2559,12 +2710,14 @@ static PyMethodDef posix_methods[] = {
   {"lstat", posix_lstat, METH_VARARGS},
   {"readlink", posix_readlink, METH_VARARGS},
   {"stat", posix_stat, METH_VARARGS},
+  {"fstat", posix_fstat, METH_VARARGS},
   {"umask", posix_umask, METH_VARARGS},
   {"uname", posix_uname, METH_NOARGS},
   {"times", posix_times, METH_NOARGS},
   {"_exit", posix__exit, METH_VARARGS},
   {"execv", posix_execv, METH_VARARGS},
   {"execve", posix_execve, METH_VARARGS},
+  {"posix_spawn", posix_posix_spawn, METH_VARARGS},
   {"fork", posix_fork, METH_NOARGS},
   {"getegid", posix_getegid, METH_NOARGS},
   {"geteuid", posix_geteuid, METH_NOARGS},
@@ -2578,6 +2731,9 @@ static PyMethodDef posix_methods[] = {
   {"dup2", posix_dup2, METH_VARARGS},
   {"read", posix_read, METH_VARARGS},
   {"write", posix_write, METH_VARARGS},
+  {"lseek", posix_lseek, METH_VARARGS},
+  {"unlink", posix_unlink, METH_VARARGS},
+  {"rename", posix_rename, METH_VARARGS},
   {"fdopen", posix_fdopen, METH_VARARGS},
   {"isatty", posix_isatty, METH_VARARGS},
   {"pipe", posix_pipe, METH_NOARGS},
@@ -2652,6 +2808,12 @@ all_ins(PyObject *d)
 #ifdef O_RDWR
     if (ins(d, "O_RDWR", (long)O_RDWR)) return -1;
 #endif
+#ifdef SEEK_SET
+    if (ins(d, "SEEK_SET", (long)SEEK_SET)) return -1;
+#endif
+#ifdef SEEK_CUR
+    if (ins(d, "SEEK_CUR", (long)SEEK_CUR)) return -1;
+#endif
 #ifdef O_NDELAY
     if (ins(d, "O_NDELAY", (long)O_NDELAY)) return -1;
 #endif
@@ -132,6 +132,22 @@ n=3
 ## N-I dash/mksh/zsh/ash STDOUT:
 ## END
 
+#### mapfile -t keeps empty lines
+type mapfile >/dev/null 2>&1 || exit 0
+printf 'a\n\nb' | {
+  mapfile -t arr
+  echo "n=${#arr[@]}"
+  printf '[%s]\n' "${arr[@]}"
+}
+## STDOUT:
+n=3
+[a]
+[]
+[b]
+## END
+## N-I dash/mksh/zsh/ash STDOUT:
+## END
+
 #### mapfile -t doesn't remove \r
 type mapfile >/dev/null 2>&1 || exit 0
 printf '%s\r\n' {1..5..2} | {
@@ -231,6 +231,42 @@ echo status=$?
 ## OK mksh stdout-json: ""
 ## OK mksh status: 1
 
+#### Eval the same strings many times
+f() {
+  eval "$1"
+}
+x=0
+for i in 1 2 3; do
+  eval 'x=$((x + i))
+echo "i=$i x=$x"'
+  f 'echo "f $i"'
+done
+eval 'echo "x=$x"'
+f 'echo "x=$x"'
+## STDOUT:
+i=1 x=1
+f 1
+i=2 x=3
+f 2
+i=3 x=6
+f 3
+x=6
+x=6
+## END
+
+#### Eval the same string after an alias is defined
+shopt -s expand_aliases 2>/dev/null  # bash
+
+hi() { echo function; }
+for i in 1 2; do
+  eval 'hi'
+  alias hi='echo alias'
+done
+## STDOUT:
+function
+alias
+## END
+
 #### Eval in does tilde expansion
 
 x="~"
@@ -767,3 +767,15 @@ status=1
 status=0
 ## END
 ## N-I dash/ash/mksh/zsh stdout-json: ""
+
+#### read from a file leaves the rest of the input for other commands
+printf '%s\n' one two three four > tmp.txt
+
+{ read a; head -n 1; read -n 2 b; read c
+  echo "[$a] [$b] [$c]"
+} < tmp.txt
+
+## STDOUT:
+two
+[one] [th] [ree]
+## END
@@ -242,3 +242,43 @@ in esac
 ## OK mksh status: 1
 ## OK zsh status: 127
 
+
+#### Literal, glob, and dynamic patterns keep first-match order
+pat='-[a-c]'
+for a in -v --verbose -b -z '-[a-c]' '*' foo; do
+  case $a in
+    -v|--verbose) echo "$a verbose" ;;
+    $pat) echo "$a dynamic" ;;
+    -[a-c]) echo "$a glob" ;;
+    '-[a-c]') echo "$a quoted" ;;
+    "*") echo "$a star" ;;
+    --verbose|foo) echo "$a foo" ;;
+    *) echo "$a default" ;;
+  esac
+done
+## STDOUT:
+-v verbose
+--verbose verbose
+-b dynamic
+-z default
+-[a-c] quoted
+* star
+foo foo
+## END
+
+#### Patterns after the matching arm aren't evaluated
+case x in
+  x) echo literal ;;
+  $(echo bad >&2)) echo bad ;;
+esac
+case x in
+  $(echo side >&2; echo x)) echo dynamic ;;
+  x) echo bad ;;
+esac
+## STDOUT:
+literal
+dynamic
+## END
+## STDERR:
+side
+## END
@@ -284,3 +284,115 @@ echo -$()- ".$()."
 ## STDOUT:
 -- ..
 ## END
+
+#### no_fork_command_sub: functions, locals, and nested subs
+shopt -s no_fork_command_sub 2>/dev/null
+
+f() { local x=$1 i; for i in a b; do echo "$x$i"; done; }
+echo "[$(f z)] [$(echo $(echo nested))] [$(printf '%s-' 1 2)]"
+echo "x=$x i=$i"
+## STDOUT:
+[za
+zb] [nested] [1-2-]
+x= i=
+## END
+
+#### no_fork_command_sub: assignments and cd don't leak out
+shopt -s no_fork_command_sub 2>/dev/null
+
+g() { y=leak; echo g; }
+h() { cd /; echo h; }
+echo "[$(g)] y=$y"
+old=$PWD
+echo "[$(h)] same=$(test "$PWD" = "$old" && echo yes)"
+## STDOUT:
+[g] y=
+[h] same=yes
+## END
+
+#### no_fork_command_sub: if and while
+shopt -s no_fork_command_sub 2>/dev/null
+
+f() {
+  local i=0
+  while test $i -lt 3; do
+    if test $i = 1; then echo one; else echo $i; fi
+    i=$(( i + 1 ))
+  done
+}
+echo "[$(f)] [$(if true; then echo yes; fi)] [$(while false; do :; done)]"
+## STDOUT:
+[0
+one
+2] [yes] []
+## END
+
+#### no_fork_command_sub: local that may not run doesn't hide assignments
+shopt -s no_fork_command_sub 2>/dev/null
+
+g() { case a in b) local y;; esac; y=leaked; echo g; }
+h() { true && local z; z=leaked; echo h; }
+x=$(g)
+x=$(h)
+echo "y=$y z=$z"
+## STDOUT:
+y= z=
+## END
+
+#### no_fork_command_sub: ${!ref} and $BASHPID
+shopt -s no_fork_command_sub 2>/dev/null
+
+a=(x y z)
+ref='a[i=2]'
+x=$(echo ${!ref})
+echo "x=$x i=$i"
+test "$(echo $BASHPID)" != "$BASHPID" && echo differs
+test "$(echo ${BASHPID})" != "$BASHPID" && echo differs
+## STDOUT:
+x=z i=
+differs
+differs
+## END
+## N-I dash status: 2
+## N-I dash STDOUT:
+## END
+
+#### no_fork_command_sub: ${x@P} runs prompt code in the sub
+shopt -s no_fork_command_sub 2>/dev/null
+
+x='$((y=5))'
+z=$(echo ${x@P})
+echo "z=$z y=${y:-unset}"
+## STDOUT:
+z=5 y=unset
+## END
+## N-I dash STDOUT:
+z= y=unset
+## END
+
+#### no_fork_command_sub: status and stderr
+shopt -s no_fork_command_sub 2>/dev/null
+
+x=$(false)
+echo status=$?
+x=$(echo out; echo err >&2; true) 2>/dev/null
+echo status=$? x=$x
+x=$(echo; exit 3)
+echo status=$?
+## STDOUT:
+status=1
+status=0 x=out
+status=3
+## END
+
+#### no_fork_command_sub: large output and $(<file)
+shopt -s no_fork_command_sub 2>/dev/null
+
+n=$(printf 'x%.0s' $(seq 10000))
+echo ${#n}
+echo hi > $TMP/nofork.txt
+echo "[$(<$TMP/nofork.txt)] [$(cat $TMP/nofork.txt)]"
+## STDOUT:
+10000
+[hi] [hi]
+## END
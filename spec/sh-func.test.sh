@@ -56,6 +56,35 @@ g_var=f_mutation
 g_var=
 ## END
 
+#### Dynamic Scope in deep recursion
+x=global
+f() {
+  local d=$1
+  if test $d -eq 5 || test $d -eq 12; then
+    local x="x$d"
+  fi
+  if test $d -eq 20; then
+    echo "x=$x"
+    x=mutated
+    new_global=new
+    return
+  fi
+  f $((d + 1))
+  case $d in 1|4|5|11|12|19) echo "$d x=$x" ;; esac
+}
+f 1
+echo "x=$x new_global=$new_global"
+## STDOUT:
+x=x12
+19 x=mutated
+12 x=mutated
+11 x=x5
+5 x=x5
+4 x=global
+1 x=global
+x=global new_global=new
+## END
+
 #### Assign local separately
 f() {
   local f
@@ -161,3 +161,97 @@ status=0
 status=1
 ## END
 
+
+#### --tool parse-batch parses files in workers
+cd $TMP
+echo 'echo ok' > good.sh
+echo 'echo (' > bad.sh
+
+printf '%s\n' good.sh bad.sh missing.sh good.sh > files.txt
+$SH --tool parse-batch --parse-jobs 3 files.txt > out.txt
+echo status=$?
+
+# Results are streamed in any order; the summary is last
+head -n 4 out.txt | sort
+tail -n 1 out.txt | sed 's/"elapsed":[0-9.e-]*/"elapsed":X/'
+
+## STDOUT:
+status=2
+{"path":"bad.sh","status":"error","line":1,"col":7,"message":"Syntax error in expression (near Id.Eof_Real)"}
+{"path":"good.sh","status":"ok"}
+{"path":"good.sh","status":"ok"}
+{"path":"missing.sh","status":"error","message":"Couldn't open: No such file or directory"}
+{"files":4,"errors":2,"jobs":3,"elapsed":X}
+## END
+
+
+#### OILS_PARSE_CACHE_DIR caches files run with source and use
+cd $TMP
+mkdir -p cache
+
+cat >lib.sh <<'SH'
+f() {
+  echo "f $1"
+}
+cat <<END
+here doc
+END
+SH
+
+cat >mod.ysh <<'SH'
+const __provide__ = :| p |
+proc p (x) { echo "p $x" }
+SH
+
+for i in 1 2; do
+  OILS_PARSE_CACHE_DIR=cache $SH -c '
+  source lib.sh
+  f 42
+  shopt -s ysh:upgrade
+  use mod.ysh --pick p
+  p 43
+  '
+done
+ls cache | wc -l
+
+# Files are parsed again after they change
+echo 'echo changed' >> lib.sh
+OILS_PARSE_CACHE_DIR=cache $SH -c 'source lib.sh'
+
+## STDOUT:
+here doc
+f 42
+p 43
+here doc
+f 42
+p 43
+2
+here doc
+changed
+## END
+
+
+#### eval cache respects parse options, and shows hits in the trace dump
+mkdir -p $TMP/eval-cache
+
+OILS_TRACE_DIR=$TMP/eval-cache $SH -c '
+a=(x y)
+for i in 1 2 3; do
+  eval "echo @a"
+  shopt -s parse_at
+done
+'
+
+python3 -c '
+import json, sys
+for path in sys.argv[1:]:
+    with open(path) as f:
+        print(json.load(f)["metric_eval_cache"])
+' $TMP/eval-cache/*.json
+
+## STDOUT:
+@a
+x y
+x y
+{'hits': 1, 'misses': 2}
+## END
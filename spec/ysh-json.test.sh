@@ -163,6 +163,42 @@ pp cell_ y
 y = (Cell exported:F readonly:F nameref:F val:(value.Dict d:{age (value.Int i:43)}))
 ## END
 
+#### json read with path= selects one value
+echo '{"items": [{"name": "a"}, {"name": "b", "tags": [1, 2]}]}' > $TMP/items.json
+
+json read (&x, path=['items', 1]) < $TMP/items.json
+pp test_ (x)
+
+json read (&x, path=['items', 1, 'name']) < $TMP/items.json
+pp test_ (x)
+
+json read (&x, path=['items', 5]) < $TMP/items.json
+echo status=$?
+
+echo '[1, [2}' | json read (&x, path=[0])
+echo status=$?
+
+json read (&x, path=[null]) < $TMP/items.json
+echo status=$?
+## STDOUT:
+(Dict)   {"name":"b","tags":[1,2]}
+(Str)   "b"
+status=1
+status=1
+## END
+## status: 3
+
+#### json read with path= checks the whole document, and the last key wins
+echo '{"a": 1, "b": [1 2 3]}' | json read (&x, path=['a'])
+echo status=$?
+
+echo '{"a": 1, "a": 2}' | json read (&x, path=['a'])
+pp test_ (x)
+## STDOUT:
+status=1
+(Int)   2
+## END
+
 #### invalid JSON
 echo '{' | json read (&y)
 echo pipeline status = $?
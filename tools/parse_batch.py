@@ -0,0 +1,189 @@
+from __future__ import print_function
+"""
+parse_batch.py: Parse many files in worker processes.
+
+    find . -name '*.sh' | osh --tool parse-batch --parse-jobs 8
+
+The paths to parse are read one per line, from stdin or the file argument.
+They're divided among forked workers, so we pay for shell startup once rather
+than once per file.
+
+Each worker prints a JSON8 message on its own line as soon as a file is parsed:
+
+    {"path": "a.sh", "status": "ok"}
+    {"path": "b.sh", "status": "error", "line": 3, "col": 5, "message": "..."}
+
+When all workers are done, we print a summary:
+
+    {"files": 2, "errors": 1, "jobs": 8, "elapsed": 0.012}
+
+The exit status is 2 if any file had an error, like osh -n.
+"""
+
+from _devbuild.gen.syntax_asdl import source
+from _devbuild.gen.value_asdl import value, value_t
+from core import alloc
+from core import error
+from core import main_loop
+from core import pyos
+from data_lang import j8
+from frontend import location
+from frontend import reader
+from mycpp import mops
+from mycpp import mylib
+from mycpp.mylib import log, print_stderr
+
+import posix_ as posix
+import time as time_
+
+from typing import List, Dict, TYPE_CHECKING
+if TYPE_CHECKING:
+    from core import process
+    from frontend.parse_lib import ParseContext
+
+_ = log
+
+
+def ReadPaths(line_reader):
+    # type: (reader._Reader) -> List[str]
+    """Returns the non-empty lines of the file list."""
+    paths = []  # type: List[str]
+    while True:
+        src_line, _ = line_reader.GetLine()
+        if src_line is None:
+            break
+        path = src_line.content.rstrip()
+        if len(path):
+            paths.append(path)
+    line_reader.arena.DiscardLines()
+    return paths
+
+
+def _WriteMessage(d):
+    # type: (Dict[str, value_t]) -> None
+    buf = mylib.BufWriter()
+    j8.PrintMessage(value.Dict(d), buf, -1)
+    buf.write('\n')
+
+    # One write() per message, so the lines of workers don't interleave
+    posix.write(1, buf.getvalue())
+
+
+def _Int(i):
+    # type: (int) -> value_t
+    return value.Int(mops.IntWiden(i))
+
+
+def ParseFile(parse_ctx, fd_state, path):
+    # type: (ParseContext, process.FdState, str) -> bool
+    """Parse a file and print the result.  Returns whether it was OK."""
+    d = mylib.NewDict()  # type: Dict[str, value_t]
+    d['path'] = value.Str(path)
+
+    try:
+        f = fd_state.Open(path)
+    except (IOError, OSError) as e:
+        d['status'] = value.Str('error')
+        d['message'] = value.Str("Couldn't open: %s" %
+                                 posix.strerror(e.errno))
+        _WriteMessage(d)
+        return False
+
+    arena = parse_ctx.arena
+    line_reader = reader.FileLineReader(f, arena)
+    c_parser = parse_ctx.MakeOshParser(line_reader)
+
+    ok = True
+    with alloc.ctx_SourceCode(arena, source.MainFile(path)):
+        try:
+            main_loop.ParseWholeFile(c_parser)
+        except error.Parse as e:
+            ok = False
+            d['status'] = value.Str('error')
+            blame_tok = location.TokenFor(e.location)
+            if blame_tok:
+                d['line'] = _Int(blame_tok.line.line_num)
+                d['col'] = _Int(blame_tok.col)
+            d['message'] = value.Str(e.UserErrorString())
+    f.close()
+    arena.DiscardLines()
+
+    if ok:
+        d['status'] = value.Str('ok')
+    _WriteMessage(d)
+    return ok
+
+
+def _Worker(parse_ctx, fd_state, paths, worker_id, num_jobs, w):
+    # type: (ParseContext, process.FdState, List[str], int, int, int) -> None
+    """Parse every num_jobs'th file, then report counts to the parent."""
+    num_files = 0
+    num_errors = 0
+    i = worker_id
+    while i < len(paths):
+        if not ParseFile(parse_ctx, fd_state, paths[i]):
+            num_errors += 1
+        num_files += 1
+        i += num_jobs
+
+    posix.write(w, '%d %d\n' % (num_files, num_errors))
+    posix.close(w)
+
+
+def ParseBatch(parse_ctx, fd_state, paths, num_jobs):
+    # type: (ParseContext, process.FdState, List[str], int) -> int
+    """Parse the files in num_jobs worker processes.
+
+    Returns the exit status.
+    """
+    start_time = time_.time()
+
+    if num_jobs > len(paths):
+        num_jobs = len(paths)
+    if num_jobs < 1:
+        num_jobs = 1
+
+    pids = []  # type: List[int]
+    read_fds = []  # type: List[int]
+    for worker_id in xrange(num_jobs):
+        r, w = posix.pipe()
+        pid = posix.fork()
+        if pid == 0:  # child
+            mylib.FreezeHeap()
+            posix.close(r)
+            _Worker(parse_ctx, fd_state, paths, worker_id, num_jobs, w)
+            posix._exit(0)
+
+        posix.close(w)
+        pids.append(pid)
+        read_fds.append(r)
+
+    num_files = 0
+    num_errors = 0
+    failed = False
+    for i, pid in enumerate(pids):
+        _, status = posix.waitpid(pid, 0)
+
+        # The counts fit in the pipe buffer, so workers never block on them
+        buf = mylib.BufWriter()
+        pyos.ReadAll(read_fds[i], -1, buf)
+        posix.close(read_fds[i])
+
+        counts = buf.getvalue().split()
+        if status != 0 or len(counts) != 2:
+            print_stderr('parse-batch: worker %d failed' % pid)
+            failed = True
+            continue
+        num_files += int(counts[0])
+        num_errors += int(counts[1])
+
+    d = mylib.NewDict()  # type: Dict[str, value_t]
+    d['files'] = _Int(num_files)
+    d['errors'] = _Int(num_errors)
+    d['jobs'] = _Int(num_jobs)
+    d['elapsed'] = value.Float(time_.time() - start_time)
+    _WriteMessage(d)
+
+    if failed:
+        return 1
+    return 2 if num_errors else 0
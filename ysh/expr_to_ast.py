@@ -406,7 +406,7 @@ class Transformer(object):
                       parent.GetChild(2).tok)
 
             name_tok = parent.GetChild(1).tok
-            return expr.Place(name_tok, lexer.TokenVal(name_tok), [])
+            return expr.Place(name_tok, intern(lexer.TokenVal(name_tok)), [])
 
         if id_ == Id.Expr_Func:
             # STUB.  This should really be a Func, not Lambda.
@@ -440,7 +440,7 @@ class Transformer(object):
         if n == 3:
             typ = self._TypeExpr(p_node.GetChild(2))
 
-        return NameType(name_tok, lexer.TokenVal(name_tok), typ)
+        return NameType(name_tok, intern(lexer.TokenVal(name_tok)), typ)
 
     def _NameTypeList(self, p_node):
         # type: (PNode) -> List[NameType]
@@ -728,7 +728,7 @@ class Transformer(object):
 
         tok = pnode.tok
         if typ == Id.Expr_Name:
-            return expr.Var(tok, lexer.TokenVal(tok))
+            return expr.Var(tok, intern(lexer.TokenVal(tok)))
 
         # Everything else is an expr.Const
         tok_str = lexer.TokenVal(tok)
@@ -1187,7 +1187,8 @@ class Transformer(object):
             type_ = self._TypeExpr(pnode.GetChild(1))
             default_val = self.Expr(pnode.GetChild(3))
 
-        return Param(name_tok, lexer.TokenVal(name_tok), type_, default_val)
+        return Param(name_tok, intern(lexer.TokenVal(name_tok)), type_,
+                     default_val)
 
     def _ParamGroup(self, p_node):
         # type: (PNode) -> ParamGroup